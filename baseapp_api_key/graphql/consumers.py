@@ -11,12 +11,24 @@ from graphene_django.settings import graphene_settings
 
 from baseapp_api_key.models import APIKey, BaseAPIKey
 from baseapp_core.graphql import get_pk_from_relay_id
-from baseapp_core.graphql.consumers import threadpool_for_sync_resolvers
+from baseapp_core.graphql.consumers import (
+    PersistedQueryConsumerMixin,
+    QueryBudgetConsumerMixin,
+    QueryCostConsumerMixin,
+    SubscriptionGroupsConsumerMixin,
+    threadpool_for_sync_resolvers,
+)
 
 python_version = sys.version_info
 
 
-class BaseGraphqlWsAPIKeyAuthenticatedConsumer(channels_graphql_ws.GraphqlWsConsumer):
+class BaseGraphqlWsAPIKeyAuthenticatedConsumer(
+    PersistedQueryConsumerMixin,
+    QueryCostConsumerMixin,
+    QueryBudgetConsumerMixin,
+    SubscriptionGroupsConsumerMixin,
+    channels_graphql_ws.GraphqlWsConsumer,
+):
     APIKeyModel: typing.Type[BaseAPIKey]
     middleware = [threadpool_for_sync_resolvers]
 
@@ -61,6 +61,7 @@ class AbstractBlock(DocumentIdMixin, RelayModel, TimeStampedModel):
         if created:
             self.update_blockers_count(self.target)
             self.update_blocking_count(self.actor)
+            self.invalidate_chats_permissions(self.actor_id, self.target_id)
 
     def delete(self, *args, **kwargs) -> None:
         actor = self.actor
@@ -69,6 +70,7 @@ class AbstractBlock(DocumentIdMixin, RelayModel, TimeStampedModel):
 
         self.update_blockers_count(target)
         self.update_blocking_count(actor)
+        self.invalidate_chats_permissions(self.actor_id, self.target_id)
 
     @classmethod
     def get_graphql_object_type(cls) -> type["DjangoObjectType"]:
@@ -92,6 +94,13 @@ class AbstractBlock(DocumentIdMixin, RelayModel, TimeStampedModel):
             return
         service.recompute_blocking_count(actor)
 
+    def invalidate_chats_permissions(self, *profile_ids) -> None:
+        # Chat permission caches memoise the blocks between participants
+        service = shared_services.get("chats_participation")
+        if service is None:
+            return
+        service.invalidate_permissions_of_profiles(profile_ids)
+
 
 class AbstractBlockableMetadata(DocumentIdUniqueTargetMixin, TimeStampedModel):
     """
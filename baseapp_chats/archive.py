@@ -0,0 +1,339 @@
+"""
+Archival of cold chat messages.
+
+`archive_messages` moves the messages older than a date out of the `Message` table into
+an archive table, `<message table>_archive`, declaratively partitioned by month on
+`created`, with its text and JSON columns compressed (`lz4` where the server supports
+it). Their `MessageStatus` rows are marked read, then deleted along with the messages:
+archived messages count as read.
+
+A room's last message, and messages replied to by messages that stay, are kept, so no
+foreign key points into the archive. So are messages with rows keyed on their
+`DocumentId`, like mentions and reactions, which would be deleted with them. Archived
+messages are read-only history: their public ids are kept in the archive's `public_id`
+column, and their `DocumentId` rows are deleted, so they can't be fetched by id.
+
+With `BASEAPP_CHATS_MESSAGE_ARCHIVE = True`, `ChatRoom.allMessages` pages through the
+archived messages of a room after its hot ones (see `MessageHistoryConnectionField`).
+`get_archived_queryset` reads the archive as a `Message` queryset, so the connection's
+filters apply to archived messages too.
+The `Message` table itself isn't partitioned: its primary key is the target of foreign
+keys (`MessageStatus`, replies, `ChatRoom.last_message`), which Postgres doesn't allow
+on partitioned tables whose key doesn't include the partition column.
+"""
+
+import logging
+from datetime import date, datetime
+from datetime import timezone as dt_timezone
+
+import swapper
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import DatabaseError, connection, models, transaction
+from django.db.models import F, prefetch_related_objects
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import TruncMonth
+from django.db.models.sql.datastructures import BaseTable
+from django.utils import timezone
+
+from baseapp_core.models import DocumentId
+
+logger = logging.getLogger(__name__)
+
+Message = swapper.load_model("baseapp_chats", "Message")
+MessageStatus = swapper.load_model("baseapp_chats", "MessageStatus")
+
+COMPRESSED_FIELDS = (models.TextField, models.JSONField)
+PUBLIC_ID_COLUMN = "public_id"
+
+
+def is_archive_enabled() -> bool:
+    return getattr(settings, "BASEAPP_CHATS_MESSAGE_ARCHIVE", False)
+
+
+def get_archive_table() -> str:
+    return f"{Message._meta.db_table}_archive"
+
+
+def get_partition_table(month: date) -> str:
+    return f"{get_archive_table()}_{month:%Y_%m}"
+
+
+def _columns() -> list[str]:
+    return [field.column for field in Message._meta.concrete_fields]
+
+
+def _select_columns(table: str | None = None) -> str:
+    quote = connection.ops.quote_name
+    prefix = f"{quote(table)}." if table else ""
+    return ", ".join(prefix + quote(column) for column in _columns())
+
+
+def ensure_archive_table() -> None:
+    """Create the archive table, or add the columns `Message` gained since."""
+    quote = connection.ops.quote_name
+    table = get_archive_table()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NULL", [quote(table)])
+        changed = cursor.fetchone()[0]
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(table)} "
+            f"(LIKE {quote(Message._meta.db_table)} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE ({quote(Message._meta.get_field('created').column)})"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(table + '_room_idx')} "
+            f"ON {quote(table)} (room_id, created DESC, id DESC)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(table + '_id_idx')} ON {quote(table)} (id)"
+        )
+        existing = {
+            column.name for column in connection.introspection.get_table_description(cursor, table)
+        }
+        for field in Message._meta.concrete_fields:
+            if field.column not in existing:
+                changed = True
+                cursor.execute(
+                    f"ALTER TABLE {quote(table)} "
+                    f"ADD COLUMN {quote(field.column)} {field.db_type(connection)}"
+                )
+        if PUBLIC_ID_COLUMN not in existing:
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(PUBLIC_ID_COLUMN)} uuid")
+            _adopt_document_ids(cursor)
+    if changed:
+        _compress(table)
+
+
+def _adopt_document_ids(cursor) -> None:
+    # Messages archived before the `public_id` column existed kept their `DocumentId` rows
+    quote = connection.ops.quote_name
+    table, document_table = quote(get_archive_table()), quote(DocumentId._meta.db_table)
+    content_type_id = ContentType.objects.get_for_model(Message).pk
+    cursor.execute(
+        f"UPDATE {table} AS archived SET {quote(PUBLIC_ID_COLUMN)} = document.public_id "
+        f"FROM {document_table} AS document "
+        "WHERE document.content_type_id = %s AND document.object_id = archived.id",
+        [content_type_id],
+    )
+    cursor.execute(
+        f"DELETE FROM {document_table} AS document USING {table} AS archived "
+        "WHERE document.content_type_id = %s AND document.object_id = archived.id "
+        f"AND NOT EXISTS (SELECT 1 FROM {quote(Message._meta.db_table)} AS message "
+        "WHERE message.id = archived.id)",
+        [content_type_id],
+    )
+
+
+def ensure_archive_partition(month: date) -> str:
+    """Create the archive partition of the month of `month`, returning its name."""
+    quote = connection.ops.quote_name
+    start = month.replace(day=1)
+    stop = (
+        start.replace(year=start.year + 1, month=1)
+        if start.month == 12
+        else start.replace(month=start.month + 1)
+    )
+    partition = get_partition_table(start)
+    with connection.cursor() as cursor:
+        # Existing partitions were compressed when created, skip the `ALTER TABLE` locks
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [quote(partition)])
+        if cursor.fetchone()[0]:
+            return partition
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(partition)} PARTITION OF "
+            f"{quote(get_archive_table())} FOR VALUES FROM (%s) TO (%s)",
+            [start.isoformat(), stop.isoformat()],
+        )
+    _compress(partition)
+    return partition
+
+
+def _compress(table: str) -> None:
+    # Column compression methods need Postgres 14 built with lz4, pglz is used otherwise
+    if connection.pg_version < 140000:
+        return
+    quote = connection.ops.quote_name
+    columns = [
+        field.column
+        for field in Message._meta.concrete_fields
+        if isinstance(field, COMPRESSED_FIELDS)
+    ]
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            for column in columns:
+                cursor.execute(
+                    f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(column)} SET COMPRESSION lz4"
+                )
+    except DatabaseError:
+        logger.info("lz4 compression isn't available, %s uses the default compression", table)
+
+
+def get_archivable_messages(before: datetime) -> models.QuerySet:
+    """Messages created before `before`, but the last one of each room."""
+    return Message.objects.filter(created__lt=before, room__isnull=False).filter(
+        created__lt=F("room__last_message_time")
+    )
+
+
+def archive_messages(before: datetime, batch_size: int = 1000) -> int:
+    """Move the messages created before `before` to the archive, returning their count."""
+    ensure_archive_table()
+    archived, last_pk = 0, 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                get_archivable_messages(before)
+                .filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                return archived
+            last_pk = ids[-1]
+            archived += _archive_batch(_exclude_replied_to(_exclude_referenced(set(ids))))
+
+
+def _exclude_referenced(ids: set) -> set:
+    # Mentions, reactions and other rows keyed on the `DocumentId` of a message would be
+    # deleted along with it, so the message stays
+    content_type = ContentType.objects.get_for_model(Message)
+    for relation in DocumentId._meta.related_objects:
+        if not ids:
+            break
+        if relation.many_to_many or not relation.field.concrete:
+            continue
+        name = relation.field.name
+        ids -= set(
+            relation.related_model._base_manager.filter(
+                **{f"{name}__content_type": content_type, f"{name}__object_id__in": ids}
+            ).values_list(f"{name}__object_id", flat=True)
+        )
+    return ids
+
+
+def _exclude_replied_to(ids: set) -> list:
+    # Messages replied to by a message that stays in the `Message` table stay too
+    while ids:
+        replied_to = set(
+            Message.objects.filter(in_reply_to_id__in=ids)
+            .exclude(pk__in=ids)
+            .values_list("in_reply_to_id", flat=True)
+        )
+        if not replied_to:
+            break
+        ids -= replied_to
+    return sorted(ids)
+
+
+def _archive_batch(ids: list) -> int:
+    if not ids:
+        return 0
+    months = (
+        Message.objects.filter(pk__in=ids)
+        # Partition bounds are in the connection's time zone, UTC
+        .annotate(month=TruncMonth("created", tzinfo=dt_timezone.utc))
+        .order_by()
+        .values_list("month", flat=True)
+        .distinct()
+    )
+    for month in months:
+        ensure_archive_partition(month.date())
+
+    # Archived messages count as read, keeping `UnreadMessageCount` in sync
+    MessageStatus.objects.filter(message_id__in=ids, is_read=False).update(
+        is_read=True, read_at=timezone.now()
+    )
+    quote = connection.ops.quote_name
+    message_table = Message._meta.db_table
+    with connection.cursor() as cursor:
+        # Keep their public ids, the `delete_document_id` trigger drops their `DocumentId`
+        cursor.execute(
+            f"INSERT INTO {quote(get_archive_table())} "
+            f"({_select_columns()}, {quote(PUBLIC_ID_COLUMN)}) "
+            f"SELECT {_select_columns(message_table)}, document.public_id "
+            f"FROM {quote(message_table)} "
+            f"LEFT JOIN {quote(DocumentId._meta.db_table)} AS document "
+            f"ON document.content_type_id = %s AND document.object_id = {quote(message_table)}.id "
+            f"WHERE {quote(message_table)}.id = ANY(%s)",
+            [ContentType.objects.get_for_model(Message).pk, ids],
+        )
+    Message.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def _archive_exists() -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [get_archive_table()])
+        return cursor.fetchone()[0]
+
+
+def get_archived_queryset(room=None, since: datetime | None = None) -> models.QuerySet:
+    """
+    The archived messages, of `room` and created since `since` if given, newest first. A
+    `Message` queryset reading the archive table under the alias of the `Message` table,
+    whose columns it shares, so it can be filtered like hot messages.
+    """
+    queryset = Message.objects.all()
+    alias = queryset.query.get_initial_alias()
+    queryset.query.alias_map[alias] = BaseTable(get_archive_table(), alias)
+    if room is not None:
+        queryset = queryset.filter(room=room)
+    if since is not None:
+        queryset = queryset.filter(created__gte=since)
+    return queryset.order_by("-created", "-id")
+
+
+def count_archived_messages(
+    room, since: datetime | None = None, queryset: models.QuerySet | None = None
+) -> int:
+    """Archived messages of `room`, created since `since` if given, or of `queryset`."""
+    if not is_archive_enabled() or not _archive_exists():
+        return 0
+    if queryset is None:
+        queryset = get_archived_queryset(room, since=since)
+    return queryset.count()
+
+
+def get_archived_messages(
+    room,
+    offset: int,
+    limit: int,
+    since: datetime | None = None,
+    queryset: models.QuerySet | None = None,
+) -> list["Message"]:
+    """
+    A page of the archived messages of `room`, newest first, or of `queryset`. Their
+    `in_reply_to` and `profile` are loaded along.
+    """
+    if queryset is None:
+        queryset = get_archived_queryset(room, since=since)
+    messages = list(_with_public_ids(queryset)[offset : offset + limit])
+    _load_replied_to(messages)
+    prefetch_related_objects(messages, "profile")
+    return messages
+
+
+def _with_public_ids(queryset: models.QuerySet) -> models.QuerySet:
+    # Read by the public id resolver instead of the deleted `DocumentId` rows
+    quote = connection.ops.quote_name
+    return queryset.annotate(
+        mapped_public_id=RawSQL(f"{quote(Message._meta.db_table)}.{quote(PUBLIC_ID_COLUMN)}", ())
+    )
+
+
+def _load_replied_to(messages: list["Message"]) -> None:
+    # The messages replied to were archived too, unless replied to from the hot table
+    ids = {message.in_reply_to_id for message in messages if message.in_reply_to_id}
+    if not ids:
+        return
+    replied_to = {message.pk: message for message in Message.objects.filter(pk__in=ids)}
+    if missing := list(ids - replied_to.keys()):
+        replied_to.update(
+            (message.pk, message)
+            for message in _with_public_ids(get_archived_queryset().filter(pk__in=missing))
+        )
+    field = Message._meta.get_field("in_reply_to")
+    for message in messages:
+        if message.in_reply_to_id:
+            field.set_cached_value(message, replied_to.get(message.in_reply_to_id))
@@ -0,0 +1,216 @@
+"""
+Room-level fan-out of chat subscription events.
+
+Instead of one channel-layer `group_send` per participant, room events are published
+once to a room group that every participant's subscription listens to, and each
+consumer derives the participant-specific payload in `publish`. Events of the same
+room can be coalesced within a short window, keeping only the latest one.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import channels.layers
+from asgiref.sync import async_to_sync
+from channels_graphql_ws.serializer import Serializer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def room_group(room_id: int | str) -> str:
+    """Subscription group of a chat room, joined by its participants' subscriptions."""
+    return f"room-{room_id}"
+
+
+@dataclass
+class RoomFanoutStats:
+    """
+    Counters of a `RoomFanout`. `coalesced` events were replaced by a later event of the
+    same room before being sent; `latency_*` are the seconds from publishing an event to
+    handing it to the channel layer.
+    """
+
+    published: int = 0
+    coalesced: int = 0
+    sent: int = 0
+    batches: int = 0
+    batch_size_max: int = 0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+
+    @property
+    def batch_size_avg(self) -> float:
+        return self.sent / self.batches if self.batches else 0.0
+
+    @property
+    def latency_avg(self) -> float:
+        return self.latency_total / self.sent if self.sent else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            **asdict(self),
+            "batch_size_avg": self.batch_size_avg,
+            "latency_avg": self.latency_avg,
+        }
+
+
+@dataclass
+class RoomEvent:
+    subscription: Any
+    group: str
+    payload: dict
+    published_at: float = field(default_factory=time.monotonic)
+
+
+class RoomFanout:
+    """
+    Publishes subscription events to room groups.
+
+    With `BASEAPP_CHATS_FANOUT_WINDOW` (seconds, default `0`) above zero, events
+    published with a `coalesce_key` are held for the window by a background thread and
+    only the latest event per room and key is sent, all of a window's events in one
+    batch. Otherwise events are sent right away.
+    """
+
+    def __init__(self, window: float | None = None) -> None:
+        self._window = window
+        self._pending: dict[tuple, RoomEvent] = {}
+        self._condition = threading.Condition()
+        self._stats = RoomFanoutStats()
+        self._flusher: threading.Thread | None = None
+        self._flusher_pid: int | None = None
+        # Sends scheduled on a running loop, referenced until done so they aren't collected
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def window(self) -> float:
+        if self._window is not None:
+            return self._window
+        return getattr(settings, "BASEAPP_CHATS_FANOUT_WINDOW", 0)
+
+    def publish(
+        self,
+        subscription,
+        room_id: int,
+        payload: dict,
+        coalesce_key: str | None = None,
+        merge: Callable[[dict, dict], dict] | None = None,
+    ) -> None:
+        """
+        Publish `payload` to the `subscription` operations listening to the room.
+
+        Events with the same `coalesce_key` in a room replace each other within the
+        window; `merge(previous, payload)` can combine them instead.
+        """
+        event = RoomEvent(subscription, room_group(room_id), payload)
+        with self._condition:
+            self._stats.published += 1
+
+        if coalesce_key is None or self.window <= 0:
+            self._send([event])
+            return
+
+        key = (subscription, room_id, coalesce_key)
+        with self._condition:
+            if (previous := self._pending.get(key)) is not None:
+                self._stats.coalesced += 1
+                # Latency is measured from the first event of the window
+                event.published_at = previous.published_at
+                if merge is not None:
+                    event.payload = merge(previous.payload, payload)
+            self._pending[key] = event
+            self._ensure_flusher()
+            self._condition.notify()
+
+    def flush(self) -> None:
+        """Send the pending events now."""
+        with self._condition:
+            events = list(self._pending.values())
+            self._pending.clear()
+        if events:
+            self._send(events)
+
+    def stats(self) -> RoomFanoutStats:
+        with self._condition:
+            return RoomFanoutStats(**asdict(self._stats))
+
+    def _ensure_flusher(self) -> None:
+        # Called with the condition held. The thread doesn't survive a fork.
+        if self._flusher is not None and self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(
+            target=self._run_flusher, name="chats-room-fanout", daemon=True
+        )
+        self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+            time.sleep(self.window)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush chat room events")
+
+    def _send(self, events: list[RoomEvent]) -> None:
+        # Serialized here, as Django models in payloads can't be serialized in async code
+        messages = []
+        for event in events:
+            group = event.subscription._group_name(event.group)
+            payload = Serializer.serialize(event.payload)
+            messages.append((group, {"type": "broadcast", "group": group, "payload": payload}))
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            async_to_sync(self._send_async)(events, messages)
+        else:
+            task = loop.create_task(self._send_async(events, messages))
+            with self._condition:
+                self._tasks.add(task)
+            task.add_done_callback(self._send_done)
+
+    def _send_done(self, task: asyncio.Task) -> None:
+        with self._condition:
+            self._tasks.discard(task)
+        if not task.cancelled() and (exception := task.exception()) is not None:
+            logger.error("Failed to send chat room events", exc_info=exception)
+
+    async def _send_async(self, events: list[RoomEvent], messages: list[tuple]) -> None:
+        channel_layer = channels.layers.get_channel_layer()
+        results = await asyncio.gather(
+            *(channel_layer.group_send(group, message) for group, message in messages),
+            return_exceptions=True,
+        )
+
+        now = time.monotonic()
+        with self._condition:
+            stats = self._stats
+            stats.batches += 1
+            stats.sent += len(events)
+            stats.batch_size_max = max(stats.batch_size_max, len(events))
+            for event in events:
+                latency = now - event.published_at
+                stats.latency_total += latency
+                stats.latency_max = max(stats.latency_max, latency)
+
+        for event, result in zip(events, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "Failed to broadcast chat room event to %s",
+                    event.group,
+                    exc_info=result,
+                )
+
+
+room_fanout = RoomFanout()
@@ -0,0 +1,129 @@
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+import swapper
+from django.core.exceptions import ValidationError
+from django.db.models import QuerySet
+from graphene.relay.connection import connection_adapter, page_info_adapter
+from graphene_django.filter.fields import convert_enum
+from graphql_relay.connection.array_connection import offset_to_cursor
+from query_optimizer import DjangoConnectionField
+from query_optimizer.compiler import OptimizationCompiler
+from query_optimizer.prefetch_hack import evaluate_with_prefetch_hack
+from query_optimizer.utils import calculate_queryset_slice, is_optimized
+from query_optimizer.validators import validate_pagination_args
+
+from baseapp_chats.archive import (
+    count_archived_messages,
+    get_archived_messages,
+    get_archived_queryset,
+)
+
+ChatRoom = swapper.load_model("baseapp_chats", "ChatRoom")
+
+
+class MessageHistoryConnectionField(DjangoConnectionField):
+    """
+    Connection of the messages of a `ChatRoom`, newest first, that carries on into the
+    room's archived messages (see `baseapp_chats.archive`) once the hot ones are paged
+    through. Offsets and cursors span both, so clients page as usual.
+
+    `since(room, info)` returns the date the requesting profile's history starts at, if
+    any; the resolver applies it to the hot messages, the field to the archived ones. The
+    field's filters apply to both. Nested listings, prefetched by the optimizer, only list
+    hot messages.
+    """
+
+    def __init__(
+        self,
+        type_: Any,
+        since: Callable[[Any, Any], datetime | None] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self.since = since
+        super().__init__(type_, **kwargs)
+
+    def connection_resolver(self, root: Any, info: Any, **kwargs: Any) -> Any:
+        if not isinstance(root, ChatRoom):
+            return super().connection_resolver(root, info, **kwargs)
+        since = self.since(root, info) if self.since else None
+        arguments = dict(kwargs)
+        archived_queryset = self.filter_archived(
+            get_archived_queryset(root, since=since), info, arguments
+        )
+        archived = count_archived_messages(root, queryset=archived_queryset)
+        if not archived:
+            return super().connection_resolver(root, info, **kwargs)
+
+        pagination_args = validate_pagination_args(
+            first=arguments.pop("first", None),
+            last=arguments.pop("last", None),
+            offset=arguments.pop("offset", None),
+            after=arguments.pop("after", None),
+            before=arguments.pop("before", None),
+            max_limit=self.max_limit,
+        )
+        queryset = self.to_queryset(self.resolver(root, info, **arguments))
+        queryset = self.underlying_type.get_queryset(queryset, info)
+        if is_optimized(queryset):
+            return super().connection_resolver(root, info, **kwargs)
+
+        max_complexity = getattr(self.underlying_type._meta, "max_complexity", None)
+        optimizer = OptimizationCompiler(info, max_complexity=max_complexity).compile(queryset)
+        if optimizer is not None:
+            queryset = optimizer.optimize_queryset(queryset)
+
+        hot = queryset.count()
+        pagination_args["size"] = count = hot + archived
+        cut = calculate_queryset_slice(**pagination_args)
+
+        # Hot messages first, then the archived ones, both newest first
+        instances = []
+        if cut.start < hot:
+            instances += evaluate_with_prefetch_hack(queryset[cut.start : min(cut.stop, hot)])
+        if cut.stop > hot:
+            offset = max(cut.start - hot, 0)
+            instances += get_archived_messages(
+                root, offset, cut.stop - hot - offset, queryset=archived_queryset
+            )
+
+        edges = [
+            self.connection_type.Edge(node=value, cursor=offset_to_cursor(cut.start + index))
+            for index, value in enumerate(instances)
+        ]
+        connection = connection_adapter(
+            cls=self.connection_type,
+            edges=edges,
+            pageInfo=page_info_adapter(
+                startCursor=edges[0].cursor if edges else None,
+                endCursor=edges[-1].cursor if edges else None,
+                hasPreviousPage=cut.start > 0,
+                hasNextPage=cut.stop < count,
+            ),
+        )
+        connection.iterable = queryset
+        connection.length = count
+        return connection
+
+    def filter_archived(self, queryset: QuerySet, info: Any, arguments: dict) -> QuerySet:
+        """Filter the archived messages like the optimizer filters the hot ones."""
+        object_type = self.underlying_type
+        if callable(getattr(object_type, "filter_queryset", None)):
+            queryset = object_type.filter_queryset(queryset, info)
+
+        filterset_class = getattr(object_type._meta, "filterset_class", None)
+        if filterset_class is None or not self.filtering_args:
+            return queryset
+        filterset = filterset_class(
+            data={
+                name: convert_enum(value)
+                for name, value in arguments.items()
+                if name in self.filtering_args
+            },
+            queryset=queryset,
+            request=info.context,
+        )
+        if not filterset.is_valid():
+            raise ValidationError(filterset.form.errors.as_json())
+        return filterset.qs
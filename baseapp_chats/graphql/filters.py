@@ -2,6 +2,7 @@ import django_filters
 import swapper
 from django.db.models import Q, QuerySet
 
+from baseapp_chats.read_state import filter_rooms_with_unread_messages
 from baseapp_core.graphql import get_pk_from_relay_id
 
 ChatRoom = swapper.load_model("baseapp_chats", "ChatRoom")
@@ -67,14 +68,7 @@ class ChatRoomFilter(django_filters.FilterSet):
                 get_pk_from_relay_id(profile_id) if profile_id else user_profile.pk
             )
 
-            return (
-                queryset.prefetch_related("unread_messages")
-                .filter(
-                    Q(unread_messages__profile_id=unread_messages_profile_pk),
-                    Q(unread_messages__count__gt=0) | Q(unread_messages__marked_unread=True),
-                )
-                .distinct()
-            )
+            return filter_rooms_with_unread_messages(queryset, unread_messages_profile_pk)
 
         return queryset
 
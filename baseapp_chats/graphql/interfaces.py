@@ -2,22 +2,44 @@ from typing import TYPE_CHECKING
 
 import graphene
 import swapper
-from django.db.models import Q, Sum
+from graphql import GraphQLError
 from query_optimizer import DjangoConnectionField
+from query_optimizer.compiler import OptimizationCompiler
 
+from baseapp_chats.inbox import (
+    encode_inbox_cursor,
+    exclude_hidden_rooms,
+    get_inbox,
+    paginate_inbox,
+)
+from baseapp_chats.read_state import get_total_unread_count
 from baseapp_core.graphql import Node as RelayNode
 from baseapp_core.graphql import get_object_type_for_model
-from baseapp_core.plugins import shared_services
+
+from .loaders import get_chats_loader
 
 if TYPE_CHECKING:
     from django.db.models import QuerySet
 
 ChatRoom = swapper.load_model("baseapp_chats", "ChatRoom")
-UnreadMessageCount = swapper.load_model("baseapp_chats", "UnreadMessageCount")
+
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
 
 
 class ChatRoomsInterface(RelayNode):
     chat_rooms = DjangoConnectionField(get_object_type_for_model(ChatRoom))
+    chat_inbox = graphene.Field(
+        lambda: get_object_type_for_model(ChatRoom)()._meta.connection,
+        first=graphene.Int(),
+        after=graphene.String(),
+        archived=graphene.Boolean(default_value=False),
+        unread_messages=graphene.Boolean(default_value=False),
+        description=(
+            "The profile's rooms in inbox order (pinned first, then by recent activity), "
+            "paginated by keyset."
+        ),
+    )
     unread_messages_count = graphene.Int()
 
     def resolve_chat_rooms(self, info, **kwargs) -> "QuerySet":
@@ -27,37 +49,52 @@ class ChatRoomsInterface(RelayNode):
         qs = ChatRoom.objects.filter(
             participants__profile_id=self.pk,
         ).order_by("-last_message_time", "-created")
+        return exclude_hidden_rooms(qs, self.pk)
 
-        # Exclude rooms involving profiles blocked by / blocking self, via the
-        # optional blocks.lookup service. When baseapp_blocks isn't installed
-        # there are no blocks, so nothing is excluded here.
-        if blocks_service := shared_services.get("blocks.lookup"):
-            # Rooms with a participant that self blocks.
-            qs = qs.exclude(
-                participants__profile_id__in=blocks_service.get_blocked_profile_ids(self.pk)
-            )
-            # Rooms with a participant that blocks self.
-            qs = qs.exclude(
-                participants__profile_id__in=blocks_service.get_blocker_profile_ids(self.pk)
-            )
-
-        # Exclude empty 1-on-1 chat rooms where current profile is not the creator
-        # Recipients should only see 1-on-1 chats if they have at least one message
-        qs = qs.exclude(
-            Q(is_group=False)
-            & Q(created_by_profile__isnull=False)
-            & ~Q(created_by_profile_id=self.pk)
-            & Q(last_message__isnull=True)
-        )
+    def resolve_chat_inbox(
+        self, info, first=None, after=None, archived=False, unread_messages=False, **kwargs
+    ) -> graphene.relay.Connection:
+        connection_type = get_object_type_for_model(ChatRoom)()._meta.connection
+        if not info.context.user.has_perm("baseapp_chats.list_chatrooms", self):
+            connection = connection_type(edges=[], page_info=graphene.relay.PageInfo())
+            connection.length = 0
+            return connection
 
-        return qs
+        first = min(first or INBOX_PAGE_SIZE, INBOX_MAX_PAGE_SIZE)
+        inbox = get_inbox(self.pk, archived=archived, unread=unread_messages)
+        try:
+            entries, has_next_page = paginate_inbox(inbox, first, after=after)
+        except ValueError as e:
+            raise GraphQLError(str(e), extensions={"code": "invalid_cursor"})
+
+        # The rooms of the page, with the relations the selection needs
+        rooms = ChatRoom.objects.filter(pk__in=[entry.room_id for entry in entries])
+        optimizer = OptimizationCompiler(info).compile(rooms)
+        if optimizer is not None:
+            rooms = optimizer.optimize_queryset(rooms)
+        rooms = {room.pk: room for room in rooms}
+
+        loader = get_chats_loader(info)
+        edges = []
+        for entry in entries:
+            if (room := rooms.get(entry.room_id)) is None:
+                continue
+            loader.prime_participant(room, entry)
+            edges.append(connection_type.Edge(node=room, cursor=encode_inbox_cursor(entry)))
+        connection = connection_type(
+            edges=edges,
+            page_info=graphene.relay.PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=bool(after),
+                has_next_page=has_next_page,
+            ),
+        )
+        connection.length = inbox.count
+        return connection
 
     def resolve_unread_messages_count(self, info, **kwargs) -> int | None:
         if not info.context.user.has_perm("baseapp_chats.list_chatrooms", self):
             return None
 
-        aggregate_result = UnreadMessageCount.objects.filter(
-            profile_id=self.pk,
-        ).aggregate(total_count=Sum("count"))
-
-        return aggregate_result["total_count"] or 0
+        return get_total_unread_count(self.pk)
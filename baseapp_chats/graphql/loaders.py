@@ -0,0 +1,207 @@
+import threading
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import swapper
+from django.db.models import Count, Q
+
+from baseapp_chats.read_state import (
+    get_messages_read_state,
+    get_unread_messages_for_rooms,
+)
+from baseapp_core.graphql import get_pk_from_relay_id
+from baseapp_core.graphql.connections import CountedConnection
+
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
+Profile = swapper.load_model("baseapp_profiles", "Profile")
+
+# Attribute used to memoise the loader on the GraphQL context, see `get_chats_loader`
+CONTEXT_ATTR = "_chats_loader"
+
+
+class ChatsLoader:
+    """
+    Operation-scoped batching loader for the per-room and per-message lookups of the chat
+    object types.
+
+    Rooms and messages are primed by `ChatRoomConnection` / `MessageConnection` with each
+    page of nodes, and the first lookup that misses answers it for every primed node at
+    once, so resolving `isArchived` for a page of 30 rooms costs one query instead of 30.
+    Results are keyed by `(room_id or message_id, profile_pk)` and memoised for the
+    lifetime of the loader.
+    """
+
+    def __init__(self) -> None:
+        # Websocket resolvers of the same operation run in several threads
+        self._lock = threading.RLock()
+        self._rooms: dict[int, Any] = {}
+        self._messages: dict[int, Any] = {}
+        self._participants: dict[tuple[int, Any], Any] = {}
+        self._other_participants: dict[tuple[int, Any], Any] = {}
+        self._unread_messages: dict[tuple[int, Any], Any] = {}
+        self._admin_counts: dict[tuple[int, Any], int | None] = {}
+        self._is_read: dict[tuple[int, Any], bool | None] = {}
+        self._relay_pks: dict[str, Any] = {}
+        self._member_profile_pks: dict[tuple[int, Any], Any] = {}
+
+    # Priming
+
+    def prime_rooms(self, rooms: Iterable[Any]) -> None:
+        with self._lock:
+            for room in rooms:
+                if room is None or room.pk is None:
+                    continue
+                self._rooms.setdefault(room.pk, room)
+                # The last message is often listed along the room, load its read state too
+                if room._meta.get_field("last_message").is_cached(room):
+                    self.prime_messages([room.last_message])
+
+    def prime_participant(self, room, participant) -> None:
+        """Prime `load_participant` with an already loaded participant of `room`."""
+        with self._lock:
+            self._rooms.setdefault(room.pk, room)
+            self._participants[(room.pk, participant.profile_id)] = participant
+
+    def prime_messages(self, messages: Iterable[Any]) -> None:
+        with self._lock:
+            for message in messages:
+                if message is not None and message.pk is not None:
+                    self._messages.setdefault(message.pk, message)
+
+    # Loading
+
+    def load_participant(self, room, profile_pk: int) -> "ChatRoomParticipant | None":
+        """The participant of `profile_pk` in `room`."""
+
+        def fetch(rooms, requested) -> dict[int, Any]:
+            participants = ChatRoomParticipant.objects.filter(
+                room_id__in=[room.pk for room in rooms], profile_id=profile_pk
+            ).order_by("-pk")
+            return {participant.room_id: participant for participant in participants}
+
+        return self._load(self._participants, self._rooms, room, profile_pk, fetch)
+
+    def load_other_participant(self, room, profile_pk: int) -> "ChatRoomParticipant | None":
+        """The first participant of `room` other than `profile_pk`, for one-to-one rooms."""
+
+        def fetch(rooms, requested) -> dict[int, Any]:
+            # Group rooms can have many participants, only the requested one is loaded
+            participants = (
+                ChatRoomParticipant.objects.filter(
+                    Q(room_id__in=[room.pk for room in rooms], room__is_group=False)
+                    | Q(room_id=requested.pk)
+                )
+                .exclude(profile_id=profile_pk)
+                .select_related("profile")
+                .order_by("-role", "profile__name", "pk")
+            )
+            other_participants = {}
+            for participant in participants:
+                other_participants.setdefault(participant.room_id, participant)
+            return other_participants
+
+        return self._load(self._other_participants, self._rooms, room, profile_pk, fetch)
+
+    def load_admin_count(self, room) -> int:
+        def fetch(rooms, requested) -> dict[int, int]:
+            admins = (
+                ChatRoomParticipant.objects.filter(
+                    room_id__in=[room.pk for room in rooms if room.is_group] + [requested.pk],
+                    role=ChatRoomParticipant.ChatRoomParticipantRoles.ADMIN,
+                )
+                .order_by()
+                .values("room_id")
+                .annotate(count=Count("pk"))
+            )
+            return {row["room_id"]: row["count"] for row in admins}
+
+        return self._load(self._admin_counts, self._rooms, room, None, fetch) or 0
+
+    def load_unread_messages(self, room, profile_pk: int) -> Any:
+        def fetch(rooms, requested) -> dict[int, Any]:
+            return get_unread_messages_for_rooms(rooms, profile_pk)
+
+        return self._load(self._unread_messages, self._rooms, room, profile_pk, fetch)
+
+    def load_is_read(self, message, profile_pk: int) -> bool | None:
+        def fetch(messages, requested) -> dict[int, bool | None]:
+            participants = {
+                room_id: participant
+                for (room_id, pk), participant in self._participants.items()
+                if pk == profile_pk
+            }
+            return get_messages_read_state(messages, profile_pk, participants=participants)
+
+        return self._load(self._is_read, self._messages, message, profile_pk, fetch)
+
+    def get_pk_from_relay_id(self, relay_id: str) -> Any:
+        # The decode can hit the database (public-id strategy) and arguments are usually
+        # the same for every row of a listing
+        with self._lock:
+            if relay_id not in self._relay_pks:
+                self._relay_pks[relay_id] = get_pk_from_relay_id(relay_id)
+            return self._relay_pks[relay_id]
+
+    def get_member_profile_pk(self, relay_id: str, user) -> Any:
+        """The pk of the profile `relay_id` if `user` is one of its members, else `None`."""
+        profile_pk = self.get_pk_from_relay_id(relay_id)
+        key = (user.pk, profile_pk)
+        with self._lock:
+            if key not in self._member_profile_pks:
+                profile = Profile.objects.get_if_member(pk=profile_pk, user=user)
+                self._member_profile_pks[key] = profile and profile.pk
+            return self._member_profile_pks[key]
+
+    def _load(
+        self,
+        memo: dict,
+        primed: dict[int, Any],
+        obj,
+        profile_pk: int | None,
+        fetch: Callable[[list, Any], dict[int, Any]],
+    ) -> Any:
+        key = (obj.pk, profile_pk)
+        with self._lock:
+            if key not in memo:
+                primed.setdefault(obj.pk, obj)
+                pending = [
+                    primed_obj for pk, primed_obj in primed.items() if (pk, profile_pk) not in memo
+                ]
+                results = fetch(pending, obj)
+                for pending_obj in pending:
+                    memo[(pending_obj.pk, profile_pk)] = results.get(pending_obj.pk)
+            return memo[key]
+
+
+def get_chats_loader(info) -> ChatsLoader:
+    """
+    The loader of the operation being executed, memoised on its context. Subscription
+    events are executed again with the same context, and get a fresh loader each.
+    """
+    memo = getattr(info.context, CONTEXT_ATTR, None)
+    if memo is None or memo[0] is not info.root_value:
+        memo = (info.root_value, ChatsLoader())
+        setattr(info.context, CONTEXT_ATTR, memo)
+    return memo[1]
+
+
+class ChatRoomConnection(CountedConnection):
+    class Meta:
+        abstract = True
+
+    def resolve_edges(self, info, **kwargs) -> list:
+        get_chats_loader(info).prime_rooms(edge.node for edge in self.edges)
+        return self.edges
+
+    def resolve_total_count(self, info, **kwargs) -> int:
+        # Keyset paginated connections (`chatInbox`) only count when asked to
+        return self.length() if callable(self.length) else self.length
+
+
+class MessageConnection(CountedConnection):
+    class Meta:
+        abstract = True
+
+    def resolve_edges(self, info, **kwargs) -> list:
+        get_chats_loader(info).prime_messages(edge.node for edge in self.edges)
+        return self.edges
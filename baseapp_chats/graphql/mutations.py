@@ -12,18 +12,24 @@ from graphene_file_upload.scalars import Upload
 from rest_framework import serializers
 
 from baseapp_chats.graphql.subscriptions import (
+    ChatProfileOnPresence,
     ChatRoomOnMessage,
     ChatRoomOnMessagesCountUpdate,
     ChatRoomOnRoomUpdate,
+    ChatRoomOnTyping,
 )
+from baseapp_chats.permissions import (
+    invalidate_chats_permissions,
+    invalidate_chats_permissions_of_profiles,
+)
+from baseapp_chats.pipeline import SendMessageContext, message_pipeline
+from baseapp_chats.read_state import mark_messages_read
 from baseapp_chats.utils import (
     SYSTEM_MESSAGE_GROUP_CREATED,
     SYSTEM_MESSAGE_MADE_ADMIN,
     add_profiles_to_room,
     escape_format_braces,
     send_chatroom_update_system_messages,
-    send_message,
-    send_new_chat_message_notification,
     send_system_message,
 )
 from baseapp_core.graphql import (
@@ -40,7 +46,6 @@ ChatRoom = swapper.load_model("baseapp_chats", "ChatRoom")
 ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
 ChatRoomParticipantRoles = ChatRoomParticipant.ChatRoomParticipantRoles
 Message = swapper.load_model("baseapp_chats", "Message")
-MessageStatus = swapper.load_model("baseapp_chats", "MessageStatus")
 UnreadMessageCount = swapper.load_model("baseapp_chats", "UnreadMessageCount")
 User = get_user_model()
 Profile = swapper.load_model("baseapp_profiles", "Profile")
@@ -195,7 +200,7 @@ class ChatRoomCreate(RelayMutation):
                 SYSTEM_MESSAGE_GROUP_CREATED.replace("{title}", safe_title),
                 actor=profile,
             )
-            ChatRoomOnRoomUpdate.room_updated(room)
+        ChatRoomOnRoomUpdate.room_created(room, created_participants, notify=is_group)
 
         return ChatRoomCreate(
             profile=profile,
@@ -343,6 +348,7 @@ class ChatRoomUpdate(RelayMutation):
             participants_to_remove.delete()
 
             # Setting new admin if needed
+            oldest_remaining_participant = None
             if is_leaving_chatroom and is_sole_admin:
                 oldest_remaining_participant = (
                     ChatRoomParticipant.objects.filter(room=room).order_by("accepted_at").first()
@@ -365,6 +371,16 @@ class ChatRoomUpdate(RelayMutation):
                 room.image = None
             room.save()
 
+        # The memberships and roles changed for these profiles, in every connection, and
+        # for the rest of this operation
+        changed_participants = [*removed_participants, *created_participants]
+        if oldest_remaining_participant:
+            changed_participants.append(oldest_remaining_participant)
+        if changed_participants:
+            invalidate_chats_permissions_of_profiles(
+                participant.profile_id for participant in changed_participants
+            )
+            invalidate_chats_permissions(info.context.user)
         ChatRoomOnRoomUpdate.room_updated(
             room, removed_participants, added_participants=created_participants
         )
@@ -685,6 +701,9 @@ class ChatRoomToggleAdmin(RelayMutation):
                     )
                 target_participant.role = ChatRoomParticipantRoles.MEMBER
                 target_participant.save(update_fields=["role"])
+        # The target's role changed, in every connection, and for the rest of this operation
+        invalidate_chats_permissions_of_profiles([target_participant.profile_id])
+        invalidate_chats_permissions(info.context.user)
 
         if not participant_is_admin:
             send_system_message(
@@ -769,28 +788,19 @@ class ChatRoomSendMessage(RelayMutation):
                 ]
             )
 
-        message = send_message(
-            profile=profile,
-            user=info.context.user,
-            content=content,
-            room=room,
-            verb=Message.Verbs.SENT_MESSAGE,
-            room_id=room_id,
-            in_reply_to=in_reply_to,
+        message = message_pipeline.send(
+            SendMessageContext(
+                room=room,
+                profile=profile,
+                user=info.context.user,
+                content=content,
+                room_id=room_id,
+                in_reply_to=in_reply_to,
+                mentioned_profile_ids=input.pop("mentioned_profile_ids", None) or [],
+                info=info,
+            )
         )
 
-        mentioned_profile_ids = input.pop("mentioned_profile_ids", None) or []
-        if mentioned_profile_ids:
-            if service := shared_services.get("mentions"):
-                service.update_mentions(
-                    message,
-                    mentioned_profile_ids,
-                    exclude_profile=profile,
-                )
-
-        send_new_chat_message_notification(room, message, info)
-        ChatRoomReadMessages.read_messages(room, profile)
-
         return ChatRoomSendMessage(
             message=MessageObjectType._meta.connection.Edge(
                 node=message,
@@ -1003,26 +1013,10 @@ class ChatRoomReadMessages(RelayMutation):
 
     @classmethod
     def read_messages(cls, room, profile, message_ids=None) -> "ChatRoomReadMessages":
-        messages_status_qs = MessageStatus.objects.filter(
-            profile_id=profile.pk,
-            is_read=False,
-        )
-
         if message_ids:
             message_ids = [get_pk_from_relay_id(message_id) for message_id in message_ids]
-            messages_status_qs = messages_status_qs.filter(
-                message_id__in=message_ids,
-            )
-        else:
-            messages_status_qs = messages_status_qs.filter(
-                message__room_id=room.pk,
-            )
-
-        messages = Message.objects.filter(
-            pk__in=messages_status_qs.values_list("message_id", flat=True)
-        )
 
-        messages_status_qs.update(is_read=True, read_at=timezone.now())
+        messages = mark_messages_read(room, profile, message_ids)
 
         ChatRoomOnMessagesCountUpdate.send_updated_chat_count(
             profile=profile, profile_id=profile.relay_id
@@ -1128,6 +1122,132 @@ class ChatRoomArchive(RelayMutation):
         return ChatRoomArchive(room=room)
 
 
+class ChatRoomPin(RelayMutation):
+    room = graphene.Field(ChatRoomObjectType)
+
+    class Input:
+        room_id = graphene.ID(required=True)
+        profile_id = graphene.ID(required=True)
+        pin = graphene.Boolean(required=True)
+
+    @classmethod
+    @login_required
+    def mutate_and_get_payload(cls, root, info, room_id, profile_id, pin, **input) -> "ChatRoomPin":
+        room = get_obj_from_relay_id(info, room_id)
+        profile = get_obj_from_relay_id(info, profile_id)
+
+        if not info.context.user.has_perm(f"{profile_app_label}.use_profile", profile):
+            return ChatRoomPin(
+                errors=[
+                    ErrorType(
+                        field="profile_id",
+                        messages=[
+                            _("You don't have permission to pin this chatroom as this profile")
+                        ],
+                    )
+                ]
+            )
+
+        # Pinned rooms are listed first in the profile's `chatInbox`
+        updated = ChatRoomParticipant.objects.filter(profile_id=profile.pk, room=room).update(
+            is_pinned=pin
+        )
+        if not updated:
+            return ChatRoomPin(
+                errors=[
+                    ErrorType(
+                        field="participant",
+                        messages=[_("Participant is not part of the room.")],
+                    )
+                ]
+            )
+        return ChatRoomPin(room=room)
+
+
+class ChatRoomTyping(RelayMutation):
+    """
+    Broadcast that a profile is typing (or stopped typing) in a room to its
+    `chatRoomOnTyping` subscribers. Nothing is written to the database, and repeated
+    updates are throttled, so clients can send one per keystroke.
+    """
+
+    published = graphene.Boolean()
+
+    class Input:
+        room_id = graphene.ID(required=True)
+        profile_id = graphene.ID(required=True)
+        is_typing = graphene.Boolean(required=True)
+
+    @classmethod
+    @login_required
+    def mutate_and_get_payload(
+        cls, root, info, room_id, profile_id, is_typing, **input
+    ) -> "ChatRoomTyping":
+        room = get_obj_from_relay_id(info, room_id)
+        profile = get_obj_from_relay_id(info, profile_id)
+
+        if not profile or not info.context.user.has_perm(
+            f"{profile_app_label}.use_profile", profile
+        ):
+            return ChatRoomTyping(
+                errors=[
+                    ErrorType(
+                        field="profile_id",
+                        messages=[_("You don't have permission to act as this profile")],
+                    )
+                ]
+            )
+
+        if not room or not info.context.user.has_perm(
+            "baseapp_chats.add_message", {"profile": profile, "room": room}
+        ):
+            return ChatRoomTyping(
+                errors=[
+                    ErrorType(
+                        field="room_id",
+                        messages=[_("You don't have permission to send a message here")],
+                    )
+                ]
+            )
+
+        return ChatRoomTyping(published=ChatRoomOnTyping.typing(room, profile, is_typing))
+
+
+class ChatProfilePresence(RelayMutation):
+    """
+    Heartbeat (or sign off) a profile, broadcasting its presence to its
+    `chatProfileOnPresence` subscribers. Send it more often than
+    `BASEAPP_CHATS_PRESENCE_TTL`; nothing is written to the database.
+    """
+
+    published = graphene.Boolean()
+
+    class Input:
+        profile_id = graphene.ID(required=True)
+        is_online = graphene.Boolean(required=True)
+
+    @classmethod
+    @login_required
+    def mutate_and_get_payload(
+        cls, root, info, profile_id, is_online, **input
+    ) -> "ChatProfilePresence":
+        profile = get_obj_from_relay_id(info, profile_id)
+
+        if not profile or not info.context.user.has_perm(
+            f"{profile_app_label}.use_profile", profile
+        ):
+            return ChatProfilePresence(
+                errors=[
+                    ErrorType(
+                        field="profile_id",
+                        messages=[_("You don't have permission to act as this profile")],
+                    )
+                ]
+            )
+
+        return ChatProfilePresence(published=ChatProfileOnPresence.presence(profile, is_online))
+
+
 class ChatsMutations(object):
     chat_room_create = ChatRoomCreate.Field()
     chat_room_update = ChatRoomUpdate.Field()
@@ -1138,4 +1258,7 @@ class ChatsMutations(object):
     chat_room_read_messages = ChatRoomReadMessages.Field()
     chat_room_unread = ChatRoomUnread.Field()
     chat_room_archive = ChatRoomArchive.Field()
+    chat_room_pin = ChatRoomPin.Field()
     chat_room_toggle_admin = ChatRoomToggleAdmin.Field()
+    chat_room_typing = ChatRoomTyping.Field()
+    chat_profile_presence = ChatProfilePresence.Field()
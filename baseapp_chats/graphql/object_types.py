@@ -16,13 +16,16 @@ from baseapp_core.graphql import (
     ThumbnailField,
     get_obj_relay_id,
     get_object_type_for_model,
-    get_pk_from_relay_id,
 )
 from baseapp_core.plugins import graphql_shared_interfaces
 
+from .fields import MessageHistoryConnectionField
 from .filters import ChatRoomFilter, ChatRoomParticipantFilter
+from .loaders import ChatRoomConnection, MessageConnection, get_chats_loader
 
 if TYPE_CHECKING:
+    from datetime import datetime
+
     from django.db.models.fields.files import ImageFieldFile
 
 Profile = swapper.load_model("baseapp_profiles", "Profile")
@@ -80,6 +83,7 @@ class BaseMessageObjectType:
             "deleted",
         )
         filter_fields = ("verb",)
+        connection_class = MessageConnection
 
     @classmethod
     def pre_optimization_hook(
@@ -118,11 +122,7 @@ class BaseMessageObjectType:
     @staticmethod
     def get_profile_pk(info, profile_id=None) -> int | None:
         if profile_id:
-            profile_pk = get_pk_from_relay_id(profile_id)
-            if not Profile.objects.get_if_member(pk=profile_pk, user=info.context.user):
-                return None
-            else:
-                return profile_pk
+            return get_chats_loader(info).get_member_profile_pk(profile_id, info.context.user)
         elif hasattr(info.context.user, "current_profile") and hasattr(
             info.context.user.current_profile, "pk"
         ):
@@ -174,8 +174,7 @@ class BaseMessageObjectType:
         if not profile_pk:
             return None
 
-        message_status = root.statuses.filter(profile_id=profile_pk).first()
-        return message_status and message_status.is_read
+        return get_chats_loader(info).load_is_read(root, profile_pk)
 
 
 class MessageObjectType(BaseMessageObjectType, DjangoObjectType):
@@ -183,8 +182,23 @@ class MessageObjectType(BaseMessageObjectType, DjangoObjectType):
         pass
 
 
+def get_messages_since(room, info) -> "datetime | None":
+    """When the messages of `room` visible to the requesting profile start, if they do."""
+    if not room.is_group:
+        return None
+    profile = (
+        info.context.user.current_profile
+        if hasattr(info.context.user, "current_profile")
+        else (info.context.user.profile.pk if hasattr(info.context.user, "profile") else None)
+    )
+    participant = get_chats_loader(info).load_participant(room, getattr(profile, "pk", profile))
+    return participant.accepted_at if participant else None
+
+
 class BaseChatRoomObjectType:
-    all_messages = DjangoConnectionField(get_object_type_for_model(Message))
+    all_messages = MessageHistoryConnectionField(
+        get_object_type_for_model(Message), since=get_messages_since
+    )
     participants = DjangoConnectionField(get_object_type_for_model(ChatRoomParticipant))
     unread_messages = graphene.Field(
         get_object_type_for_model(UnreadMessageCount), profile_id=graphene.ID(required=False)
@@ -221,22 +235,11 @@ class BaseChatRoomObjectType:
         if not current_profile:
             return None
 
-        return room.participants.exclude(profile_id=current_profile.pk).first()
+        return get_chats_loader(info).load_other_participant(room, current_profile.pk)
 
     def resolve_all_messages(self, info, **kwargs) -> QuerySet:
-        if self.is_group:
-            profile = (
-                info.context.user.current_profile
-                if hasattr(info.context.user, "current_profile")
-                else (
-                    info.context.user.profile.pk if hasattr(info.context.user, "profile") else None
-                )
-            )
-            participant = self.participants.filter(profile=profile).first()
-            if participant:
-                return self.messages.filter(created__gte=participant.accepted_at).order_by(
-                    "-created"
-                )
+        if since := get_messages_since(self, info):
+            return self.messages.filter(created__gte=since).order_by("-created")
         return self.messages.all().order_by("-created")
 
     def resolve_participants(self, info, **kwargs) -> QuerySet:
@@ -256,10 +259,10 @@ class BaseChatRoomObjectType:
         return self.participants.all()
 
     def resolve_is_archived(self, info, profile_id=None, **kwargs) -> bool | None:
+        loader = get_chats_loader(info)
         if profile_id:
-            profile_pk = get_pk_from_relay_id(profile_id)
-            profile = Profile.objects.get_if_member(pk=profile_pk, user=info.context.user)
-            if not profile:
+            profile_pk = loader.get_member_profile_pk(profile_id, info.context.user)
+            if not profile_pk:
                 return None
         else:
             profile_pk = (
@@ -273,15 +276,15 @@ class BaseChatRoomObjectType:
                     else None
                 )
             )
-        return self.participants.filter(profile_id=profile_pk, has_archived_room=True).exists()
+        participant = loader.load_participant(self, profile_pk)
+        return bool(participant and participant.has_archived_room)
 
     def resolve_unread_messages(
         self, info, profile_id=None, **kwargs
     ) -> "UnreadMessageCount | None":
+        loader = get_chats_loader(info)
         if profile_id:
-            profile_pk = get_pk_from_relay_id(profile_id)
-            profile = Profile.objects.get_if_member(pk=profile_pk, user=info.context.user)
-            if not profile:
+            if not loader.get_member_profile_pk(profile_id, info.context.user):
                 return None
 
         if hasattr(info.context.user, "current_profile"):
@@ -289,12 +292,7 @@ class BaseChatRoomObjectType:
         else:
             return None
 
-        unread_messages = UnreadMessageCount.objects.filter(
-            room=self,
-            profile_id=profile_pk,
-        ).first()
-
-        return unread_messages
+        return loader.load_unread_messages(self, profile_pk)
 
     def resolve_other_participant(self, info, **kwargs) -> "ChatRoomParticipant | None":
         if self.is_group:
@@ -315,18 +313,15 @@ class BaseChatRoomObjectType:
         if not current_profile:
             return False
 
-        current_participant = self.participants.filter(profile_id=current_profile.pk).first()
+        loader = get_chats_loader(info)
+        current_participant = loader.load_participant(self, current_profile.pk)
         if (
             not current_participant
             or current_participant.role != ChatRoomParticipant.ChatRoomParticipantRoles.ADMIN
         ):
             return False
 
-        admin_count = self.participants.filter(
-            role=ChatRoomParticipant.ChatRoomParticipantRoles.ADMIN
-        ).count()
-
-        return admin_count == 1
+        return loader.load_admin_count(self) == 1
 
     def resolve_title(self, info, **kwargs) -> str | None:
         if self.is_group:
@@ -356,16 +351,7 @@ class BaseChatRoomObjectType:
     def resolve_is_participant(
         self, info: graphene.ResolveInfo, profile_id: str, **kwargs: Any
     ) -> bool | None:
-        # The relay id decode can hit the database (public-id strategy) and the
-        # argument is the same for every row of a listing, so memoize the decoded
-        # pk on the request.
-        cache = getattr(info.context, "_chats_relay_pk_cache", None)
-        if cache is None:
-            cache = {}
-            info.context._chats_relay_pk_cache = cache
-        if profile_id not in cache:
-            cache[profile_id] = get_pk_from_relay_id(profile_id)
-        profile_pk = cache[profile_id]
+        profile_pk = get_chats_loader(info).get_pk_from_relay_id(profile_id)
         if not profile_pk:
             return None
         return self.participants.filter(profile_id=profile_pk).exists()
@@ -388,6 +374,7 @@ class BaseChatRoomObjectType:
             "is_participant",
         )
         filterset_class = ChatRoomFilter
+        connection_class = ChatRoomConnection
 
 
 class ChatRoomObjectType(BaseChatRoomObjectType, DjangoObjectType):
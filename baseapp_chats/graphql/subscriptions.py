@@ -1,9 +1,24 @@
+from datetime import datetime
+
 import channels_graphql_ws
 import graphene
 import swapper
 from channels.db import database_sync_to_async
 
+from baseapp_chats.fanout import room_fanout, room_group
+from baseapp_chats.presence import (
+    get_expires_at,
+    get_presence_ttl,
+    get_typing_ttl,
+    set_online,
+    set_typing,
+)
 from baseapp_core.graphql import get_obj_from_relay_id, get_pk_from_relay_id
+from baseapp_core.graphql.subscription_groups import (
+    join_subscription_groups,
+    leave_subscription_groups,
+)
+from baseapp_core.loaders import document_id_loader_scope
 
 Profile = swapper.load_model("baseapp_profiles", "Profile")
 ChatRoom = swapper.load_model("baseapp_chats", "ChatRoom")
@@ -15,6 +30,93 @@ ProfileObjectType = Profile.get_graphql_object_type()
 ChatRoomObjectType = ChatRoom.get_graphql_object_type()
 ChatRoomParticipantObjectType = ChatRoomParticipant.get_graphql_object_type()
 
+# Profiles a `chatProfileOnPresence` subscription can follow
+MAX_PRESENCE_PROFILES = 100
+
+# The subscriber's profile, kept on the operation context by `subscribe` so `publish`
+# doesn't resolve it again for every event
+SUBSCRIBER_PROFILE_ATTR = "chats_subscriber_profile"
+
+
+def get_profile_room_groups(profile) -> list[str]:
+    """Room groups of the rooms `profile` participates in, see `baseapp_chats.fanout`."""
+    room_ids = ChatRoomParticipant.objects.filter(profile_id=profile.pk).values_list(
+        "room_id", flat=True
+    )
+    return [room_group(room_id) for room_id in room_ids]
+
+
+def get_participant_relay_ids(participants) -> dict:
+    """
+    Relay ids of the profiles of `participants` by profile pk, loading the profiles they
+    don't have cached and their public ids in one query each.
+    """
+    profiles = {
+        participant.profile_id: participant.profile
+        for participant in participants
+        if ChatRoomParticipant.profile.is_cached(participant)
+    }
+    missing = {participant.profile_id for participant in participants} - profiles.keys()
+    if missing:
+        profiles.update(Profile.objects.in_bulk(missing))
+    with document_id_loader_scope() as loader:
+        loader.prime_objects(profiles.values())
+        return {profile_id: profile.relay_id for profile_id, profile in profiles.items()}
+
+
+def get_participant_groups(subscription, participants) -> list[tuple]:
+    """
+    The `(subscription, group)` pairs of the room subscriptions of `participants`:
+    `subscription` keyed by profile pk, `ChatRoomOnMessagesCountUpdate` by relay id.
+    """
+    relay_ids = get_participant_relay_ids(participants)
+    return [
+        *((subscription, str(profile_id)) for profile_id in relay_ids),
+        *((ChatRoomOnMessagesCountUpdate, relay_id) for relay_id in relay_ids.values()),
+    ]
+
+
+def get_subscriber_profile(info) -> "Profile | None":
+    return getattr(info.context, SUBSCRIBER_PROFILE_ATTR, None)
+
+
+def is_room_event_recipient(payload, profile) -> bool:
+    """Whether the subscriber's `profile` is meant to get a room event."""
+    if profile is None:
+        return False
+    profile_pk = str(profile.pk)
+    if profile_pk == str(payload.get("exclude_profile_id")):
+        return False
+    return profile_pk in {str(pk) for pk in payload["participant_ids"]}
+
+
+async def get_subscribable_room(info, room_id, profile_id) -> "ChatRoom | None":
+    """The room `room_id`, if the subscriber can follow it as the participant `profile_id`."""
+    room = await database_sync_to_async(get_obj_from_relay_id)(info, room_id)
+    user = info.context.channels_scope["user"]
+    profile = await database_sync_to_async(get_obj_from_relay_id)(info, profile_id)
+
+    if not user.is_authenticated or not profile or not room:
+        return None
+
+    has_profile_permission = await database_sync_to_async(user.has_perm)(
+        f"{profile_app_label}.use_profile", profile
+    )
+    if not has_profile_permission:
+        return None
+
+    is_participant = await database_sync_to_async(
+        room.participants.filter(profile=profile).exists
+    )()
+    if not is_participant:
+        return None
+
+    can_view_room = await database_sync_to_async(user.has_perm)("baseapp_chats.view_chatroom", room)
+    if not can_view_room:
+        return None
+    setattr(info.context, SUBSCRIBER_PROFILE_ATTR, profile)
+    return room
+
 
 class ChatRoomOnRoomUpdate(channels_graphql_ws.Subscription):
     room = graphene.Field(ChatRoomObjectType._meta.connection.Edge)
@@ -35,10 +137,17 @@ class ChatRoomOnRoomUpdate(channels_graphql_ws.Subscription):
         )
         if not has_permission:
             return []
-        return [str(profile.pk)]
+        room_groups = await database_sync_to_async(get_profile_room_groups)(profile)
+        setattr(info.context, SUBSCRIBER_PROFILE_ATTR, profile)
+        return [str(profile.pk), *room_groups]
 
     @staticmethod
-    def publish(payload, info, profile_id) -> "ChatRoomOnRoomUpdate":
+    def publish(payload, info, profile_id) -> "ChatRoomOnRoomUpdate | None":
+        if "participant_ids" in payload and not is_room_event_recipient(
+            payload, get_subscriber_profile(info)
+        ):
+            return None
+
         return ChatRoomOnRoomUpdate(
             room=ChatRoomObjectType._meta.connection.Edge(node=payload["room"]),
             removed_participants=payload["removed_participants"],
@@ -46,21 +155,68 @@ class ChatRoomOnRoomUpdate(channels_graphql_ws.Subscription):
         )
 
     @classmethod
-    def new_message(cls, message) -> None:
-        cls.room_updated(message.room)
+    def new_message(cls, message, participant_ids=None) -> None:
+        cls.room_updated(message.room, participant_ids=participant_ids)
+
+    @classmethod
+    def room_created(cls, room, participants, notify=True) -> None:
+        """Make the participants' subscriptions follow a new room, notifying them."""
+        cls.join_room(room, participants)
+        if notify:
+            payload = {"room": room, "removed_participants": [], "added_participants": []}
+            for participant in participants:
+                cls.broadcast(group=str(participant.profile_id), payload=payload)
+
+    @classmethod
+    def room_updated(
+        cls, room, removed_participants=[], added_participants=[], participant_ids=None
+    ) -> None:
+        """
+        Notify the room participants once through the room group. Added and removed
+        participants are notified through their own group, and their subscriptions join
+        or leave the room group. `participant_ids` saves loading the room's participants
+        when the caller already has them.
+        """
+        payload = {
+            "room": room,
+            "removed_participants": removed_participants,
+            "added_participants": added_participants,
+        }
+        added_ids = {participant.profile_id for participant in added_participants}
+        if participant_ids is None:
+            participant_ids = room.participants.values_list("profile_id", flat=True)
+        participant_ids = [
+            profile_id for profile_id in participant_ids if profile_id not in added_ids
+        ]
+        # Plain room updates (e.g. a new message) only need the latest room state
+        is_membership_change = bool(removed_participants or added_participants)
+        room_fanout.publish(
+            cls,
+            room.pk,
+            {**payload, "participant_ids": participant_ids},
+            coalesce_key=None if is_membership_change else "room",
+        )
+
+        for participant in [*added_participants, *removed_participants]:
+            cls.broadcast(group=str(participant.profile_id), payload=payload)
+        cls.join_room(room, added_participants)
+        cls.leave_room(room, removed_participants)
+
+    @classmethod
+    def join_room(cls, room, participants) -> None:
+        """
+        Add the room group to the live subscriptions of `participants`. Needed when
+        participants are added outside the chat mutations, or they only get the room's
+        events after subscribing again.
+        """
+        if participants:
+            join_subscription_groups(get_participant_groups(cls, participants), room_group(room.pk))
 
     @classmethod
-    def room_updated(cls, room, removed_participants=[], added_participants=[]) -> None:
-        participant_ids = list(room.participants.values_list("profile_id", flat=True))
-        removed_ids = [participant.profile.id for participant in removed_participants]
-        for id in participant_ids + removed_ids:
-            cls.broadcast(
-                group=str(id),
-                payload={
-                    "room": room,
-                    "removed_participants": removed_participants,
-                    "added_participants": added_participants,
-                },
+    def leave_room(cls, room, participants) -> None:
+        if participants:
+            leave_subscription_groups(
+                get_participant_groups(cls, participants), room_group(room.pk)
             )
 
 
@@ -83,12 +239,19 @@ class ChatRoomOnMessagesCountUpdate(channels_graphql_ws.Subscription):
         )
         if not has_permission:
             return []
-        return [profile_id]
+        room_groups = await database_sync_to_async(get_profile_room_groups)(profile)
+        setattr(info.context, SUBSCRIBER_PROFILE_ATTR, profile)
+        return [profile_id, *room_groups]
 
     @staticmethod
-    def publish(payload, info, profile_id) -> "ChatRoomOnMessagesCountUpdate":
-        profile = payload["profile"]
+    def publish(payload, info, profile_id) -> "ChatRoomOnMessagesCountUpdate | None":
+        if "participant_ids" not in payload:
+            return ChatRoomOnMessagesCountUpdate(profile=payload["profile"])
 
+        # Room-level event: the subscriber's own profile is the payload
+        profile = get_subscriber_profile(info)
+        if not is_room_event_recipient(payload, profile):
+            return None
         return ChatRoomOnMessagesCountUpdate(profile=profile)
 
     @classmethod
@@ -98,6 +261,27 @@ class ChatRoomOnMessagesCountUpdate(channels_graphql_ws.Subscription):
             payload={"profile": profile},
         )
 
+    @classmethod
+    def send_room_chat_count(cls, room_id, participant_ids, sender_profile_id=None) -> None:
+        """
+        Notify the participants of a room, but the sender, that their unread count
+        changed. Coalesced per room within `BASEAPP_CHATS_FANOUT_WINDOW`.
+        """
+        room_fanout.publish(
+            cls,
+            room_id,
+            {"participant_ids": list(participant_ids), "exclude_profile_id": sender_profile_id},
+            coalesce_key="count",
+            merge=merge_room_chat_counts,
+        )
+
+
+def merge_room_chat_counts(previous: dict, payload: dict) -> dict:
+    # Senders are only skipped when every coalesced message is theirs
+    if previous["exclude_profile_id"] != payload["exclude_profile_id"]:
+        return {**payload, "exclude_profile_id": None}
+    return payload
+
 
 class ChatRoomOnMessage(channels_graphql_ws.Subscription):
     message = graphene.Field(lambda: MessageObjectType._meta.connection.Edge)
@@ -108,31 +292,8 @@ class ChatRoomOnMessage(channels_graphql_ws.Subscription):
 
     @staticmethod
     async def subscribe(root, info, room_id, profile_id) -> list[str]:
-        room = await database_sync_to_async(get_obj_from_relay_id)(info, room_id)
-        user = info.context.channels_scope["user"]
-        profile = await database_sync_to_async(get_obj_from_relay_id)(info, profile_id)
-
-        if not user.is_authenticated or not profile or not room:
-            return []
-
-        has_profile_permission = await database_sync_to_async(user.has_perm)(
-            f"{profile_app_label}.use_profile", profile
-        )
-        if not has_profile_permission:
-            return []
-
-        is_participant = await database_sync_to_async(
-            room.participants.filter(profile=profile).exists
-        )()
-        if not is_participant:
-            return []
-
-        can_view_room = await database_sync_to_async(user.has_perm)(
-            "baseapp_chats.view_chatroom", room
-        )
-        if not can_view_room:
-            return []
-        return [room_id]
+        room = await get_subscribable_room(info, room_id, profile_id)
+        return [room_id] if room else []
 
     @staticmethod
     def publish(payload, info, room_id, profile_id) -> "ChatRoomOnMessage | None":
@@ -141,18 +302,19 @@ class ChatRoomOnMessage(channels_graphql_ws.Subscription):
 
         if not user.is_authenticated:
             return None
-        if str(message.profile_id) == str(get_pk_from_relay_id(profile_id)):
+        profile = get_subscriber_profile(info)
+        if profile is None or message.profile_id == profile.pk:
             return None
 
         return ChatRoomOnMessage(message=MessageObjectType._meta.connection.Edge(node=message))
 
     @classmethod
-    def new_message(cls, message, room_id) -> None:
+    def new_message(cls, message, room_id, participant_ids=None) -> None:
         cls.broadcast(
             group=room_id,
             payload={"message": message},
         )
-        ChatRoomOnRoomUpdate.new_message(message=message)
+        ChatRoomOnRoomUpdate.new_message(message=message, participant_ids=participant_ids)
 
     @classmethod
     def edit_message(cls, message, room_id) -> None:
@@ -162,7 +324,127 @@ class ChatRoomOnMessage(channels_graphql_ws.Subscription):
         )
 
 
+class ChatRoomOnTyping(channels_graphql_ws.Subscription):
+    """
+    Typing state of the other participants of a room, published by `chatRoomTyping`.
+    Ephemeral: the state is kept in the cache until `expiresAt` (see
+    `baseapp_chats.presence`), nothing is stored in the database.
+    """
+
+    profile_id = graphene.ID()
+    is_typing = graphene.Boolean()
+    expires_at = graphene.DateTime()
+
+    class Arguments:
+        room_id = graphene.ID(required=True)
+        profile_id = graphene.ID(required=True)
+
+    @staticmethod
+    async def subscribe(root, info, room_id, profile_id) -> list[str]:
+        room = await get_subscribable_room(info, room_id, profile_id)
+        return [str(room.pk)] if room else []
+
+    @staticmethod
+    def publish(payload, info, room_id, profile_id) -> "ChatRoomOnTyping | None":
+        profile = get_subscriber_profile(info)
+        if profile is None or str(payload["profile_pk"]) == str(profile.pk):
+            return None
+        return ChatRoomOnTyping(
+            profile_id=payload["profile_id"],
+            is_typing=payload["is_typing"],
+            expires_at=payload["expires_at"] and datetime.fromisoformat(payload["expires_at"]),
+        )
+
+    @classmethod
+    def typing(cls, room, profile, is_typing=True) -> bool:
+        """Update the typing state of `profile` in `room`, broadcasting it unless throttled."""
+        if not set_typing(room.pk, profile.pk, is_typing):
+            return False
+        expires_at = get_expires_at(get_typing_ttl()) if is_typing else None
+        cls.broadcast(
+            group=str(room.pk),
+            payload={
+                "profile_pk": profile.pk,
+                "profile_id": profile.relay_id,
+                "is_typing": is_typing,
+                "expires_at": expires_at and expires_at.isoformat(),
+            },
+        )
+        return True
+
+
+class ChatProfileOnPresence(channels_graphql_ws.Subscription):
+    """
+    Presence of the given profiles, published by `chatProfilePresence`. Only profiles
+    sharing a room with the subscriber `profile_id` are followed. Ephemeral, like
+    `ChatRoomOnTyping`: a profile is offline once `expiresAt` passes without an update.
+    """
+
+    profile_id = graphene.ID()
+    is_online = graphene.Boolean()
+    expires_at = graphene.DateTime()
+
+    class Arguments:
+        profile_id = graphene.ID(required=True)
+        profile_ids = graphene.List(graphene.NonNull(graphene.ID), required=True)
+
+    @staticmethod
+    async def subscribe(root, info, profile_id, profile_ids) -> list[str]:
+        user = info.context.channels_scope["user"]
+        profile = await database_sync_to_async(get_obj_from_relay_id)(info, profile_id)
+        if not user.is_authenticated or not profile:
+            return []
+        has_permission = await database_sync_to_async(user.has_perm)(
+            f"{profile_app_label}.use_profile", profile
+        )
+        if not has_permission:
+            return []
+        contact_pks = await database_sync_to_async(get_contact_profile_pks)(
+            profile, profile_ids[:MAX_PRESENCE_PROFILES]
+        )
+        return [str(pk) for pk in contact_pks]
+
+    @staticmethod
+    def publish(payload, info, profile_id, profile_ids) -> "ChatProfileOnPresence":
+        return ChatProfileOnPresence(
+            profile_id=payload["profile_id"],
+            is_online=payload["is_online"],
+            expires_at=payload["expires_at"] and datetime.fromisoformat(payload["expires_at"]),
+        )
+
+    @classmethod
+    def presence(cls, profile, is_online=True) -> bool:
+        """Heartbeat (or sign off) `profile`, broadcasting it unless throttled."""
+        if not set_online(profile.pk, is_online):
+            return False
+        expires_at = get_expires_at(get_presence_ttl()) if is_online else None
+        cls.broadcast(
+            group=str(profile.pk),
+            payload={
+                "profile_id": profile.relay_id,
+                "is_online": is_online,
+                "expires_at": expires_at and expires_at.isoformat(),
+            },
+        )
+        return True
+
+
+def get_contact_profile_pks(profile, profile_ids) -> list:
+    """The pks of the profiles `profile_ids` (relay ids) sharing a room with `profile`."""
+    profile_pks = [get_pk_from_relay_id(profile_id) for profile_id in profile_ids]
+    return list(
+        ChatRoomParticipant.objects.filter(
+            profile_id__in=[pk for pk in profile_pks if pk is not None],
+            room__participants__profile_id=profile.pk,
+        )
+        .values_list("profile_id", flat=True)
+        .distinct()
+    )
+
+
 class ChatsSubscriptions:
     chat_room_on_message = ChatRoomOnMessage.Field()
     chat_room_on_room_update = ChatRoomOnRoomUpdate.Field()
     chat_room_on_messages_count_update = ChatRoomOnMessagesCountUpdate.Field()
+    chat_room_on_typing = ChatRoomOnTyping.Field()
+    chat_profile_on_presence = ChatProfileOnPresence.Field()
@@ -0,0 +1,160 @@
+"""
+Per-profile chat inbox.
+
+Each `ChatRoomParticipant` doubles as the inbox entry of its profile for the room:
+`unread_count`, `has_archived_room` and `is_pinned` are stored on the row, and
+`unread_count` is kept up to date by the `sync_inbox_unread_count` trigger. Entries are
+ordered by the `last_message_time` of their room, read when listing them, so sending a
+message only updates the room and not the row of every participant.
+
+The trade-off is on reads: `inbox_idx` finds the entries of a profile, but their order
+is computed across the join with the room, so no index serves it and every page sorts
+all the entries of the profile (a top-N sort, O(rooms of the profile)). Pages are
+paginated by keyset on `(is_pinned, inbox_time, id)`, which keeps them stable while
+messages arrive, but deep pages cost about as much as the first one, not less.
+
+`unread_count` mirrors `UnreadMessageCount.count`, which isn't maintained with
+`"watermark"` read tracking: unread entries are then derived from the read watermarks
+(see `baseapp_chats.read_state`). With ledger counters it lags until the deltas are
+folded, so unread entries are picked by `get_unread_counts`.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+import swapper
+from django.db.models import DateTimeField, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+
+from baseapp_chats.read_state import (
+    get_unread_counts,
+    unread_messages_for_profile,
+    uses_read_watermarks,
+)
+from baseapp_chats.unread_ledger import uses_unread_ledger
+from baseapp_core.plugins import shared_services
+
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
+UnreadMessageCount = swapper.load_model("baseapp_chats", "UnreadMessageCount")
+
+INBOX_ORDERING = ("-is_pinned", "-inbox_time", "-id")
+CURSOR_PREFIX = "inbox:"
+
+
+def exclude_hidden_rooms(queryset: QuerySet, profile_id: int, prefix: str = "") -> QuerySet:
+    """
+    Exclude the rooms `profile_id` shouldn't see from a `ChatRoom` queryset, or from a
+    queryset related to it through `prefix` (e.g. `"room__"`): rooms with a profile
+    blocked by / blocking `profile_id`, and empty 1-on-1 rooms it didn't create.
+    """
+    # Via the optional blocks.lookup service. When baseapp_blocks isn't installed there
+    # are no blocks, so nothing is excluded here.
+    if blocks_service := shared_services.get("blocks.lookup"):
+        participant_profile_in = f"{prefix}participants__profile_id__in"
+        # Rooms with a participant that self blocks.
+        queryset = queryset.exclude(
+            **{participant_profile_in: blocks_service.get_blocked_profile_ids(profile_id)}
+        )
+        # Rooms with a participant that blocks self.
+        queryset = queryset.exclude(
+            **{participant_profile_in: blocks_service.get_blocker_profile_ids(profile_id)}
+        )
+
+    # Recipients should only see 1-on-1 chats if they have at least one message
+    return queryset.exclude(
+        Q(**{f"{prefix}is_group": False})
+        & Q(**{f"{prefix}created_by_profile__isnull": False})
+        & ~Q(**{f"{prefix}created_by_profile_id": profile_id})
+        & Q(**{f"{prefix}last_message__isnull": True})
+    )
+
+
+def get_inbox(profile_id: int, archived: bool = False, unread: bool = False) -> QuerySet:
+    """
+    The inbox entries of `profile_id`, in inbox order, annotated with the `inbox_time` of
+    their room: its last message time, or its creation for rooms without messages.
+    """
+    entries = ChatRoomParticipant.objects.filter(profile_id=profile_id, has_archived_room=archived)
+    if unread and uses_read_watermarks():
+        entries = entries.filter(
+            room_id__in=unread_messages_for_profile(profile_id).values("room_id")
+        )
+    elif unread and uses_unread_ledger():
+        entries = entries.filter(room_id__in=list(get_unread_counts(profile_id)))
+    elif unread:
+        entries = entries.filter(unread_count__gt=0)
+    entries = entries.annotate(
+        inbox_time=Coalesce(
+            "room__last_message_time", "room__created", output_field=DateTimeField()
+        )
+    )
+    return exclude_hidden_rooms(entries, profile_id, prefix="room__").order_by(*INBOX_ORDERING)
+
+
+def paginate_inbox(entries: QuerySet, first: int, after: str | None = None) -> tuple[list, bool]:
+    """
+    The `first` of the `get_inbox` `entries` after the `after` cursor, and whether more
+    entries follow. Raises `ValueError` for invalid cursors.
+    """
+    if after:
+        entries = entries.filter(_after_cursor_q(*decode_inbox_cursor(after)))
+    page = list(entries[: first + 1])
+    return page[:first], len(page) > first
+
+
+def get_inbox_page(
+    profile_id: int,
+    first: int,
+    after: str | None = None,
+    archived: bool = False,
+    unread: bool = False,
+) -> tuple[list, bool]:
+    """
+    The `first` inbox entries of `profile_id` after the `after` cursor, and whether more
+    entries follow. Raises `ValueError` for invalid cursors.
+    """
+    return paginate_inbox(get_inbox(profile_id, archived=archived, unread=unread), first, after)
+
+
+def encode_inbox_cursor(entry) -> str:
+    value = f"{CURSOR_PREFIX}{int(entry.is_pinned)}:{entry.inbox_time.isoformat()}:{entry.pk}"
+    return base64.b64encode(value.encode()).decode()
+
+
+def decode_inbox_cursor(cursor: str) -> tuple[bool, datetime, int]:
+    try:
+        value = base64.b64decode(cursor.encode(), validate=True).decode()
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError(cursor)
+        is_pinned, rest = value[len(CURSOR_PREFIX) :].split(":", 1)
+        inbox_time, pk = rest.rsplit(":", 1)
+        return is_pinned == "1", datetime.fromisoformat(inbox_time), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid inbox cursor: {cursor}") from e
+
+
+def _after_cursor_q(is_pinned: bool, inbox_time: datetime, pk: int) -> Q:
+    # Row comparison `(is_pinned, inbox_time, id) < (...)` in the inbox order
+    after = Q(is_pinned=is_pinned, inbox_time__lt=inbox_time) | Q(
+        is_pinned=is_pinned, inbox_time=inbox_time, id__lt=pk
+    )
+    if is_pinned:
+        after |= Q(is_pinned=False)
+    return after
+
+
+def rebuild_inbox(participants: QuerySet | None = None) -> int:
+    """
+    Recompute the `unread_count` of the inbox entries of `participants` (all of them by
+    default) from their unread counts. Run it once after adding the inbox columns.
+    """
+    if participants is None:
+        participants = ChatRoomParticipant.objects.all()
+
+    unread_counts = UnreadMessageCount.objects.filter(
+        room_id=OuterRef("room_id"), profile_id=OuterRef("profile_id")
+    )
+    return participants.update(
+        unread_count=Coalesce(Subquery(unread_counts.values("count")[:1]), 0),
+    )
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from baseapp_chats.archive import archive_messages, get_archivable_messages
+
+
+class Command(BaseCommand):
+    """
+    Move the chat messages older than `--older-than-days` to the partitioned archive
+    table (see `baseapp_chats.archive`), in batches of one transaction each. Meant to run
+    periodically; enable `BASEAPP_CHATS_MESSAGE_ARCHIVE` to list archived messages.
+    """
+
+    help = "Archive chat messages older than a number of days."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=getattr(settings, "BASEAPP_CHATS_ARCHIVE_AFTER_DAYS", 365),
+            help="Archive messages created more than this many days ago.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Messages per batch.")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only count the messages to archive."
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options["older_than_days"] < 1:
+            raise CommandError("--older-than-days must be at least 1.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        before = timezone.now() - timedelta(days=options["older_than_days"])
+
+        if options["dry_run"]:
+            count = get_archivable_messages(before).count()
+            self.stdout.write(f"{count} message(s) created before {before:%Y-%m-%d} to archive.")
+            return
+
+        archived = archive_messages(before, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} message(s)."))
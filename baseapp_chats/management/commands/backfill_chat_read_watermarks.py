@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from baseapp_chats.read_state import backfill_read_watermarks
+
+
+class Command(BaseCommand):
+    """
+    Set the read watermark of participants that don't have one yet from their
+    `MessageStatus` rows. Run it before switching `BASEAPP_CHATS_READ_TRACKING` to
+    `"watermark"`; participants that read a room since this release already have one.
+    """
+
+    help = "Backfill ChatRoomParticipant read watermarks from MessageStatus rows."
+
+    def handle(self, *args, **options) -> None:
+        updated = backfill_read_watermarks()
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} read watermark(s)."))
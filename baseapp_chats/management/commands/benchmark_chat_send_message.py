@@ -0,0 +1,94 @@
+import time
+
+import swapper
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from baseapp_chats.fanout import room_fanout
+from baseapp_chats.pipeline import SendMessageContext, message_pipeline
+
+ChatRoom = swapper.load_model("baseapp_chats", "ChatRoom")
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
+
+IN_MEMORY_CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+
+
+class Command(BaseCommand):
+    """
+    Send messages through `baseapp_chats.pipeline` as a participant of a room and report
+    the queries and time per send, for the send transaction and its deferred side effects
+    (notifications and broadcasts) apart. Everything is rolled back and the broadcasts go
+    to an in-memory channel layer, so no live subscription gets the messages.
+    """
+
+    help = "Benchmark the queries and time per message of the chat send pipeline."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("room_id", type=int, help="Primary key of the chat room.")
+        parser.add_argument(
+            "--profile-id",
+            type=int,
+            help="Primary key of the sending profile (default: the room's first participant).",
+        )
+        parser.add_argument("--messages", type=int, default=20, help="Messages to send.")
+
+    def handle(self, *args, **options) -> None:
+        if options["messages"] < 1:
+            raise CommandError("--messages must be at least 1.")
+        room = ChatRoom.objects.filter(pk=options["room_id"]).first()
+        if room is None:
+            raise CommandError(f"Chat room {options['room_id']} does not exist.")
+        participants = ChatRoomParticipant.objects.filter(room=room).select_related(
+            "profile__owner"
+        )
+        if options["profile_id"]:
+            participants = participants.filter(profile_id=options["profile_id"])
+        participant = participants.order_by("pk").first()
+        if participant is None:
+            raise CommandError("The sending profile must be a participant of the room.")
+
+        profile = participant.profile
+        queries, side_effect_queries, durations, side_effects = [], [], [], 0
+        with (
+            transaction.atomic(),
+            override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS),
+        ):
+            for i in range(options["messages"]):
+                context = SendMessageContext(
+                    room=room, profile=profile, user=profile.owner, content=f"Benchmark {i}"
+                )
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    message_pipeline.send(context)
+                    durations.append(time.perf_counter() - started)
+                queries.append(len(captured))
+                side_effects += len(context.side_effects)
+
+                # `on_commit` never fires in the rolled back transaction, run them here
+                with CaptureQueriesContext(connection) as captured:
+                    message_pipeline.run_side_effects(context)
+                    room_fanout.flush()
+                side_effect_queries.append(len(captured))
+            transaction.set_rollback(True)
+
+        count = len(queries)
+        self.stdout.write(
+            f"Sent {count} message(s) to room {room.pk} with {room.participants.count()} "
+            f"participant(s)."
+        )
+        self.stdout.write(
+            f"Queries per send: avg {sum(queries) / count:.1f}, "
+            f"min {min(queries)}, max {max(queries)}."
+        )
+        self.stdout.write(
+            f"Side effect queries per send: avg {sum(side_effect_queries) / count:.1f}, "
+            f"min {min(side_effect_queries)}, max {max(side_effect_queries)}."
+        )
+        self.stdout.write(
+            f"Time per send: avg {sum(durations) / count * 1000:.2f}ms, "
+            f"max {max(durations) * 1000:.2f}ms."
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Side effects deferred per send: {side_effects / count:.1f}.")
+        )
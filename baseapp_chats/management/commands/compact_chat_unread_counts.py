@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from baseapp_chats.unread_ledger import compact_unread_counts
+
+
+class Command(BaseCommand):
+    """
+    Fold the pending `UnreadMessageCountDelta` rows into `UnreadMessageCount`. Run it
+    periodically with `BASEAPP_CHATS_UNREAD_COUNTERS = "ledger"`, or schedule the
+    `baseapp_chats.tasks.compact_chat_unread_counts` task, and once after switching back
+    to `"direct"`.
+    """
+
+    help = "Fold the chat unread count ledger into UnreadMessageCount."
+
+    def handle(self, *args, **options) -> None:
+        folded = compact_unread_counts()
+        self.stdout.write(self.style.SUCCESS(f"Folded {folded} unread count delta(s)."))
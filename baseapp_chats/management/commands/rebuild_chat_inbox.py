@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from baseapp_chats.inbox import rebuild_inbox
+
+
+class Command(BaseCommand):
+    """
+    Recompute the `unread_count` inbox column of every `ChatRoomParticipant` from the
+    unread counts. The `sync_inbox_unread_count` trigger keeps it up to date afterwards;
+    run it again if it was ever disabled.
+    """
+
+    help = "Rebuild the chat inbox entries of ChatRoomParticipant rows."
+
+    def handle(self, *args, **options) -> None:
+        updated = rebuild_inbox()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {updated} inbox entry(ies)."))
@@ -17,10 +17,13 @@ from baseapp_core.pghelpers import pgtrigger_register_default_track
 from baseapp_core.swapper import init_swapped_models
 
 from .triggers import (
+    append_unread_count_on_insert_trigger,
+    append_unread_count_on_read_trigger,
     create_message_status_trigger,
     decrement_unread_count_trigger,
     increment_unread_count_trigger,
     set_last_message_on_insert_trigger,
+    sync_inbox_unread_count_trigger,
     update_last_message_on_delete_trigger,
 )
 
@@ -153,6 +156,8 @@ class AbstractBaseMessage(TimeStampedModel, DocumentIdMixin, RelayModel):
     class Meta:
         abstract = True
         ordering = ["-created"]
+        # Unread messages are the ones of a room above a participant's read watermark
+        indexes = [models.Index(fields=["room", "id"], name="%(app_label)s_msg_room_idx")]
         swappable = swapper.swappable_setting("baseapp_chats", "Message")
 
     def __str__(self) -> str:
@@ -197,31 +202,28 @@ class AbstractBaseMessage(TimeStampedModel, DocumentIdMixin, RelayModel):
         if not created or self.room is None:
             return
 
-        # Materialise inside the current transaction with the Profile
-        # FK pulled in one query so the on_commit callback doesn't
-        # re-hit the DB and doesn't fan out as N+1.
-        participants = list(
-            self.room.participants.select_related("profile").exclude(profile_id=self.profile_id)
-        )
-        if not participants:
+        # Read inside the current transaction; the on_commit callback publishes a single
+        # room-level event that each participant's consumer turns into its own count.
+        # Senders that already loaded them (`baseapp_chats.pipeline`) pass them along.
+        participant_ids = getattr(self, "_room_participant_ids", None)
+        if participant_ids is None:
+            participant_ids = list(self.room.participants.values_list("profile_id", flat=True))
+        if not any(profile_id != self.profile_id for profile_id in participant_ids):
             return
 
+        room_id, sender_profile_id = self.room_id, self.profile_id
+
         def _broadcast_unread_counts() -> None:
             from baseapp_chats.graphql.subscriptions import (
                 ChatRoomOnMessagesCountUpdate,
             )
 
-            for participant in participants:
-                try:
-                    ChatRoomOnMessagesCountUpdate.send_updated_chat_count(
-                        profile=participant.profile,
-                        profile_id=participant.profile.relay_id,
-                    )
-                except Exception:
-                    logger.exception(
-                        "Failed to broadcast unread-count update to profile_id=%s",
-                        participant.profile_id,
-                    )
+            try:
+                ChatRoomOnMessagesCountUpdate.send_room_chat_count(
+                    room_id, participant_ids, sender_profile_id=sender_profile_id
+                )
+            except Exception:
+                logger.exception("Failed to broadcast unread-count update to room_id=%s", room_id)
 
         transaction.on_commit(_broadcast_unread_counts)
 
@@ -251,10 +253,25 @@ class AbstractChatRoomParticipant(TimeStampedModel, DocumentIdMixin, RelayModel)
     )
     accepted_at = models.DateTimeField(null=True, blank=True)
     has_archived_room = models.BooleanField(default=False)
+    # Read watermark, see `baseapp_chats.read_state`. Not a foreign key: deleting the
+    # message must not move the watermark back.
+    last_read_message_id = models.BigIntegerField(null=True, blank=True)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    # Inbox entry of the profile, see `baseapp_chats.inbox`
+    unread_count = models.IntegerField(default=0)
+    is_pinned = models.BooleanField(default=False)
 
     class Meta:
         abstract = True
         ordering = ["-role", "profile__name"]
+        # Index of the inbox entries of a profile
+        indexes = [
+            models.Index(
+                fields=["profile", "has_archived_room", "-is_pinned"],
+                include=["room", "unread_count"],
+                name="%(app_label)s_inbox_idx",
+            )
+        ]
         swappable = swapper.swappable_setting("baseapp_chats", "ChatRoomParticipant")
 
     @classmethod
@@ -301,17 +318,51 @@ class AbstractMessageStatus(DocumentIdMixin, RelayModel):
         swappable = swapper.swappable_setting("baseapp_chats", "MessageStatus")
 
 
+class AbstractUnreadMessageCountDelta(models.Model):
+    """
+    Append-only ledger of `UnreadMessageCount.count` changes. With
+    `BASEAPP_CHATS_UNREAD_COUNTERS = "ledger"` the message status triggers append here
+    instead of updating the counts, and `compact_unread_counts` folds the deltas in (see
+    `baseapp_chats.unread_ledger`). Rooms and profiles aren't foreign keys, so appending
+    takes no lock on their rows.
+    """
+
+    # Every unread message of every recipient appends a row
+    id = models.BigAutoField(primary_key=True)
+    room_id = models.BigIntegerField()
+    profile_id = models.BigIntegerField()
+    delta = models.IntegerField()
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=["profile_id", "room_id"], name="%(app_label)s_unread_delta_idx")
+        ]
+        swappable = swapper.swappable_setting("baseapp_chats", "UnreadMessageCountDelta")
+
+    def __str__(self) -> str:
+        return f"{self.room_id}:{self.profile_id} {self.delta:+d}"
+
+
 # Resolve the concrete swap targets (e.g. social_chats.ChatRoom) so the
 # triggers below can be wired with real db_table names. Order matters:
 # Message references ChatRoom + ChatRoomParticipant, MessageStatus
 # references Message + UnreadMessageCount.
-ChatRoom, ChatRoomParticipant, Message, UnreadMessageCount, MessageStatus = init_swapped_models(
+(
+    ChatRoom,
+    ChatRoomParticipant,
+    Message,
+    UnreadMessageCount,
+    MessageStatus,
+    UnreadMessageCountDelta,
+) = init_swapped_models(
     [
         ("baseapp_chats", "ChatRoom"),
         ("baseapp_chats", "ChatRoomParticipant"),
         ("baseapp_chats", "Message"),
         ("baseapp_chats", "UnreadMessageCount"),
         ("baseapp_chats", "MessageStatus"),
+        ("baseapp_chats", "UnreadMessageCountDelta"),
     ]
 )
 
@@ -319,19 +370,32 @@ ChatRoom, ChatRoomParticipant, Message, UnreadMessageCount, MessageStatus = init
 # Default domain triggers. Mirrors the pghistory_register_default_track
 # contract: consumers can swap a chats model and override these via
 # `@pgtrigger_register_track(...)` on the concrete model.
-pgtrigger_register_default_track(
-    Message,
-    [
-        set_last_message_on_insert_trigger(ChatRoom),
-        create_message_status_trigger(ChatRoomParticipant, AbstractBaseMessage.MessageType),
-        update_last_message_on_delete_trigger(ChatRoom),
-    ],
-)
-
-pgtrigger_register_default_track(
-    MessageStatus,
-    [
+message_triggers = [
+    set_last_message_on_insert_trigger(ChatRoom),
+    update_last_message_on_delete_trigger(ChatRoom),
+]
+# With read watermarks no `MessageStatus` rows are created, see `baseapp_chats.read_state`
+# (not imported here, it loads the swapped models).
+if getattr(settings, "BASEAPP_CHATS_READ_TRACKING", "statuses") != "watermark":
+    message_triggers.insert(
+        1, create_message_status_trigger(ChatRoomParticipant, AbstractBaseMessage.MessageType)
+    )
+pgtrigger_register_default_track(Message, message_triggers)
+
+# Ledger counters trade the row locks on `UnreadMessageCount` for a compaction step, see
+# `baseapp_chats.unread_ledger`
+if getattr(settings, "BASEAPP_CHATS_UNREAD_COUNTERS", "direct") == "ledger":
+    message_status_triggers = [
+        append_unread_count_on_insert_trigger(UnreadMessageCountDelta, Message),
+        append_unread_count_on_read_trigger(UnreadMessageCountDelta, Message),
+    ]
+else:
+    message_status_triggers = [
         increment_unread_count_trigger(UnreadMessageCount, Message),
         decrement_unread_count_trigger(UnreadMessageCount, Message),
-    ],
+    ]
+pgtrigger_register_default_track(MessageStatus, message_status_triggers)
+
+pgtrigger_register_default_track(
+    UnreadMessageCount, [sync_inbox_unread_count_trigger(ChatRoomParticipant)]
 )
@@ -1,6 +1,14 @@
+import threading
+import time
+import uuid
+from collections.abc import Iterable
+from typing import Any
+
 import swapper
+from django.conf import settings
 from django.contrib.auth.backends import BaseBackend
-from django.db import models
+from django.core.cache import cache as shared_cache
+from django.db import models, transaction
 
 from baseapp_core.plugins import shared_services
 
@@ -10,6 +18,197 @@ ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
 Profile = swapper.load_model("baseapp_profiles", "Profile")
 profile_app_label = Profile._meta.app_label
 
+# Attribute used to memoise the cache on user objects, like Django's `_perm_cache`
+PERMISSION_CACHE_ATTR = "_chats_perm_cache"
+# Shared cache key of the permissions version of a user, replaced to invalidate its caches
+VERSION_CACHE_KEY = "baseapp_chats:permissions_version:{}"
+# Seconds between checks of a memoised cache against the shared version
+VERSION_CHECK_INTERVAL = 1
+
+
+class ChatsPermissionCache:
+    """
+    Memoised chat lookups of a user, answering the repeated `has_perm` checks of an
+    operation from memory.
+
+    The user's profiles and their room memberships (room, profile and role) are loaded
+    once, with one query each, on the first check that needs them; room participants and
+    blocks are memoised per room. Rooms missing from the memberships are checked again, so
+    only memberships and roles lost since the prefetch can be stale.
+
+    The cache lives on the user object: for the duration of a request over HTTP, and of
+    the connection over websockets, where it expires after
+    `BASEAPP_CHATS_PERMISSION_CACHE_TIMEOUT` seconds (default `0`, which disables the
+    cache). It's also dropped, in every process, once `invalidate_chats_permissions`
+    replaced the user's version in the default Django cache, so only enable it when that
+    cache is shared by every worker, like Redis.
+    """
+
+    def __init__(self, user_obj, timeout: float, version: str | None) -> None:
+        self.user_obj = user_obj
+        self.version = version
+        self.validated_at = time.monotonic()
+        self.expires_at = self.validated_at + timeout
+        # Websocket resolvers of the same connection run in several threads
+        self._lock = threading.RLock()
+        self._profile_ids: frozenset | None = None
+        self._memberships: dict[Any, dict[Any, str]] | None = None
+        self._room_profile_ids: dict[Any, frozenset] = {}
+        self._blocks: dict[tuple, bool] = {}
+
+    @property
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def profile_ids(self) -> frozenset:
+        """The profiles the user owns or is a member of."""
+        with self._lock:
+            if self._profile_ids is None:
+                self._profile_ids = frozenset(
+                    Profile.objects.filter_user_profiles(self.user_obj).values_list("id", flat=True)
+                )
+            return self._profile_ids
+
+    @property
+    def memberships(self) -> dict[Any, dict[Any, str]]:
+        """`{room_id: {profile_id: role}}` of the rooms the user's profiles participate in."""
+        with self._lock:
+            if self._memberships is None:
+                memberships = {}
+                for room_id, profile_id, role in ChatRoomParticipant.objects.filter(
+                    profile_id__in=self.profile_ids
+                ).values_list("room_id", "profile_id", "role"):
+                    memberships.setdefault(room_id, {})[profile_id] = role
+                self._memberships = memberships
+            return self._memberships
+
+    def get_room_memberships(self, room) -> dict[Any, str]:
+        """`{profile_id: role}` of the user's profiles participating in `room`."""
+        with self._lock:
+            if room.pk in self.memberships:
+                return self.memberships[room.pk]
+        # Rooms joined since the prefetch aren't listed, so misses are checked (and not
+        # memoised): only memberships lost since then can be stale
+        memberships = dict(
+            room.participants.filter(profile_id__in=self.profile_ids).values_list(
+                "profile_id", "role"
+            )
+        )
+        if memberships:
+            with self._lock:
+                self.memberships[room.pk] = memberships
+        return memberships
+
+    def get_role(self, room, profile_id) -> str | None:
+        """The role of `profile_id` in `room`, `None` if it doesn't participate."""
+        if profile_id not in self.profile_ids:
+            # Not one of the user's profiles, so not prefetched
+            return (
+                ChatRoomParticipant.objects.filter(room=room, profile_id=profile_id)
+                .values_list("role", flat=True)
+                .first()
+            )
+        return self.get_room_memberships(room).get(profile_id)
+
+    def is_participant(self, room, profile_ids: Iterable) -> bool:
+        """Whether any of `profile_ids` participates in `room`."""
+        profile_ids = set(profile_ids)
+        if profile_ids - self.profile_ids:
+            return room.participants.filter(profile_id__in=profile_ids).exists()
+        return bool(profile_ids & self.get_room_memberships(room).keys())
+
+    def get_room_profile_ids(self, room) -> frozenset:
+        with self._lock:
+            if room.pk not in self._room_profile_ids:
+                self._room_profile_ids[room.pk] = frozenset(
+                    room.participants.values_list("profile_id", flat=True)
+                )
+            return self._room_profile_ids[room.pk]
+
+    def has_block_in_room(self, room, profile_ids: Iterable) -> bool:
+        """Whether any of `profile_ids` blocks or is blocked by a participant of `room`."""
+        if not (service := shared_services.get("blocks.lookup")):
+            return False
+        key = (room.pk, frozenset(profile_ids))
+        with self._lock:
+            if key not in self._blocks:
+                self._blocks[key] = service.has_block_between(
+                    list(key[1]), list(self.get_room_profile_ids(room))
+                )
+            return self._blocks[key]
+
+
+def get_permission_cache_timeout() -> float:
+    return getattr(settings, "BASEAPP_CHATS_PERMISSION_CACHE_TIMEOUT", 0)
+
+
+def get_chats_permission_cache(user_obj) -> ChatsPermissionCache | None:
+    """The permission cache of `user_obj`, `None` for anonymous users or when disabled."""
+    timeout = get_permission_cache_timeout()
+    if not timeout or not user_obj.is_authenticated:
+        return None
+    cache = getattr(user_obj, PERMISSION_CACHE_ATTR, None)
+    if cache is not None and not cache.is_expired:
+        if time.monotonic() - cache.validated_at < VERSION_CHECK_INTERVAL:
+            return cache
+        if shared_cache.get(VERSION_CACHE_KEY.format(user_obj.pk)) == cache.version:
+            cache.validated_at = time.monotonic()
+            return cache
+    cache = ChatsPermissionCache(
+        user_obj, timeout, shared_cache.get(VERSION_CACHE_KEY.format(user_obj.pk))
+    )
+    setattr(user_obj, PERMISSION_CACHE_ATTR, cache)
+    return cache
+
+
+def _replace_versions(user_ids: Iterable) -> None:
+    # Versions only have to outlive the caches built against them
+    shared_cache.set_many(
+        {VERSION_CACHE_KEY.format(user_id): uuid.uuid4().hex for user_id in user_ids},
+        timeout=get_permission_cache_timeout(),
+    )
+
+
+def invalidate_chats_permissions_of_users(user_ids: Iterable) -> None:
+    """
+    Drop the permission caches of `user_ids` in every process and connection, after their
+    memberships or roles changed. The versions are replaced again once the current
+    transaction commits, so caches rebuilt meanwhile from uncommitted state are dropped
+    too.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids or not get_permission_cache_timeout():
+        return
+    _replace_versions(user_ids)
+    transaction.on_commit(lambda: _replace_versions(user_ids))
+
+
+def invalidate_chats_permissions(user_obj) -> None:
+    """Drop the permission caches of `user_obj`, after its memberships or roles changed."""
+    if user_obj is None:
+        return
+    if hasattr(user_obj, PERMISSION_CACHE_ATTR):
+        delattr(user_obj, PERMISSION_CACHE_ATTR)
+    if user_obj.is_authenticated:
+        invalidate_chats_permissions_of_users([user_obj.pk])
+
+
+def invalidate_chats_permissions_of_profiles(profile_ids: Iterable) -> None:
+    """
+    Drop the permission caches of the users acting as `profile_ids`, their owners and
+    members, after the profiles' memberships or roles changed.
+    """
+    profile_ids = {profile_id for profile_id in profile_ids if profile_id is not None}
+    if not profile_ids or not get_permission_cache_timeout():
+        return
+    user_ids = set()
+    for owner_id, member_id in Profile.objects.filter(pk__in=profile_ids).values_list(
+        "owner_id", "members__user_id"
+    ):
+        user_ids.update((owner_id, member_id))
+    invalidate_chats_permissions_of_users(user_ids)
+
 
 class ChatsPermissionsBackend(BaseBackend):
     def can_add_chatroom(self, user_obj, obj) -> bool:
@@ -23,9 +222,7 @@ class ChatsPermissionsBackend(BaseBackend):
             if current_profile:
                 my_profile_ids = [current_profile.id]
             else:
-                my_profile_ids = Profile.objects.filter_user_profiles(user_obj).values_list(
-                    "id", flat=True
-                )
+                my_profile_ids = self.get_user_profile_ids(user_obj)
 
             participant_profile_ids = [participant.pk for participant in participants]
 
@@ -47,11 +244,16 @@ class ChatsPermissionsBackend(BaseBackend):
             if not getattr(room, "is_group", False) or not current_profile:
                 return False
 
-            chat_room_participant = ChatRoomParticipant.objects.filter(
-                room=room, profile_id=current_profile.pk
-            ).first()
+            if cache := get_chats_permission_cache(user_obj):
+                role = cache.get_role(room, current_profile.pk)
+            else:
+                role = (
+                    ChatRoomParticipant.objects.filter(room=room, profile_id=current_profile.pk)
+                    .values_list("role", flat=True)
+                    .first()
+                )
 
-            if not chat_room_participant:
+            if role is None:
                 return False
 
             if (
@@ -62,11 +264,58 @@ class ChatsPermissionsBackend(BaseBackend):
             ):
                 return True
 
-            if chat_room_participant.role != ChatRoomParticipant.ChatRoomParticipantRoles.ADMIN:
+            if role != ChatRoomParticipant.ChatRoomParticipantRoles.ADMIN:
                 return False
 
             return True
 
+    def get_user_profile_ids(self, user_obj) -> Iterable:
+        if cache := get_chats_permission_cache(user_obj):
+            return cache.profile_ids
+        return Profile.objects.filter_user_profiles(user_obj).values_list("id", flat=True)
+
+    def can_view_chatroom(self, user_obj, room) -> bool:
+        if cache := get_chats_permission_cache(user_obj):
+            my_profile_ids = cache.profile_ids
+            return cache.is_participant(room, my_profile_ids) and not cache.has_block_in_room(
+                room, my_profile_ids
+            )
+
+        my_profile_ids = Profile.objects.filter_user_profiles(user_obj).values_list("id", flat=True)
+
+        if not room.participants.filter(models.Q(profile_id__in=my_profile_ids)).exists():
+            return False
+
+        participant_profile_ids = room.participants.values_list("profile_id", flat=True)
+
+        if service := shared_services.get("blocks.lookup"):
+            if service.has_block_between(my_profile_ids, participant_profile_ids):
+                return False
+
+        return room.participants.filter(profile_id__in=my_profile_ids).exists()
+
+    def can_add_message(self, user_obj, obj) -> bool:
+        current_profile = obj["profile"]
+        room = obj["room"]
+
+        if current_profile:
+            my_profile_ids = [current_profile.id]
+        else:
+            my_profile_ids = self.get_user_profile_ids(user_obj)
+
+        if cache := get_chats_permission_cache(user_obj):
+            return not cache.has_block_in_room(room, my_profile_ids) and cache.is_participant(
+                room, my_profile_ids
+            )
+
+        participant_profile_ids = room.participants.values_list("profile_id", flat=True)
+
+        if service := shared_services.get("blocks.lookup"):
+            if service.has_block_between(my_profile_ids, participant_profile_ids):
+                return False
+
+        return room.participants.filter(profile_id__in=my_profile_ids).exists()
+
     def has_perm(self, user_obj, perm, obj=None) -> bool | None:
         if perm == "baseapp_chats.add_chatroom" and user_obj.is_authenticated:
             return self.can_add_chatroom(user_obj, obj)
@@ -80,42 +329,15 @@ class ChatsPermissionsBackend(BaseBackend):
         if perm == "baseapp_chats.modify_chatroom":
             return self.can_modify_chatroom(user_obj, obj)
         if perm == "baseapp_chats.view_chatroom":
-            my_profile_ids = Profile.objects.filter_user_profiles(user_obj).values_list(
-                "id", flat=True
-            )
-
-            if not obj.participants.filter(models.Q(profile_id__in=my_profile_ids)).exists():
-                return False
-
-            participant_profile_ids = obj.participants.values_list("profile_id", flat=True)
-
-            if service := shared_services.get("blocks.lookup"):
-                if service.has_block_between(my_profile_ids, participant_profile_ids):
-                    return False
-
-            return obj.participants.filter(profile_id__in=my_profile_ids).exists()
+            return self.can_view_chatroom(user_obj, obj)
 
         if perm == "baseapp_chats.list_chatrooms":
+            if cache := get_chats_permission_cache(user_obj):
+                return obj.pk in cache.profile_ids
             return obj.check_if_member(user_obj)
 
         if perm == "baseapp_chats.add_message":
-            current_profile = obj["profile"]
-            room = obj["room"]
-
-            if current_profile:
-                my_profile_ids = [current_profile.id]
-            else:
-                my_profile_ids = Profile.objects.filter_user_profiles(user_obj).values_list(
-                    "id", flat=True
-                )
-
-            participant_profile_ids = room.participants.values_list("profile_id", flat=True)
-
-            if service := shared_services.get("blocks.lookup"):
-                if service.has_block_between(my_profile_ids, participant_profile_ids):
-                    return False
-
-            return room.participants.filter(profile_id__in=my_profile_ids).exists()
+            return self.can_add_message(user_obj, obj)
 
         if (
             perm == "baseapp_chats.change_message" or perm == "baseapp_chats.delete_message"
@@ -0,0 +1,177 @@
+"""
+Pipeline sending user messages, used by `ChatRoomSendMessage`.
+
+Sending runs a list of stages over a `SendMessageContext`: the default ones persist the
+message, replace its mentions, mark the room read by the sender, and queue the
+notifications and subscription broadcasts. The database work of every stage runs in one
+transaction; side effects are queued with `SendMessageContext.defer` and run together
+from a single `on_commit` callback, so nothing is broadcast or notified for a message
+that was rolled back. The room participants are loaded once and shared by every stage.
+
+The stages can be replaced with `BASEAPP_CHATS_SEND_MESSAGE_STAGES`, a list of dotted
+paths to `SendMessageStage` subclasses.
+"""
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import swapper
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from baseapp_chats.read_state import mark_room_read_by_sender
+from baseapp_core.plugins import shared_services
+
+logger = logging.getLogger(__name__)
+
+Message = swapper.load_model("baseapp_chats", "Message")
+
+DEFAULT_STAGES = [
+    "baseapp_chats.pipeline.PersistStage",
+    "baseapp_chats.pipeline.MentionsStage",
+    "baseapp_chats.pipeline.ReadStateStage",
+    "baseapp_chats.pipeline.NotifyStage",
+    "baseapp_chats.pipeline.BroadcastStage",
+]
+
+
+@dataclass
+class SendMessageContext:
+    room: Any
+    profile: Any
+    user: Any
+    content: str
+    room_id: str | None = None
+    in_reply_to: Any = None
+    mentioned_profile_ids: list = field(default_factory=list)
+    info: Any = None
+    message: Any = None
+    side_effects: list[Callable[[], None]] = field(default_factory=list)
+    _participant_ids: list | None = None
+
+    @property
+    def participant_ids(self) -> list:
+        """Profile ids of the room participants, loaded once."""
+        if self._participant_ids is None:
+            self._participant_ids = list(
+                self.room.participants.values_list("profile_id", flat=True)
+            )
+        return self._participant_ids
+
+    def defer(self, side_effect: Callable[[], None]) -> None:
+        """Run `side_effect` once the message is committed."""
+        self.side_effects.append(side_effect)
+
+
+class SendMessageStage:
+    """A step of `MessagePipeline`, run inside the pipeline's transaction."""
+
+    def run(self, context: SendMessageContext) -> None:
+        raise NotImplementedError
+
+
+class PersistStage(SendMessageStage):
+    def run(self, context: SendMessageContext) -> None:
+        message = Message(
+            user=context.user,
+            profile=context.profile,
+            content=context.content,
+            room=context.room,
+            message_type=Message.MessageType.USER_MESSAGE,
+            verb=Message.Verbs.SENT_MESSAGE,
+            in_reply_to=context.in_reply_to,
+        )
+        message._room_participant_ids = context.participant_ids
+        message.save(force_insert=True)
+        context.message = message
+
+        # Already saved by `set_last_message_on_insert_trigger`
+        context.room.last_message = message
+        context.room.last_message_time = message.created
+
+
+class MentionsStage(SendMessageStage):
+    def run(self, context: SendMessageContext) -> None:
+        if not context.mentioned_profile_ids:
+            return
+        if service := shared_services.get("mentions"):
+            service.update_mentions(
+                context.message, context.mentioned_profile_ids, exclude_profile=context.profile
+            )
+
+
+class ReadStateStage(SendMessageStage):
+    def run(self, context: SendMessageContext) -> None:
+        from baseapp_chats.graphql.subscriptions import ChatRoomOnMessagesCountUpdate
+
+        mark_room_read_by_sender(context.message)
+        profile = context.profile
+        context.defer(
+            lambda: ChatRoomOnMessagesCountUpdate.send_updated_chat_count(
+                profile=profile, profile_id=profile.relay_id
+            )
+        )
+
+
+class NotifyStage(SendMessageStage):
+    def run(self, context: SendMessageContext) -> None:
+        from baseapp_chats.utils import send_new_chat_message_notification
+
+        room, message, info = context.room, context.message, context.info
+        participant_ids = context.participant_ids
+        context.defer(
+            lambda: send_new_chat_message_notification(
+                room, message, info, participant_profile_ids=participant_ids
+            )
+        )
+
+
+class BroadcastStage(SendMessageStage):
+    def run(self, context: SendMessageContext) -> None:
+        from baseapp_chats.graphql.subscriptions import ChatRoomOnMessage
+
+        message, participant_ids = context.message, context.participant_ids
+        room_id = context.room_id or context.room.relay_id
+        context.defer(
+            lambda: ChatRoomOnMessage.new_message(
+                message=message, room_id=room_id, participant_ids=participant_ids
+            )
+        )
+
+
+class MessagePipeline:
+    def __init__(self, stages: list[SendMessageStage] | None = None) -> None:
+        self._stages = stages
+
+    @property
+    def stages(self) -> list[SendMessageStage]:
+        if self._stages is not None:
+            return self._stages
+        # Resolved on every send so overriding the setting takes effect
+        paths = getattr(settings, "BASEAPP_CHATS_SEND_MESSAGE_STAGES", DEFAULT_STAGES)
+        return [import_string(path)() for path in paths]
+
+    def send(self, context: SendMessageContext) -> "Message":
+        stages = self.stages
+        with transaction.atomic():
+            for stage in stages:
+                stage.run(context)
+            transaction.on_commit(lambda: self.run_side_effects(context))
+        return context.message
+
+    def run_side_effects(self, context: SendMessageContext) -> None:
+        # The message is committed, failures must not surface as mutation errors
+        for side_effect in context.side_effects:
+            try:
+                side_effect()
+            except Exception:
+                logger.exception(
+                    "Failed to run a side effect of message %s",
+                    getattr(context.message, "pk", None),
+                )
+
+
+message_pipeline = MessagePipeline()
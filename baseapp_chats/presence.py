@@ -0,0 +1,88 @@
+"""
+Ephemeral typing and presence state of chat profiles.
+
+State lives in the Django cache (`BASEAPP_CHATS_PRESENCE_CACHE`), never in the database,
+and expires on its own: a profile is typing in a room for `BASEAPP_CHATS_TYPING_TTL`
+seconds after its last typing update, and online for `BASEAPP_CHATS_PRESENCE_TTL`
+seconds after its last heartbeat. Updates return whether they should be broadcast:
+activity (typing keystrokes, heartbeats) at most once per `BASEAPP_CHATS_PRESENCE_RATE_LIMIT`
+seconds, whether or not the profile was active before, so clients can send them freely;
+going inactive whenever the profile was active.
+
+Broadcasting is done by `ChatRoomOnTyping` and `ChatProfileOnPresence`, which carry
+the expiry along, so clients expire state themselves.
+"""
+
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.utils import timezone
+
+KEY_PREFIX = "baseapp_chats"
+
+
+def get_presence_cache() -> BaseCache:
+    return caches[getattr(settings, "BASEAPP_CHATS_PRESENCE_CACHE", "default")]
+
+
+def get_typing_ttl() -> float:
+    return getattr(settings, "BASEAPP_CHATS_TYPING_TTL", 6)
+
+
+def get_presence_ttl() -> float:
+    return getattr(settings, "BASEAPP_CHATS_PRESENCE_TTL", 60)
+
+
+def get_rate_limit() -> float:
+    return getattr(settings, "BASEAPP_CHATS_PRESENCE_RATE_LIMIT", 2)
+
+
+def get_expires_at(ttl: float) -> datetime:
+    return timezone.now() + timedelta(seconds=ttl)
+
+
+def _typing_key(room_pk, profile_pk) -> str:
+    return f"{KEY_PREFIX}:typing:{room_pk}:{profile_pk}"
+
+
+def _presence_key(profile_pk) -> str:
+    return f"{KEY_PREFIX}:presence:{profile_pk}"
+
+
+def _update(key: str, is_active: bool, ttl: float) -> bool:
+    cache = get_presence_cache()
+    throttle_key = f"{key}:throttle"
+    if not is_active:
+        # Leaves the window alone, so toggling the state can't skip the rate limit
+        return bool(cache.delete(key))
+
+    cache.set(key, True, timeout=ttl)
+    rate_limit = get_rate_limit()
+    if rate_limit <= 0:
+        return True
+    # `add` only succeeds once per rate limit window
+    return cache.add(throttle_key, True, timeout=rate_limit)
+
+
+def set_typing(room_pk, profile_pk, is_typing: bool = True) -> bool:
+    """Update the typing state of `profile_pk` in `room_pk`; whether to broadcast it."""
+    return _update(_typing_key(room_pk, profile_pk), is_typing, get_typing_ttl())
+
+
+def set_online(profile_pk, is_online: bool = True) -> bool:
+    """Heartbeat (or sign off) `profile_pk`; whether to broadcast it."""
+    return _update(_presence_key(profile_pk), is_online, get_presence_ttl())
+
+
+def get_typing_profile_pks(room_pk, profile_pks: Iterable) -> set:
+    """Which of `profile_pks` are typing in `room_pk`."""
+    keys = {_typing_key(room_pk, profile_pk): profile_pk for profile_pk in profile_pks}
+    return {keys[key] for key in get_presence_cache().get_many(keys)}
+
+
+def get_online_profile_pks(profile_pks: Iterable) -> set:
+    """Which of `profile_pks` are online."""
+    keys = {_presence_key(profile_pk): profile_pk for profile_pk in profile_pks}
+    return {keys[key] for key in get_presence_cache().get_many(keys)}
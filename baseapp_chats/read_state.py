@@ -0,0 +1,394 @@
+"""
+Read state of chat participants.
+
+Two tracking modes are supported, picked by `BASEAPP_CHATS_READ_TRACKING`:
+
+- `"statuses"` (default): one `MessageStatus` row per participant and message, created by
+  `create_message_status_trigger`, with `UnreadMessageCount.count` kept by triggers, or
+  by a ledger whose pending deltas are added on read (see `baseapp_chats.unread_ledger`).
+- `"watermark"`: each `ChatRoomParticipant` stores `last_read_message_id` /
+  `last_read_at`, and `is_read`, unread counts and read receipts are derived from it.
+  Sending a message writes no per-participant rows and reading a room is one `UPDATE`.
+
+Callers go through the functions below so they work in both modes.
+"""
+
+import copy
+from collections.abc import Iterable
+from typing import Any
+
+import swapper
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q, QuerySet, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from baseapp_chats.unread_ledger import (
+    compact_unread_counts,
+    get_pending_unread_deltas,
+    uses_unread_ledger,
+)
+
+READ_TRACKING_STATUSES = "statuses"
+READ_TRACKING_WATERMARK = "watermark"
+
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
+Message = swapper.load_model("baseapp_chats", "Message")
+MessageStatus = swapper.load_model("baseapp_chats", "MessageStatus")
+UnreadMessageCount = swapper.load_model("baseapp_chats", "UnreadMessageCount")
+
+
+def get_read_tracking_mode() -> str:
+    return getattr(settings, "BASEAPP_CHATS_READ_TRACKING", READ_TRACKING_STATUSES)
+
+
+def uses_read_watermarks() -> bool:
+    return get_read_tracking_mode() == READ_TRACKING_WATERMARK
+
+
+def unread_messages_for_profile(profile_id: int) -> QuerySet:
+    """
+    Messages unread by `profile_id` across its rooms, derived from the watermarks: user
+    messages of other profiles, newer than the watermark and than the participation
+    itself (`MessageStatus` rows were only created for participants at send time).
+    """
+    return Message.objects.filter(
+        room__participants__profile_id=profile_id,
+        room__participants__created__lte=F("created"),
+        id__gt=Coalesce(F("room__participants__last_read_message_id"), 0),
+        message_type=Message.MessageType.USER_MESSAGE,
+    ).exclude(profile_id=profile_id)
+
+
+def get_unread_counts(profile_id: int, room_ids: Iterable[int] | None = None) -> dict[int, int]:
+    """`{room_id: unread_count}` for the rooms of `profile_id` with unread messages."""
+    if uses_read_watermarks():
+        qs = unread_messages_for_profile(profile_id)
+        if room_ids is not None:
+            qs = qs.filter(room_id__in=room_ids)
+        rows = qs.order_by().values("room_id").annotate(count=Count("pk"))
+        return {row["room_id"]: row["count"] for row in rows}
+
+    qs = UnreadMessageCount.objects.filter(profile_id=profile_id, count__gt=0)
+    if room_ids is not None:
+        room_ids = list(room_ids)
+        qs = qs.filter(room_id__in=room_ids)
+    counts = dict(qs.values_list("room_id", "count"))
+    for room_id, delta in get_pending_unread_deltas(profile_id, room_ids).items():
+        counts[room_id] = max(0, counts.get(room_id, 0) + delta)
+    return {room_id: count for room_id, count in counts.items() if count}
+
+
+def get_total_unread_count(profile_id: int) -> int:
+    if uses_read_watermarks():
+        return unread_messages_for_profile(profile_id).count()
+    if uses_unread_ledger():
+        return sum(get_unread_counts(profile_id).values())
+    aggregate_result = UnreadMessageCount.objects.filter(profile_id=profile_id).aggregate(
+        total_count=Sum("count")
+    )
+    return aggregate_result["total_count"] or 0
+
+
+def get_unread_messages(room, profile_id: int) -> "UnreadMessageCount | None":
+    """
+    The `UnreadMessageCount` of `profile_id` in `room`. With watermarks its `count` is
+    derived, and an unsaved instance is returned when only the count is known.
+    """
+    return get_unread_messages_for_rooms([room], profile_id)[room.pk]
+
+
+def get_unread_messages_for_rooms(rooms: Iterable, profile_id: int) -> dict[int, Any]:
+    """`get_unread_messages` of many rooms, as `{room_id: unread_messages}`."""
+    rooms = {room.pk: room for room in rooms}
+    unread_messages_by_room = {}
+    to_fetch = []
+    for room_id, room in rooms.items():
+        # Rooms listed with `prefetch_related("unread_messages")` are answered from it
+        prefetched = getattr(room, "_prefetched_objects_cache", {}).get("unread_messages")
+        if prefetched is None:
+            to_fetch.append(room_id)
+            continue
+        for unread_messages in prefetched:
+            if str(unread_messages.profile_id) == str(profile_id):
+                unread_messages_by_room[room_id] = unread_messages
+    if to_fetch:
+        for unread_messages in UnreadMessageCount.objects.filter(
+            room_id__in=to_fetch, profile_id=profile_id
+        ):
+            unread_messages_by_room[unread_messages.room_id] = unread_messages
+    if not uses_read_watermarks():
+        deltas = get_pending_unread_deltas(profile_id, list(rooms))
+        result = {}
+        for room_id, room in rooms.items():
+            unread_messages = unread_messages_by_room.get(room_id)
+            if delta := deltas.get(room_id):
+                if unread_messages is not None:
+                    # Prefetched instances are shared, count the deltas on a copy
+                    unread_messages = copy.copy(unread_messages)
+                elif delta > 0:
+                    unread_messages = UnreadMessageCount(room=room, profile_id=profile_id)
+                if unread_messages is not None:
+                    unread_messages.count = max(0, unread_messages.count + delta)
+            result[room_id] = unread_messages
+        return result
+
+    counts = get_unread_counts(profile_id, room_ids=list(rooms))
+    result = {}
+    for room_id, room in rooms.items():
+        unread_messages = unread_messages_by_room.get(room_id)
+        count = counts.get(room_id, 0)
+        if unread_messages is None and count:
+            unread_messages = UnreadMessageCount(room=room, profile_id=profile_id)
+        if unread_messages is not None:
+            unread_messages.count = count
+        result[room_id] = unread_messages
+    return result
+
+
+def filter_rooms_with_unread_messages(queryset: QuerySet, profile_id: int) -> QuerySet:
+    """Narrow a `ChatRoom` queryset to rooms with unread messages or marked unread."""
+    if uses_unread_ledger() and not uses_read_watermarks():
+        marked_unread = UnreadMessageCount.objects.filter(profile_id=profile_id, marked_unread=True)
+        return queryset.prefetch_related("unread_messages").filter(
+            Q(pk__in=list(get_unread_counts(profile_id)))
+            | Q(pk__in=marked_unread.values("room_id"))
+        )
+    if not uses_read_watermarks():
+        return (
+            queryset.prefetch_related("unread_messages")
+            .filter(
+                Q(unread_messages__profile_id=profile_id),
+                Q(unread_messages__count__gt=0) | Q(unread_messages__marked_unread=True),
+            )
+            .distinct()
+        )
+
+    marked_unread = UnreadMessageCount.objects.filter(profile_id=profile_id, marked_unread=True)
+    return queryset.filter(
+        Q(pk__in=unread_messages_for_profile(profile_id).values("room_id"))
+        | Q(pk__in=marked_unread.values("room_id"))
+    )
+
+
+def is_message_read(message, profile_id: int, participant=None) -> bool | None:
+    """
+    Whether `profile_id` read `message`. `None` when the profile had no receipt for it:
+    system messages and messages sent before the profile joined the room.
+    """
+    if not uses_read_watermarks():
+        message_status = message.statuses.filter(profile_id=profile_id).first()
+        return message_status and message_status.is_read
+
+    if message.message_type != Message.MessageType.USER_MESSAGE:
+        return None
+    if participant is None:
+        participant = (
+            ChatRoomParticipant.objects.filter(room_id=message.room_id, profile_id=profile_id)
+            .order_by("pk")
+            .first()
+        )
+    return _is_read_by_watermark(message, profile_id, participant)
+
+
+def get_messages_read_state(
+    messages: Iterable, profile_id: int, participants: dict[int, Any] | None = None
+) -> dict[int, bool | None]:
+    """
+    `is_message_read` of many messages, as `{message_id: is_read}`. `participants` maps
+    room ids to the participant of `profile_id`, when already loaded.
+    """
+    messages = list(messages)
+    if not uses_read_watermarks():
+        statuses = dict(
+            MessageStatus.objects.filter(
+                message_id__in=[message.pk for message in messages], profile_id=profile_id
+            ).values_list("message_id", "is_read")
+        )
+        return {message.pk: statuses.get(message.pk) for message in messages}
+
+    room_ids = {message.room_id for message in messages} - set(participants or {})
+    participants = dict(participants or {})
+    for participant in ChatRoomParticipant.objects.filter(
+        room_id__in=room_ids, profile_id=profile_id
+    ).order_by("-pk"):
+        participants[participant.room_id] = participant
+    return {
+        message.pk: (
+            _is_read_by_watermark(message, profile_id, participants.get(message.room_id))
+            if message.message_type == Message.MessageType.USER_MESSAGE
+            else None
+        )
+        for message in messages
+    }
+
+
+def _is_read_by_watermark(message, profile_id: int, participant) -> bool | None:
+    if participant is None or message.created < participant.created:
+        return None
+    if message.profile_id == profile_id:
+        return True
+    return message.pk <= (participant.last_read_message_id or 0)
+
+
+def get_read_receipts(message) -> QuerySet:
+    """Participants, other than the sender, who read `message`."""
+    participants = ChatRoomParticipant.objects.filter(room_id=message.room_id).exclude(
+        profile_id=message.profile_id
+    )
+    if uses_read_watermarks():
+        return participants.filter(
+            created__lte=message.created, last_read_message_id__gte=message.pk
+        )
+    return participants.filter(
+        profile_id__in=message.statuses.filter(is_read=True).values("profile_id")
+    )
+
+
+def get_message_statuses(message) -> list:
+    """
+    Compatibility shim for `MessageStatus` consumers: the statuses of `message`, built
+    as unsaved `MessageStatus` instances from the watermarks when those are in use.
+    """
+    if not uses_read_watermarks():
+        return list(message.statuses.all())
+
+    if message.message_type != Message.MessageType.USER_MESSAGE:
+        return []
+    participants = ChatRoomParticipant.objects.filter(
+        room_id=message.room_id, created__lte=message.created, profile__isnull=False
+    )
+    statuses = []
+    for participant in participants:
+        is_sender = participant.profile_id == message.profile_id
+        is_read = is_sender or message.pk <= (participant.last_read_message_id or 0)
+        statuses.append(
+            MessageStatus(
+                message=message,
+                profile_id=participant.profile_id,
+                is_read=is_read,
+                read_at=participant.last_read_at if is_read and not is_sender else None,
+            )
+        )
+    return statuses
+
+
+def mark_messages_read(room, profile, message_ids: Iterable[int] | None = None) -> QuerySet:
+    """
+    Mark the messages of `room` read by `profile` and return the messages that were
+    unread. With watermarks, reading some messages also reads every older one.
+
+    The watermark is advanced in both modes, so that switching to `"watermark"` tracking
+    only needs `backfill_chat_read_watermarks` for rooms nobody read since.
+    """
+    if message_ids is not None:
+        message_ids = list(message_ids)
+
+    if not uses_read_watermarks():
+        messages = _mark_statuses_read(room, profile, message_ids)
+        _advance_watermark(room, profile, message_ids)
+        if uses_unread_ledger():
+            # Folded on write, so the ledger of active readers stays short
+            compact_unread_counts([profile.pk])
+        return messages
+
+    advanced = _advance_watermark(room, profile, message_ids)
+    if advanced is None:
+        return Message.objects.none()
+
+    participant, last_read_message_id, read_up_to = advanced
+    return Message.objects.filter(
+        room_id=room.pk,
+        pk__gt=last_read_message_id,
+        pk__lte=read_up_to,
+        created__gte=participant.created,
+        message_type=Message.MessageType.USER_MESSAGE,
+    ).exclude(profile_id=profile.pk)
+
+
+def mark_room_read_by_sender(message) -> None:
+    """
+    Mark the room of `message` read by its sender, up to `message`: sending a message
+    implies having read the room. Batched version of `mark_messages_read(room, profile)`
+    for the send pipeline, one `UPDATE` per kind of read state.
+    """
+    if not uses_read_watermarks():
+        MessageStatus.objects.filter(
+            profile_id=message.profile_id, is_read=False, message__room_id=message.room_id
+        ).update(is_read=True, read_at=timezone.now())
+
+    ChatRoomParticipant.objects.filter(
+        room_id=message.room_id, profile_id=message.profile_id
+    ).filter(Q(last_read_message_id__isnull=True) | Q(last_read_message_id__lt=message.pk)).update(
+        last_read_message_id=message.pk, last_read_at=timezone.now()
+    )
+
+
+def _advance_watermark(
+    room, profile, message_ids: list[int] | None
+) -> tuple["ChatRoomParticipant", int, int] | None:
+    """Move the watermark forward, returning `(participant, previous, new)` if it moved."""
+    with transaction.atomic():
+        participant = (
+            ChatRoomParticipant.objects.select_for_update()
+            .filter(room_id=room.pk, profile_id=profile.pk)
+            .order_by("pk")
+            .first()
+        )
+        if participant is None:
+            return None
+
+        last_read_message_id = participant.last_read_message_id or 0
+        messages = Message.objects.filter(room_id=room.pk, pk__gt=last_read_message_id)
+        if message_ids:
+            messages = messages.filter(pk__in=message_ids)
+        read_up_to = messages.aggregate(read_up_to=Max("pk"))["read_up_to"]
+        if read_up_to is None:
+            return None
+
+        ChatRoomParticipant.objects.filter(pk=participant.pk).update(
+            last_read_message_id=read_up_to, last_read_at=timezone.now()
+        )
+    return participant, last_read_message_id, read_up_to
+
+
+def _mark_statuses_read(room, profile, message_ids: list[int] | None) -> QuerySet:
+    messages_status_qs = MessageStatus.objects.filter(profile_id=profile.pk, is_read=False)
+    if message_ids:
+        messages_status_qs = messages_status_qs.filter(message_id__in=message_ids)
+    else:
+        messages_status_qs = messages_status_qs.filter(message__room_id=room.pk)
+
+    messages = Message.objects.filter(
+        pk__in=messages_status_qs.values_list("message_id", flat=True)
+    )
+    messages_status_qs.update(is_read=True, read_at=timezone.now())
+    return messages
+
+
+def backfill_read_watermarks(participants: QuerySet | None = None) -> int:
+    """
+    Set the watermark of participants without one to the newest message they read
+    according to `MessageStatus`. Run it before switching to `"watermark"` tracking.
+    Returns the number of participants updated.
+    """
+    if participants is None:
+        participants = ChatRoomParticipant.objects.all()
+
+    read_statuses = MessageStatus.objects.filter(
+        profile_id=OuterRef("profile_id"),
+        message__room_id=OuterRef("room_id"),
+        is_read=True,
+    )
+    latest_read_message = read_statuses.order_by("-message_id").values("message_id")[:1]
+    # The sender's own statuses are read without a `read_at`
+    latest_read_at = read_statuses.order_by(F("read_at").desc(nulls_last=True)).values("read_at")
+    return (
+        participants.filter(last_read_message_id__isnull=True)
+        .filter(Exists(read_statuses))
+        .update(
+            last_read_message_id=Subquery(latest_read_message),
+            last_read_at=Subquery(latest_read_at[:1]),
+        )
+    )
@@ -9,7 +9,8 @@ from baseapp_core.plugins import SharedServiceProvider
 class ChatsParticipationService(SharedServiceProvider):
     """Expose chat participation cleanup to other packages.
 
-    Consumers (currently only the auth anonymize-user task) call
+    Consumers (the auth anonymize-user task, and blocks for
+    `invalidate_permissions_of_profiles`) call
     `shared_services.get("chats_participation").cleanup_user_participation(user)`
     so the dependency stays one-way and chats can be uninstalled without
     leaving callers with broken swapper imports.
@@ -23,14 +24,26 @@ class ChatsParticipationService(SharedServiceProvider):
         return apps.is_installed("baseapp_chats")
 
     def cleanup_user_participation(self, user) -> None:
+        from .permissions import invalidate_chats_permissions_of_users
+
         ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
         ChatRoom = swapper.load_model("baseapp_chats", "ChatRoom")
 
         participant_qs = ChatRoomParticipant.objects.filter(profile__user=user)
-        room_ids = list(participant_qs.values_list("room_id", flat=True).distinct())
+        rows = list(participant_qs.values_list("room_id", "profile_id"))
+        room_ids = sorted({room_id for room_id, _ in rows})
+        profile_ids = {profile_id for _, profile_id in rows}
         participant_qs.delete()
+        self.invalidate_permissions_of_profiles(profile_ids)
+        invalidate_chats_permissions_of_users([user.pk])
 
         for room_id in room_ids:
             room = ChatRoom.objects.get(id=room_id)
             room.participants_count = ChatRoomParticipant.objects.filter(room=room).count()
             room.save(update_fields=["participants_count"])
+
+    def invalidate_permissions_of_profiles(self, profile_ids) -> None:
+        """Drop the chat permission caches of the users acting as `profile_ids`."""
+        from .permissions import invalidate_chats_permissions_of_profiles
+
+        invalidate_chats_permissions_of_profiles(profile_ids)
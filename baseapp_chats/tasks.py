@@ -0,0 +1,9 @@
+from celery import shared_task
+
+
+@shared_task
+def compact_chat_unread_counts() -> None:
+    """Fold the unread count ledger, see `baseapp_chats.unread_ledger`."""
+    from .unread_ledger import compact_unread_counts
+
+    compact_unread_counts()
@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+import swapper
+from django.core.management import call_command
+from django.utils import timezone
+
+from baseapp_chats import archive
+from baseapp_chats.archive import (
+    archive_messages,
+    count_archived_messages,
+    get_archived_messages,
+)
+from baseapp_chats.read_state import get_unread_counts
+from baseapp_core.models import DocumentId
+from baseapp_core.plugins import shared_services
+
+from .factories import ChatRoomFactory, ChatRoomParticipantFactory, MessageFactory
+
+pytestmark = pytest.mark.django_db
+
+Message = swapper.load_model("baseapp_chats", "Message")
+
+ROOM_MESSAGES_GRAPHQL = """
+    query GetRoomMessages($roomId: ID!, $first: Int, $after: String, $verb: VerbsEnum) {
+        chatRoom(id: $roomId) {
+            allMessages(first: $first, after: $after, verb: $verb) {
+                totalCount
+                edges {
+                    cursor
+                    node {
+                        id
+                        content
+                        inReplyTo {
+                            content
+                        }
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+    }
+"""
+
+
+@pytest.fixture
+def old_room(django_user_client) -> tuple:
+    """A room with 3 messages from two years ago and 2 recent ones, newest last."""
+    room = ChatRoomFactory()
+    me = django_user_client.user.profile
+    friend = ChatRoomParticipantFactory(room=room).profile
+    ChatRoomParticipantFactory(room=room, profile=me)
+    old = timezone.now() - timedelta(days=730)
+    messages = [
+        MessageFactory(
+            room=room,
+            profile=friend,
+            user=friend.owner,
+            content=f"Message {index}",
+            created=old + timedelta(days=index),
+        )
+        for index in range(3)
+    ]
+    messages += [
+        MessageFactory(room=room, profile=friend, user=friend.owner, content=f"Message {index}")
+        for index in range(3, 5)
+    ]
+    return room, me, messages
+
+
+def _before() -> datetime:
+    return timezone.now() - timedelta(days=365)
+
+
+def test_archive_moves_old_messages(old_room) -> None:
+    room, me, messages = old_room
+    assert get_unread_counts(me.pk) == {room.pk: 5}
+
+    assert archive_messages(_before(), batch_size=2) == 3
+
+    assert list(Message.objects.filter(room=room).order_by("created")) == messages[3:]
+    assert count_archived_messages(room) == 0  # Listing the archive isn't enabled
+    # Archived messages count as read
+    assert get_unread_counts(me.pk) == {room.pk: 2}
+    room.refresh_from_db()
+    assert room.last_message_id == messages[-1].pk
+
+
+def test_archive_compresses_new_tables_only() -> None:
+    room = ChatRoomFactory()
+    old = timezone.now() - timedelta(days=730)
+    MessageFactory.create_batch(3, room=room, created=old)
+    MessageFactory(room=room)
+
+    with patch.object(archive, "_compress", wraps=archive._compress) as compress:
+        assert archive_messages(_before(), batch_size=1) == 3
+        assert archive_messages(_before(), batch_size=1) == 0
+
+    # The archive table and the partition of `old`, not once per batch or run
+    assert compress.call_count == 2
+
+
+def test_archive_keeps_last_and_replied_to_messages(settings, django_user_client) -> None:
+    settings.BASEAPP_CHATS_MESSAGE_ARCHIVE = True
+    room = ChatRoomFactory()
+    old = timezone.now() - timedelta(days=730)
+    first = MessageFactory(room=room, created=old)
+    replied_to = MessageFactory(room=room, created=old + timedelta(days=1))
+    last = MessageFactory(room=room, created=old + timedelta(days=2), in_reply_to=replied_to)
+
+    assert archive_messages(_before()) == 1
+
+    assert set(Message.objects.filter(room=room)) == {replied_to, last}
+    assert [message.pk for message in get_archived_messages(room, 0, 10)] == [first.pk]
+
+
+def test_all_messages_pages_into_the_archive(settings, old_room, graphql_user_client) -> None:
+    settings.BASEAPP_CHATS_MESSAGE_ARCHIVE = True
+    room, me, messages = old_room
+    archive_messages(_before())
+
+    contents, after = [], None
+    while True:
+        response = graphql_user_client(
+            ROOM_MESSAGES_GRAPHQL, variables={"roomId": room.relay_id, "first": 2, "after": after}
+        )
+        connection = response.json()["data"]["chatRoom"]["allMessages"]
+        assert connection["totalCount"] == 5
+        contents += [edge["node"]["content"] for edge in connection["edges"]]
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        after = connection["pageInfo"]["endCursor"]
+
+    assert contents == [f"Message {index}" for index in reversed(range(5))]
+
+
+def test_all_messages_filters_the_archive(settings, old_room, graphql_user_client) -> None:
+    settings.BASEAPP_CHATS_MESSAGE_ARCHIVE = True
+    room, me, messages = old_room
+    Message.objects.filter(pk__in=[messages[1].pk, messages[4].pk]).update(verb=0)
+    archive_messages(_before())
+
+    response = graphql_user_client(
+        ROOM_MESSAGES_GRAPHQL,
+        variables={"roomId": room.relay_id, "first": 10, "verb": "SENT_MESSAGE"},
+    )
+
+    connection = response.json()["data"]["chatRoom"]["allMessages"]
+    assert connection["totalCount"] == 3
+    assert [edge["node"]["content"] for edge in connection["edges"]] == [
+        "Message 3",
+        "Message 2",
+        "Message 0",
+    ]
+
+
+def test_archived_messages_keep_their_public_ids(settings, old_room) -> None:
+    settings.BASEAPP_CHATS_MESSAGE_ARCHIVE = True
+    room, me, messages = old_room
+    relay_ids = [message.relay_id for message in messages[:3]]
+
+    archive_messages(_before())
+
+    assert not DocumentId.objects.filter(
+        content_type__model=Message._meta.model_name,
+        object_id__in=[message.pk for message in messages[:3]],
+    ).exists()
+    archived = get_archived_messages(room, 0, 10)
+    assert [message.relay_id for message in archived] == relay_ids[::-1]
+
+
+def test_messages_with_mentions_are_not_archived(old_room) -> None:
+    room, me, messages = old_room
+    shared_services.get("mentions").update_mentions(messages[0], [me.pk])
+
+    assert archive_messages(_before()) == 2
+
+    assert Message.objects.filter(pk=messages[0].pk).exists()
+    assert messages[0].public_id is not None
+
+
+def test_archived_messages_load_their_replies(settings, old_room) -> None:
+    settings.BASEAPP_CHATS_MESSAGE_ARCHIVE = True
+    room, me, messages = old_room
+    Message.objects.filter(pk=messages[1].pk).update(in_reply_to=messages[0])
+    archive_messages(_before())
+
+    archived = get_archived_messages(room, 0, 10)
+
+    assert [message.content for message in archived] == ["Message 2", "Message 1", "Message 0"]
+    assert archived[1].in_reply_to.content == "Message 0"
+    assert archived[0].profile == messages[0].profile
+
+
+def test_delete_only_recomputes_the_last_message(old_room) -> None:
+    room, me, messages = old_room
+
+    messages[-1].delete()
+    room.refresh_from_db()
+    assert room.last_message_id == messages[-2].pk
+
+    Message.objects.filter(pk=messages[0].pk).delete()
+    room.refresh_from_db()
+    assert room.last_message_id == messages[-2].pk
+
+
+def test_archive_command_dry_run(old_room, capsys) -> None:
+    room, me, messages = old_room
+
+    call_command("archive_chat_messages", "--dry-run")
+
+    assert "3 message(s)" in capsys.readouterr().out
+    assert Message.objects.filter(room=room).count() == 5
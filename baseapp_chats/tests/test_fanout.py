@@ -0,0 +1,87 @@
+import asyncio
+from unittest import mock
+
+import channels.layers
+import pytest
+from asgiref.sync import sync_to_async
+from channels_graphql_ws.serializer import Serializer
+
+from baseapp_chats.fanout import RoomFanout, room_group
+from baseapp_chats.graphql.subscriptions import (
+    ChatRoomOnMessagesCountUpdate,
+    merge_room_chat_counts,
+)
+
+
+async def join_room_group(room_id: int, channel_name: str) -> None:
+    group = ChatRoomOnMessagesCountUpdate._group_name(room_group(room_id))
+    await channels.layers.get_channel_layer().group_add(group, channel_name)
+
+
+async def receive_payload(channel_name: str) -> dict:
+    message = await channels.layers.get_channel_layer().receive(channel_name)
+    return Serializer.deserialize(message["payload"])
+
+
+@pytest.mark.asyncio
+async def test_publishes_once_to_the_room_group() -> None:
+    fanout = RoomFanout(window=0)
+    await join_room_group(1, "fanout-test-a")
+
+    # From a sync thread, as on commit of a message, so the send completes before returning
+    await sync_to_async(fanout.publish)(
+        ChatRoomOnMessagesCountUpdate, 1, {"participant_ids": [1, 2]}
+    )
+
+    assert await receive_payload("fanout-test-a") == {"participant_ids": [1, 2]}
+    stats = fanout.stats()
+    assert (stats.published, stats.sent, stats.batches) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_coalesces_events_within_the_window() -> None:
+    fanout = RoomFanout(window=60)
+    await join_room_group(2, "fanout-test-b")
+    await join_room_group(3, "fanout-test-b")
+
+    for count in range(3):
+        fanout.publish(ChatRoomOnMessagesCountUpdate, 2, {"count": count}, coalesce_key="count")
+    fanout.publish(ChatRoomOnMessagesCountUpdate, 3, {"count": 10}, coalesce_key="count")
+    await sync_to_async(fanout.flush)()
+
+    payloads = [await receive_payload("fanout-test-b") for _ in range(2)]
+    assert sorted(payload["count"] for payload in payloads) == [2, 10]
+
+    stats = fanout.stats()
+    assert stats.published == 4
+    assert stats.coalesced == 2
+    assert stats.sent == stats.batch_size_max == 2
+    assert stats.batches == 1
+    assert stats.latency_max >= 0
+
+
+@pytest.mark.asyncio
+async def test_failed_sends_on_a_running_loop_are_logged(caplog) -> None:
+    fanout = RoomFanout(window=0)
+
+    with mock.patch.object(
+        channels.layers, "get_channel_layer", side_effect=RuntimeError("layer down")
+    ):
+        fanout.publish(ChatRoomOnMessagesCountUpdate, 4, {"participant_ids": [1]})
+        [task] = fanout._tasks
+        await asyncio.wait([task])
+        # Done callbacks run on the next iteration of the loop
+        await asyncio.sleep(0)
+
+    assert not fanout._tasks
+    assert "Failed to send chat room events" in caplog.text
+
+
+def test_coalesced_count_updates_keep_senders_only_when_all_match() -> None:
+    first = {"participant_ids": [1, 2], "exclude_profile_id": 1}
+
+    assert merge_room_chat_counts(first, {**first})["exclude_profile_id"] == 1
+    assert (
+        merge_room_chat_counts(first, {**first, "exclude_profile_id": 2})["exclude_profile_id"]
+        is None
+    )
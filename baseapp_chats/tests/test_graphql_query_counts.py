@@ -381,3 +381,66 @@ def test_manageable_listing_with_is_participant_stays_linear(
         "  - the `manageable` filter join lost `.distinct()` and duplicated rows\n"
         "  - a per-row COUNT crept into `participants_count` resolution"
     )
+
+
+CHAT_ROOMS_WITH_PER_ROOM_STATE = """
+    query ChatRoomsWithPerRoomState($profileId: ID!) {
+        profile(id: $profileId) {
+            id
+            ... on ChatRoomsInterface {
+                chatRooms {
+                    edges {
+                        node {
+                            id
+                            title
+                            isArchived
+                            isSoleAdmin
+                            unreadMessages(profileId: $profileId) {
+                                count
+                            }
+                            otherParticipant {
+                                id
+                            }
+                            lastMessage {
+                                id
+                                isRead(profileId: $profileId)
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+"""
+
+
+def test_chat_rooms_per_room_state_is_batched(graphql_user_client, django_user_client) -> None:
+    """Bound guard for the `ChatsLoader` batched resolvers.
+
+    `isArchived`, `isSoleAdmin`, `unreadMessages`, `otherParticipant` (and
+    `title`, which reads it) and `lastMessage.isRead` are answered for the
+    whole page at once, so the listing costs the same for 2 or 6 rooms.
+    """
+    my_profile = django_user_client.user.profile
+
+    def count_queries() -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            response = graphql_user_client(
+                CHAT_ROOMS_WITH_PER_ROOM_STATE, variables={"profileId": my_profile.relay_id}
+            )
+        assert "errors" not in response.json(), response.json()
+        return len(ctx.captured_queries)
+
+    _set_up_rooms_with_participants(my_profile, n_rooms=2, n_other_participants_per_room=1)
+    # Warms up the ContentType cache
+    count_queries()
+    two_rooms = count_queries()
+
+    _set_up_rooms_with_participants(my_profile, n_rooms=4, n_other_participants_per_room=1)
+    six_rooms = count_queries()
+
+    assert six_rooms == two_rooms, (
+        f"Listing 6 rooms issued {six_rooms} queries, {two_rooms} for 2 rooms. "
+        "Likely cause: a `BaseChatRoomObjectType` resolver stopped going through "
+        "`get_chats_loader(info)`, or `ChatRoomConnection` no longer primes the page."
+    )
@@ -1,4 +1,6 @@
 import textwrap
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
 import pytest
 import swapper
@@ -6,9 +8,11 @@ from channels.db import database_sync_to_async
 
 from baseapp_core.tests.factories import UserFactory
 
+from ..graphql.subscriptions import ChatRoomOnRoomUpdate
 from ..utils import send_message
 from .factories import ChatRoomFactory, ChatRoomParticipantFactory
 
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
 Message = swapper.load_model("baseapp_chats", "Message")
 Verbs = Message.Verbs
 
@@ -338,3 +342,19 @@ async def test_current_profile_ws_context(django_user_client, graphql_ws_user_cl
         ]["count"]
         == 1
     )
+
+
+def test_join_room_loads_the_profiles_once(django_assert_max_num_queries) -> None:
+    room = ChatRoomFactory()
+    ChatRoomParticipantFactory.create_batch(3, room=room)
+    participants = list(ChatRoomParticipant.objects.filter(room=room))
+    channel_layer = SimpleNamespace(group_send=AsyncMock())
+
+    with (
+        patch("channels.layers.get_channel_layer", return_value=channel_layer),
+        django_assert_max_num_queries(2),
+    ):
+        ChatRoomOnRoomUpdate.join_room(room, participants)
+
+    # The room update and unread count subscriptions of each participant
+    assert channel_layer.group_send.await_count == 6
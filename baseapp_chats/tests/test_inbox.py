@@ -0,0 +1,196 @@
+import pytest
+import swapper
+from django.core.management import call_command
+
+from baseapp_chats.inbox import (
+    decode_inbox_cursor,
+    encode_inbox_cursor,
+    get_inbox,
+    get_inbox_page,
+)
+from baseapp_profiles.tests.factories import ProfileFactory
+
+from .factories import ChatRoomFactory, ChatRoomParticipantFactory, MessageFactory
+
+pytestmark = pytest.mark.django_db
+
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
+UnreadMessageCount = swapper.load_model("baseapp_chats", "UnreadMessageCount")
+
+PROFILE_INBOX_GRAPHQL = """
+    query ProfileInbox($profileId: ID!, $first: Int, $after: String) {
+        profile(id: $profileId) {
+            ... on ChatRoomsInterface {
+                chatInbox(first: $first, after: $after) {
+                    totalCount
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
+                    edges {
+                        node {
+                            id
+                            isArchived(profileId: $profileId)
+                            unreadMessages(profileId: $profileId) {
+                                count
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+"""
+
+
+@pytest.fixture
+def inbox() -> tuple:
+    """A profile with 5 rooms with a message each, the last one being the most recent."""
+    me = ProfileFactory()
+    rooms = []
+    for _ in range(5):
+        room = ChatRoomFactory()
+        ChatRoomParticipantFactory(room=room, profile=me)
+        friend = ChatRoomParticipantFactory(room=room).profile
+        MessageFactory(room=room, profile=friend, user=friend.owner)
+        rooms.append(room)
+    return me, rooms
+
+
+def test_new_message_moves_room_to_the_top(inbox) -> None:
+    me, rooms = inbox
+    assert [entry.room_id for entry in get_inbox(me.pk)][:1] == [rooms[-1].pk]
+
+    MessageFactory(room=rooms[0], profile=me, user=me.owner)
+
+    entry = get_inbox(me.pk).first()
+    rooms[0].refresh_from_db()
+    assert entry.room_id == rooms[0].pk
+    assert entry.inbox_time == rooms[0].last_message_time
+
+
+def test_rooms_without_messages_are_listed_by_creation(inbox) -> None:
+    me, rooms = inbox
+    room = ChatRoomFactory(last_message_time=None, is_group=True)
+    ChatRoomParticipantFactory(room=room, profile=me)
+
+    entry = get_inbox(me.pk).get(room=room)
+
+    assert entry.inbox_time == room.created
+
+
+def test_unread_count_mirrors_unread_message_count(inbox) -> None:
+    me, rooms = inbox
+
+    counts = UnreadMessageCount.objects.filter(profile=me).values_list("room_id", "count")
+    entries = ChatRoomParticipant.objects.filter(profile=me).values_list("room_id", "unread_count")
+    assert dict(entries) == dict(counts) == {room.pk: 1 for room in rooms}
+    assert get_inbox(me.pk, unread=True).count() == 5
+
+    UnreadMessageCount.objects.filter(profile=me, room=rooms[0]).update(count=0)
+
+    assert get_inbox(me.pk, unread=True).count() == 4
+
+
+def test_unread_inbox_with_read_watermarks(settings, inbox) -> None:
+    settings.BASEAPP_CHATS_READ_TRACKING = "watermark"
+    me, rooms = inbox
+    rooms[0].refresh_from_db()
+    ChatRoomParticipant.objects.filter(profile=me).update(unread_count=0)
+    ChatRoomParticipant.objects.filter(profile=me, room=rooms[0]).update(
+        last_read_message_id=rooms[0].last_message_id
+    )
+
+    assert {entry.room_id for entry in get_inbox(me.pk, unread=True)} == {
+        room.pk for room in rooms[1:]
+    }
+
+
+def test_keyset_pagination_lists_pinned_rooms_first(inbox) -> None:
+    me, rooms = inbox
+    ChatRoomParticipant.objects.filter(profile=me, room=rooms[1]).update(is_pinned=True)
+
+    room_ids, after, has_next = [], None, True
+    while has_next:
+        entries, has_next = get_inbox_page(me.pk, 2, after=after)
+        room_ids += [entry.room_id for entry in entries]
+        after = encode_inbox_cursor(entries[-1])
+
+    assert room_ids == [rooms[1].pk, rooms[4].pk, rooms[3].pk, rooms[2].pk, rooms[0].pk]
+
+
+def test_archived_rooms_have_their_own_inbox(inbox) -> None:
+    me, rooms = inbox
+    ChatRoomParticipant.objects.filter(profile=me, room=rooms[0]).update(has_archived_room=True)
+
+    assert rooms[0].pk not in [entry.room_id for entry in get_inbox(me.pk)]
+    assert [entry.room_id for entry in get_inbox(me.pk, archived=True)] == [rooms[0].pk]
+
+
+def test_inbox_cursor_roundtrip(inbox) -> None:
+    me, rooms = inbox
+    entry = get_inbox(me.pk).first()
+
+    assert decode_inbox_cursor(encode_inbox_cursor(entry)) == (
+        False,
+        entry.inbox_time,
+        entry.pk,
+    )
+    with pytest.raises(ValueError):
+        decode_inbox_cursor("not-a-cursor")
+
+
+def test_rebuild_chat_inbox_command(inbox) -> None:
+    me, rooms = inbox
+    ChatRoomParticipant.objects.update(unread_count=0)
+
+    call_command("rebuild_chat_inbox")
+
+    assert get_inbox(me.pk, unread=True).count() == 5
+
+
+def test_chat_inbox_query(django_user_client, graphql_user_client) -> None:
+    me = django_user_client.user.profile
+    rooms = []
+    for _ in range(3):
+        room = ChatRoomFactory()
+        ChatRoomParticipantFactory(room=room, profile=me)
+        friend = ChatRoomParticipantFactory(room=room).profile
+        MessageFactory(room=room, profile=friend, user=friend.owner)
+        rooms.append(room)
+
+    response = graphql_user_client(
+        PROFILE_INBOX_GRAPHQL, variables={"profileId": me.relay_id, "first": 2}
+    )
+    inbox = response.json()["data"]["profile"]["chatInbox"]
+
+    assert inbox["totalCount"] == 3
+    assert inbox["pageInfo"]["hasNextPage"] is True
+    assert [edge["node"]["id"] for edge in inbox["edges"]] == [
+        rooms[2].relay_id,
+        rooms[1].relay_id,
+    ]
+    assert inbox["edges"][0]["node"]["unreadMessages"]["count"] == 1
+
+    response = graphql_user_client(
+        PROFILE_INBOX_GRAPHQL,
+        variables={
+            "profileId": me.relay_id,
+            "first": 2,
+            "after": inbox["pageInfo"]["endCursor"],
+        },
+    )
+    inbox = response.json()["data"]["profile"]["chatInbox"]
+
+    assert inbox["pageInfo"]["hasNextPage"] is False
+    assert [edge["node"]["id"] for edge in inbox["edges"]] == [rooms[0].relay_id]
+
+
+def test_chat_inbox_query_with_invalid_cursor(django_user_client, graphql_user_client) -> None:
+    me = django_user_client.user.profile
+
+    response = graphql_user_client(
+        PROFILE_INBOX_GRAPHQL, variables={"profileId": me.relay_id, "after": "nope"}
+    )
+
+    assert response.json()["errors"][0]["extensions"]["code"] == "invalid_cursor"
@@ -0,0 +1,141 @@
+import pytest
+import swapper
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from baseapp_blocks.tests.factories import BlockFactory
+from baseapp_chats.permissions import (
+    invalidate_chats_permissions,
+    invalidate_chats_permissions_of_profiles,
+)
+from baseapp_core.plugins import shared_services
+from baseapp_core.tests.factories import UserFactory
+
+from .factories import ChatRoomFactory, ChatRoomParticipantFactory
+
+pytestmark = pytest.mark.django_db
+
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
+
+
+@pytest.fixture
+def permission_cache(settings) -> None:
+    settings.BASEAPP_CHATS_PERMISSION_CACHE_TIMEOUT = 60
+
+
+@pytest.fixture
+def user_rooms() -> tuple:
+    user = UserFactory()
+    rooms = [ChatRoomFactory(is_group=True) for _ in range(5)]
+    for room in rooms:
+        ChatRoomParticipantFactory(room=room, profile=user.profile)
+        ChatRoomParticipantFactory(room=room)
+    return user, rooms
+
+
+@pytest.mark.usefixtures("permission_cache")
+def test_view_chatroom_checks_are_answered_from_memory(user_rooms) -> None:
+    user, rooms = user_rooms
+    assert user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+    with CaptureQueriesContext(connection) as queries:
+        for room in rooms:
+            assert user.has_perm("baseapp_chats.view_chatroom", room)
+            assert user.has_perm("baseapp_chats.view_chatroom", room)
+
+    # Only the participants of the other rooms, for the block checks
+    assert len(queries) <= len(rooms) - 1
+
+
+@pytest.mark.usefixtures("permission_cache")
+def test_rooms_joined_after_the_prefetch_are_visible(user_rooms) -> None:
+    user, rooms = user_rooms
+    room = ChatRoomFactory(is_group=True)
+    assert not user.has_perm("baseapp_chats.view_chatroom", room)
+
+    ChatRoomParticipantFactory(room=room, profile=user.profile)
+
+    assert user.has_perm("baseapp_chats.view_chatroom", room)
+
+
+@pytest.mark.usefixtures("permission_cache")
+def test_invalidate_drops_lost_memberships(user_rooms) -> None:
+    user, rooms = user_rooms
+    assert user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+    ChatRoomParticipant.objects.filter(room=rooms[0], profile=user.profile).delete()
+    invalidate_chats_permissions(user)
+
+    assert not user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+
+@pytest.mark.usefixtures("permission_cache")
+def test_invalidating_a_profile_drops_the_caches_of_other_connections(
+    user_rooms, monkeypatch
+) -> None:
+    monkeypatch.setattr("baseapp_chats.permissions.VERSION_CHECK_INTERVAL", 0)
+    user, rooms = user_rooms
+    # The same user, as seen by another connection
+    connection_user = type(user).objects.get(pk=user.pk)
+    assert connection_user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+    ChatRoomParticipant.objects.filter(room=rooms[0], profile=user.profile).delete()
+    invalidate_chats_permissions_of_profiles([user.profile.pk])
+
+    assert not connection_user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+
+def test_blocks_deny_view_chatroom(user_rooms) -> None:
+    user, rooms = user_rooms
+    other = rooms[0].participants.exclude(profile=user.profile).get().profile
+    BlockFactory(actor=other, target=user.profile)
+
+    assert not user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+    assert user.has_perm("baseapp_chats.view_chatroom", rooms[1])
+
+
+@pytest.mark.usefixtures("permission_cache")
+def test_modify_chatroom_uses_prefetched_roles(user_rooms) -> None:
+    user, rooms = user_rooms
+    ChatRoomParticipant.objects.filter(room=rooms[0], profile=user.profile).update(
+        role=ChatRoomParticipant.ChatRoomParticipantRoles.ADMIN
+    )
+    can_modify = {"room": rooms[0], "profile": user.profile, "modify_title": True}
+
+    assert user.has_perm("baseapp_chats.modify_chatroom", can_modify)
+    assert not user.has_perm("baseapp_chats.modify_chatroom", {**can_modify, "room": rooms[1]})
+    assert user.has_perm("baseapp_chats.list_chatrooms", user.profile)
+
+
+@pytest.mark.usefixtures("permission_cache")
+def test_new_blocks_drop_the_caches(user_rooms, monkeypatch) -> None:
+    monkeypatch.setattr("baseapp_chats.permissions.VERSION_CHECK_INTERVAL", 0)
+    user, rooms = user_rooms
+    connection_user = type(user).objects.get(pk=user.pk)
+    assert connection_user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+    other = rooms[0].participants.exclude(profile=user.profile).get().profile
+    BlockFactory(actor=other, target=user.profile)
+
+    assert not connection_user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+
+@pytest.mark.usefixtures("permission_cache")
+def test_cleaning_up_participation_drops_the_caches(user_rooms, monkeypatch) -> None:
+    monkeypatch.setattr("baseapp_chats.permissions.VERSION_CHECK_INTERVAL", 0)
+    user, rooms = user_rooms
+    connection_user = type(user).objects.get(pk=user.pk)
+    assert connection_user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+    shared_services.get("chats_participation").cleanup_user_participation(user)
+
+    assert not connection_user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+
+def test_cache_is_disabled_by_default(user_rooms) -> None:
+    user, rooms = user_rooms
+    assert user.has_perm("baseapp_chats.view_chatroom", rooms[0])
+
+    ChatRoomParticipant.objects.filter(room=rooms[0], profile=user.profile).delete()
+
+    assert not user.has_perm("baseapp_chats.view_chatroom", rooms[0])
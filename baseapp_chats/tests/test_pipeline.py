@@ -0,0 +1,155 @@
+from unittest import mock
+
+import pytest
+import swapper
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from baseapp_chats.pipeline import (
+    MessagePipeline,
+    PersistStage,
+    SendMessageContext,
+    SendMessageStage,
+    message_pipeline,
+)
+from baseapp_chats.read_state import get_unread_counts
+
+from .factories import ChatRoomFactory, ChatRoomParticipantFactory, MessageFactory
+
+pytestmark = pytest.mark.django_db
+
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
+
+
+@pytest.fixture
+def room_with_friends() -> tuple:
+    room = ChatRoomFactory()
+    me = ChatRoomParticipantFactory(room=room).profile
+    friends = [ChatRoomParticipantFactory(room=room).profile for _ in range(3)]
+    return room, me, friends
+
+
+def _context(room, profile, **kwargs) -> SendMessageContext:
+    return SendMessageContext(
+        room=room, profile=profile, user=profile.owner, content="Hello", **kwargs
+    )
+
+
+def test_send_persists_and_reads_the_room(room_with_friends) -> None:
+    room, me, friends = room_with_friends
+    MessageFactory(room=room, profile=friends[0], user=friends[0].owner)
+
+    message = message_pipeline.send(_context(room, me))
+
+    room.refresh_from_db()
+    assert room.last_message_id == message.pk
+    assert get_unread_counts(me.pk) == {}
+    assert get_unread_counts(friends[1].pk) == {room.pk: 2}
+    assert ChatRoomParticipant.objects.get(room=room, profile=me).last_read_message_id == (
+        message.pk
+    )
+
+
+def test_side_effects_run_once_on_commit(
+    room_with_friends, django_capture_on_commit_callbacks
+) -> None:
+    room, me, friends = room_with_friends
+
+    with (
+        mock.patch(
+            "baseapp_chats.graphql.subscriptions.ChatRoomOnMessage.new_message"
+        ) as new_message,
+        mock.patch("baseapp_chats.utils.send_new_chat_message_notification") as notify,
+    ):
+        with django_capture_on_commit_callbacks(execute=False) as callbacks:
+            context = _context(room, me)
+            message_pipeline.send(context)
+
+        assert not new_message.called and not notify.called
+        assert len(context.side_effects) == 3
+        # Message.save's unread count broadcast, then all the pipeline's side effects
+        assert len(callbacks) == 2
+        callbacks[-1]()
+
+    new_message.assert_called_once()
+    assert sorted(new_message.call_args.kwargs["participant_ids"]) == sorted(
+        [me.pk, *(friend.pk for friend in friends)]
+    )
+    notify.assert_called_once()
+
+
+def test_failing_side_effect_does_not_stop_the_others(room_with_friends) -> None:
+    room, me, friends = room_with_friends
+    calls = []
+    context = _context(room, me)
+    context.defer(mock.Mock(side_effect=RuntimeError))
+    context.defer(lambda: calls.append(True))
+
+    MessagePipeline(stages=[]).run_side_effects(context)
+
+    assert calls == [True]
+
+
+def test_stages_are_pluggable(settings, room_with_friends) -> None:
+    room, me, friends = room_with_friends
+
+    class UppercaseStage(SendMessageStage):
+        def run(self, context) -> None:
+            context.content = context.content.upper()
+
+    message = MessagePipeline(stages=[UppercaseStage(), PersistStage()]).send(_context(room, me))
+
+    message.refresh_from_db()
+    assert message.content == "HELLO"
+    assert get_unread_counts(me.pk) == {}
+
+
+def test_stages_setting_is_read_on_every_send(settings, room_with_friends) -> None:
+    room, me, friends = room_with_friends
+    message_pipeline.send(_context(room, me))
+
+    settings.BASEAPP_CHATS_SEND_MESSAGE_STAGES = ["baseapp_chats.pipeline.PersistStage"]
+    with mock.patch("baseapp_chats.pipeline.mark_room_read_by_sender") as mark_read:
+        message_pipeline.send(_context(room, me))
+
+    mark_read.assert_not_called()
+    assert room.messages.count() == 2
+
+
+def test_failing_stage_rolls_back_the_message(room_with_friends) -> None:
+    room, me, friends = room_with_friends
+
+    class FailingStage(SendMessageStage):
+        def run(self, context) -> None:
+            raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        MessagePipeline(stages=[PersistStage(), FailingStage()]).send(_context(room, me))
+
+    assert not room.messages.exists()
+
+
+def test_queries_per_send_do_not_depend_on_participants(room_with_friends) -> None:
+    room, me, friends = room_with_friends
+    message_pipeline.send(_context(room, me))
+
+    with CaptureQueriesContext(connection) as few:
+        message_pipeline.send(_context(room, me))
+    for _ in range(10):
+        ChatRoomParticipantFactory(room=room)
+    with CaptureQueriesContext(connection) as many:
+        message_pipeline.send(_context(room, me))
+
+    assert len(many) == len(few)
+
+
+def test_benchmark_command(room_with_friends, capsys) -> None:
+    room, me, friends = room_with_friends
+
+    call_command("benchmark_chat_send_message", room.pk, "--messages", "2")
+
+    out = capsys.readouterr().out
+    assert "Queries per send" in out
+    assert "Side effect queries per send" in out
+    assert not room.messages.exists()
@@ -0,0 +1,158 @@
+import textwrap
+from collections.abc import Iterator
+
+import pytest
+from channels.db import database_sync_to_async
+
+from baseapp_chats.graphql.subscriptions import ChatProfileOnPresence, ChatRoomOnTyping
+from baseapp_chats.presence import (
+    get_online_profile_pks,
+    get_presence_cache,
+    get_typing_profile_pks,
+    set_online,
+    set_typing,
+)
+
+from .factories import ChatRoomFactory, ChatRoomParticipantFactory
+
+TYPING_SUBSCRIPTION = textwrap.dedent("""
+    subscription op_name($roomId: ID!, $profileId: ID!) {
+      chatRoomOnTyping(roomId: $roomId, profileId: $profileId) {
+        profileId
+        isTyping
+        expiresAt
+      }
+    }
+    """)
+
+PRESENCE_SUBSCRIPTION = textwrap.dedent("""
+    subscription op_name($profileId: ID!, $profileIds: [ID!]!) {
+      chatProfileOnPresence(profileId: $profileId, profileIds: $profileIds) {
+        profileId
+        isOnline
+      }
+    }
+    """)
+
+
+@pytest.fixture(autouse=True)
+def presence_cache() -> Iterator[None]:
+    get_presence_cache().clear()
+    yield
+    get_presence_cache().clear()
+
+
+def test_typing_updates_are_throttled() -> None:
+    assert set_typing(1, 2) is True
+    assert set_typing(1, 2) is False
+    assert get_typing_profile_pks(1, [2, 3]) == {2}
+
+    assert set_typing(1, 2, is_typing=False) is True
+    assert set_typing(1, 2, is_typing=False) is False
+    assert get_typing_profile_pks(1, [2, 3]) == set()
+
+
+def test_toggling_typing_is_throttled() -> None:
+    assert set_typing(1, 2) is True
+    assert set_typing(1, 2, is_typing=False) is True
+    # Typing again within the window is recorded but not broadcast
+    assert set_typing(1, 2) is False
+    assert get_typing_profile_pks(1, [2]) == {2}
+    assert set_typing(1, 2, is_typing=False) is True
+
+
+def test_presence_expires(settings) -> None:
+    settings.BASEAPP_CHATS_PRESENCE_RATE_LIMIT = 0
+    assert set_online(1) is True
+    assert set_online(1) is True
+    assert get_online_profile_pks([1, 2]) == {1}
+
+    # Expires right away
+    settings.BASEAPP_CHATS_PRESENCE_TTL = 0
+    set_online(2)
+    assert get_online_profile_pks([1, 2]) == {1}
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_typing_is_broadcast_to_other_participants(
+    django_user_client, graphql_ws_user_client
+) -> None:
+    me = django_user_client.user.profile
+    room = await database_sync_to_async(ChatRoomFactory)(created_by=django_user_client.user)
+    await database_sync_to_async(ChatRoomParticipantFactory)(profile=me, room=room)
+    friend = (await database_sync_to_async(ChatRoomParticipantFactory)(room=room)).profile
+
+    client = await graphql_ws_user_client(consumer_attrs={"strict_ordering": True})
+    sub_id = await client.send(
+        msg_type="subscribe",
+        payload={
+            "query": TYPING_SUBSCRIPTION,
+            "variables": {
+                "roomId": await database_sync_to_async(lambda: room.relay_id)(),
+                "profileId": await database_sync_to_async(lambda: me.relay_id)(),
+            },
+            "operationName": "op_name",
+        },
+    )
+    await client.assert_no_messages()
+
+    # Own typing isn't echoed back
+    assert await database_sync_to_async(ChatRoomOnTyping.typing)(room, me) is True
+    await client.assert_no_messages()
+
+    assert await database_sync_to_async(ChatRoomOnTyping.typing)(room, friend) is True
+    resp = await client.receive(assert_id=sub_id, assert_type="next")
+    event = resp["data"]["chatRoomOnTyping"]
+    assert event["isTyping"] is True
+    assert event["expiresAt"]
+
+    # Throttled keystrokes aren't broadcast
+    assert await database_sync_to_async(ChatRoomOnTyping.typing)(room, friend) is False
+    await client.assert_no_messages()
+
+    await client.finalize()
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_presence_is_broadcast_to_contacts(
+    django_user_client, graphql_ws_user_client
+) -> None:
+    me = django_user_client.user.profile
+    room = await database_sync_to_async(ChatRoomFactory)(created_by=django_user_client.user)
+    await database_sync_to_async(ChatRoomParticipantFactory)(profile=me, room=room)
+    friend = (await database_sync_to_async(ChatRoomParticipantFactory)(room=room)).profile
+    stranger = (await database_sync_to_async(ChatRoomParticipantFactory)()).profile
+
+    client = await graphql_ws_user_client(consumer_attrs={"strict_ordering": True})
+    friend_id = await database_sync_to_async(lambda: friend.relay_id)()
+    sub_id = await client.send(
+        msg_type="subscribe",
+        payload={
+            "query": PRESENCE_SUBSCRIPTION,
+            "variables": {
+                "profileId": await database_sync_to_async(lambda: me.relay_id)(),
+                "profileIds": [
+                    friend_id,
+                    await database_sync_to_async(lambda: stranger.relay_id)(),
+                ],
+            },
+            "operationName": "op_name",
+        },
+    )
+    await client.assert_no_messages()
+
+    # Only profiles sharing a room are followed
+    await database_sync_to_async(ChatProfileOnPresence.presence)(stranger)
+    await client.assert_no_messages()
+
+    await database_sync_to_async(ChatProfileOnPresence.presence)(friend)
+    resp = await client.receive(assert_id=sub_id, assert_type="next")
+    assert resp["data"]["chatProfileOnPresence"] == {"profileId": friend_id, "isOnline": True}
+
+    await database_sync_to_async(ChatProfileOnPresence.presence)(friend, is_online=False)
+    resp = await client.receive(assert_id=sub_id, assert_type="next")
+    assert resp["data"]["chatProfileOnPresence"]["isOnline"] is False
+
+    await client.finalize()
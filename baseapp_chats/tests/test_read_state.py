@@ -0,0 +1,140 @@
+import pytest
+import swapper
+from django.core.management import call_command
+
+from baseapp_chats.read_state import (
+    get_message_statuses,
+    get_read_receipts,
+    get_total_unread_count,
+    get_unread_counts,
+    is_message_read,
+    mark_messages_read,
+)
+from baseapp_profiles.tests.factories import ProfileFactory
+
+from .factories import ChatRoomFactory, ChatRoomParticipantFactory, MessageFactory
+from .test_graphql_mutations import READ_MESSAGE_GRAPHQL
+
+pytestmark = pytest.mark.django_db
+
+ChatRoomParticipant = swapper.load_model("baseapp_chats", "ChatRoomParticipant")
+Message = swapper.load_model("baseapp_chats", "Message")
+MessageStatus = swapper.load_model("baseapp_chats", "MessageStatus")
+
+
+@pytest.fixture
+def read_watermarks(settings) -> None:
+    settings.BASEAPP_CHATS_READ_TRACKING = "watermark"
+
+
+@pytest.fixture
+def room_with_messages() -> tuple:
+    room = ChatRoomFactory()
+    me = ChatRoomParticipantFactory(room=room).profile
+    friend = ChatRoomParticipantFactory(room=room).profile
+    mine = MessageFactory.create_batch(2, room=room, profile=me, user=me.owner)
+    theirs = MessageFactory.create_batch(3, room=room, profile=friend, user=friend.owner)
+    return room, me, friend, mine, theirs
+
+
+def test_unread_counts_are_derived_from_watermark(read_watermarks, room_with_messages) -> None:
+    room, me, friend, mine, theirs = room_with_messages
+    MessageFactory(room=room, message_type=Message.MessageType.SYSTEM_GENERATED)
+
+    assert get_unread_counts(me.pk) == {room.pk: 3}
+    assert get_unread_counts(friend.pk) == {room.pk: 2}
+    assert get_total_unread_count(me.pk) == 3
+
+    messages = mark_messages_read(room, me, [theirs[1].pk])
+
+    assert set(messages.values_list("pk", flat=True)) == {theirs[0].pk, theirs[1].pk}
+    assert get_unread_counts(me.pk) == {room.pk: 1}
+    assert ChatRoomParticipant.objects.get(room=room, profile=me).last_read_message_id == (
+        theirs[1].pk
+    )
+
+
+def test_watermark_never_moves_back(read_watermarks, room_with_messages) -> None:
+    room, me, friend, mine, theirs = room_with_messages
+
+    mark_messages_read(room, me)
+    assert not mark_messages_read(room, me, [theirs[0].pk]).exists()
+    assert ChatRoomParticipant.objects.get(room=room, profile=me).last_read_message_id == (
+        theirs[-1].pk
+    )
+
+
+def test_is_read_and_receipts(read_watermarks, room_with_messages) -> None:
+    room, me, friend, mine, theirs = room_with_messages
+    mark_messages_read(room, friend, [mine[0].pk])
+
+    assert is_message_read(mine[0], friend.pk) is True
+    assert is_message_read(mine[1], friend.pk) is False
+    assert is_message_read(mine[1], me.pk) is True
+    assert list(get_read_receipts(mine[0]).values_list("profile_id", flat=True)) == [friend.pk]
+    assert not get_read_receipts(mine[1]).exists()
+
+
+def test_messages_before_joining_have_no_read_state(read_watermarks, room_with_messages) -> None:
+    room, me, friend, mine, theirs = room_with_messages
+    newcomer = ChatRoomParticipantFactory(room=room).profile
+
+    assert get_unread_counts(newcomer.pk) == {}
+    assert is_message_read(theirs[0], newcomer.pk) is None
+
+
+def test_message_statuses_shim(read_watermarks, room_with_messages) -> None:
+    room, me, friend, mine, theirs = room_with_messages
+    mark_messages_read(room, friend)
+
+    statuses = {status.profile_id: status for status in get_message_statuses(mine[0])}
+
+    assert set(statuses) == {me.pk, friend.pk}
+    assert statuses[me.pk].is_read and statuses[me.pk].read_at is None
+    assert statuses[friend.pk].is_read and statuses[friend.pk].read_at is not None
+
+
+def test_statuses_mode_also_advances_watermark(room_with_messages) -> None:
+    room, me, friend, mine, theirs = room_with_messages
+
+    mark_messages_read(room, me)
+
+    assert not MessageStatus.objects.filter(profile=me, is_read=False).exists()
+    assert ChatRoomParticipant.objects.get(room=room, profile=me).last_read_message_id == (
+        theirs[-1].pk
+    )
+
+
+def test_backfill_sets_watermarks_from_statuses(room_with_messages) -> None:
+    room, me, friend, mine, theirs = room_with_messages
+    MessageStatus.objects.filter(profile=me, message=theirs[1]).update(is_read=True)
+    ChatRoomParticipant.objects.update(last_read_message_id=None)
+
+    call_command("backfill_chat_read_watermarks")
+
+    assert ChatRoomParticipant.objects.get(room=room, profile=me).last_read_message_id == (
+        theirs[1].pk
+    )
+    # The friend only "read" its own messages
+    assert ChatRoomParticipant.objects.get(room=room, profile=friend).last_read_message_id == (
+        theirs[-1].pk
+    )
+
+
+def test_read_messages_mutation_with_watermarks(
+    read_watermarks, graphql_user_client, django_user_client
+) -> None:
+    my_profile = django_user_client.user.profile
+    room = ChatRoomFactory(created_by=django_user_client.user)
+    ChatRoomParticipantFactory(room=room, profile=my_profile)
+    friend = ChatRoomParticipantFactory(room=room, profile=ProfileFactory()).profile
+    MessageFactory.create_batch(2, room=room, profile=friend, user=friend.owner)
+
+    response = graphql_user_client(
+        READ_MESSAGE_GRAPHQL,
+        variables={"input": {"roomId": room.relay_id, "profileId": my_profile.relay_id}},
+    )
+    content = response.json()
+
+    assert content["data"]["chatRoomReadMessages"]["room"]["unreadMessages"]["count"] == 0
+    assert get_total_unread_count(my_profile.pk) == 0
@@ -0,0 +1,96 @@
+import pytest
+import swapper
+from django.core.management import call_command
+
+from baseapp_chats.inbox import get_inbox
+from baseapp_chats.read_state import (
+    filter_rooms_with_unread_messages,
+    get_total_unread_count,
+    get_unread_counts,
+    get_unread_messages,
+    mark_messages_read,
+)
+from baseapp_chats.tasks import compact_chat_unread_counts
+from baseapp_chats.triggers import (
+    append_unread_count_on_insert_trigger,
+    append_unread_count_on_read_trigger,
+    decrement_unread_count_trigger,
+    increment_unread_count_trigger,
+)
+
+from .factories import ChatRoomFactory, ChatRoomParticipantFactory, MessageFactory
+
+pytestmark = pytest.mark.django_db
+
+ChatRoom = swapper.load_model("baseapp_chats", "ChatRoom")
+Message = swapper.load_model("baseapp_chats", "Message")
+MessageStatus = swapper.load_model("baseapp_chats", "MessageStatus")
+UnreadMessageCount = swapper.load_model("baseapp_chats", "UnreadMessageCount")
+UnreadMessageCountDelta = swapper.load_model("baseapp_chats", "UnreadMessageCountDelta")
+
+
+@pytest.fixture
+def ledger_counters(settings) -> None:
+    # The test database has the default triggers, swap them within the test transaction
+    settings.BASEAPP_CHATS_UNREAD_COUNTERS = "ledger"
+    increment_unread_count_trigger(UnreadMessageCount, Message).uninstall(MessageStatus)
+    decrement_unread_count_trigger(UnreadMessageCount, Message).uninstall(MessageStatus)
+    append_unread_count_on_insert_trigger(UnreadMessageCountDelta, Message).install(MessageStatus)
+    append_unread_count_on_read_trigger(UnreadMessageCountDelta, Message).install(MessageStatus)
+
+
+@pytest.fixture
+def room_with_messages() -> tuple:
+    room = ChatRoomFactory()
+    me = ChatRoomParticipantFactory(room=room).profile
+    friend = ChatRoomParticipantFactory(room=room).profile
+    theirs = MessageFactory.create_batch(3, room=room, profile=friend, user=friend.owner)
+    return room, me, friend, theirs
+
+
+def test_messages_append_to_the_ledger(ledger_counters, room_with_messages) -> None:
+    room, me, friend, theirs = room_with_messages
+
+    assert not UnreadMessageCount.objects.filter(profile=me, count__gt=0).exists()
+    assert UnreadMessageCountDelta.objects.filter(profile_id=me.pk).count() == 3
+
+    # Reading counts the pending deltas without folding them
+    assert get_unread_counts(me.pk) == {room.pk: 3}
+    assert get_total_unread_count(me.pk) == 3
+    assert get_unread_messages(room, me.pk).count == 3
+    assert list(filter_rooms_with_unread_messages(ChatRoom.objects.all(), me.pk)) == [room]
+    assert list(get_inbox(me.pk, unread=True).values_list("room_id", flat=True)) == [room.pk]
+    assert UnreadMessageCountDelta.objects.filter(profile_id=me.pk).count() == 3
+
+
+def test_marking_read_folds_the_readers_deltas(ledger_counters, room_with_messages) -> None:
+    room, me, friend, theirs = room_with_messages
+    assert get_total_unread_count(me.pk) == 3
+
+    mark_messages_read(room, me, [theirs[0].pk, theirs[1].pk])
+
+    assert not UnreadMessageCountDelta.objects.filter(profile_id=me.pk).exists()
+    assert UnreadMessageCount.objects.get(room=room, profile=me).count == 1
+    assert get_total_unread_count(me.pk) == 1
+    assert get_inbox(me.pk).get(room=room).unread_count == 1
+
+
+def test_compact_command_folds_everyone(ledger_counters, room_with_messages) -> None:
+    room, me, friend, theirs = room_with_messages
+    MessageFactory(room=room, profile=me, user=me.owner)
+
+    call_command("compact_chat_unread_counts")
+
+    assert not UnreadMessageCountDelta.objects.exists()
+    assert dict(
+        UnreadMessageCount.objects.filter(room=room).values_list("profile_id", "count")
+    ) == {me.pk: 3, friend.pk: 1}
+
+
+def test_compact_task_folds_everyone(ledger_counters, room_with_messages) -> None:
+    room, me, friend, theirs = room_with_messages
+
+    compact_chat_unread_counts.delay()
+
+    assert not UnreadMessageCountDelta.objects.exists()
+    assert UnreadMessageCount.objects.get(room=room, profile=me).count == 3
@@ -41,6 +41,47 @@ def decrement_unread_count_trigger(UnreadMessageCount, Message) -> pgtrigger.Tri
     )
 
 
+# Ledger counters (see `baseapp_chats.unread_ledger`): append the unread count changes of
+# each statement to the ledger, instead of updating the shared `UnreadMessageCount` rows
+def append_unread_count_on_insert_trigger(UnreadMessageCountDelta, Message) -> pgtrigger.Trigger:
+    return pgtrigger.Trigger(
+        name="append_unread_count_on_insert",
+        level=pgtrigger.Statement,
+        when=pgtrigger.After,
+        operation=pgtrigger.Insert,
+        referencing=pgtrigger.Referencing(new="new_values"),
+        func=f"""
+            INSERT INTO {UnreadMessageCountDelta._meta.db_table} (room_id, profile_id, delta)
+            SELECT message.room_id, new_values.profile_id, COUNT(*)
+            FROM new_values
+            JOIN {Message._meta.db_table} AS message ON message.id = new_values.message_id
+            WHERE NOT new_values.is_read AND message.room_id IS NOT NULL
+            GROUP BY message.room_id, new_values.profile_id;
+            RETURN NULL;
+        """,
+    )
+
+
+def append_unread_count_on_read_trigger(UnreadMessageCountDelta, Message) -> pgtrigger.Trigger:
+    return pgtrigger.Trigger(
+        name="append_unread_count_on_read",
+        level=pgtrigger.Statement,
+        when=pgtrigger.After,
+        operation=pgtrigger.Update,
+        referencing=pgtrigger.Referencing(old="old_values", new="new_values"),
+        func=f"""
+            INSERT INTO {UnreadMessageCountDelta._meta.db_table} (room_id, profile_id, delta)
+            SELECT message.room_id, new_values.profile_id, -COUNT(*)
+            FROM new_values
+            JOIN old_values ON old_values.id = new_values.id
+            JOIN {Message._meta.db_table} AS message ON message.id = new_values.message_id
+            WHERE new_values.is_read AND NOT old_values.is_read AND message.room_id IS NOT NULL
+            GROUP BY message.room_id, new_values.profile_id;
+            RETURN NULL;
+        """,
+    )
+
+
 # Create MessageStatus row in the database for each CharRoomParticipant
 def create_message_status_trigger(ChatRoomParticipant, MessageType) -> pgtrigger.Trigger:
     return pgtrigger.Trigger(
@@ -75,7 +116,9 @@ def set_last_message_on_insert_trigger(ChatRoom) -> pgtrigger.Trigger:
     )
 
 
-# Update ChatRoom last_message and last_message_time fields to previous message when the last message is deleted
+# Update ChatRoom last_message and last_message_time fields to previous message when the last message is deleted.
+# Rooms are only recomputed when the deleted message is their last one (already unset when deleted through
+# the ORM, by `on_delete=SET_NULL`), so deleting or archiving older messages doesn't touch the room per row.
 def update_last_message_on_delete_trigger(ChatRoom) -> pgtrigger.Trigger:
     return pgtrigger.Trigger(
         name="update_last_message",
@@ -84,21 +127,35 @@ def update_last_message_on_delete_trigger(ChatRoom) -> pgtrigger.Trigger:
         operation=pgtrigger.Delete,
         func=Func(f"""
             UPDATE {ChatRoom._meta.db_table}
-            SET last_message_id = (
-                SELECT id
-                FROM {{meta.db_table}}
-                WHERE room_id = OLD.room_id
-                ORDER BY created DESC
-                LIMIT 1
-            ),
-            last_message_time = (
-                SELECT created
+            SET (last_message_id, last_message_time) = (
+                SELECT id, created
                 FROM {{meta.db_table}}
                 WHERE room_id = OLD.room_id
                 ORDER BY created DESC
                 LIMIT 1
             )
-            WHERE id = OLD.room_id;
+            WHERE
+                id = OLD.room_id AND
+                (last_message_id IS NULL OR last_message_id = OLD.id);
             RETURN NULL;
         """),
     )
+
+
+# Copy UnreadMessageCount.count to the inbox entry of the profile, see `baseapp_chats.inbox`
+def sync_inbox_unread_count_trigger(ChatRoomParticipant) -> pgtrigger.Trigger:
+    return pgtrigger.Trigger(
+        name="sync_inbox_unread_count",
+        level=pgtrigger.Row,
+        when=pgtrigger.After,
+        operation=pgtrigger.Insert | pgtrigger.UpdateOf("count"),
+        func=f"""
+            UPDATE {ChatRoomParticipant._meta.db_table}
+            SET unread_count = NEW.count
+            WHERE
+                room_id = NEW.room_id AND
+                profile_id = NEW.profile_id AND
+                unread_count <> NEW.count;
+            RETURN NULL;
+        """,
+    )
@@ -0,0 +1,116 @@
+"""
+Ledger unread counters.
+
+By default `increment_unread_count_trigger` / `decrement_unread_count_trigger` update the
+`UnreadMessageCount` row of each recipient for every message, so concurrent senders in a
+busy room queue on the same row locks. With `BASEAPP_CHATS_UNREAD_COUNTERS = "ledger"`
+the message status triggers append one `UnreadMessageCountDelta` row per recipient and
+statement instead, which never conflicts, and the deltas are folded into
+`UnreadMessageCount` by `compact_unread_counts`:
+
+- when a profile marks messages read, for that profile, by `mark_messages_read`;
+- periodically, for everyone, by the `baseapp_chats.tasks.compact_chat_unread_counts`
+  task or `./manage.py compact_chat_unread_counts`, so the ledger stays small and
+  `UnreadMessageCount` is up to date for direct readers.
+
+Reads never compact: the functions of `baseapp_chats.read_state` and `baseapp_chats.inbox`
+add the pending deltas of the profile to its counts, so counts stay exact.
+
+Switching modes changes the `MessageStatus` triggers: run `makemigrations` for your
+chats app, and `compact_chat_unread_counts` after switching back to `"direct"`.
+"""
+
+from collections.abc import Iterable
+
+import swapper
+from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+
+UNREAD_COUNTERS_DIRECT = "direct"
+UNREAD_COUNTERS_LEDGER = "ledger"
+
+UnreadMessageCount = swapper.load_model("baseapp_chats", "UnreadMessageCount")
+UnreadMessageCountDelta = swapper.load_model("baseapp_chats", "UnreadMessageCountDelta")
+
+
+def uses_unread_ledger() -> bool:
+    return (
+        getattr(settings, "BASEAPP_CHATS_UNREAD_COUNTERS", UNREAD_COUNTERS_DIRECT)
+        == UNREAD_COUNTERS_LEDGER
+    )
+
+
+def compact_unread_counts(profile_ids: Iterable[int] | None = None) -> int:
+    """
+    Fold the pending deltas of `profile_ids` (of everyone by default) into their
+    `UnreadMessageCount` rows, returning the number of deltas folded. The deltas are
+    deleted and applied in one statement, so concurrent compactions never apply a delta
+    twice, and senders keep appending meanwhile.
+    """
+    where, params = "", []
+    if profile_ids is not None:
+        profile_ids = list(profile_ids)
+        if not profile_ids:
+            return 0
+        where, params = "WHERE profile_id = ANY(%s)", [profile_ids]
+
+    counts = UnreadMessageCount._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH deltas AS (
+                DELETE FROM {UnreadMessageCountDelta._meta.db_table} {where}
+                RETURNING room_id, profile_id, delta
+            ),
+            summed AS (
+                SELECT room_id, profile_id, SUM(delta) AS delta, COUNT(*) AS folded
+                FROM deltas
+                GROUP BY room_id, profile_id
+            ),
+            updated AS (
+                UPDATE {counts} AS counts
+                SET count = GREATEST(0, counts.count + summed.delta)
+                FROM summed
+                WHERE
+                    counts.room_id = summed.room_id AND
+                    counts.profile_id = summed.profile_id AND
+                    summed.delta <> 0
+                RETURNING counts.room_id, counts.profile_id
+            ),
+            inserted AS (
+                INSERT INTO {counts} (room_id, profile_id, marked_unread, count)
+                SELECT room_id, profile_id, FALSE, GREATEST(0, delta)
+                FROM summed
+                WHERE
+                    delta > 0 AND
+                    NOT EXISTS (
+                        SELECT 1 FROM {counts} AS counts
+                        WHERE
+                            counts.room_id = summed.room_id AND
+                            counts.profile_id = summed.profile_id
+                    )
+                ON CONFLICT (room_id, profile_id)
+                DO UPDATE SET count = {counts}.count + EXCLUDED.count
+            )
+            SELECT COALESCE(SUM(folded), 0) FROM summed
+            """,
+            params,
+        )
+        return cursor.fetchone()[0]
+
+
+def get_pending_unread_deltas(
+    profile_id: int, room_ids: Iterable[int] | None = None
+) -> dict[int, int]:
+    """
+    `{room_id: delta}` of the deltas of `profile_id` not folded yet, in ledger mode. Reads
+    add them to the stored counts instead of compacting.
+    """
+    if not uses_unread_ledger():
+        return {}
+    qs = UnreadMessageCountDelta.objects.filter(profile_id=profile_id)
+    if room_ids is not None:
+        qs = qs.filter(room_id__in=room_ids)
+    rows = qs.order_by().values("room_id").annotate(delta=Sum("delta"))
+    return {row["room_id"]: row["delta"] for row in rows if row["delta"]}
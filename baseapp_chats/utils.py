@@ -4,7 +4,7 @@ from typing import Any
 import swapper
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Model
+from django.db.models import Model, Q
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -168,23 +168,26 @@ def send_chatroom_update_system_messages(
             )
 
 
-def send_new_chat_message_notification(room, message, info) -> None:
+def send_new_chat_message_notification(room, message, info, participant_profile_ids=None) -> None:
     if service := shared_services.get("notifications"):
-        for participant in room.participants.all():
-            recipients = participant.profile.get_all_users()
-            for recipient in recipients:
-                service.send_notification(
-                    add_to_history=False,
-                    send_email=False,
-                    send_push=True,
-                    sender=message.profile,
-                    recipient=recipient,
-                    verb="CHATS.NEW_CHAT_MESSAGE",
-                    action_object=message,
-                    target=room,
-                    level="info",
-                    description=_("You got a new message"),
-                    notification_url=f"{settings.FRONT_URL}/chat?roomId={room.relay_id}",
-                    push_title=_("New message"),
-                    push_description=_("You got a new message"),
-                )
+        if participant_profile_ids is None:
+            participant_profile_ids = room.participants.values("profile_id")
+        recipients = User.objects.filter(
+            Q(profiles_owner__pk__in=participant_profile_ids)
+            | Q(profile_members__profile__pk__in=participant_profile_ids)
+        ).distinct()
+        service.send_bulk_notification(
+            add_to_history=False,
+            send_email=False,
+            send_push=True,
+            sender=message.profile,
+            recipients=recipients,
+            verb="CHATS.NEW_CHAT_MESSAGE",
+            action_object=message,
+            target=room,
+            level="info",
+            description=_("You got a new message"),
+            notification_url=f"{settings.FRONT_URL}/chat?roomId={room.relay_id}",
+            push_title=_("New message"),
+            push_description=_("You got a new message"),
+        )
@@ -9,7 +9,12 @@ class PackageConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
 
     def ready(self) -> None:
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
         from .pghelpers import apply_pghistory_tracks, apply_pgtrigger_tracks
+        from .query_budget import install_query_budget_execute_wrapper
+        from .user_cache import connect_signals
 
         # Apply all registered pghistory tracks
         apply_pghistory_tracks()
@@ -17,3 +22,13 @@ class PackageConfig(AppConfig):
         # Apply all registered pgtrigger domain triggers (chats, etc.).
         # Runs before makemigrations autodetection sees `_meta.triggers`.
         apply_pgtrigger_tracks()
+
+        # Drop cached authenticated users when they are saved or deleted
+        connect_signals()
+
+        # Count queries per GraphQL operation, see `baseapp_core.query_budget`
+        connection_created.connect(
+            install_query_budget_execute_wrapper, dispatch_uid="baseapp_core_query_budget"
+        )
+        for connection in connections.all(initialized_only=True):
+            install_query_budget_execute_wrapper(connection=connection)
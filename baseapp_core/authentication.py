@@ -18,17 +18,18 @@ def get_user_from_access_token(access_token: str | None) -> AbstractBaseUser | N
     clients reconnect — so it resolves to ``None`` and is logged at debug level rather
     than raised or logged as an exception.
     """
-    from rest_framework_simplejwt.authentication import JWTAuthentication
     from rest_framework_simplejwt.exceptions import (
         AuthenticationFailed,
         InvalidToken,
         TokenError,
     )
 
+    from baseapp_core.rest_framework.authentication import CachedJWTAuthentication
+
     if not access_token:
         return None
 
-    auth = JWTAuthentication()
+    auth = CachedJWTAuthentication()
     try:
         validated_token = auth.get_validated_token(access_token)
         return auth.get_user(validated_token)
@@ -37,6 +38,28 @@ def get_user_from_access_token(access_token: str | None) -> AbstractBaseUser | N
         return None
 
 
+def get_user_from_token(token: str | None) -> AbstractBaseUser | None:
+    """Return the user owning a DRF auth token, or ``None``.
+
+    Inactive users are returned as well, so callers can tell them apart from an unknown
+    token.
+    """
+    from rest_framework.authtoken.models import Token
+
+    from baseapp_core.user_cache import user_cache
+
+    if not token:
+        return None
+
+    def load() -> AbstractBaseUser | None:
+        try:
+            return Token.objects.select_related("user").get(key=token).user
+        except Token.DoesNotExist:
+            return None
+
+    return user_cache.get_or_load(user_cache.token_key(token), load)
+
+
 def refresh_access_token(refresh_token: str | None) -> str | None:
     """Mint a new access token from a refresh token, or ``None`` if it is invalid."""
     from rest_framework_simplejwt.exceptions import TokenError
@@ -73,3 +96,4 @@ def authenticate_jwt(
 
 
 authenticate_jwt_async = database_sync_to_async(authenticate_jwt)
+get_user_from_token_async = database_sync_to_async(get_user_from_token)
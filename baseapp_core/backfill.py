@@ -1,34 +1,112 @@
-import itertools
 import logging
+import math
+import multiprocessing
+import time
 import uuid
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any
 
 from django.apps import apps as django_apps
 from django.contrib.contenttypes.models import ContentType
-from django.db import models, transaction
+from django.db import connection, connections, models, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
 
 from baseapp_core.utils import has_autoincrement_pk
 
 if TYPE_CHECKING:
     from django.apps.registry import Apps
 
-    from baseapp_core.models import DocumentId
+    from baseapp_core.models import DocumentId, DocumentIdBackfillChunk
 
 logger = logging.getLogger(__name__)
 
+METHOD_ORM = "orm"
+METHOD_SQL = "sql"
+
+
+@dataclass
+class BackfillStats:
+    """Progress of the backfill of a single model, used for throughput and ETA reports."""
+
+    label: str
+    total: int = 0
+    covered: int = 0
+    processed: int = 0
+    created: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Rows processed per second."""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """Seconds left, extrapolated from the share of the primary key range already covered."""
+        if self.covered <= 0 or self.elapsed <= 0:
+            return None
+        return self.elapsed * max(self.total - self.covered, 0) / self.covered
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.covered / self.total if self.total else 100.0
+
+    def __str__(self) -> str:
+        eta = "-" if self.eta is None else f"{self.eta:.0f}s"
+        return (
+            f"{self.label}: {self.percent:.1f}% — {self.processed} rows processed, "
+            f"{self.created} document IDs created, {self.rate:.0f} rows/s, ETA {eta}"
+        )
+
 
 class DocumentIdBackfiller:
-    """Handles backfilling of DocumentId entries for models with DocumentIdMixin."""
+    """
+    Handles backfilling of DocumentId entries for models with DocumentIdMixin.
+
+    Each model is walked with keyset pagination (`pk > cursor ORDER BY pk LIMIT batch_size`)
+    over one or more primary key range chunks:
+
+    - `method="orm"` (default) diffs every page against the existing DocumentId rows in
+      Python and `bulk_create`s the missing ones.
+    - `method="sql"` inserts every page with a single
+      `INSERT ... SELECT ... ON CONFLICT DO NOTHING` statement, no row ever reaches Python.
+    - `checkpoint=True` persists each chunk's cursor in `DocumentIdBackfillChunk`, so an
+      interrupted backfill resumes where it stopped.
+    - `workers > 1` processes the chunks of a model in parallel processes.
+    """
 
     def __init__(
         self,
         apps: "Apps | None" = None,
         batch_size: int = 1000,
         dry_run: bool = False,
+        method: str = METHOD_ORM,
+        checkpoint: bool = False,
+        workers: int = 1,
+        chunks_per_worker: int = 4,
+        report_interval: float = 10.0,
+        progress_callback: Callable[[BackfillStats], None] | None = None,
     ) -> None:
+        if method not in (METHOD_ORM, METHOD_SQL):
+            raise ValueError(f"Unknown backfill method: {method}")
+
         self.apps = apps or django_apps
         self.batch_size = batch_size
         self.dry_run = dry_run
+        self.method = method
+        # Progress is never persisted on dry runs, and the chunk table doesn't exist yet
+        # in the historical apps registry of a data migration.
+        self.checkpoint = checkpoint and not dry_run and self.apps is django_apps
+        self.workers = max(workers, 1) if self.apps is django_apps else 1
+        self.chunks_per_worker = chunks_per_worker
+        self.report_interval = report_interval
+        self.progress_callback = progress_callback
+        self.stats: list[BackfillStats] = []
+        self._started_at = time.monotonic()
+        self._last_report = 0.0
 
     def _get_document_id_model(self) -> type["DocumentId"]:
         """Get the DocumentId model from the apps registry."""
@@ -72,7 +150,6 @@ class DocumentIdBackfiller:
         if DocumentId is None:
             DocumentId = self._get_document_id_model()
 
-        pk_field = model._meta.pk
         app_label = model._meta.app_label
         model_name = model._meta.model_name
 
@@ -86,77 +163,323 @@ class DocumentIdBackfiller:
             return 0
 
         ct = ContentType.objects.get_for_model(model)
-        qs = model.objects.order_by(pk_field.name).values_list(pk_field.name, flat=True)
+        chunks = self.plan_chunks(model, ct)
+        stats = BackfillStats(
+            label=f"{app_label}.{model_name}",
+            total=sum(chunk.range_end - chunk.range_start + 1 for chunk in chunks),
+            covered=sum(chunk.covered for chunk in chunks),
+        )
+        self.stats.append(stats)
+        pending = [chunk for chunk in chunks if not chunk.is_completed]
+
+        started_at = self._started_at = time.monotonic()
+        if self.workers > 1 and len(pending) > 1:
+            self._backfill_chunks_in_processes(model, pending, stats, started_at)
+        else:
+            for chunk in pending:
+                self.backfill_chunk(model, chunk, DocumentId=DocumentId, stats=stats)
+
+        stats.elapsed = time.monotonic() - started_at
+        self._report(stats, force=True)
+
+        logger.info("Created %d DocumentId rows for %s.%s", stats.created, app_label, model_name)
+        return stats.created
+
+    def plan_chunks(
+        self, model: type[models.Model], ct: ContentType
+    ) -> list["DocumentIdBackfillChunk"]:
+        """
+        Split the primary key range of `model` into chunks.
+
+        With `checkpoint` enabled the chunks are persisted on the first run and the
+        existing ones are returned on later runs, plus a tail chunk for rows inserted
+        past the planned range in the meantime.
+        """
+        from baseapp_core.models import DocumentIdBackfillChunk
+
+        pk_name = model._meta.pk.name
+        bounds = model.objects.aggregate(low=Min(pk_name), high=Max(pk_name))
+        low, high = bounds["low"], bounds["high"]
+
+        existing = []
+        if self.checkpoint:
+            existing = list(
+                DocumentIdBackfillChunk.objects.filter(content_type=ct).order_by("range_start")
+            )
+            if existing:
+                low = existing[-1].range_end + 1
 
-        created_count = 0
-        batch_iter = iter(qs)
+        if low is None or high is None or low > high:
+            return existing
+
+        count = self.workers * self.chunks_per_worker if self.workers > 1 else 1
+        size = max(math.ceil((high - low + 1) / count), 1)
+        planned = [
+            DocumentIdBackfillChunk(
+                content_type=ct, range_start=start, range_end=min(start + size - 1, high)
+            )
+            for start in range(low, high + 1, size)
+        ]
+        if self.checkpoint:
+            DocumentIdBackfillChunk.objects.bulk_create(planned, ignore_conflicts=True)
+            return list(
+                DocumentIdBackfillChunk.objects.filter(content_type=ct).order_by("range_start")
+            )
+        return planned
+
+    def reset_progress(self, model: type[models.Model]) -> int:
+        """Drop the persisted chunks of `model`, so the next run starts from scratch."""
+        from baseapp_core.models import DocumentIdBackfillChunk
+
+        ct = ContentType.objects.get_for_model(model)
+        deleted, _ = DocumentIdBackfillChunk.objects.filter(content_type=ct).delete()
+        return deleted
+
+    def backfill_chunk(
+        self,
+        model: type[models.Model],
+        chunk: "DocumentIdBackfillChunk",
+        DocumentId: type["DocumentId"] | None = None,
+        stats: BackfillStats | None = None,
+    ) -> tuple[int, int]:
+        """
+        Walk `chunk` page by page from its cursor, returning `(processed, created)`.
+
+        The chunk cursor is saved after every page when `checkpoint` is enabled. A failing
+        page raises, leaving the cursor before it and the chunk incomplete.
+        """
+        if DocumentId is None:
+            DocumentId = self._get_document_id_model()
+
+        ct = ContentType.objects.get_for_model(model)
+        processed_total = created_total = 0
 
         while True:
-            batch = list(itertools.islice(batch_iter, self.batch_size))
-            if not batch:
+            if self.method == METHOD_SQL:
+                last_pk, processed, created = self._backfill_page_sql(model, ct, chunk, DocumentId)
+            else:
+                last_pk, processed, created = self._backfill_page_orm(model, ct, chunk, DocumentId)
+            if not processed:
                 break
 
-            # Find existing document IDs for this batch
-            existing_ids = set(
-                DocumentId.objects.filter(content_type=ct, object_id__in=batch).values_list(
-                    "object_id", flat=True
-                )
-            )
-            missing = [obj_id for obj_id in batch if obj_id not in existing_ids]
-
-            if missing:
-                # Verify that the instances still exist before creating document IDs
-                # (they could have been deleted between the values_list query and now)
-                verified_ids = set(
-                    model.objects.filter(pk__in=missing).values_list(pk_field.name, flat=True)
+            covered_before = chunk.covered
+            chunk.last_pk = last_pk
+            chunk.processed_count += processed
+            chunk.created_count += created
+            if self.checkpoint:
+                chunk.save(
+                    update_fields=["last_pk", "processed_count", "created_count", "modified"]
                 )
-                still_missing = [obj_id for obj_id in missing if obj_id in verified_ids]
 
-                if not still_missing:
-                    logger.info(
-                        "Skipped batch for %s.%s — all %d IDs no longer exist",
-                        app_label,
-                        model_name,
-                        len(missing),
-                    )
-                    continue
+            processed_total += processed
+            created_total += created
+            if stats is not None:
+                stats.processed += processed
+                stats.created += created
+                stats.covered += chunk.covered - covered_before
+                stats.elapsed = time.monotonic() - self._started_at
+                self._report(stats)
+
+        if stats is not None:
+            stats.covered += chunk.range_end - chunk.range_start + 1 - chunk.covered
+        chunk.completed_at = timezone.now()
+        if self.checkpoint:
+            chunk.save(update_fields=["completed_at", "modified"])
+        return processed_total, created_total
+
+    def _backfill_page_orm(
+        self,
+        model: type[models.Model],
+        ct: ContentType,
+        chunk: "DocumentIdBackfillChunk",
+        DocumentId: type["DocumentId"],
+    ) -> tuple[int | None, int, int]:
+        pk_field = model._meta.pk
+        app_label = model._meta.app_label
+        model_name = model._meta.model_name
 
-                to_create = [
-                    DocumentId(public_id=uuid.uuid4(), content_type=ct, object_id=obj_id)
-                    for obj_id in still_missing
-                ]
+        batch = list(
+            model.objects.filter(pk__gt=chunk.cursor, pk__lte=chunk.range_end)
+            .order_by(pk_field.name)
+            .values_list(pk_field.name, flat=True)[: self.batch_size]
+        )
+        if not batch:
+            return None, 0, 0
+
+        # Find existing document IDs for this batch
+        existing_ids = set(
+            DocumentId.objects.filter(content_type=ct, object_id__in=batch).values_list(
+                "object_id", flat=True
+            )
+        )
+        missing = [obj_id for obj_id in batch if obj_id not in existing_ids]
+        created_count = 0
 
-                if self.dry_run:
-                    logger.info(
-                        "[DRY RUN] Would create %d document IDs for %s.%s (batch)",
-                        len(to_create),
+        if missing:
+            to_create = [
+                DocumentId(public_id=uuid.uuid4(), content_type=ct, object_id=obj_id)
+                for obj_id in missing
+            ]
+
+            if self.dry_run:
+                logger.info(
+                    "[DRY RUN] Would create %d document IDs for %s.%s (batch)",
+                    len(to_create),
+                    app_label,
+                    model_name,
+                )
+            else:
+                try:
+                    # Skip instances deleted since the page was read, their delete
+                    # trigger already ran and would leave the new rows orphaned.
+                    with transaction.atomic():
+                        verified_ids = set(
+                            model.objects.filter(pk__in=missing).values_list(
+                                pk_field.name, flat=True
+                            )
+                        )
+                        to_create = [doc for doc in to_create if doc.object_id in verified_ids]
+                        DocumentId.objects.bulk_create(
+                            to_create, batch_size=self.batch_size, ignore_conflicts=True
+                        )
+                    created_count = len(to_create)
+                except Exception:
+                    # The cursor stays before this page and the chunk incomplete, so the
+                    # next run retries it
+                    logger.exception(
+                        "Failed creating batch for %s.%s after pk %s",
                         app_label,
                         model_name,
+                        chunk.cursor,
                     )
-                else:
-                    try:
-                        with transaction.atomic():
-                            DocumentId.objects.bulk_create(
-                                to_create, batch_size=self.batch_size, ignore_conflicts=True
-                            )
-                        created_count += len(to_create)
-                    except Exception:
-                        logger.exception(
-                            "Partial failure creating batch for %s.%s",
-                            app_label,
-                            model_name,
+                    raise
+
+        logger.debug(
+            "Processed batch of %d for %s.%s — missing %d",
+            len(batch),
+            app_label,
+            model_name,
+            len(missing),
+        )
+        return batch[-1], len(batch), created_count
+
+    def _backfill_page_sql(
+        self,
+        model: type[models.Model],
+        ct: ContentType,
+        chunk: "DocumentIdBackfillChunk",
+        DocumentId: type["DocumentId"],
+    ) -> tuple[int | None, int, int]:
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        pk = qn(model._meta.pk.column)
+        document_id_table = qn(DocumentId._meta.db_table)
+
+        # Locked rows can't be deleted until the insert commits, and rows deleted meanwhile
+        # are skipped, so no DocumentId outlives its row (its delete trigger already ran)
+        page_sql = f"""
+            SELECT {pk} AS object_id FROM {table}
+            WHERE {pk} > %s AND {pk} <= %s
+            ORDER BY {pk}
+            LIMIT %s
+            {"" if self.dry_run else "FOR KEY SHARE"}
+        """
+        if self.dry_run:
+            sql = f"""
+                WITH page AS ({page_sql})
+                SELECT
+                    MAX(page.object_id),
+                    COUNT(*),
+                    COUNT(*) FILTER (
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM {document_id_table} AS document_id
+                            WHERE document_id.content_type_id = %s
+                            AND document_id.object_id = page.object_id
                         )
+                    )
+                FROM page
+            """
+        else:
+            sql = f"""
+                WITH page AS ({page_sql}),
+                inserted AS (
+                    INSERT INTO {document_id_table}
+                        (public_id, content_type_id, object_id, created, modified)
+                    SELECT gen_random_uuid(), %s, page.object_id, NOW(), NOW() FROM page
+                    ON CONFLICT (content_type_id, object_id) DO NOTHING
+                    RETURNING 1
+                )
+                SELECT
+                    (SELECT MAX(object_id) FROM page),
+                    (SELECT COUNT(*) FROM page),
+                    (SELECT COUNT(*) FROM inserted)
+            """
 
-            logger.debug(
-                "Processed batch of %d for %s.%s — missing %d",
-                len(batch),
-                app_label,
-                model_name,
-                len(missing),
-            )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [chunk.cursor, chunk.range_end, self.batch_size, ct.pk])
+            last_pk, processed, created = cursor.fetchone()
+
+        if self.dry_run:
+            if created:
+                logger.info(
+                    "[DRY RUN] Would create %d document IDs for %s.%s (batch)",
+                    created,
+                    model._meta.app_label,
+                    model._meta.model_name,
+                )
+            created = 0
+        return last_pk, processed, created
 
-        logger.info("Created %d DocumentId rows for %s.%s", created_count, app_label, model_name)
-        return created_count
+    def _backfill_chunks_in_processes(
+        self,
+        model: type[models.Model],
+        chunks: list["DocumentIdBackfillChunk"],
+        stats: BackfillStats,
+        started_at: float,
+    ) -> None:
+        options = {
+            "batch_size": self.batch_size,
+            "dry_run": self.dry_run,
+            "method": self.method,
+            "checkpoint": self.checkpoint,
+        }
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(chunks)),
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _backfill_chunk_worker,
+                    model._meta.app_label,
+                    model._meta.model_name,
+                    chunk,
+                    options,
+                ): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    processed, created = future.result()
+                except Exception:
+                    logger.exception("Failed to backfill %s chunk %s", stats.label, chunk)
+                    continue
+                stats.processed += processed
+                stats.created += created
+                stats.covered += chunk.range_end - chunk.range_start + 1 - chunk.covered
+                stats.elapsed = time.monotonic() - started_at
+                self._report(stats, force=True)
+
+    def _report(self, stats: BackfillStats, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_report < self.report_interval:
+            return
+        self._last_report = now
+        logger.info("%s", stats)
+        if self.progress_callback is not None:
+            self.progress_callback(stats)
 
     def backfill_all_models(self, apps_filter: list[str] | None = None) -> int:
         """Backfill DocumentId entries for all models with DocumentIdMixin."""
@@ -260,6 +583,51 @@ class DocumentIdBackfiller:
             return False
 
 
+def _backfill_chunk_worker(
+    app_label: str,
+    model_name: str,
+    chunk: "DocumentIdBackfillChunk",
+    options: dict[str, Any],
+) -> tuple[int, int]:
+    """Entry point of the backfill worker processes."""
+    model = django_apps.get_model(app_label, model_name)
+    try:
+        return DocumentIdBackfiller(**options).backfill_chunk(model, chunk)
+    finally:
+        connections.close_all()
+
+
+def get_backfill_progress(model: type[models.Model]) -> BackfillStats | None:
+    """
+    Build the throughput/ETA report of a checkpointed backfill from its persisted chunks,
+    e.g. to follow chunks processed by `backfill_document_id_chunk` Celery tasks.
+    """
+    from baseapp_core.models import DocumentIdBackfillChunk
+
+    chunks = list(
+        DocumentIdBackfillChunk.objects.filter(
+            content_type=ContentType.objects.get_for_model(model)
+        )
+    )
+    if not chunks:
+        return None
+
+    started = [chunk for chunk in chunks if chunk.processed_count or chunk.is_completed]
+    elapsed = 0.0
+    if started:
+        first = min(chunk.created for chunk in chunks)
+        last = max(chunk.modified for chunk in started)
+        elapsed = (last - first).total_seconds()
+    return BackfillStats(
+        label=f"{model._meta.app_label}.{model._meta.model_name}",
+        total=sum(chunk.range_end - chunk.range_start + 1 for chunk in chunks),
+        covered=sum(chunk.covered for chunk in chunks),
+        processed=sum(chunk.processed_count for chunk in chunks),
+        created=sum(chunk.created_count for chunk in chunks),
+        elapsed=elapsed,
+    )
+
+
 def get_models_with_document_id_mixin(apps: "Apps | None" = None) -> list[type[models.Model]]:
     """Get all concrete models that inherit from DocumentIdMixin and have integer PKs."""
     backfiller = DocumentIdBackfiller(apps=apps)
@@ -1,31 +1,17 @@
-from typing import TYPE_CHECKING, Any
+from typing import Any
 
-from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
 
-from baseapp_core.authentication import authenticate_jwt_async
-
-if TYPE_CHECKING:
-    from rest_framework.authtoken.models import Token
+from baseapp_core.authentication import (
+    authenticate_jwt_async,
+    get_user_from_token_async,
+)
 
 # WS auth subprotocols arrive as adjacent key/value pairs; these are the recognized keys,
 # used to tell a key apart from a value when a key is sent without one.
 SUBPROTOCOL_KEYS = ("Authorization", "Refresh")
 
 
-@database_sync_to_async
-def get_token_from_db(token_str) -> "Token | None":
-    if not token_str:
-        return None
-
-    from rest_framework.authtoken.models import Token
-
-    try:
-        return Token.objects.select_related("user").get(key=token_str)
-    except Token.DoesNotExist:
-        return None
-
-
 class TokenAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send) -> Any:
         if "Authorization" not in scope["subprotocols"]:
@@ -37,11 +23,11 @@ class TokenAuthMiddleware(BaseMiddleware):
         except IndexError:
             token_str = ""
 
-        token = await get_token_from_db(token_str)
-        if token:
-            scope["user"] = token.user
+        user = await get_user_from_token_async(token_str)
+        if user:
+            scope["user"] = user
 
-        if token and not token.user.is_active:
+        if user and not user.is_active:
             raise ValueError("User inactive or deleted")
 
         return await super().__call__(scope, receive, send)
@@ -0,0 +1,226 @@
+import logging
+import select
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Channel used by the `notify_document_id_deleted` trigger on `DocumentId`.
+NOTIFY_CHANNEL = "baseapp_document_id_deleted"
+
+CACHE_KEY_PREFIX = "baseapp:document_id:"
+# Shared tier entries are keyed under this namespace, replaced to drop all of them at once.
+NAMESPACE_KEY = CACHE_KEY_PREFIX + "namespace"
+
+
+def _get_setting(name: str, default: Any) -> Any:
+    return getattr(settings, f"BASEAPP_CORE_DOCUMENT_ID_CACHE_{name}", default)
+
+
+class DocumentIdMappingCache:
+    """
+    Two-tier cache for the immutable `public_id -> (content_type_id, object_id)` mapping.
+
+    - A bounded, process-local LRU (`BASEAPP_CORE_DOCUMENT_ID_CACHE_SIZE` entries, `0`
+      disables the whole cache).
+    - An optional shared Django cache (`BASEAPP_CORE_DOCUMENT_ID_CACHE_ALIAS`), kept for
+      `BASEAPP_CORE_DOCUMENT_ID_CACHE_TIMEOUT` seconds.
+
+    A mapping only becomes invalid when its `DocumentId` row is deleted. The
+    `notify_document_id_deleted` trigger publishes the public id on the
+    `baseapp_document_id_deleted` channel, and `DocumentIdCacheListener` evicts it.
+    Misses are never cached. Shared entries are keyed under a namespace stored in the
+    shared cache, so `clear(shared=True)` drops all of them at once.
+    """
+
+    def __init__(
+        self,
+        maxsize: int | None = None,
+        cache_alias: str | None = None,
+        timeout: int | None = None,
+    ) -> None:
+        self.maxsize = _get_setting("SIZE", 0) if maxsize is None else maxsize
+        self.cache_alias = _get_setting("ALIAS", None) if cache_alias is None else cache_alias
+        self.timeout = _get_setting("TIMEOUT", 60 * 60) if timeout is None else timeout
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[int, int]] = OrderedDict()
+        self._namespace: str | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    @property
+    def shared_cache(self) -> Any:
+        if not self.cache_alias:
+            return None
+        try:
+            return caches[self.cache_alias]
+        except InvalidCacheBackendError:
+            logger.warning("DocumentId cache alias %r is not configured", self.cache_alias)
+            return None
+
+    def get(self, public_id: Any) -> tuple[int, int] | None:
+        if not self.enabled or (key := _normalize_key(public_id)) is None:
+            return None
+
+        with self._lock:
+            if (mapping := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                return mapping
+
+        if (cache := self.shared_cache) is not None:
+            if (mapping := cache.get(self._shared_key(cache, key))) is not None:
+                mapping = tuple(mapping)
+                self._set_local(key, mapping)
+                return mapping
+        return None
+
+    def set(self, public_id: Any, content_type_id: int, object_id: int) -> None:
+        if not self.enabled or (key := _normalize_key(public_id)) is None:
+            return
+        mapping = (content_type_id, object_id)
+        self._set_local(key, mapping)
+        if (cache := self.shared_cache) is not None:
+            cache.set(self._shared_key(cache, key), mapping, timeout=self.timeout)
+
+    def invalidate(self, public_id: Any) -> None:
+        if (key := _normalize_key(public_id)) is None:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+        if (cache := self.shared_cache) is not None:
+            cache.delete(self._shared_key(cache, key))
+
+    def clear(self, shared: bool = False) -> None:
+        """
+        Clear the local tier, and with `shared` the shared tier of every process too, by
+        moving it to a new namespace.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._namespace = None
+        if shared and (cache := self.shared_cache) is not None:
+            cache.set(NAMESPACE_KEY, uuid.uuid4().hex, timeout=None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _shared_key(self, cache: Any, key: str) -> str:
+        # Read once per process and local clear; an evicted namespace is never reused
+        if self._namespace is None:
+            cache.add(NAMESPACE_KEY, uuid.uuid4().hex, timeout=None)
+            self._namespace = cache.get(NAMESPACE_KEY)
+        return f"{CACHE_KEY_PREFIX}{self._namespace}:{key}"
+
+    def _set_local(self, key: str, mapping: tuple[int, int]) -> None:
+        with self._lock:
+            self._entries[key] = mapping
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class DocumentIdCacheListener(threading.Thread):
+    """
+    Daemon thread that `LISTEN`s on `baseapp_document_id_deleted` through a dedicated
+    database connection and evicts the deleted public ids from `mapping_cache`.
+
+    The whole local tier is cleared when the connection drops, since notifications sent
+    while disconnected are lost. Once reconnected, the shared tier is cleared as well:
+    every listener may have been disconnected (e.g. the database restarted), so no one
+    evicted the public ids deleted meanwhile.
+    """
+
+    poll_timeout = 5
+    reconnect_delay = 5
+
+    def __init__(self, mapping_cache: DocumentIdMappingCache, using: str = "default") -> None:
+        super().__init__(name="document-id-cache-listener", daemon=True)
+        self.mapping_cache = mapping_cache
+        self.using = using
+        self._stop_event = threading.Event()
+        self._has_listened = False
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("DocumentId cache listener failed, reconnecting")
+            self.mapping_cache.clear()
+            self._stop_event.wait(self.reconnect_delay)
+
+    def _listen(self) -> None:
+        wrapper = connections[self.using]
+        conn = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL};")
+            # Anything cached before LISTEN was active may have missed its notification.
+            self.mapping_cache.clear(shared=self._has_listened)
+            self._has_listened = True
+
+            while not self._stop_event.is_set():
+                if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self.mapping_cache.invalidate(notify.payload)
+        finally:
+            conn.close()
+
+
+mapping_cache = DocumentIdMappingCache()
+
+_listener: DocumentIdCacheListener | None = None
+_listener_lock = threading.Lock()
+
+
+def start_document_id_cache_listener() -> DocumentIdCacheListener | None:
+    """
+    Start the invalidation listener once per process.
+
+    Called lazily on the first cache lookup when `BASEAPP_CORE_DOCUMENT_ID_CACHE_LISTENER`
+    is enabled (the default), so management commands that never resolve public ids don't
+    open the extra connection.
+    """
+    global _listener
+
+    if not mapping_cache.enabled or not _get_setting("LISTENER", True):
+        return None
+
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = DocumentIdCacheListener(mapping_cache)
+            _listener.start()
+    return _listener
+
+
+def get_cached_mapping(public_id: Any) -> tuple[int, int] | None:
+    if not mapping_cache.enabled:
+        return None
+    start_document_id_cache_listener()
+    return mapping_cache.get(public_id)
+
+
+def cache_mapping(public_id: Any, content_type_id: int, object_id: int) -> None:
+    mapping_cache.set(public_id, content_type_id, object_id)
+
+
+def _normalize_key(public_id: Any) -> str | None:
+    try:
+        return str(public_id if isinstance(public_id, uuid.UUID) else uuid.UUID(str(public_id)))
+    except (ValueError, TypeError, AttributeError):
+        return None
@@ -3,6 +3,9 @@ from typing import Any
 import graphene
 from graphql import GraphQLResolveInfo
 
+from baseapp_core.loaders import get_document_id_loader
+from baseapp_core.models import DocumentIdMixin
+
 
 class CountedConnection(graphene.Connection):
     class Meta:
@@ -11,6 +14,17 @@ class CountedConnection(graphene.Connection):
     total_count = graphene.Int()
     edge_count = graphene.Int()
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Queue the public id lookups of the whole page, so the first node resolving its
+        # `id` loads them all with a single query.
+        if (loader := get_document_id_loader()) and self.edges:
+            loader.prime_objects(
+                edge.node
+                for edge in self.edges
+                if isinstance(getattr(edge, "node", None), DocumentIdMixin)
+            )
+
     def resolve_total_count(self, info: GraphQLResolveInfo, **kwargs: Any) -> int:
         return self.length
 
@@ -1,39 +1,117 @@
-import asyncio
-import contextvars
-import functools
-import sys
-from typing import Any
-
 import channels_graphql_ws
 import swapper
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from graphene_django.settings import graphene_settings
-from rest_framework.authtoken.models import Token
+from graphql import GraphQLError, get_operation_ast
 
-from baseapp_core.authentication import authenticate_jwt_async
+from baseapp_core.authentication import (
+    authenticate_jwt_async,
+    get_user_from_token_async,
+)
 from baseapp_core.graphql import get_pk_from_relay_id
-
-python_version = sys.version_info
+from baseapp_core.graphql.executors import ResolverExecutorMiddleware
+from baseapp_core.graphql.persisted_queries import (
+    document_cache,
+    resolve_persisted_query,
+)
+from baseapp_core.graphql.query_cost import (
+    analyze_query_cost,
+    check_query_cost,
+    get_client_key,
+    get_query_cost_rate_limit,
+)
+from baseapp_core.graphql.subscription_groups import SubscriptionGroupsConsumerMixin
+from baseapp_core.query_budget import track_queries
 
 Profile = swapper.load_model("baseapp_profiles", "Profile")
 
 
-async def threadpool_for_sync_resolvers(next_middleware, root, info, *args, **kwds) -> Any:
-    if asyncio.iscoroutinefunction(next_middleware):
-        result = await next_middleware(root, info, *args, **kwds)
-    else:
-        if python_version >= (3, 9):
-            result = await asyncio.to_thread(next_middleware, root, info, *args, **kwds)
-        else:
-            loop = asyncio.get_running_loop()
-            ctx = contextvars.copy_context()
-            func_call = functools.partial(ctx.run, next_middleware, *args, **kwds)
-            result = await loop.run_in_executor(None, func_call)
-    return result
-
-
-class GraphqlWsAuthenticatedConsumer(channels_graphql_ws.GraphqlWsConsumer):
+# Shared by the consumers below. Declare a `ResolverExecutorMiddleware` instance on a consumer
+# to give it a dedicated, differently sized pool.
+threadpool_for_sync_resolvers = ResolverExecutorMiddleware()
+
+
+class PersistedQueryConsumerMixin:
+    """
+    Resolves Apollo APQ persisted queries and shares the parsed-document LRU with
+    `baseapp_core.graphql.views.GraphQLView`, instead of the per-connection `lru_cache`
+    of `GraphqlWsConsumer`.
+    """
+
+    async def _on_gql_start(self, op_id, payload) -> None:
+        if payload.get("extensions"):
+            try:
+                query, _ = await database_sync_to_async(resolve_persisted_query)(
+                    payload.get("query"), payload["extensions"]
+                )
+            except GraphQLError as e:
+                await self._send_gql_data(op_id, None, [e])
+                await self._send_gql_complete(op_id)
+                return
+            payload = {**payload, "query": query}
+        await super()._on_gql_start(op_id, payload)
+
+    def _on_gql_start__parse_query_sync_cached(self, op_name, query) -> tuple:
+        document, errors = document_cache.get_document(self.schema.graphql_schema, query)
+        if errors:
+            return None, None, errors
+        return document, get_operation_ast(document, op_name), None
+
+
+class QueryCostConsumerMixin:
+    """
+    Rejects operations above the `baseapp_core.graphql.query_cost` budgets, same as
+    `baseapp_core.graphql.views.GraphQLView`.
+    """
+
+    async def _on_gql_start(self, op_id, payload) -> None:
+        errors = await database_sync_to_async(self._check_query_cost)(payload)
+        if errors:
+            await self._send_gql_data(op_id, None, errors)
+            await self._send_gql_complete(op_id)
+            return
+        await super()._on_gql_start(op_id, payload)
+
+    def _check_query_cost(self, payload) -> list[GraphQLError]:
+        if not payload.get("query"):
+            return []
+        schema = self.schema.graphql_schema
+        document, errors = document_cache.get_document(schema, payload["query"])
+        operation = get_operation_ast(document, payload.get("operationName")) if document else None
+        if errors or operation is None:
+            # Reported by `GraphqlWsConsumer` itself
+            return []
+
+        variables = payload.get("variables")
+        cost = analyze_query_cost(
+            schema, document, operation, variables if isinstance(variables, dict) else None
+        )
+        client_key = None
+        if get_query_cost_rate_limit() is not None:
+            client = self.scope.get("client")
+            client_key = get_client_key(self.scope.get("user"), client[0] if client else None)
+        return check_query_cost(cost, client_key)
+
+
+class QueryBudgetConsumerMixin:
+    """
+    Tracks the queries of each operation with `baseapp_core.query_budget`, logging the
+    ones over budget or with N+1 patterns, same as `baseapp_core.graphql.views.GraphQLView`.
+    """
+
+    async def _on_gql_start(self, op_id, payload) -> None:
+        with track_queries(payload.get("operationName")):
+            await super()._on_gql_start(op_id, payload)
+
+
+class GraphqlWsAuthenticatedConsumer(
+    PersistedQueryConsumerMixin,
+    QueryCostConsumerMixin,
+    QueryBudgetConsumerMixin,
+    SubscriptionGroupsConsumerMixin,
+    channels_graphql_ws.GraphqlWsConsumer,
+):
     middleware = [threadpool_for_sync_resolvers]
 
     schema = graphene_settings.SCHEMA
@@ -47,17 +125,10 @@ class GraphqlWsAuthenticatedConsumer(channels_graphql_ws.GraphqlWsConsumer):
             self.scope["user"] = AnonymousUser()
             return
 
-        token = await database_sync_to_async(
-            Token.objects.select_related("user").filter(key=payload["Authorization"]).first
-        )()
-
-        try:
-            user = token.user
-        except AttributeError:
-            user = None
+        user = await get_user_from_token_async(payload["Authorization"])
 
         if user and user.is_active:
-            self.scope["user"] = token.user
+            self.scope["user"] = user
             if "Current-Profile" in payload:
                 pk = await database_sync_to_async(get_pk_from_relay_id)(payload["Current-Profile"])
                 if pk:
@@ -65,13 +136,19 @@ class GraphqlWsAuthenticatedConsumer(channels_graphql_ws.GraphqlWsConsumer):
                     if profile and await database_sync_to_async(user.has_perm)(
                         f"{profile._meta.app_label}.use_profile", profile
                     ):
-                        token.user.current_profile = profile
+                        user.current_profile = profile
         else:
             self.scope["user"] = AnonymousUser()
             return
 
 
-class GraphqlWsJWTAuthenticatedConsumer(channels_graphql_ws.GraphqlWsConsumer):
+class GraphqlWsJWTAuthenticatedConsumer(
+    PersistedQueryConsumerMixin,
+    QueryCostConsumerMixin,
+    QueryBudgetConsumerMixin,
+    SubscriptionGroupsConsumerMixin,
+    channels_graphql_ws.GraphqlWsConsumer,
+):
     middleware = [threadpool_for_sync_resolvers]
 
     schema = graphene_settings.SCHEMA
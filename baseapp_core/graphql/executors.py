@@ -0,0 +1,250 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any
+
+import graphene
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import close_old_connections, models
+from graphene.types.resolver import attr_resolver, dict_or_attr_resolver, dict_resolver
+from graphql import GraphQLResolveInfo, default_field_resolver
+
+from baseapp_core.hashids.strategies.flags import public_id_logic_snapshot
+from baseapp_core.loaders import document_id_loader_scope
+
+logger = logging.getLogger(__name__)
+
+INLINE = "inline"
+THREADED = "threaded"
+
+RESOLVER_MODE_ATTR = "_baseapp_resolver_mode"
+
+DEFAULT_RESOLVERS = (dict_or_attr_resolver, attr_resolver, dict_resolver)
+
+
+def _get_setting(name: str, default: Any) -> Any:
+    return getattr(settings, f"BASEAPP_CORE_GRAPHQL_WS_{name}", default)
+
+
+def inline_resolver(func: Callable) -> Callable:
+    """Mark a sync resolver as safe to run on the event loop (no I/O, no database)."""
+    setattr(func, RESOLVER_MODE_ATTR, INLINE)
+    return func
+
+
+def threaded_resolver(func: Callable) -> Callable:
+    """Mark a sync resolver as blocking, so it always runs in the resolver thread pool."""
+    setattr(func, RESOLVER_MODE_ATTR, THREADED)
+    return func
+
+
+def _get_resolver_mode(resolve: Callable | None) -> tuple[str | None, str | None]:
+    """
+    Return `(mode, attname)` for a field resolver: the explicit mode of a decorated
+    resolver, or `(None, attname)` for the default attribute resolvers, whose mode
+    depends on the object being resolved. Anything else is `THREADED`.
+    """
+    if resolve is None:
+        return None, None
+
+    func = resolve.func if isinstance(resolve, functools.partial) else resolve
+    if (mode := getattr(func, RESOLVER_MODE_ATTR, None)) is not None:
+        return mode, None
+    if func is default_field_resolver:
+        return None, None
+    if func in DEFAULT_RESOLVERS and isinstance(resolve, functools.partial) and resolve.args:
+        return None, resolve.args[0]
+    return THREADED, None
+
+
+def _is_loaded_model_field(instance: models.Model, attname: str) -> bool:
+    try:
+        field = instance._meta.pk if attname == "pk" else instance._meta.get_field(attname)
+    except FieldDoesNotExist:
+        return False
+    # Relations and deferred fields would query the database when accessed
+    return field.concrete and not field.is_relation and field.attname in instance.__dict__
+
+
+class ResolverClassifier:
+    """
+    Decides whether a sync resolver runs inline on the event loop or in the thread pool.
+
+    Resolvers decorated with `inline_resolver` / `threaded_resolver` follow the
+    decorator. Graphene's default attribute resolvers run inline when reading from a
+    `dict`, a graphene `ObjectType` instance (connections, edges, page info, payloads) or
+    an already loaded, non-relational model field. Every other resolver may touch the
+    database and is threaded. The per-field part of the decision is cached.
+    """
+
+    def __init__(self) -> None:
+        self._modes: dict[tuple[int, str, str], tuple[str | None, str | None]] = {}
+
+    def classify(self, root: Any, info: GraphQLResolveInfo) -> str:
+        key = (id(info.schema), info.parent_type.name, info.field_name)
+        if (cached := self._modes.get(key)) is None:
+            field = info.parent_type.fields.get(info.field_name)
+            cached = self._modes[key] = _get_resolver_mode(field.resolve if field else None)
+
+        mode, attname = cached
+        if mode is not None:
+            return mode
+        if isinstance(root, (dict, graphene.ObjectType)):
+            return INLINE
+        if isinstance(root, models.Model):
+            return INLINE if _is_loaded_model_field(root, attname or info.field_name) else THREADED
+        return THREADED
+
+
+@dataclass
+class ResolverExecutorStats:
+    """
+    Counters of a `ResolverExecutor`. `queue_wait_*` are the seconds resolvers waited for
+    a free thread, which grows when the pool is saturated.
+    """
+
+    max_workers: int = 0
+    inline: int = 0
+    threaded: int = 0
+    queued: int = 0
+    running: int = 0
+    queue_wait_total: float = 0.0
+    queue_wait_max: float = 0.0
+
+    @property
+    def queue_wait_avg(self) -> float:
+        return self.queue_wait_total / self.threaded if self.threaded else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {**asdict(self), "queue_wait_avg": self.queue_wait_avg}
+
+
+class ResolverExecutor:
+    """
+    Bounded thread pool for blocking resolvers.
+
+    `max_workers` defaults to `BASEAPP_CORE_GRAPHQL_WS_RESOLVER_WORKERS` (or the
+    `ThreadPoolExecutor` default). Resolvers waiting longer than
+    `BASEAPP_CORE_GRAPHQL_WS_RESOLVER_QUEUE_WAIT_WARNING` seconds for a thread are logged.
+    """
+
+    def __init__(self, max_workers: int | None = None, thread_name_prefix: str = "") -> None:
+        self._max_workers = max_workers
+        self._thread_name_prefix = thread_name_prefix or "graphql-resolver"
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._stats = ResolverExecutorStats()
+
+    @property
+    def max_workers(self) -> int:
+        if self._max_workers is not None:
+            return self._max_workers
+        return _get_setting("RESOLVER_WORKERS", None) or min(32, (os.cpu_count() or 1) + 4)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Created lazily, so it's not inherited by forked processes
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._stats.max_workers = self.max_workers
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix=self._thread_name_prefix,
+                    )
+        return self._executor
+
+    async def run(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run `func` in the pool, with a copy of the current context vars."""
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._stats.queued += 1
+        return await loop.run_in_executor(
+            self.executor, ctx.run, self._call, submitted_at, func, args, kwargs
+        )
+
+    def record_inline(self) -> None:
+        with self._lock:
+            self._stats.inline += 1
+
+    def stats(self) -> ResolverExecutorStats:
+        with self._lock:
+            return ResolverExecutorStats(**asdict(self._stats))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _call(self, submitted_at: float, func: Callable, args: tuple, kwargs: dict) -> Any:
+        queue_wait = time.monotonic() - submitted_at
+        with self._lock:
+            stats = self._stats
+            stats.queued -= 1
+            stats.running += 1
+            stats.threaded += 1
+            stats.queue_wait_total += queue_wait
+            stats.queue_wait_max = max(stats.queue_wait_max, queue_wait)
+
+        threshold = _get_setting("RESOLVER_QUEUE_WAIT_WARNING", None)
+        if threshold is not None and queue_wait > threshold:
+            logger.warning(
+                "GraphQL resolver waited %.3fs for a thread (%d workers)",
+                queue_wait,
+                self.max_workers,
+            )
+
+        # Same as `database_sync_to_async`, drop connections that outlived CONN_MAX_AGE
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._stats.running -= 1
+
+
+class ResolverExecutorMiddleware:
+    """
+    GraphQL middleware of the websocket consumers, running sync resolvers off the event
+    loop only when they may block.
+
+    Each instance owns its `ResolverExecutor`, so a consumer gets a dedicated pool by
+    declaring its own instance::
+
+        class ReportsConsumer(GraphqlWsJWTAuthenticatedConsumer):
+            middleware = [ResolverExecutorMiddleware(max_workers=4)]
+    """
+
+    def __init__(self, max_workers: int | None = None, thread_name_prefix: str = "") -> None:
+        self.executor = ResolverExecutor(max_workers, thread_name_prefix)
+        self.classifier = ResolverClassifier()
+
+    async def resolve(self, next_middleware, root, info, *args, **kwargs) -> Any:
+        # The loader and the public id flag snapshot are memoised on the operation
+        # context; the context vars set here are copied into the worker thread.
+        with document_id_loader_scope(info.context), public_id_logic_snapshot(info.context):
+            if asyncio.iscoroutinefunction(next_middleware):
+                return await next_middleware(root, info, *args, **kwargs)
+
+            if self.classifier.classify(root, info) == INLINE:
+                self.executor.record_inline()
+                result = next_middleware(root, info, *args, **kwargs)
+            else:
+                result = await self.executor.run(next_middleware, root, info, *args, **kwargs)
+
+            if inspect.isawaitable(result):
+                result = await result
+            return result
@@ -1,12 +1,21 @@
 import logging
 import traceback
+from collections.abc import Iterable
 from typing import Any
 
-from rest_framework.authentication import TokenAuthentication as RestTokenAuthentication
-from rest_framework_simplejwt.authentication import (
-    JWTAuthentication as RestJWTAuthentication,
+from graphql.execution.middleware import MiddlewareManager
+from rest_framework.exceptions import APIException
+
+from baseapp_core.rest_framework.authentication import (
+    CachedJWTAuthentication,
+    CachedTokenAuthentication,
 )
 
+# The authentication middleware classes that ran on the operation context, so each runs
+# once per request or operation no matter how many resolvers run, or how many times the
+# middleware is instantiated.
+AUTHENTICATED_ATTR = "_baseapp_authenticated"
+
 
 class LogExceptionMiddleware(object):
     def on_error(self, error) -> None:
@@ -32,29 +41,46 @@ class LogExceptionMiddleware(object):
         return response
 
 
-class TokenAuthentication(RestTokenAuthentication):
-    authenticated = False
+class AuthenticationMiddlewareMixin:
+    def authenticate_context(self, context) -> None:
+        authenticated = getattr(context, AUTHENTICATED_ATTR, None)
+        if authenticated is None:
+            authenticated = set()
+            setattr(context, AUTHENTICATED_ATTR, authenticated)
+        # Keyed per class, so the Token and JWT middlewares both get their turn
+        if type(self) in authenticated:
+            return
+        auth = self.authenticate(context)
+        if auth:
+            user = auth[0]
+            if user and user.is_authenticated:
+                context.user = user
+        authenticated.add(type(self))
 
     def resolve(self, next, root, info, **kwargs) -> Any:
-        if not self.authenticated:
-            auth = self.authenticate(info.context)
-            if auth:
-                user = auth[0]
-                if user and user.is_authenticated:
-                    info.context.user = user
-            self.authenticated = True
+        self.authenticate_context(info.context)
         return next(root, info, **kwargs)
 
 
-class JWTAuthentication(RestJWTAuthentication):
-    authenticated = False
+def authenticate_context(context, middleware: Iterable | MiddlewareManager | None) -> None:
+    """
+    Run the authentication middlewares of `middleware` on `context` before executing the
+    operation, so its user is known ahead of the resolvers. Authentication failures are
+    left to the middlewares to report once the operation executes.
+    """
+    if isinstance(middleware, MiddlewareManager):
+        middleware = middleware.middlewares
+    for instance in middleware or ():
+        if isinstance(instance, AuthenticationMiddlewareMixin):
+            try:
+                instance.authenticate_context(context)
+            except APIException:
+                return
 
-    def resolve(self, next, root, info, **kwargs) -> Any:
-        if not self.authenticated:
-            auth = self.authenticate(info.context)
-            if auth:
-                user = auth[0]
-                if user and user.is_authenticated:
-                    info.context.user = user
-            self.authenticated = True
-        return next(root, info, **kwargs)
+
+class TokenAuthentication(AuthenticationMiddlewareMixin, CachedTokenAuthentication):
+    pass
+
+
+class JWTAuthentication(AuthenticationMiddlewareMixin, CachedJWTAuthentication):
+    pass
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Collection
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+from graphene_django.settings import graphene_settings
+from graphql import (
+    ASTValidationRule,
+    DocumentNode,
+    GraphQLError,
+    GraphQLSchema,
+    parse,
+    validate,
+)
+
+# Apollo APQ request extension: `{"persistedQuery": {"version": 1, "sha256Hash": "..."}}`
+PERSISTED_QUERY_EXTENSION = "persistedQuery"
+PERSISTED_QUERY_VERSION = 1
+
+CACHE_KEY_PREFIX = "baseapp:graphql:persisted_query:"
+
+
+def _get_setting(name: str, default: Any) -> Any:
+    return getattr(settings, f"BASEAPP_CORE_GRAPHQL_{name}", default)
+
+
+class PersistedQueryNotFound(GraphQLError):
+    """Sent when only a hash is received and it is not registered yet, the client then
+    retries with the full query (Apollo APQ protocol)."""
+
+    def __init__(self) -> None:
+        super().__init__("PersistedQueryNotFound", extensions={"code": "PERSISTED_QUERY_NOT_FOUND"})
+
+
+class PersistedQueryNotSupported(GraphQLError):
+    def __init__(self) -> None:
+        super().__init__(
+            "PersistedQueryNotSupported", extensions={"code": "PERSISTED_QUERY_NOT_SUPPORTED"}
+        )
+
+
+class PersistedQueryInvalid(GraphQLError):
+    def __init__(self, message: str) -> None:
+        super().__init__(message, extensions={"code": "BAD_USER_INPUT"})
+
+
+def get_query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+class PersistedQueryRegistry:
+    """
+    `sha256 hash -> query` registry backed by the Django cache.
+
+    - `BASEAPP_CORE_GRAPHQL_PERSISTED_QUERIES`: enables the registry (default `True`).
+    - `BASEAPP_CORE_GRAPHQL_PERSISTED_QUERIES_CACHE_ALIAS`: cache alias (default `"default"`).
+    - `BASEAPP_CORE_GRAPHQL_PERSISTED_QUERIES_TIMEOUT`: seconds a registered query is kept
+      (default one day). Clients re-register expired hashes transparently.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        return _get_setting("PERSISTED_QUERIES", True)
+
+    @property
+    def cache(self) -> Any:
+        return caches[_get_setting("PERSISTED_QUERIES_CACHE_ALIAS", "default")]
+
+    def get(self, query_hash: str) -> str | None:
+        return self.cache.get(CACHE_KEY_PREFIX + query_hash)
+
+    def register(self, query_hash: str, query: str) -> None:
+        self.cache.set(
+            CACHE_KEY_PREFIX + query_hash,
+            query,
+            timeout=_get_setting("PERSISTED_QUERIES_TIMEOUT", 60 * 60 * 24),
+        )
+
+
+class DocumentCache:
+    """
+    LRU of parsed and validated `DocumentNode`s keyed by the sha256 of the query.
+
+    Holds up to `BASEAPP_CORE_GRAPHQL_DOCUMENT_CACHE_SIZE` documents (default `512`, `0`
+    disables it). Validation errors are cached along with the document, since they only
+    depend on the query and the schema.
+    """
+
+    def __init__(self, maxsize: int | None = None) -> None:
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[DocumentNode | None, list[GraphQLError]]] = (
+            OrderedDict()
+        )
+
+    @property
+    def maxsize(self) -> int:
+        if self._maxsize is not None:
+            return self._maxsize
+        return _get_setting("DOCUMENT_CACHE_SIZE", 512)
+
+    def get_document(
+        self,
+        schema: GraphQLSchema,
+        query: str,
+        query_hash: str | None = None,
+        validation_rules: Collection[type[ASTValidationRule]] | None = None,
+    ) -> tuple[DocumentNode | None, list[GraphQLError]]:
+        """Return `(document, errors)` for `query`, parsing and validating it on a miss."""
+        key = (
+            id(schema),
+            query_hash or get_query_hash(query),
+            tuple(validation_rules) if validation_rules else None,
+        )
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._parse_and_validate(schema, query, validation_rules)
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _parse_and_validate(
+        schema: GraphQLSchema,
+        query: str,
+        validation_rules: Collection[type[ASTValidationRule]] | None,
+    ) -> tuple[DocumentNode | None, list[GraphQLError]]:
+        try:
+            document = parse(query)
+        except GraphQLError as e:
+            return None, [e]
+
+        errors = validate(
+            schema, document, validation_rules, graphene_settings.MAX_VALIDATION_ERRORS
+        )
+        return document, errors
+
+
+persisted_query_registry = PersistedQueryRegistry()
+document_cache = DocumentCache()
+
+
+def resolve_persisted_query(query: str | None, extensions: Any) -> tuple[str | None, str | None]:
+    """
+    Apply the Apollo APQ protocol to an incoming operation, returning `(query, query_hash)`.
+
+    - A hash without query is looked up in the registry, raising `PersistedQueryNotFound`
+      when it's not registered.
+    - A hash with its query registers it, once the hash is verified.
+    - Without the extension the query is returned untouched and hashed lazily by the
+      document cache.
+    """
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            raise PersistedQueryInvalid("Extensions are invalid JSON.")
+
+    persisted_query = (extensions or {}).get(PERSISTED_QUERY_EXTENSION)
+    if not persisted_query:
+        return query, None
+
+    if not persisted_query_registry.enabled:
+        raise PersistedQueryNotSupported()
+
+    query_hash = persisted_query.get("sha256Hash")
+    if persisted_query.get("version") != PERSISTED_QUERY_VERSION or not query_hash:
+        raise PersistedQueryInvalid("Unsupported persisted query version.")
+
+    if not query:
+        query = persisted_query_registry.get(query_hash)
+        if query is None:
+            raise PersistedQueryNotFound()
+        return query, query_hash
+
+    if get_query_hash(query) != query_hash:
+        raise PersistedQueryInvalid("provided sha does not match query")
+    persisted_query_registry.register(query_hash, query)
+    return query, query_hash
@@ -0,0 +1,258 @@
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import caches
+from graphene_django.settings import graphene_settings
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLNamedType,
+    GraphQLObjectType,
+    GraphQLSchema,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    VariableNode,
+    get_named_type,
+    is_leaf_type,
+)
+
+PAGINATION_ARGUMENTS = ("first", "last")
+
+CACHE_KEY_PREFIX = "baseapp:graphql:query_cost:"
+
+
+def _get_setting(name: str, default: Any) -> Any:
+    return getattr(settings, f"BASEAPP_CORE_GRAPHQL_{name}", default)
+
+
+@dataclass
+class QueryCost:
+    """
+    Static cost of an operation.
+
+    - `depth`: deepest field nesting.
+    - `complexity`: sum of the field costs, each multiplied by the page sizes of the
+      connections above it.
+    - `nodes`: estimated number of objects the operation can return.
+    """
+
+    depth: int = 0
+    complexity: int = 0
+    nodes: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class QueryCostAnalyzer:
+    """
+    Computes the `QueryCost` of a parsed and validated operation.
+
+    Leaf fields cost `0` and object fields `1`, unless overridden per `"Type.field"` in
+    `BASEAPP_CORE_GRAPHQL_FIELD_COSTS`. Relay connections multiply the cost of everything
+    below them by their `first`/`last` argument (literal or variable), falling back to
+    graphene's `RELAY_CONNECTION_MAX_LIMIT` when no page size is given. Fragments are
+    expanded in place, so fields selected on several type conditions are all counted:
+    the result is an upper bound.
+    """
+
+    def __init__(
+        self,
+        schema: GraphQLSchema,
+        document: DocumentNode,
+        variables: dict[str, Any] | None = None,
+    ) -> None:
+        self.schema = schema
+        self.variables = variables or {}
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.field_costs: dict[str, int] = _get_setting("FIELD_COSTS", {})
+        self.max_page_size: int | None = graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+
+    def analyze(self, operation: OperationDefinitionNode) -> QueryCost:
+        root_type = self.schema.get_root_type(operation.operation)
+        cost = QueryCost()
+        if root_type is not None:
+            self._visit(operation.selection_set, root_type, cost, depth=0, multiplier=1)
+        return cost
+
+    def _visit(
+        self,
+        selection_set: SelectionSetNode,
+        parent_type: GraphQLNamedType,
+        cost: QueryCost,
+        depth: int,
+        multiplier: int,
+    ) -> None:
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                self._visit_field(selection, parent_type, cost, depth, multiplier)
+            elif isinstance(selection, InlineFragmentNode):
+                type_condition = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition
+                    else parent_type
+                )
+                self._visit(selection.selection_set, type_condition, cost, depth, multiplier)
+            elif isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is not None:
+                    type_condition = self.schema.get_type(fragment.type_condition.name.value)
+                    self._visit(fragment.selection_set, type_condition, cost, depth, multiplier)
+
+    def _visit_field(
+        self,
+        field: FieldNode,
+        parent_type: GraphQLNamedType,
+        cost: QueryCost,
+        depth: int,
+        multiplier: int,
+    ) -> None:
+        name = field.name.value
+        # Introspection is left out so GraphiQL and codegen keep working under tight budgets
+        if name.startswith("__"):
+            return
+
+        field_def = getattr(parent_type, "fields", {}).get(name)
+        if field_def is None:
+            return
+
+        field_type = get_named_type(field_def.type)
+        is_leaf = is_leaf_type(field_type)
+        cost.depth = max(cost.depth, depth + 1)
+        cost.complexity += (
+            self.field_costs.get(f"{parent_type.name}.{name}", 0 if is_leaf else 1) * multiplier
+        )
+        if is_leaf or field.selection_set is None:
+            return
+
+        if _is_connection_type(field_type):
+            multiplier *= self._get_page_size(field)
+            cost.nodes += multiplier
+        elif not (_is_connection_type(parent_type) or _is_edge_type(parent_type)):
+            # `edges`, `node` and `pageInfo` are connection plumbing, not extra objects
+            cost.nodes += multiplier
+
+        self._visit(field.selection_set, field_type, cost, depth + 1, multiplier)
+
+    def _get_page_size(self, field: FieldNode) -> int:
+        page_size = None
+        for argument in field.arguments:
+            if argument.name.value not in PAGINATION_ARGUMENTS:
+                continue
+            if isinstance(argument.value, IntValueNode):
+                page_size = int(argument.value.value)
+            elif isinstance(argument.value, VariableNode):
+                page_size = self.variables.get(argument.value.name.value)
+            if page_size is not None:
+                break
+
+        if not isinstance(page_size, int) or page_size < 0:
+            page_size = self.max_page_size or 1
+        if self.max_page_size:
+            page_size = min(page_size, self.max_page_size)
+        return page_size
+
+
+def _is_connection_type(graphql_type: GraphQLNamedType) -> bool:
+    return (
+        isinstance(graphql_type, GraphQLObjectType)
+        and "edges" in graphql_type.fields
+        and "pageInfo" in graphql_type.fields
+    )
+
+
+def _is_edge_type(graphql_type: GraphQLNamedType) -> bool:
+    return (
+        isinstance(graphql_type, GraphQLObjectType)
+        and "node" in graphql_type.fields
+        and "cursor" in graphql_type.fields
+    )
+
+
+def analyze_query_cost(
+    schema: GraphQLSchema,
+    document: DocumentNode,
+    operation: OperationDefinitionNode,
+    variables: dict[str, Any] | None = None,
+) -> QueryCost:
+    return QueryCostAnalyzer(schema, document, variables).analyze(operation)
+
+
+def should_report_query_cost() -> bool:
+    return _get_setting("REPORT_QUERY_COST", True)
+
+
+def get_query_cost_rate_limit() -> tuple[int, int] | None:
+    return _get_setting("QUERY_COST_RATE_LIMIT", None)
+
+
+def check_query_cost(cost: QueryCost, client_key: str | None = None) -> list[GraphQLError]:
+    """
+    Check `cost` against the configured budgets, returning the errors to reject the
+    operation with.
+
+    - `BASEAPP_CORE_GRAPHQL_MAX_QUERY_DEPTH`, `BASEAPP_CORE_GRAPHQL_MAX_QUERY_COMPLEXITY`
+      and `BASEAPP_CORE_GRAPHQL_MAX_QUERY_NODES` bound a single operation (default `None`,
+      unlimited).
+    - `BASEAPP_CORE_GRAPHQL_QUERY_COST_RATE_LIMIT`, a `(complexity, seconds)` tuple,
+      throttles the total complexity a client (`client_key`) may spend per window.
+    """
+    errors = []
+    for attr, setting in (
+        ("depth", "MAX_QUERY_DEPTH"),
+        ("complexity", "MAX_QUERY_COMPLEXITY"),
+        ("nodes", "MAX_QUERY_NODES"),
+    ):
+        limit = _get_setting(setting, None)
+        value = getattr(cost, attr)
+        if limit is not None and value > limit:
+            errors.append(
+                GraphQLError(
+                    f"Query {attr} of {value} exceeds the maximum allowed of {limit}.",
+                    extensions={"code": "QUERY_TOO_COMPLEX", "cost": cost.as_dict()},
+                )
+            )
+    if errors or client_key is None:
+        return errors
+
+    rate_limit = get_query_cost_rate_limit()
+    if rate_limit is None:
+        return errors
+
+    budget, window = rate_limit
+    cache = caches[_get_setting("QUERY_COST_CACHE_ALIAS", "default")]
+    key = CACHE_KEY_PREFIX + client_key
+    cache.add(key, 0, timeout=window)
+    try:
+        spent = cache.incr(key, cost.complexity)
+    except ValueError:
+        # The window expired between `add` and `incr`
+        cache.set(key, cost.complexity, timeout=window)
+        spent = cost.complexity
+    if spent > budget:
+        errors.append(
+            GraphQLError(
+                "Query cost rate limit exceeded, try again later.",
+                extensions={"code": "THROTTLED", "cost": cost.as_dict()},
+            )
+        )
+    return errors
+
+
+def get_client_key(user: Any, address: str | None) -> str | None:
+    """Key the cost rate limit by user, or by address for anonymous clients."""
+    if user is not None and getattr(user, "is_authenticated", False):
+        return f"user:{user.pk}"
+    if address:
+        return f"address:{address}"
+    return None
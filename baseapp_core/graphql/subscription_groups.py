@@ -0,0 +1,112 @@
+import asyncio
+from collections.abc import Iterable
+from typing import Any
+
+import channels.layers
+from asgiref.sync import async_to_sync
+
+JOIN_GROUP = "subscription.join_group"
+LEAVE_GROUP = "subscription.leave_group"
+
+
+def _group_message(message_type: str, subscription, group: str, other_group: str) -> tuple:
+    group_name = subscription._group_name(group)
+    return group_name, {
+        "type": message_type,
+        "group": group_name,
+        "other_group": subscription._group_name(other_group),
+    }
+
+
+async def join_subscription_group_async(subscription, group: str, join: str) -> None:
+    """
+    Make the live `subscription` operations of `group` also listen to the `join` group,
+    as if their `subscribe` had returned it. Handled by `SubscriptionGroupsConsumerMixin`.
+    """
+    group_name, message = _group_message(JOIN_GROUP, subscription, group, join)
+    await channels.layers.get_channel_layer().group_send(group_name, message)
+
+
+async def leave_subscription_group_async(subscription, group: str, leave: str) -> None:
+    """Stop the live `subscription` operations of `group` from listening to `leave`."""
+    group_name, message = _group_message(LEAVE_GROUP, subscription, group, leave)
+    await channels.layers.get_channel_layer().group_send(group_name, message)
+
+
+def join_subscription_group(subscription, group: str, join: str) -> None:
+    async_to_sync(join_subscription_group_async)(subscription, group, join)
+
+
+def leave_subscription_group(subscription, group: str, leave: str) -> None:
+    async_to_sync(leave_subscription_group_async)(subscription, group, leave)
+
+
+async def _send_group_messages(messages: dict[str, dict]) -> None:
+    channel_layer = channels.layers.get_channel_layer()
+    await asyncio.gather(
+        *(channel_layer.group_send(group_name, message) for group_name, message in messages.items())
+    )
+
+
+def join_subscription_groups(groups: Iterable[tuple[Any, str]], join: str) -> None:
+    """
+    `join_subscription_group` for each `(subscription, group)` of `groups`, sending once
+    per distinct group.
+    """
+    async_to_sync(_send_group_messages)(
+        dict(
+            _group_message(JOIN_GROUP, subscription, group, join) for subscription, group in groups
+        )
+    )
+
+
+def leave_subscription_groups(groups: Iterable[tuple[Any, str]], leave: str) -> None:
+    """`leave_subscription_group` for each `(subscription, group)` of `groups`."""
+    async_to_sync(_send_group_messages)(
+        dict(
+            _group_message(LEAVE_GROUP, subscription, group, leave)
+            for subscription, group in groups
+        )
+    )
+
+
+class SubscriptionGroupsConsumerMixin:
+    """
+    Lets subscriptions join and leave groups after `subscribe`, through
+    `join_subscription_group` / `leave_subscription_group`. Used to follow membership
+    changes, e.g. a profile added to a chat room starts receiving the room's broadcasts.
+    """
+
+    async def subscription_join_group(self, message) -> None:
+        group, join = message["group"], message["other_group"]
+        sids = [
+            sid
+            for sid in self._sids_by_group.get(group, [])
+            if join not in self._subscriptions[sid].groups
+        ]
+        if not sids:
+            return
+
+        is_new_group = join not in self._sids_by_group
+        for sid in sids:
+            self._subscriptions[sid].groups.append(join)
+            self._sids_by_group.setdefault(join, []).append(sid)
+        if is_new_group:
+            await self._channel_layer.group_add(join, self.channel_name)
+
+    async def subscription_leave_group(self, message) -> None:
+        group, leave = message["group"], message["other_group"]
+        sids = [
+            sid
+            for sid in self._sids_by_group.get(group, [])
+            if leave in self._subscriptions[sid].groups
+        ]
+        if not sids:
+            return
+
+        for sid in sids:
+            self._subscriptions[sid].groups.remove(leave)
+            self._sids_by_group[leave].remove(sid)
+        if not self._sids_by_group[leave]:
+            del self._sids_by_group[leave]
+            await self._channel_layer.group_discard(leave, self.channel_name)
@@ -17,6 +17,8 @@ from graphene_django import views as _views
 from graphene_django.debug.sql import tracking as _tracking
 from graphene_django.registry import get_global_registry
 
+from baseapp_core.query_budget import is_tracked_query
+
 from .decorators import graphql_schema_required
 
 if TYPE_CHECKING:
@@ -188,13 +190,7 @@ def db_query_logger(
 
     # Don't include transaction creation, as we aren't interested in them.
 
-    if (
-        not sql.startswith("SAVEPOINT")
-        and not sql.startswith("RELEASE SAVEPOINT")
-        and not sql.startswith("ROLLBACK")
-        and not sql.startswith('SELECT "constance_constance"."id"')
-        and not sql.startswith('INSERT INTO "constance_constance"')
-    ):
+    if is_tracked_query(sql):
         try:
             query_data.queries.append(sql % params)
         except TypeError:
@@ -1,13 +1,41 @@
-import logging
 from collections.abc import Generator
 from contextlib import contextmanager
 
 import pghistory
+from django.db import connection, transaction
+from django.http import HttpResponseNotAllowed
 from django.http.response import HttpResponseBadRequest
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
 from graphene_django.views import GraphQLView as GrapheneGraphQLView
 from graphene_django.views import HttpError
-from graphql import get_operation_ast, parse
+from graphql import (
+    GraphQLError,
+    OperationType,
+    execute,
+    get_operation_ast,
+    validate_schema,
+)
 from graphql.execution import ExecutionResult
+from ipware import get_client_ip
+
+from baseapp_core.graphql.middlewares import authenticate_context
+from baseapp_core.graphql.persisted_queries import (
+    document_cache,
+    resolve_persisted_query,
+)
+from baseapp_core.graphql.query_cost import (
+    analyze_query_cost,
+    check_query_cost,
+    get_client_key,
+    get_query_cost_rate_limit,
+    should_report_query_cost,
+)
+from baseapp_core.hashids.strategies.flags import public_id_logic_snapshot
+from baseapp_core.loaders import document_id_loader_scope
+from baseapp_core.middleware import IPWARE_META_PRECEDENCE_ORDER
+from baseapp_core.query_budget import should_report_queries, track_queries
 
 try:
     import sentry_sdk
@@ -32,21 +60,61 @@ def sentry_graphql_span(operation_name, operation_type) -> Generator[None, None,
 
 
 class GraphQLView(GrapheneGraphQLView):
+    """
+    Graphene's view with Apollo APQ persisted queries and a shared LRU of parsed and
+    validated documents (see `baseapp_core.graphql.persisted_queries`), so repeated
+    operations skip parsing and validation and clients can send only the query hash.
+    """
+
     def execute_graphql_request(
         self, request, data, query, variables, operation_name, show_graphiql=False
     ) -> ExecutionResult | None:
+        try:
+            query, query_hash = resolve_persisted_query(
+                query, request.GET.get("extensions") or data.get("extensions")
+            )
+        except GraphQLError as e:
+            return ExecutionResult(errors=[e])
+
         if not query:
             if show_graphiql:
                 return None
             raise HttpError(HttpResponseBadRequest("Must provide query string."))
 
-        try:
-            document = parse(query)
-        except Exception as e:
-            logging.exception(e)
-            return ExecutionResult(errors=[e])
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        document, errors = document_cache.get_document(
+            schema, query, query_hash, self.validation_rules
+        )
+        if document is None:
+            return ExecutionResult(errors=errors)
 
         operation_ast = get_operation_ast(document, operation_name)
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        if errors:
+            return ExecutionResult(data=None, errors=errors)
+
         operation_name = (
             operation_ast.name.value
             if operation_ast and operation_ast.name and not operation_name
@@ -54,10 +122,112 @@ class GraphQLView(GrapheneGraphQLView):
         )
         operation_type = operation_ast.operation.value
 
+        cost = analyze_query_cost(
+            schema, document, operation_ast, variables if isinstance(variables, dict) else None
+        )
+        extensions = {"cost": cost.as_dict()} if should_report_query_cost() else None
+        # Only authenticate ahead of execution when there's a rate limit to key
+        client_key = (
+            self.get_client_key(request) if get_query_cost_rate_limit() is not None else None
+        )
+        cost_errors = check_query_cost(cost, client_key)
+        if cost_errors:
+            return ExecutionResult(data=None, errors=cost_errors, extensions=extensions)
+
         with sentry_graphql_span(operation_name, operation_type):
-            with pghistory.context(
-                graphql_operation_name=operation_name, graphql_operation_type=operation_type
+            with (
+                pghistory.context(
+                    graphql_operation_name=operation_name, graphql_operation_type=operation_type
+                ),
+                document_id_loader_scope(request),
+                public_id_logic_snapshot(request),
+                track_queries(operation_name) as query_tracker,
             ):
-                return super().execute_graphql_request(
-                    request, data, query, variables, operation_name, show_graphiql
+                result = self.execute_document(
+                    request, document, operation_ast, variables, operation_name
+                )
+        if query_tracker is not None and should_report_queries():
+            extensions = {**(extensions or {}), "queries": query_tracker.as_dict()}
+        if extensions:
+            result.extensions = {**(result.extensions or {}), **extensions}
+        return result
+
+    def get_client_key(self, request) -> str | None:
+        """
+        The query cost rate limit key of `request`: its user, authenticated by the token
+        and JWT middlewares ahead of execution, or its address for anonymous clients.
+        """
+        context = self.get_context(request)
+        authenticate_context(context, self.get_middleware(request))
+        address, _ = get_client_ip(request, request_header_order=IPWARE_META_PRECEDENCE_ORDER)
+        return get_client_key(getattr(context, "user", None), address)
+
+    def get_response(self, request, data, show_graphiql=False) -> tuple[str | None, int]:
+        """Graphene's `get_response`, also serializing the result `extensions`."""
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        status_code = 200
+        if not execution_result:
+            return None, status_code
+
+        response = {}
+        if execution_result.errors:
+            set_rollback()
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.errors and any(
+            not getattr(e, "path", None) for e in execution_result.errors
+        ):
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        if execution_result.extensions:
+            response["extensions"] = execution_result.extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def execute_document(
+        self, request, document, operation_ast, variables, operation_name
+    ) -> ExecutionResult:
+        """Execute an already parsed and validated document, same as Graphene's view."""
+        schema = self.schema.graphql_schema
+        try:
+            execute_options = {
+                "root_value": self.get_root_value(request),
+                "context_value": self.get_context(request),
+                "variable_values": variables,
+                "operation_name": operation_name,
+                "middleware": self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options["execution_context_class"] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
                 )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
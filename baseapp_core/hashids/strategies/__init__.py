@@ -1,9 +1,8 @@
 from typing import TYPE_CHECKING, Any, Optional, Type
 
-from constance import config
-
 from baseapp_core.hashids.models import LegacyWithPkMixin
 from baseapp_core.hashids.strategies.bundle import HashidsStrategyBundle
+from baseapp_core.hashids.strategies.flags import is_public_id_logic_enabled
 from baseapp_core.hashids.utils import is_uuid4
 from baseapp_core.models import DocumentIdMixin
 from baseapp_core.utils import has_autoincrement_pk
@@ -13,7 +12,9 @@ if TYPE_CHECKING:
 
 
 def _is_public_id_logic_enabled() -> bool:
-    return bool(config.ENABLE_PUBLIC_ID_LOGIC)
+    # Served from the request snapshot / short-TTL cache in `flags`, strategy selection
+    # runs per node and per field.
+    return is_public_id_logic_enabled()
 
 
 def _is_model_public_id_compatible(model_cls: type) -> bool:
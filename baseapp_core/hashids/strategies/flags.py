@@ -0,0 +1,112 @@
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from constance import config
+from constance.signals import config_updated
+from django.conf import settings
+from django.dispatch import receiver
+
+PUBLIC_ID_LOGIC_KEY = "ENABLE_PUBLIC_ID_LOGIC"
+
+# Attribute used to memoise the snapshot on a request / GraphQL context object, same
+# pattern as `baseapp_core.loaders.CONTEXT_ATTR`.
+CONTEXT_ATTR = "_public_id_logic_snapshot"
+
+
+class PublicIdLogicFlag:
+    """
+    Process-local cache of the `ENABLE_PUBLIC_ID_LOGIC` constance flag.
+
+    The value is kept for `BASEAPP_CORE_PUBLIC_ID_LOGIC_CACHE_TTL` seconds (default `5`,
+    `0` disables the cache) and dropped as soon as constance sends `config_updated` for
+    it, so only changes made by other processes take up to the TTL to be picked up.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._value: bool | None = None
+        self._expires_at = 0.0
+
+    @property
+    def ttl(self) -> float:
+        return getattr(settings, "BASEAPP_CORE_PUBLIC_ID_LOGIC_CACHE_TTL", 5)
+
+    def get(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._value is not None and now < self._expires_at:
+                return self._value
+
+        value = bool(getattr(config, PUBLIC_ID_LOGIC_KEY))
+        with self._lock:
+            self._value = value
+            self._expires_at = now + self.ttl
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+            self._expires_at = 0.0
+
+
+class PublicIdLogicSnapshot:
+    """
+    Value of the flag frozen for a single request/operation, so every strategy picked
+    while resolving it agrees even if the flag changes mid-way.
+
+    The flag is read lazily, on the first strategy selection, which keeps constance
+    backend reads out of the event loop in the websocket consumers.
+    """
+
+    def __init__(self) -> None:
+        self._value: bool | None = None
+
+    @property
+    def enabled(self) -> bool:
+        if self._value is None:
+            self._value = public_id_logic_flag.get()
+        return self._value
+
+
+public_id_logic_flag = PublicIdLogicFlag()
+
+_current_snapshot: ContextVar[PublicIdLogicSnapshot | None] = ContextVar(
+    "baseapp_public_id_logic_snapshot", default=None
+)
+
+
+def is_public_id_logic_enabled() -> bool:
+    """Return the active request snapshot of the flag, or the cached process-wide value."""
+    if (snapshot := _current_snapshot.get()) is not None:
+        return snapshot.enabled
+    return public_id_logic_flag.get()
+
+
+@contextmanager
+def public_id_logic_snapshot(context: Any = None) -> Generator[PublicIdLogicSnapshot, None, None]:
+    """
+    Freeze the flag for the enclosed block.
+
+    When `context` (an `HttpRequest` or a GraphQL context object) is given the snapshot is
+    memoised on it, so every resolver of the same operation shares it.
+    """
+    snapshot = getattr(context, CONTEXT_ATTR, None) if context is not None else None
+    if snapshot is None:
+        snapshot = PublicIdLogicSnapshot()
+        if context is not None:
+            setattr(context, CONTEXT_ATTR, snapshot)
+    token = _current_snapshot.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _current_snapshot.reset(token)
+
+
+@receiver(config_updated)
+def invalidate_public_id_logic_flag(sender, key, **kwargs) -> None:
+    if key == PUBLIC_ID_LOGIC_KEY:
+        public_id_logic_flag.invalidate()
@@ -13,8 +13,14 @@ from baseapp_core.hashids.strategies import (
     get_public_id_strategy,
     graphql_get_node_from_global_id_using_strategy,
     graphql_to_global_id_using_strategy,
+    should_use_public_id,
 )
 from baseapp_core.hashids.strategies.bundle import HashidsStrategyBundle
+from baseapp_core.hashids.strategies.flags import (
+    PublicIdLogicFlag,
+    public_id_logic_flag,
+    public_id_logic_snapshot,
+)
 from baseapp_core.hashids.strategies.legacy import (
     LegacyGraphQLResolverStrategy,
     LegacyIdResolverStrategy,
@@ -410,3 +416,47 @@ class TestHashidsStrategyIntegrationScenarios:
                 legacy_instance.pk, model_cls=DummyLegacyModel
             )
             assert legacy_id_resolved.pk == legacy_instance.pk
+
+
+@pytest.mark.django_db
+class TestPublicIdLogicFlagCache:
+    def test_flag_is_read_once_within_ttl(self) -> None:
+        flag = PublicIdLogicFlag()
+        with patch("baseapp_core.hashids.strategies.flags.config") as mocked_config:
+            mocked_config.ENABLE_PUBLIC_ID_LOGIC = True
+            assert flag.get() is True
+            mocked_config.ENABLE_PUBLIC_ID_LOGIC = False
+            assert flag.get() is True
+
+    def test_zero_ttl_disables_cache(self, settings) -> None:
+        settings.BASEAPP_CORE_PUBLIC_ID_LOGIC_CACHE_TTL = 0
+        flag = PublicIdLogicFlag()
+        with patch("baseapp_core.hashids.strategies.flags.config") as mocked_config:
+            mocked_config.ENABLE_PUBLIC_ID_LOGIC = True
+            assert flag.get() is True
+            mocked_config.ENABLE_PUBLIC_ID_LOGIC = False
+            assert flag.get() is False
+
+    def test_config_updated_invalidates_cache(self) -> None:
+        with override_config(ENABLE_PUBLIC_ID_LOGIC=True):
+            assert public_id_logic_flag.get() is True
+            with override_config(ENABLE_PUBLIC_ID_LOGIC=False):
+                assert public_id_logic_flag.get() is False
+            assert public_id_logic_flag.get() is True
+
+    def test_snapshot_is_frozen_for_the_operation(self) -> None:
+        class Context:
+            pass
+
+        context = Context()
+        with override_config(ENABLE_PUBLIC_ID_LOGIC=True):
+            with public_id_logic_snapshot(context):
+                assert _is_public_id_logic_enabled() is True
+                with override_config(ENABLE_PUBLIC_ID_LOGIC=False):
+                    assert _is_public_id_logic_enabled() is True
+                    assert should_use_public_id(DummyPublicIdModel) is True
+            with override_config(ENABLE_PUBLIC_ID_LOGIC=False):
+                assert _is_public_id_logic_enabled() is False
+                # Re-entering the scope of the same operation reuses its snapshot
+                with public_id_logic_snapshot(context):
+                    assert _is_public_id_logic_enabled() is True
@@ -0,0 +1,175 @@
+import threading
+import uuid
+from collections import defaultdict
+from collections.abc import Generator, Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from django.contrib.contenttypes.models import ContentType
+
+# Attribute used to memoise the loader on a request / GraphQL context object, same
+# pattern as `baseapp_core.graphql.utils.resolve_document_content_object`.
+CONTEXT_ATTR = "_document_id_loader"
+
+_current_loader: ContextVar["DocumentIdLoader | None"] = ContextVar(
+    "baseapp_document_id_loader", default=None
+)
+
+
+class DocumentIdLoader:
+    """
+    Request-scoped batching loader for `DocumentId` lookups.
+
+    Keys are queued (either explicitly through `prime_*` or implicitly on a cache miss)
+    and every pending key is answered on the next load with a single `IN` query per
+    content type (or a single `public_id IN (...)` query for reverse lookups). Results are
+    memoised for the lifetime of the loader, so resolving a page of 50 nodes costs one
+    query instead of 50.
+
+    Both directions share the same memo: loading a public id for an object also answers
+    the `public_id -> (content_type, object_id)` lookup for it, and vice-versa.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        # (content_type_id, object_id) -> public_id
+        self._public_ids: dict[tuple[int, int], uuid.UUID] = {}
+        # public_id -> (content_type_id, object_id) | None
+        self._mappings: dict[uuid.UUID, tuple[int, int] | None] = {}
+        self._pending_objects: dict[int, set[int]] = defaultdict(set)
+        self._pending_public_ids: set[uuid.UUID] = set()
+
+    # Priming
+
+    def prime_objects(self, objs: Iterable[Any]) -> None:
+        """Queue public id lookups for `objs` without hitting the database yet."""
+        with self._lock:
+            for obj in objs:
+                if obj is None or not getattr(obj, "pk", None):
+                    continue
+                key = self._object_key(obj)
+                if getattr(obj, "mapped_public_id", None):
+                    # Already annotated by the queryset annotator strategy
+                    self._public_ids[key] = obj.mapped_public_id
+                    self._mappings[obj.mapped_public_id] = key
+                    continue
+                if key not in self._public_ids:
+                    self._pending_objects[key[0]].add(key[1])
+
+    def prime_public_ids(self, public_ids: Iterable[Any]) -> None:
+        """Queue `public_id -> (content_type, object_id)` lookups."""
+        with self._lock:
+            for public_id in public_ids:
+                public_id = self._normalize_public_id(public_id)
+                if public_id is not None and public_id not in self._mappings:
+                    self._pending_public_ids.add(public_id)
+
+    # Loading
+
+    def load_public_id(self, obj: Any) -> uuid.UUID | None:
+        if obj is None or not getattr(obj, "pk", None):
+            return None
+
+        key = self._object_key(obj)
+        with self._lock:
+            if key not in self._public_ids:
+                self._pending_objects[key[0]].add(key[1])
+                self._dispatch_objects()
+            return self._public_ids.get(key)
+
+    def load_content_type_and_id(self, public_id: Any) -> tuple[ContentType, int] | None:
+        public_id = self._normalize_public_id(public_id)
+        if public_id is None:
+            return None
+
+        with self._lock:
+            if public_id not in self._mappings:
+                self._pending_public_ids.add(public_id)
+                self._dispatch_public_ids()
+            mapping = self._mappings.get(public_id)
+
+        if mapping is None:
+            return None
+        content_type_id, object_id = mapping
+        return ContentType.objects.get_for_id(content_type_id), object_id
+
+    # Internals
+
+    def _dispatch_objects(self) -> None:
+        from baseapp_core.models import DocumentId
+
+        pending = {ct_id: ids for ct_id, ids in self._pending_objects.items() if ids}
+        self._pending_objects.clear()
+
+        for content_type_id, object_ids in pending.items():
+            rows = DocumentId.objects.filter(
+                content_type_id=content_type_id, object_id__in=object_ids
+            ).values_list("object_id", "public_id")
+            # Only hits are memoised: a missing row may still be created later in the
+            # request (e.g. `DocumentId.get_or_create_for_object`).
+            for object_id, public_id in rows:
+                self._public_ids[(content_type_id, object_id)] = public_id
+                self._mappings[public_id] = (content_type_id, object_id)
+
+    def _dispatch_public_ids(self) -> None:
+        from baseapp_core.models import DocumentId
+
+        pending = self._pending_public_ids
+        self._pending_public_ids = set()
+        if not pending:
+            return
+
+        rows = DocumentId.objects.filter(public_id__in=pending).values_list(
+            "public_id", "content_type_id", "object_id"
+        )
+        for public_id, content_type_id, object_id in rows:
+            self._mappings[public_id] = (content_type_id, object_id)
+            self._public_ids[(content_type_id, object_id)] = public_id
+        for public_id in pending:
+            self._mappings.setdefault(public_id, None)
+
+    @staticmethod
+    def _object_key(obj: Any) -> tuple[int, int]:
+        return ContentType.objects.get_for_model(obj).pk, obj.pk
+
+    @staticmethod
+    def _normalize_public_id(public_id: Any) -> uuid.UUID | None:
+        if isinstance(public_id, uuid.UUID):
+            return public_id
+        try:
+            return uuid.UUID(str(public_id))
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+
+def get_document_id_loader() -> DocumentIdLoader | None:
+    """Return the loader of the active request/operation, or `None` outside of one."""
+    return _current_loader.get()
+
+
+def get_document_id_loader_for_context(context: Any) -> DocumentIdLoader:
+    """Return the loader memoised on `context`, creating it on first access."""
+    loader = getattr(context, CONTEXT_ATTR, None)
+    if loader is None:
+        loader = DocumentIdLoader()
+        setattr(context, CONTEXT_ATTR, loader)
+    return loader
+
+
+@contextmanager
+def document_id_loader_scope(context: Any = None) -> Generator[DocumentIdLoader, None, None]:
+    """
+    Activate a `DocumentIdLoader` for the enclosed block.
+
+    When `context` (an `HttpRequest` or a GraphQL context object) is given the loader is
+    memoised on it, so re-entering the scope for the same request reuses the results.
+    """
+    loader = get_document_id_loader_for_context(context) if context is not None else None
+    if loader is None:
+        loader = DocumentIdLoader()
+    token = _current_loader.set(loader)
+    try:
+        yield loader
+    finally:
+        _current_loader.reset(token)
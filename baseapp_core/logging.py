@@ -5,6 +5,7 @@ from django.conf import settings
 from json_log_formatter import JSONFormatter
 
 from .middleware import threading_local
+from .query_budget import get_current_query_tracker
 
 
 class BaseJSONFormatter(JSONFormatter):
@@ -18,6 +19,11 @@ class BaseJSONFormatter(JSONFormatter):
         if request_trace:
             extra = {**extra, **request_trace}
 
+        # Query count and time of the GraphQL operation being executed, if tracked
+        query_tracker = get_current_query_tracker()
+        if query_tracker is not None:
+            extra = {**query_tracker.log_fields(), **extra}
+
         sentry_release = getattr(settings, "SENTRY_RELEASE", None)
         if sentry_release:
             extra["service.version"] = sentry_release
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from baseapp_core.backfill import backfill_all_models, backfill_single_instance
+from baseapp_core.backfill import (
+    METHOD_ORM,
+    METHOD_SQL,
+    DocumentIdBackfiller,
+    backfill_single_instance,
+    get_backfill_progress,
+)
 
 
 class Command(BaseCommand):
@@ -32,6 +38,42 @@ class Command(BaseCommand):
             dest="instance",
             help="Backfill a single instance in the format app_label.Model:pk (example: users.User:1)",
         )
+        parser.add_argument(
+            "--method",
+            choices=[METHOD_ORM, METHOD_SQL],
+            default=METHOD_SQL,
+            help="'sql' inserts each batch with INSERT ... SELECT ... ON CONFLICT DO NOTHING, "
+            "'orm' diffs each batch in Python and uses bulk_create",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes used to backfill each model. Each model is split "
+            "into 4 chunks per worker, which also sets how many tasks --celery enqueues",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Plan the chunks and enqueue a backfill_document_id_chunk task per chunk "
+            "instead of processing them here",
+        )
+        parser.add_argument(
+            "--no-checkpoint",
+            action="store_false",
+            dest="checkpoint",
+            help="Don't persist the progress of each chunk (the backfill can't be resumed)",
+        )
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Drop the persisted progress and start the backfill from scratch",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Only report the persisted progress, throughput and ETA of each model",
+        )
 
     def handle(self, *args, **options) -> None:
         batch_size: int = options["batch_size"]
@@ -68,13 +110,38 @@ class Command(BaseCommand):
                 )
             return
 
-        # Handle bulk backfill
-        total_created = backfill_all_models(
-            apps=None,
+        if options["celery"] and dry_run:
+            # The chunks are planned and persisted for the tasks, which always write
+            raise CommandError("--celery can't be combined with --dry-run")
+
+        backfiller = DocumentIdBackfiller(
             batch_size=batch_size,
             dry_run=dry_run,
-            apps_filter=apps_filter,
+            method=options["method"],
+            checkpoint=options["checkpoint"] or options["celery"],
+            workers=options["workers"],
+            progress_callback=lambda stats: self.stdout.write(str(stats)),
         )
+        target_models = backfiller.get_models_with_document_id_mixin()
+        if apps_filter:
+            target_models = [m for m in target_models if m._meta.app_label in apps_filter]
+
+        if options["status"]:
+            for model in target_models:
+                if stats := get_backfill_progress(model):
+                    self.stdout.write(str(stats))
+            return
+
+        if options["reset"]:
+            for model in target_models:
+                backfiller.reset_progress(model)
+
+        if options["celery"]:
+            self.enqueue_chunks(backfiller, target_models, batch_size, options["method"])
+            return
+
+        # Handle bulk backfill
+        total_created = backfiller.backfill_all_models(apps_filter=apps_filter)
 
         if dry_run:
             self.stdout.write(
@@ -88,3 +155,23 @@ class Command(BaseCommand):
                     f"Backfill complete. Total document IDs created: {total_created}"
                 )
             )
+
+    def enqueue_chunks(
+        self, backfiller: DocumentIdBackfiller, target_models: list, batch_size: int, method: str
+    ) -> None:
+        from django.contrib.contenttypes.models import ContentType
+
+        from baseapp_core.tasks import backfill_document_id_chunk
+
+        enqueued = 0
+        for model in target_models:
+            chunks = backfiller.plan_chunks(model, ContentType.objects.get_for_model(model))
+            for chunk in chunks:
+                if chunk.is_completed:
+                    continue
+                backfill_document_id_chunk.delay(chunk.pk, batch_size=batch_size, method=method)
+                enqueued += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Enqueued {enqueued} backfill chunks. Follow them with --status.")
+        )
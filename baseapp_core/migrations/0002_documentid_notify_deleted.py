@@ -0,0 +1,29 @@
+# Generated by Django 5.2.13 on 2026-10-17 22:11
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("baseapp_core", "0001_initial"),
+    ]
+
+    operations = [
+        pgtrigger.migrations.AddTrigger(
+            model_name="documentid",
+            trigger=pgtrigger.compiler.Trigger(
+                name="notify_document_id_deleted",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n                PERFORM pg_notify('baseapp_document_id_deleted', OLD.public_id::text);\n                RETURN NULL;\n                ",
+                    hash="4b07ac92787108e341235198b58092625d286e44",
+                    operation="DELETE",
+                    pgid="pgtrigger_notify_document_id_deleted_b1512",
+                    table="baseapp_core_documentid",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
@@ -11,7 +11,13 @@ from django.utils.deconstruct import deconstructible
 from django.utils.translation import gettext_lazy as _
 from model_utils.models import TimeStampedModel
 
+from baseapp_core.document_id_cache import (
+    NOTIFY_CHANNEL,
+    cache_mapping,
+    get_cached_mapping,
+)
 from baseapp_core.hashids.models import *  # noqa
+from baseapp_core.loaders import get_document_id_loader
 from baseapp_core.models import *  # noqa
 
 
@@ -84,6 +90,21 @@ class DocumentId(TimeStampedModel):
         ]
         verbose_name = "Document ID"
         verbose_name_plural = "Document IDs"
+        triggers = [
+            # Lets every process evict the deleted mapping from its DocumentId cache,
+            # whether the row went away through a model's delete_document_id trigger,
+            # a content type cascade or a manual delete.
+            pgtrigger.Trigger(
+                name="notify_document_id_deleted",
+                level=pgtrigger.Row,
+                when=pgtrigger.After,
+                operation=pgtrigger.Delete,
+                func=f"""
+                PERFORM pg_notify('{NOTIFY_CHANNEL}', OLD.public_id::text);
+                RETURN NULL;
+                """,
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.content_type.model}:{self.object_id} -> {self.public_id}"
@@ -93,6 +114,9 @@ class DocumentId(TimeStampedModel):
         if not obj or not obj.pk:
             return None
 
+        if loader := get_document_id_loader():
+            return loader.load_public_id(obj)
+
         try:
             mapping = cls.objects.get(
                 content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk
@@ -103,23 +127,42 @@ class DocumentId(TimeStampedModel):
 
     @classmethod
     def get_object_by_public_id(cls, public_id, model_class=None) -> models.Model | None:
-        try:
-            mapping = cls.objects.select_related("content_type").get(public_id=public_id)
+        resolved = cls.get_content_type_and_id_by_public_id(public_id)
+        if resolved is None:
+            return None
 
-            if model_class and mapping.content_type.model_class() != model_class:
-                return None
+        content_type, object_id = resolved
+        resolved_model_class = content_type.model_class()
+        if resolved_model_class is None:
+            return None
+        if model_class and resolved_model_class != model_class:
+            return None
 
-            return mapping.content_object
-        except cls.DoesNotExist:
+        try:
+            return content_type.get_object_for_this_type(pk=object_id)
+        except models.ObjectDoesNotExist:
             return None
 
     @classmethod
     def get_content_type_and_id_by_public_id(cls, public_id) -> tuple[ContentType, int] | None:
-        try:
-            mapping = cls.objects.select_related("content_type").get(public_id=public_id)
-            return mapping.content_type, mapping.object_id
-        except cls.DoesNotExist:
-            return None
+        # The mapping never changes once created, so hot public ids are answered from the
+        # process-local / shared cache without touching the database.
+        if cached := get_cached_mapping(public_id):
+            content_type_id, object_id = cached
+            return ContentType.objects.get_for_id(content_type_id), object_id
+
+        if loader := get_document_id_loader():
+            resolved = loader.load_content_type_and_id(public_id)
+        else:
+            try:
+                mapping = cls.objects.select_related("content_type").get(public_id=public_id)
+            except cls.DoesNotExist:
+                return None
+            resolved = mapping.content_type, mapping.object_id
+
+        if resolved is not None:
+            cache_mapping(public_id, resolved[0].pk, resolved[1])
+        return resolved
 
     @classmethod
     def get_or_create_for_object(cls, obj) -> "DocumentId | None":
@@ -137,6 +180,48 @@ class DocumentId(TimeStampedModel):
         return doc
 
 
+class DocumentIdBackfillChunk(TimeStampedModel):
+    """
+    Checkpoint of a primary key range processed by `baseapp_core.backfill.DocumentIdBackfiller`.
+
+    The backfiller splits each model into `[range_start, range_end]` chunks and records the
+    last primary key it committed for each of them, so an interrupted backfill resumes from
+    `last_pk` instead of starting over.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name="+")
+    range_start = models.BigIntegerField()
+    range_end = models.BigIntegerField()
+    last_pk = models.BigIntegerField(null=True, blank=True)
+    processed_count = models.PositiveBigIntegerField(default=0)
+    created_count = models.PositiveBigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("content_type", "range_start")
+        verbose_name = "Document ID backfill chunk"
+        verbose_name_plural = "Document ID backfill chunks"
+
+    def __str__(self) -> str:
+        return f"{self.content_type.model}:[{self.range_start}, {self.range_end}]"
+
+    @property
+    def is_completed(self) -> bool:
+        return self.completed_at is not None
+
+    @property
+    def cursor(self) -> int:
+        """Primary key the next keyset page starts after."""
+        return self.last_pk if self.last_pk is not None else self.range_start - 1
+
+    @property
+    def covered(self) -> int:
+        """Size of the primary key range already walked."""
+        if self.is_completed:
+            return self.range_end - self.range_start + 1
+        return self.cursor - self.range_start + 1
+
+
 class DocumentIdMixin(models.Model):
     """
     Mixin to add document ID functionality to any model.
@@ -159,6 +244,12 @@ class DocumentIdMixin(models.Model):
         object_id_field="object_id",
     )
 
+    # Level of the `insert_document_id` / `delete_document_id` triggers. Set it to
+    # `pgtrigger.Statement` on models that are mostly written with `bulk_create` or
+    # queryset deletes, so the DocumentId rows are handled with one set-based statement
+    # per query (through transition tables) instead of one trigger call per row.
+    document_id_trigger_level = pgtrigger.Row
+
     class Meta:
         abstract = True
 
@@ -336,10 +427,33 @@ class DocumentIdFunc(pgtrigger.Func):
         )
 
 
-def insert_document_id_trigger() -> pgtrigger.Trigger:
+def insert_document_id_trigger(level: pgtrigger.Level = pgtrigger.Row) -> pgtrigger.Trigger:
     """
     Trigger to automatically insert a DocumentId when a model using DocumentIdMixin is inserted.
+
+    With `level=pgtrigger.Statement` the trigger reads the inserted rows from the `new_values`
+    transition table, resolving the content type once and inserting every DocumentId in a
+    single statement, which is much cheaper for `bulk_create`.
     """
+    if level == pgtrigger.Statement:
+        return pgtrigger.Trigger(
+            name="insert_document_id",
+            level=pgtrigger.Statement,
+            when=pgtrigger.After,
+            operation=pgtrigger.Insert,
+            referencing=pgtrigger.Referencing(new="new_values"),
+            func=DocumentIdFunc("""
+                INSERT INTO {document_id_table} (public_id, content_type_id, object_id, created, modified)
+                SELECT gen_random_uuid(), ct.id, new_values.{pk}, NOW(), NOW()
+                FROM new_values
+                CROSS JOIN (
+                    SELECT id FROM {content_type_table} WHERE app_label = '{app_label}' AND model = '{model_name}'
+                ) AS ct
+                ON CONFLICT (content_type_id, object_id) DO NOTHING;
+                RETURN NULL;
+                """),
+        )
+
     return pgtrigger.Trigger(
         name="insert_document_id",
         level=pgtrigger.Row,
@@ -360,10 +474,30 @@ def insert_document_id_trigger() -> pgtrigger.Trigger:
     )
 
 
-def delete_document_id_trigger() -> pgtrigger.Trigger:
+def delete_document_id_trigger(level: pgtrigger.Level = pgtrigger.Row) -> pgtrigger.Trigger:
     """
     Trigger to automatically delete the DocumentId when a model using DocumentIdMixin is deleted.
+
+    With `level=pgtrigger.Statement` the deleted rows are read from the `old_values`
+    transition table and every DocumentId is removed in a single statement.
     """
+    if level == pgtrigger.Statement:
+        return pgtrigger.Trigger(
+            name="delete_document_id",
+            level=pgtrigger.Statement,
+            when=pgtrigger.After,
+            operation=pgtrigger.Delete,
+            referencing=pgtrigger.Referencing(old="old_values"),
+            func=DocumentIdFunc("""
+                DELETE FROM {document_id_table} AS document_id
+                USING old_values
+                WHERE
+                    document_id.content_type_id = (SELECT id FROM {content_type_table} WHERE app_label = '{app_label}' AND model = '{model_name}')
+                    AND document_id.object_id = old_values.{pk};
+                RETURN NULL;
+                """),
+        )
+
     return pgtrigger.Trigger(
         name="delete_document_id",
         level=pgtrigger.Row,
@@ -400,10 +534,11 @@ def add_document_id_trigger(sender, **kwargs) -> None:
         sender._meta.triggers = []
 
     existing = [t.name for t in sender._meta.triggers]
+    level = sender.document_id_trigger_level
     if "insert_document_id" not in existing:
-        sender._meta.triggers.append(insert_document_id_trigger())
+        sender._meta.triggers.append(insert_document_id_trigger(level=level))
     if "delete_document_id" not in existing:
-        sender._meta.triggers.append(delete_document_id_trigger())
+        sender._meta.triggers.append(delete_document_id_trigger(level=level))
 
 
 # Every baseapp_core model coming from internal folders should be added here
@@ -0,0 +1,240 @@
+import logging
+import re
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from django.conf import settings
+from graphql import GraphQLError
+
+logger = logging.getLogger(__name__)
+
+MODE_OFF = "off"
+MODE_WARN = "warn"
+MODE_RAISE = "raise"
+
+# Transaction bookkeeping and constance reads aren't counted against budgets
+IGNORED_SQL_PREFIXES = (
+    "SAVEPOINT",
+    "RELEASE SAVEPOINT",
+    "ROLLBACK",
+    'SELECT "constance_constance"."id"',
+    'INSERT INTO "constance_constance"',
+)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+
+_current_tracker: ContextVar["QueryTracker | None"] = ContextVar(
+    "baseapp_query_tracker", default=None
+)
+
+
+def _get_setting(name: str, default: Any) -> Any:
+    return getattr(settings, f"BASEAPP_CORE_QUERY_BUDGET_{name}", default)
+
+
+def get_query_budget_mode() -> str:
+    return _get_setting("MODE", MODE_WARN if settings.DEBUG else MODE_OFF)
+
+
+def should_report_queries() -> bool:
+    return _get_setting("REPORT", settings.DEBUG)
+
+
+def is_tracked_query(sql: str) -> bool:
+    return not sql.startswith(IGNORED_SQL_PREFIXES)
+
+
+@lru_cache(maxsize=1024)
+def get_query_shape(sql: str) -> str:
+    """Reduce `sql` to its shape: literals and `IN (...)` lists collapse to placeholders."""
+    sql = _NUMBER_RE.sub("%s", _STRING_RE.sub("%s", sql))
+    return _IN_LIST_RE.sub("(%s, ...)", sql)
+
+
+class QueryBudgetExceeded(GraphQLError):
+    def __init__(self, message: str) -> None:
+        super().__init__(message, extensions={"code": "QUERY_BUDGET_EXCEEDED"})
+
+
+@dataclass
+class QueryShape:
+    sql: str
+    count: int = 0
+    duration: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"sql": self.sql, "count": self.count, "duration_ms": _ms(self.duration)}
+
+
+class QueryTracker:
+    """
+    Counts the SQL queries and the time spent in the database by one operation, grouping
+    them by shape to detect N+1 patterns.
+
+    - `BASEAPP_CORE_QUERY_BUDGET_MODE`: `"off"`, `"warn"` (log operations over budget or
+      with N+1 patterns) or `"raise"` (also fail the query that goes over budget with
+      `QueryBudgetExceeded`). Defaults to `"warn"` under `DEBUG`, `"off"` otherwise.
+    - `BASEAPP_CORE_QUERY_BUDGET_MAX_QUERIES` / `BASEAPP_CORE_QUERY_BUDGET_MAX_DURATION`:
+      queries and seconds allowed per operation (default `None`, unlimited).
+    - `BASEAPP_CORE_QUERY_BUDGET_OPERATIONS`: `{operation_name: max_queries}` overrides.
+    - `BASEAPP_CORE_QUERY_BUDGET_N_PLUS_ONE_THRESHOLD`: executions of the same shape
+      flagged as N+1 (default `5`).
+    """
+
+    def __init__(
+        self,
+        operation_name: str | None = None,
+        mode: str | None = None,
+        max_queries: int | None = None,
+        max_duration: float | None = None,
+        n_plus_one_threshold: int | None = None,
+    ) -> None:
+        self.operation_name = operation_name
+        self.mode = get_query_budget_mode() if mode is None else mode
+        self.max_queries = (
+            _get_setting("OPERATIONS", {}).get(operation_name, _get_setting("MAX_QUERIES", None))
+            if max_queries is None
+            else max_queries
+        )
+        self.max_duration = (
+            _get_setting("MAX_DURATION", None) if max_duration is None else max_duration
+        )
+        self.n_plus_one_threshold = (
+            _get_setting("N_PLUS_ONE_THRESHOLD", 5)
+            if n_plus_one_threshold is None
+            else n_plus_one_threshold
+        )
+        self.count = 0
+        self.duration = 0.0
+        self.exceeded = False
+        self.closed = False
+        self.shapes: dict[str, QueryShape] = {}
+        # Websocket resolvers of the same operation run in several threads
+        self._lock = threading.Lock()
+
+    def before_query(self) -> None:
+        over_count = self.max_queries is not None and self.count >= self.max_queries
+        over_duration = self.max_duration is not None and self.duration >= self.max_duration
+        if not (over_count or over_duration):
+            return
+
+        self.exceeded = True
+        if self.mode == MODE_RAISE:
+            raise QueryBudgetExceeded(
+                f"Operation exceeded its database budget ({self.count} queries, "
+                f"{_ms(self.duration)}ms)."
+            )
+
+    def record(self, sql: str, duration: float) -> None:
+        shape_sql = get_query_shape(sql)
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            if (shape := self.shapes.get(shape_sql)) is None:
+                shape = self.shapes[shape_sql] = QueryShape(shape_sql)
+            shape.count += 1
+            shape.duration += duration
+
+    @property
+    def n_plus_one(self) -> list[QueryShape]:
+        repeated = [
+            shape for shape in self.shapes.values() if shape.count >= self.n_plus_one_threshold
+        ]
+        return sorted(repeated, key=lambda shape: shape.count, reverse=True)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "duration_ms": _ms(self.duration),
+            "budget": self.max_queries,
+            "exceeded": self.exceeded,
+            "n_plus_one": [shape.as_dict() for shape in self.n_plus_one],
+        }
+
+    def log_fields(self) -> dict[str, Any]:
+        """Structured fields added by `BaseJSONFormatter` to records logged meanwhile."""
+        return {
+            "graphql.operation.name": self.operation_name,
+            "db.query.count": self.count,
+            "db.query.duration_ms": _ms(self.duration),
+        }
+
+    def report(self) -> None:
+        n_plus_one = self.n_plus_one
+        if not (self.exceeded or n_plus_one):
+            return
+        logger.warning(
+            "Operation %s ran %d queries in %sms%s%s",
+            self.operation_name or "<anonymous>",
+            self.count,
+            _ms(self.duration),
+            f", over its budget of {self.max_queries}" if self.exceeded else "",
+            f", {len(n_plus_one)} repeated query shapes" if n_plus_one else "",
+            extra={
+                **self.log_fields(),
+                "db.query.budget": self.max_queries,
+                "db.query.budget_exceeded": self.exceeded,
+                "db.query.n_plus_one": [shape.as_dict() for shape in n_plus_one],
+            },
+        )
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def get_current_query_tracker() -> QueryTracker | None:
+    tracker = _current_tracker.get()
+    return None if tracker is None or tracker.closed else tracker
+
+
+@contextmanager
+def track_queries(operation_name: str | None = None) -> Generator[QueryTracker | None, None, None]:
+    """
+    Track the queries run within the block, including resolvers offloaded to threads
+    with a copy of the context. Yields `None` when the budget mode is `"off"`.
+    """
+    if get_query_budget_mode() == MODE_OFF:
+        yield None
+        return
+
+    tracker = QueryTracker(operation_name)
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        # Tasks spawned within the block (subscription streams) keep the tracker in their
+        # context, so it's closed rather than only unset
+        tracker.closed = True
+        _current_tracker.reset(token)
+        tracker.report()
+
+
+def query_budget_execute_wrapper(execute, sql, params, many, context) -> Any:
+    """Connection execute wrapper feeding the current `QueryTracker`, if any."""
+    tracker = _current_tracker.get()
+    if tracker is None or tracker.closed or not is_tracked_query(sql):
+        return execute(sql, params, many, context)
+
+    tracker.before_query()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        tracker.record(sql, time.perf_counter() - start)
+
+
+def install_query_budget_execute_wrapper(
+    sender: Any = None, connection: Any = None, **kwargs
+) -> None:
+    """`connection_created` receiver, connected in `PackageConfig.ready`."""
+    if query_budget_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_budget_execute_wrapper)
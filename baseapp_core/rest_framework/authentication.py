@@ -0,0 +1,65 @@
+import hashlib
+from typing import Any
+
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from baseapp_core.user_cache import user_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` resolving users through `user_cache`, keyed by the token's user
+    id and `jti`. A cached user already passed the active and revoked token checks.
+    """
+
+    def get_user(self, validated_token: Any) -> Any:
+        if not user_cache.enabled:
+            return super().get_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        token_id = (
+            validated_token.get(api_settings.JTI_CLAIM)
+            or hashlib.sha256(str(validated_token).encode("utf-8")).hexdigest()
+        )
+        return user_cache.get_or_load(
+            user_cache.jwt_key(user_id, token_id),
+            lambda: super(CachedJWTAuthentication, self).get_user(validated_token),
+            user_id=user_id,
+        )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    `TokenAuthentication` resolving users through `user_cache`. On cache hits
+    `request.auth` is a `Token` built from the key and the cached user rather than loaded.
+    """
+
+    def authenticate_credentials(self, key: str) -> tuple[Any, Any]:
+        if not user_cache.enabled:
+            return super().authenticate_credentials(key)
+
+        auth = None
+
+        def load() -> Any:
+            nonlocal auth
+            auth = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+            return auth[0]
+
+        user = user_cache.get_or_load(user_cache.token_key(key), load)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        if auth is not None:
+            return auth
+        # Shaped like a loaded token, its other fields are deferred
+        Token = self.get_model()
+        token = Token.from_db(router.db_for_read(Token), ["key", "user_id"], [key, user.pk])
+        token.user = user
+        return user, token
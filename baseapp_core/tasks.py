@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from baseapp_core.backfill import METHOD_SQL, DocumentIdBackfiller
+
+
+@shared_task
+def backfill_document_id_chunk(chunk_pk, batch_size=1000, method=METHOD_SQL) -> int:
+    """Backfill the DocumentId rows of a single persisted `DocumentIdBackfillChunk`."""
+    from baseapp_core.models import DocumentIdBackfillChunk
+
+    chunk = DocumentIdBackfillChunk.objects.select_related("content_type").get(pk=chunk_pk)
+    model = chunk.content_type.model_class()
+    if chunk.is_completed or model is None:
+        return 0
+
+    backfiller = DocumentIdBackfiller(batch_size=batch_size, method=method, checkpoint=True)
+    _, created = backfiller.backfill_chunk(model, chunk)
+    return created
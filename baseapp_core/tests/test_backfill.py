@@ -2,14 +2,21 @@ from unittest.mock import patch
 
 import pytest
 from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.core.management.base import CommandError
 
 from baseapp_core.backfill import (
+    METHOD_SQL,
+    BackfillStats,
+    DocumentIdBackfiller,
     backfill_all_models,
     backfill_model_document_ids,
     backfill_single_instance,
+    get_backfill_progress,
     get_models_with_document_id_mixin,
 )
-from baseapp_core.models import DocumentId
+from baseapp_core.models import DocumentId, DocumentIdBackfillChunk
+from baseapp_core.tasks import backfill_document_id_chunk
 from testproject.testapp.models import DummyPublicIdModel
 from testproject.testapp.tests.factories import DummyPublicIdModelFactory
 
@@ -321,14 +328,125 @@ class TestBackfillModelExceptionPaths:
         DocumentId.objects.filter(object_id__in=[i.pk for i in instances]).delete()
         return instances
 
-    def test_handles_bulk_create_failure(self, dummy_instances) -> None:
-        """Test that bulk_create failures are handled gracefully (lines 143-148)."""
+    def test_bulk_create_failure_leaves_the_chunk_to_retry(self, dummy_instances) -> None:
+        """A failed page is raised, without advancing the cursor or completing the chunk."""
+        ct = ContentType.objects.get_for_model(DummyPublicIdModel)
+        backfiller = DocumentIdBackfiller(batch_size=2, checkpoint=True)
+
         with patch.object(DocumentId.objects, "bulk_create", side_effect=Exception("DB error")):
-            created_count = backfill_model_document_ids(
-                model=DummyPublicIdModel,
-                DocumentId=DocumentId,
-                batch_size=10,
-                dry_run=False,
-            )
+            with pytest.raises(Exception, match="DB error"):
+                backfiller.backfill_model(DummyPublicIdModel)
+
+        [chunk] = DocumentIdBackfillChunk.objects.filter(content_type=ct)
+        assert chunk.last_pk is None
+        assert not chunk.is_completed
+
+        assert backfiller.backfill_model(DummyPublicIdModel) == len(dummy_instances)
+
+
+@pytest.mark.django_db
+class TestKeysetBackfill:
+    @pytest.fixture
+    def dummy_instances(self) -> list[DummyPublicIdModel]:
+        DocumentId.objects.all().delete()
+        instances = [DummyPublicIdModelFactory() for _ in range(7)]
+        DocumentId.objects.filter(object_id__in=[i.pk for i in instances]).delete()
+        return instances
+
+    def test_sql_method_creates_document_ids(self, dummy_instances) -> None:
+        ct = ContentType.objects.get_for_model(DummyPublicIdModel)
+        backfiller = DocumentIdBackfiller(batch_size=3, method=METHOD_SQL)
+
+        created_count = backfiller.backfill_model(DummyPublicIdModel)
+
+        assert created_count == len(dummy_instances)
+        assert DocumentId.objects.filter(content_type=ct).count() == len(dummy_instances)
+        [stats] = backfiller.stats
+        assert stats.processed == len(dummy_instances)
+        assert stats.percent == 100.0
+
+    def test_sql_method_dry_run_does_not_create(self, dummy_instances) -> None:
+        created_count = DocumentIdBackfiller(
+            batch_size=3, method=METHOD_SQL, dry_run=True
+        ).backfill_model(DummyPublicIdModel)
 
         assert created_count == 0
+        assert not DocumentId.objects.filter(object_id__in=[i.pk for i in dummy_instances]).exists()
+
+    def test_checkpointed_backfill_resumes_from_last_pk(self, dummy_instances) -> None:
+        ct = ContentType.objects.get_for_model(DummyPublicIdModel)
+        backfiller = DocumentIdBackfiller(batch_size=2, method=METHOD_SQL, checkpoint=True)
+        [chunk] = backfiller.plan_chunks(DummyPublicIdModel, ct)
+
+        # Simulate a crash after the first three rows were committed
+        chunk.last_pk = dummy_instances[2].pk
+        chunk.save()
+
+        created_count = backfiller.backfill_model(DummyPublicIdModel)
+
+        assert created_count == len(dummy_instances) - 3
+        chunk.refresh_from_db()
+        assert chunk.is_completed
+        assert chunk.last_pk == dummy_instances[-1].pk
+        assert backfiller.backfill_model(DummyPublicIdModel) == 0
+
+        progress = get_backfill_progress(DummyPublicIdModel)
+        assert progress.percent == 100.0
+        assert progress.created == len(dummy_instances) - 3
+
+    def test_plan_chunks_splits_pk_range_per_worker(self, dummy_instances) -> None:
+        ct = ContentType.objects.get_for_model(DummyPublicIdModel)
+        backfiller = DocumentIdBackfiller(workers=2, chunks_per_worker=2)
+
+        chunks = backfiller.plan_chunks(DummyPublicIdModel, ct)
+
+        assert len(chunks) == 4
+        assert chunks[0].range_start == dummy_instances[0].pk
+        assert chunks[-1].range_end == dummy_instances[-1].pk
+        for previous, chunk in zip(chunks, chunks[1:]):
+            assert chunk.range_start == previous.range_end + 1
+
+    def test_celery_task_backfills_persisted_chunk(self, dummy_instances) -> None:
+        ct = ContentType.objects.get_for_model(DummyPublicIdModel)
+        [chunk] = DocumentIdBackfiller(checkpoint=True).plan_chunks(DummyPublicIdModel, ct)
+
+        assert backfill_document_id_chunk(chunk.pk, batch_size=2) == len(dummy_instances)
+        assert backfill_document_id_chunk(chunk.pk, batch_size=2) == 0
+
+    def test_celery_command_enqueues_persisted_chunks(self, dummy_instances) -> None:
+        with patch(
+            "baseapp_core.tasks.backfill_document_id_chunk.delay",
+            side_effect=lambda chunk_pk, **kwargs: backfill_document_id_chunk(chunk_pk, **kwargs),
+        ) as delay:
+            call_command(
+                "backfill_document_ids", "--celery", "--app", "testapp", "--batch-size", "2"
+            )
+
+        assert delay.call_count > 0
+        for call in delay.call_args_list:
+            assert call.args[0] is not None
+            assert call.kwargs == {"batch_size": 2, "method": METHOD_SQL}
+        assert DocumentId.objects.filter(
+            object_id__in=[i.pk for i in dummy_instances],
+            content_type=ContentType.objects.get_for_model(DummyPublicIdModel),
+        ).count() == len(dummy_instances)
+
+    def test_celery_command_rejects_dry_run(self, dummy_instances) -> None:
+        with patch("baseapp_core.tasks.backfill_document_id_chunk.delay") as delay:
+            with pytest.raises(CommandError):
+                call_command("backfill_document_ids", "--celery", "--dry-run")
+
+        delay.assert_not_called()
+
+
+class TestBackfillStats:
+    def test_rate_and_eta(self) -> None:
+        stats = BackfillStats(label="testapp.model", total=1000, covered=250, processed=200)
+        stats.elapsed = 10.0
+
+        assert stats.rate == 20.0
+        assert stats.eta == 30.0
+        assert "25.0%" in str(stats)
+
+    def test_eta_is_unknown_before_progress(self) -> None:
+        assert BackfillStats(label="testapp.model", total=1000).eta is None
@@ -0,0 +1,118 @@
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from baseapp_core.document_id_cache import DocumentIdMappingCache
+from baseapp_core.models import DocumentId
+from testproject.testapp.tests.factories import DummyPublicIdModelFactory
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "document_ids": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "document-ids",
+    },
+}
+
+
+class TestDocumentIdMappingCache:
+    def test_disabled_by_default(self) -> None:
+        cache = DocumentIdMappingCache(maxsize=0)
+        cache.set("0b3b9f3e-6a5e-4e8f-9a8a-5f7d6f8c9b1a", 1, 2)
+        assert cache.get("0b3b9f3e-6a5e-4e8f-9a8a-5f7d6f8c9b1a") is None
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache = DocumentIdMappingCache(maxsize=2, cache_alias="")
+        first, second, third = (
+            "00000000-0000-4000-8000-000000000001",
+            "00000000-0000-4000-8000-000000000002",
+            "00000000-0000-4000-8000-000000000003",
+        )
+        cache.set(first, 1, 1)
+        cache.set(second, 1, 2)
+        assert cache.get(first) == (1, 1)
+
+        cache.set(third, 1, 3)
+
+        assert cache.get(second) is None
+        assert cache.get(first) == (1, 1)
+        assert cache.get(third) == (1, 3)
+
+    def test_invalidate_and_invalid_keys(self) -> None:
+        cache = DocumentIdMappingCache(maxsize=10, cache_alias="")
+        public_id = "00000000-0000-4000-8000-000000000001"
+        cache.set(public_id, 1, 1)
+        cache.invalidate(public_id.upper())
+        assert cache.get(public_id) is None
+        assert cache.get("not-a-uuid") is None
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_shared_tier_refills_local_tier(self) -> None:
+        public_id = "00000000-0000-4000-8000-000000000001"
+        writer = DocumentIdMappingCache(maxsize=10, cache_alias="document_ids")
+        reader = DocumentIdMappingCache(maxsize=10, cache_alias="document_ids")
+        writer.set(public_id, 4, 2)
+
+        assert reader.get(public_id) == (4, 2)
+        assert len(reader) == 1
+
+        writer.invalidate(public_id)
+        reader.clear()
+        assert reader.get(public_id) is None
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_shared_clear_drops_shared_entries_of_every_process(self) -> None:
+        public_id = "00000000-0000-4000-8000-000000000001"
+        writer = DocumentIdMappingCache(maxsize=10, cache_alias="document_ids")
+        reader = DocumentIdMappingCache(maxsize=10, cache_alias="document_ids")
+        writer.set(public_id, 4, 2)
+
+        # e.g. the listener of `writer` reconnected after missing notifications
+        writer.clear(shared=True)
+        reader.clear()
+
+        assert reader.get(public_id) is None
+        assert writer.get(public_id) is None
+
+
+@pytest.mark.django_db
+class TestDocumentIdCacheIntegration:
+    @pytest.fixture(autouse=True)
+    def mapping_cache(self, settings) -> Generator[DocumentIdMappingCache, None, None]:
+        settings.BASEAPP_CORE_DOCUMENT_ID_CACHE_LISTENER = False
+        cache = DocumentIdMappingCache(maxsize=100, cache_alias="")
+        with patch("baseapp_core.document_id_cache.mapping_cache", cache):
+            yield cache
+
+    def test_hot_public_id_is_resolved_without_queries(self, mapping_cache) -> None:
+        obj = DummyPublicIdModelFactory()
+        public_id = DocumentId.get_public_id_from_object(obj)
+
+        first = DocumentId.get_content_type_and_id_by_public_id(public_id)
+        with CaptureQueriesContext(connection) as ctx:
+            second = DocumentId.get_content_type_and_id_by_public_id(public_id)
+
+        assert first == second == (ContentType.objects.get_for_model(obj), obj.pk)
+        assert len(ctx.captured_queries) == 0
+
+    def test_misses_are_not_cached(self, mapping_cache) -> None:
+        assert (
+            DocumentId.get_content_type_and_id_by_public_id("00000000-0000-4000-8000-000000000001")
+            is None
+        )
+        assert len(mapping_cache) == 0
+
+    def test_get_object_by_public_id_uses_cached_mapping(self, mapping_cache) -> None:
+        obj = DummyPublicIdModelFactory()
+        public_id = DocumentId.get_public_id_from_object(obj)
+        DocumentId.get_content_type_and_id_by_public_id(public_id)
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert DocumentId.get_object_by_public_id(public_id) == obj
+        # Only the object itself is fetched
+        assert len(ctx.captured_queries) == 1
@@ -0,0 +1,98 @@
+import uuid
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from baseapp_core.loaders import (
+    DocumentIdLoader,
+    document_id_loader_scope,
+    get_document_id_loader,
+)
+from baseapp_core.models import DocumentId
+from testproject.testapp.models import DummyLegacyModel
+from testproject.testapp.tests.factories import DummyPublicIdModelFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_loader_is_only_active_inside_scope() -> None:
+    assert get_document_id_loader() is None
+    with document_id_loader_scope() as loader:
+        assert get_document_id_loader() is loader
+    assert get_document_id_loader() is None
+
+
+def test_loader_is_memoised_on_context() -> None:
+    class Context:
+        pass
+
+    context = Context()
+    with document_id_loader_scope(context) as first:
+        pass
+    with document_id_loader_scope(context) as second:
+        pass
+    assert first is second
+
+
+def test_primed_objects_are_loaded_with_a_single_query() -> None:
+    objs = [DummyPublicIdModelFactory() for _ in range(5)]
+    expected = {obj.pk: DocumentId.get_public_id_from_object(obj) for obj in objs}
+
+    with document_id_loader_scope() as loader:
+        loader.prime_objects(objs)
+        with CaptureQueriesContext(connection) as ctx:
+            public_ids = {obj.pk: DocumentId.get_public_id_from_object(obj) for obj in objs}
+
+    assert public_ids == expected
+    assert len(ctx.captured_queries) == 1
+
+
+def test_reverse_lookup_is_answered_from_memo() -> None:
+    obj = DummyPublicIdModelFactory()
+
+    with document_id_loader_scope():
+        public_id = DocumentId.get_public_id_from_object(obj)
+        with CaptureQueriesContext(connection) as ctx:
+            content_type, object_id = DocumentId.get_content_type_and_id_by_public_id(public_id)
+
+    assert len(ctx.captured_queries) == 0
+    assert content_type == ContentType.objects.get_for_model(obj)
+    assert object_id == obj.pk
+
+
+def test_primed_public_ids_are_loaded_with_a_single_query() -> None:
+    objs = [DummyPublicIdModelFactory() for _ in range(3)]
+    public_ids = [DocumentId.get_public_id_from_object(obj) for obj in objs]
+
+    with document_id_loader_scope() as loader:
+        loader.prime_public_ids([*public_ids, uuid.uuid4()])
+        with CaptureQueriesContext(connection) as ctx:
+            results = [DocumentId.get_content_type_and_id_by_public_id(p) for p in public_ids]
+
+    assert len(ctx.captured_queries) == 1
+    assert [object_id for _, object_id in results] == [obj.pk for obj in objs]
+
+
+def test_get_object_by_public_id_delegates_to_loader() -> None:
+    obj = DummyPublicIdModelFactory()
+    public_id = DocumentId.get_public_id_from_object(obj)
+
+    with document_id_loader_scope():
+        assert DocumentId.get_object_by_public_id(public_id) == obj
+        assert DocumentId.get_object_by_public_id(public_id, model_class=DummyLegacyModel) is None
+        assert DocumentId.get_object_by_public_id(uuid.uuid4()) is None
+
+
+def test_missing_mapping_is_not_memoised() -> None:
+    obj = DummyPublicIdModelFactory()
+    DocumentId.objects.filter(
+        content_type=ContentType.objects.get_for_model(obj), object_id=obj.pk
+    ).delete()
+
+    loader = DocumentIdLoader()
+    assert loader.load_public_id(obj) is None
+
+    document = DocumentId.get_or_create_for_object(obj)
+    assert loader.load_public_id(obj) == document.public_id
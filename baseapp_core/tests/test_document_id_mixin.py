@@ -1,11 +1,15 @@
 import uuid
 
+import pgtrigger
 import pytest
 from django.contrib.contenttypes.models import ContentType
 
 from baseapp_core.models import DocumentId
-from testproject.testapp.models import DummyPublicIdModel
-from testproject.testapp.tests.factories import DummyPublicIdModelFactory
+from testproject.testapp.models import DummyBulkPublicIdModel, DummyPublicIdModel
+from testproject.testapp.tests.factories import (
+    DummyBulkPublicIdModelFactory,
+    DummyPublicIdModelFactory,
+)
 
 
 @pytest.mark.django_db
@@ -95,3 +99,40 @@ class TestDocumentIdMixin:
         triggers = getattr(DummyPublicIdModel._meta, "triggers", [])
         trigger_names = [t.name for t in triggers]
         assert "delete_document_id" in trigger_names
+
+
+@pytest.mark.django_db
+class TestStatementLevelDocumentIdTriggers:
+    @pytest.fixture
+    def bulk_content_type(self) -> ContentType:
+        return ContentType.objects.get_for_model(DummyBulkPublicIdModel)
+
+    def test_triggers_are_statement_level(self) -> None:
+        triggers = {t.name: t for t in DummyBulkPublicIdModel._meta.triggers}
+        assert triggers["insert_document_id"].level == pgtrigger.Statement
+        assert triggers["delete_document_id"].level == pgtrigger.Statement
+        row_triggers = {t.name: t for t in DummyPublicIdModel._meta.triggers}
+        assert row_triggers["insert_document_id"].level == pgtrigger.Row
+
+    def test_bulk_create_creates_document_ids(self, bulk_content_type) -> None:
+        objs = DummyBulkPublicIdModel.objects.bulk_create(
+            [DummyBulkPublicIdModel(name=f"bulk {i}") for i in range(20)]
+        )
+
+        documents = DocumentId.objects.filter(content_type=bulk_content_type)
+        assert set(documents.values_list("object_id", flat=True)) == {obj.pk for obj in objs}
+        assert documents.values("public_id").distinct().count() == 20
+
+    def test_queryset_delete_removes_only_deleted_document_ids(self, bulk_content_type) -> None:
+        kept = DummyBulkPublicIdModelFactory()
+        DummyBulkPublicIdModelFactory.create_batch(5)
+        public_obj = DummyPublicIdModelFactory(id=kept.pk)
+
+        DummyBulkPublicIdModel.objects.exclude(pk=kept.pk).delete()
+
+        assert list(
+            DocumentId.objects.filter(content_type=bulk_content_type).values_list(
+                "object_id", flat=True
+            )
+        ) == [kept.pk]
+        assert DocumentId.get_public_id_from_object(public_obj) is not None
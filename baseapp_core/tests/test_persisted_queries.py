@@ -0,0 +1,101 @@
+from unittest.mock import patch
+
+import graphql
+import pytest
+from graphene_django.settings import graphene_settings
+
+from baseapp_core.graphql.persisted_queries import (
+    DocumentCache,
+    document_cache,
+    get_query_hash,
+    persisted_query_registry,
+)
+from baseapp_core.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+QUERY = """
+    query GetUser($id: ID!) {
+        user(id: $id) {
+            id
+        }
+    }
+"""
+
+
+def persisted_query_extension(query: str) -> dict:
+    return {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": get_query_hash(query)}}}
+
+
+@pytest.fixture(autouse=True)
+def clear_caches() -> None:
+    document_cache.clear()
+    persisted_query_registry.cache.clear()
+
+
+def test_unknown_hash_returns_persisted_query_not_found(graphql_client) -> None:
+    response = graphql_client(None, extra=persisted_query_extension(QUERY))
+    content = response.json()
+
+    assert content["errors"][0]["message"] == "PersistedQueryNotFound"
+    assert content["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+
+
+def test_registered_hash_is_executed_without_query(graphql_client) -> None:
+    user = UserFactory()
+
+    response = graphql_client(
+        QUERY, variables={"id": user.relay_id}, extra=persisted_query_extension(QUERY)
+    )
+    assert response.json()["data"]["user"]["id"] == user.relay_id
+
+    response = graphql_client(
+        None, variables={"id": user.relay_id}, extra=persisted_query_extension(QUERY)
+    )
+    assert response.json()["data"]["user"]["id"] == user.relay_id
+
+
+def test_mismatched_hash_is_rejected(graphql_client) -> None:
+    extra = persisted_query_extension("query { __typename }")
+    response = graphql_client(QUERY, variables={"id": "1"}, extra=extra)
+
+    assert response.json()["errors"][0]["message"] == "provided sha does not match query"
+
+
+def test_repeated_operations_skip_parsing(graphql_client) -> None:
+    user = UserFactory()
+
+    with patch("baseapp_core.graphql.persisted_queries.parse", wraps=graphql.parse) as parse:
+        for _ in range(3):
+            response = graphql_client(QUERY, variables={"id": user.relay_id})
+            assert response.json()["data"]["user"]["id"] == user.relay_id
+
+    assert parse.call_count == 1
+
+
+def test_document_cache_evicts_least_recently_used() -> None:
+    schema = graphene_settings.SCHEMA.graphql_schema
+    cache = DocumentCache(maxsize=2)
+    first, second, third = "{ __typename }", "query A { __typename }", "query B { __typename }"
+
+    first_document, _ = cache.get_document(schema, first)
+    cache.get_document(schema, second)
+    assert cache.get_document(schema, first)[0] is first_document
+
+    cache.get_document(schema, third)
+
+    assert len(cache) == 2
+    assert cache.get_document(schema, first)[0] is first_document
+
+
+def test_document_cache_keeps_validation_errors() -> None:
+    schema = graphene_settings.SCHEMA.graphql_schema
+    cache = DocumentCache(maxsize=10)
+
+    document, errors = cache.get_document(schema, "{ doesNotExist }")
+    assert document is not None
+    assert errors
+
+    document, errors = cache.get_document(schema, "{ invalid")
+    assert document is None
+    assert errors
@@ -0,0 +1,126 @@
+import logging
+
+import pytest
+from django.contrib.auth import get_user_model
+
+from baseapp_core.logging import BaseJSONFormatter
+from baseapp_core.query_budget import (
+    QueryBudgetExceeded,
+    QueryTracker,
+    get_query_shape,
+    track_queries,
+)
+from baseapp_core.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+USERS_QUERY = """
+    query Users {
+        users(first: 5) {
+            edges {
+                node {
+                    id
+                }
+            }
+        }
+    }
+"""
+
+
+@pytest.fixture
+def budget_settings(settings):
+    settings.BASEAPP_CORE_QUERY_BUDGET_MODE = "warn"
+    settings.BASEAPP_CORE_QUERY_BUDGET_REPORT = True
+    return settings
+
+
+def test_query_shape_collapses_literals_and_in_lists() -> None:
+    assert get_query_shape('SELECT * FROM "t" WHERE "id" IN (%s, %s, %s) LIMIT 21') == (
+        'SELECT * FROM "t" WHERE "id" IN (%s, ...) LIMIT %s'
+    )
+    assert get_query_shape('SELECT * FROM "t" WHERE "name" = \'a\'') == (
+        'SELECT * FROM "t" WHERE "name" = %s'
+    )
+
+
+def test_repeated_shapes_are_flagged_as_n_plus_one() -> None:
+    tracker = QueryTracker(mode="warn", n_plus_one_threshold=3)
+    for pk in range(3):
+        tracker.record(f'SELECT * FROM "t" WHERE "id" = {pk}', 0.001)
+    tracker.record('SELECT * FROM "other"', 0.001)
+
+    assert tracker.count == 4
+    assert [(shape.sql, shape.count) for shape in tracker.n_plus_one] == [
+        ('SELECT * FROM "t" WHERE "id" = %s', 3)
+    ]
+
+
+def test_operation_is_tracked_and_logged(budget_settings, caplog) -> None:
+    budget_settings.BASEAPP_CORE_QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = 3
+    users = UserFactory.create_batch(3)
+
+    with caplog.at_level(logging.WARNING, logger="baseapp_core.query_budget"):
+        with track_queries("Users") as tracker:
+            for user in users:
+                User.objects.get(pk=user.pk)
+
+    assert tracker.count == 3
+    assert len(tracker.n_plus_one) == 1
+    record = caplog.records[0]
+    assert record.__dict__["db.query.count"] == 3
+    assert record.__dict__["graphql.operation.name"] == "Users"
+
+
+def test_raise_mode_blocks_queries_over_budget(budget_settings) -> None:
+    budget_settings.BASEAPP_CORE_QUERY_BUDGET_MODE = "raise"
+    budget_settings.BASEAPP_CORE_QUERY_BUDGET_MAX_QUERIES = 1
+
+    with track_queries() as tracker:
+        User.objects.count()
+        with pytest.raises(QueryBudgetExceeded):
+            User.objects.count()
+
+    assert tracker.exceeded
+
+
+def test_off_mode_does_not_track(settings) -> None:
+    settings.BASEAPP_CORE_QUERY_BUDGET_MODE = "off"
+
+    with track_queries() as tracker:
+        User.objects.count()
+
+    assert tracker is None
+
+
+def test_json_formatter_adds_operation_query_fields(budget_settings) -> None:
+    formatter = BaseJSONFormatter()
+    record = logging.LogRecord("test", logging.INFO, "", 0, "msg", None, None)
+
+    with track_queries("Users"):
+        User.objects.count()
+        result = formatter.json_record("msg", {}, record)
+
+    assert result["graphql.operation.name"] == "Users"
+    assert result["db.query.count"] == 1
+
+
+def test_queries_are_reported_in_extensions(budget_settings, graphql_client) -> None:
+    UserFactory()
+
+    content = graphql_client(USERS_QUERY).json()
+
+    assert content["extensions"]["queries"]["count"] >= 1
+    assert content["extensions"]["queries"]["exceeded"] is False
+
+
+def test_operation_over_budget_fails_in_raise_mode(budget_settings, graphql_client) -> None:
+    budget_settings.BASEAPP_CORE_QUERY_BUDGET_MODE = "raise"
+    budget_settings.BASEAPP_CORE_QUERY_BUDGET_OPERATIONS = {"Users": 0}
+    UserFactory()
+
+    content = graphql_client(USERS_QUERY).json()
+
+    assert content["errors"][0]["extensions"]["code"] == "QUERY_BUDGET_EXCEEDED"
+    assert content["extensions"]["queries"]["exceeded"] is True
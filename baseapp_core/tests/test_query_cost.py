@@ -0,0 +1,137 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from graphene_django.settings import graphene_settings
+from graphql import get_operation_ast, parse
+
+from baseapp_core.graphql.query_cost import analyze_query_cost
+from baseapp_core.tests.factories import TokenFactory, UserFactory
+
+pytestmark = pytest.mark.django_db
+
+USERS_QUERY = """
+    query Users($first: Int) {
+        users(first: $first) {
+            edges {
+                node {
+                    id
+                }
+            }
+        }
+    }
+"""
+
+
+def get_cost(query: str, variables: dict | None = None):
+    schema = graphene_settings.SCHEMA.graphql_schema
+    document = parse(query)
+    return analyze_query_cost(schema, document, get_operation_ast(document), variables)
+
+
+def test_connection_cost_scales_with_page_size() -> None:
+    small = get_cost(USERS_QUERY, {"first": 5})
+    large = get_cost(USERS_QUERY, {"first": 50})
+
+    assert small.depth == large.depth == 4
+    assert small.nodes == 5
+    assert large.nodes == 50
+    # users + edges + node
+    assert small.complexity == 1 + 5 + 5
+    assert large.complexity > small.complexity
+
+
+def test_missing_page_size_uses_max_limit() -> None:
+    cost = get_cost(USERS_QUERY)
+
+    assert cost.nodes == graphene_settings.RELAY_CONNECTION_MAX_LIMIT
+
+
+def test_introspection_is_free() -> None:
+    cost = get_cost("{ __schema { types { name } } }")
+
+    assert cost.complexity == 0
+    assert cost.depth == 0
+
+
+def test_cost_is_reported_in_extensions(graphql_client) -> None:
+    UserFactory()
+
+    response = graphql_client(USERS_QUERY, variables={"first": 5})
+    content = response.json()
+
+    assert content["extensions"]["cost"] == {"depth": 4, "complexity": 11, "nodes": 5}
+
+
+@pytest.mark.parametrize(
+    "setting,value",
+    [
+        ("BASEAPP_CORE_GRAPHQL_MAX_QUERY_DEPTH", 3),
+        ("BASEAPP_CORE_GRAPHQL_MAX_QUERY_COMPLEXITY", 10),
+        ("BASEAPP_CORE_GRAPHQL_MAX_QUERY_NODES", 4),
+    ],
+)
+def test_operations_above_budget_are_rejected(graphql_client, settings, setting, value) -> None:
+    setattr(settings, setting, value)
+
+    response = graphql_client(USERS_QUERY, variables={"first": 5})
+    content = response.json()
+
+    assert response.status_code == 400
+    assert content["errors"][0]["extensions"]["code"] == "QUERY_TOO_COMPLEX"
+    assert "data" not in content
+
+
+def test_cost_rate_limit_throttles_clients(graphql_client, settings) -> None:
+    settings.BASEAPP_CORE_GRAPHQL_QUERY_COST_RATE_LIMIT = (15, 60)
+    cache.clear()
+
+    first = graphql_client(USERS_QUERY, variables={"first": 5}).json()
+    second = graphql_client(USERS_QUERY, variables={"first": 5}).json()
+
+    assert "errors" not in first
+    assert second["errors"][0]["extensions"]["code"] == "THROTTLED"
+
+
+def test_client_key_is_skipped_without_rate_limit(graphql_client, settings) -> None:
+    settings.BASEAPP_CORE_GRAPHQL_QUERY_COST_RATE_LIMIT = None
+
+    with patch("baseapp_core.graphql.views.GraphQLView.get_client_key") as get_client_key:
+        content = graphql_client(USERS_QUERY, variables={"first": 5}).json()
+
+    assert "errors" not in content
+    get_client_key.assert_not_called()
+
+
+def test_cost_rate_limit_keys_token_users_by_user(graphql_client, settings) -> None:
+    settings.BASEAPP_CORE_GRAPHQL_QUERY_COST_RATE_LIMIT = (15, 60)
+    cache.clear()
+    token = TokenFactory()
+    headers = {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+    # Token users are authenticated before the cost check, so they don't share the budget
+    # of the anonymous clients of their address
+    anonymous = graphql_client(USERS_QUERY, variables={"first": 5}).json()
+    user = graphql_client(USERS_QUERY, variables={"first": 5}, headers=headers).json()
+    throttled = graphql_client(USERS_QUERY, variables={"first": 5}, headers=headers).json()
+
+    assert "errors" not in anonymous
+    assert "errors" not in user
+    assert throttled["errors"][0]["extensions"]["code"] == "THROTTLED"
+
+
+def test_cost_rate_limit_keys_anonymous_clients_by_forwarded_address(
+    graphql_client, settings
+) -> None:
+    settings.BASEAPP_CORE_GRAPHQL_QUERY_COST_RATE_LIMIT = (15, 60)
+    cache.clear()
+
+    first = graphql_client(
+        USERS_QUERY, variables={"first": 5}, headers={"HTTP_X_FORWARDED_FOR": "8.8.8.8"}
+    ).json()
+    second = graphql_client(
+        USERS_QUERY, variables={"first": 5}, headers={"HTTP_X_FORWARDED_FOR": "8.8.4.4"}
+    ).json()
+
+    assert "errors" not in first
+    assert "errors" not in second
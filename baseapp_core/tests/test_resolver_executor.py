@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import graphene
+import pytest
+from graphql import graphql
+
+from baseapp_core.graphql.executors import (
+    INLINE,
+    THREADED,
+    ResolverClassifier,
+    ResolverExecutor,
+    ResolverExecutorMiddleware,
+    inline_resolver,
+)
+from baseapp_core.tests.factories import UserFactory
+
+
+class Item(graphene.ObjectType):
+    name = graphene.String()
+    email = graphene.String()
+    thread = graphene.String()
+    computed = graphene.String()
+    pure = graphene.String()
+
+    def resolve_thread(self, info) -> str:
+        return threading.current_thread().name
+
+    def resolve_computed(self, info) -> str:
+        return self["name"].upper()
+
+    @inline_resolver
+    def resolve_pure(self, info) -> str:
+        return threading.current_thread().name
+
+
+class Query(graphene.ObjectType):
+    item = graphene.Field(Item)
+
+    def resolve_item(self, info) -> dict:
+        return {"name": "item"}
+
+
+schema = graphene.Schema(query=Query)
+
+
+def make_info(type_name: str, field_name: str) -> MagicMock:
+    graphql_schema = schema.graphql_schema
+    return MagicMock(
+        schema=graphql_schema,
+        parent_type=graphql_schema.get_type(type_name),
+        field_name=field_name,
+    )
+
+
+class TestResolverClassifier:
+    def test_default_resolver_on_dict_runs_inline(self) -> None:
+        assert ResolverClassifier().classify({"name": "x"}, make_info("Item", "name")) == INLINE
+
+    def test_custom_resolvers_are_threaded(self) -> None:
+        classifier = ResolverClassifier()
+        assert classifier.classify({}, make_info("Item", "computed")) == THREADED
+        assert classifier.classify(None, make_info("Query", "item")) == THREADED
+
+    def test_decorated_resolver_follows_decorator(self) -> None:
+        assert ResolverClassifier().classify({}, make_info("Item", "pure")) == INLINE
+
+    @pytest.mark.django_db
+    def test_model_fields_run_inline_only_when_loaded(self) -> None:
+        user = UserFactory()
+        User = type(user)
+        classifier = ResolverClassifier()
+        info = make_info("Item", "email")
+
+        assert classifier.classify(User.objects.get(pk=user.pk), info) == INLINE
+        assert classifier.classify(User.objects.only("pk").get(pk=user.pk), info) == THREADED
+
+
+class TestResolverExecutor:
+    @pytest.mark.asyncio
+    async def test_records_queue_wait_when_saturated(self) -> None:
+        executor = ResolverExecutor(max_workers=1)
+
+        await asyncio.gather(*(executor.run(time.sleep, 0.05) for _ in range(3)))
+        stats = executor.stats()
+        executor.shutdown()
+
+        assert stats.max_workers == 1
+        assert stats.threaded == 3
+        assert stats.queued == stats.running == 0
+        assert stats.queue_wait_max >= 0.05
+        assert stats.queue_wait_avg > 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_only_threads_blocking_resolvers() -> None:
+    middleware = ResolverExecutorMiddleware(max_workers=2, thread_name_prefix="test-resolver")
+
+    result = await graphql(
+        schema.graphql_schema,
+        "{ item { name thread computed pure } }",
+        middleware=[middleware],
+    )
+    middleware.executor.shutdown()
+
+    assert result.errors is None
+    item = result.data["item"]
+    assert item["name"] == "item"
+    assert item["computed"] == "ITEM"
+    assert item["thread"].startswith("test-resolver")
+    assert not item["pure"].startswith("test-resolver")
+
+    stats = middleware.executor.stats()
+    # `item`, `thread` and `computed` are threaded, `name` and `pure` inline
+    assert stats.threaded == 3
+    assert stats.inline == 2
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from baseapp_core.graphql.subscription_groups import (
+    SubscriptionGroupsConsumerMixin,
+    join_subscription_groups,
+)
+
+
+def make_consumer() -> SubscriptionGroupsConsumerMixin:
+    consumer = SubscriptionGroupsConsumerMixin()
+    consumer.channel_name = "channel"
+    consumer._channel_layer = SimpleNamespace(group_add=AsyncMock(), group_discard=AsyncMock())
+    consumer._subscriptions = {
+        "1": SimpleNamespace(groups=["profile-1"]),
+        "2": SimpleNamespace(groups=["profile-2"]),
+    }
+    consumer._sids_by_group = {"profile-1": ["1"], "profile-2": ["2"]}
+    return consumer
+
+
+@pytest.mark.asyncio
+async def test_join_and_leave_group() -> None:
+    consumer = make_consumer()
+
+    await consumer.subscription_join_group({"group": "profile-1", "other_group": "room-1"})
+    await consumer.subscription_join_group({"group": "profile-1", "other_group": "room-1"})
+
+    assert consumer._sids_by_group["room-1"] == ["1"]
+    assert consumer._subscriptions["1"].groups == ["profile-1", "room-1"]
+    consumer._channel_layer.group_add.assert_awaited_once_with("room-1", "channel")
+
+    await consumer.subscription_leave_group({"group": "profile-1", "other_group": "room-1"})
+
+    assert "room-1" not in consumer._sids_by_group
+    assert consumer._subscriptions["1"].groups == ["profile-1"]
+    consumer._channel_layer.group_discard.assert_awaited_once_with("room-1", "channel")
+
+
+@pytest.mark.asyncio
+async def test_join_ignores_unknown_groups() -> None:
+    consumer = make_consumer()
+
+    await consumer.subscription_join_group({"group": "profile-3", "other_group": "room-1"})
+
+    assert "room-1" not in consumer._sids_by_group
+    consumer._channel_layer.group_add.assert_not_awaited()
+
+
+def test_join_groups_sends_once_per_group() -> None:
+    subscription = SimpleNamespace(_group_name=lambda group: f"sub-{group}")
+    channel_layer = SimpleNamespace(group_send=AsyncMock())
+
+    with patch("channels.layers.get_channel_layer", return_value=channel_layer):
+        join_subscription_groups(
+            [(subscription, "profile-1"), (subscription, "profile-2"), (subscription, "profile-1")],
+            "room-1",
+        )
+
+    assert sorted(call.args[0] for call in channel_layer.group_send.await_args_list) == [
+        "sub-profile-1",
+        "sub-profile-2",
+    ]
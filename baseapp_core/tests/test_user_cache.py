@@ -0,0 +1,160 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from baseapp_core.authentication import get_user_from_access_token, get_user_from_token
+from baseapp_core.graphql.middlewares import (
+    JWTAuthentication,
+    TokenAuthentication,
+    authenticate_context,
+)
+from baseapp_core.rest_framework.authentication import CachedTokenAuthentication
+from baseapp_core.tests.factories import TokenFactory, UserFactory
+from baseapp_core.user_cache import AuthenticatedUserCache, invalidate_user
+
+pytestmark = pytest.mark.django_db
+
+USERS_QUERY = """
+    query {
+        first: users(first: 1) { edges { node { id } } }
+        second: users(first: 1) { edges { node { id } } }
+    }
+"""
+
+
+@pytest.fixture(autouse=True)
+def user_cache_enabled(settings) -> None:
+    settings.BASEAPP_CORE_USER_CACHE_TIMEOUT = 60
+
+
+def test_disabled_cache_always_loads(settings) -> None:
+    settings.BASEAPP_CORE_USER_CACHE_TIMEOUT = 0
+    user = UserFactory()
+    cache = AuthenticatedUserCache()
+
+    assert cache.get_or_load("key", lambda: user) is user
+    assert cache.get_or_load("key", lambda: None) is None
+
+
+def test_access_token_user_is_cached() -> None:
+    user = UserFactory()
+    token = str(AccessToken.for_user(user))
+
+    assert get_user_from_access_token(token) == user
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_user_from_access_token(token) == user
+
+    assert len(ctx.captured_queries) == 0
+
+
+def test_user_save_invalidates_cached_user() -> None:
+    user = UserFactory()
+    token = str(AccessToken.for_user(user))
+    get_user_from_access_token(token)
+
+    user.first_name = "Changed"
+    user.save()
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_user_from_access_token(token).first_name == "Changed"
+    assert len(ctx.captured_queries) == 1
+
+
+def test_deactivated_user_is_rejected() -> None:
+    user = UserFactory()
+    token = str(AccessToken.for_user(user))
+    get_user_from_access_token(token)
+
+    user.is_active = False
+    user.save()
+
+    assert get_user_from_access_token(token) is None
+
+
+def test_invalidate_user_drops_updates_bypassing_signals() -> None:
+    user = UserFactory()
+    token = str(AccessToken.for_user(user))
+    get_user_from_access_token(token)
+
+    type(user).objects.filter(pk=user.pk).update(is_staff=True)
+    assert not get_user_from_access_token(token).is_staff
+
+    invalidate_user(user.pk)
+    assert get_user_from_access_token(token).is_staff
+
+
+def test_only_configured_fields_are_cached(settings) -> None:
+    settings.BASEAPP_CORE_USER_CACHE_FIELDS = ["email", "is_active", "password"]
+    user = UserFactory(first_name="Cached")
+    token = str(AccessToken.for_user(user))
+    cache = AuthenticatedUserCache()
+    get_user_from_access_token(token)
+
+    entry = cache.cache.get(cache.jwt_key(user.pk, AccessToken(token)["jti"]))
+    assert entry[2] == {"id": user.pk, "email": user.email, "is_active": True}
+
+    cached_user = get_user_from_access_token(token)
+    with CaptureQueriesContext(connection) as ctx:
+        assert cached_user.first_name == "Cached"
+    assert len(ctx.captured_queries) == 1
+
+
+def test_auth_token_user_is_cached_until_token_is_deleted() -> None:
+    token = TokenFactory()
+
+    assert get_user_from_token(token.key) == token.user
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_user_from_token(token.key) == token.user
+    assert len(ctx.captured_queries) == 0
+
+    token.delete()
+    assert get_user_from_token(token.key) is None
+
+
+def test_cached_token_authentication_returns_a_token() -> None:
+    token = TokenFactory()
+    authentication = CachedTokenAuthentication()
+
+    assert authentication.authenticate_credentials(token.key) == (token.user, token)
+    with CaptureQueriesContext(connection) as ctx:
+        user, auth = authentication.authenticate_credentials(token.key)
+
+    assert len(ctx.captured_queries) == 0
+    assert user == token.user
+    assert isinstance(auth, type(token))
+    assert auth.key == token.key
+    assert auth.user_id == token.user_id
+
+
+def test_graphql_middleware_authenticates_once_per_request(graphql_client) -> None:
+    token = TokenFactory()
+
+    with patch.object(
+        CachedTokenAuthentication,
+        "authenticate_credentials",
+        autospec=True,
+        side_effect=CachedTokenAuthentication.authenticate_credentials,
+    ) as authenticate_credentials:
+        response = graphql_client(USERS_QUERY, headers={"HTTP_AUTHORIZATION": f"Token {token.key}"})
+
+    assert "errors" not in response.json()
+    assert authenticate_credentials.call_count == 1
+
+
+def test_token_and_jwt_middlewares_both_authenticate() -> None:
+    user = UserFactory()
+    context = SimpleNamespace(user=None)
+
+    with (
+        patch.object(TokenAuthentication, "authenticate", return_value=None),
+        patch.object(JWTAuthentication, "authenticate", return_value=(user, None)) as jwt,
+    ):
+        authenticate_context(context, [TokenAuthentication(), JWTAuthentication()])
+        authenticate_context(context, [TokenAuthentication(), JWTAuthentication()])
+
+    assert context.user == user
+    jwt.assert_called_once()
@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import InvalidCacheBackendError, caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "baseapp:auth_user:"
+DEFAULT_FIELDS = ("email", "is_active", "is_staff", "is_superuser", "profile")
+
+
+def _get_setting(name: str, default: Any) -> Any:
+    return getattr(settings, f"BASEAPP_CORE_USER_CACHE_{name}", default)
+
+
+class AuthenticatedUserCache:
+    """
+    Short-lived cache of the users resolved from credentials (JWT access tokens and DRF
+    tokens), so authenticating a request or a websocket connection doesn't hit the
+    database every time.
+
+    - `BASEAPP_CORE_USER_CACHE_TIMEOUT`: seconds a resolved user is kept (default `0`,
+      which disables the cache).
+    - `BASEAPP_CORE_USER_CACHE_ALIAS`: Django cache alias (default `"default"`).
+    - `BASEAPP_CORE_USER_CACHE_FIELDS`: user fields kept in the cache besides the pk
+      (default `DEFAULT_FIELDS`). Cached users are rebuilt with the other fields
+      deferred, so they are loaded from the database when accessed. The password is
+      never cached.
+
+    Entries are keyed by credential (`user id + jti` for JWTs, a digest of the key for DRF
+    tokens) and stamped with a per-user version. Saving or deleting the user replaces the
+    version, which invalidates every cached entry of that user at once: password changes
+    and deactivations take effect on the next request. Writes that bypass model signals
+    (`QuerySet.update`) must call `invalidate_user`, otherwise they are picked up when the
+    entries expire. Only successful resolutions are cached.
+    """
+
+    def __init__(self, timeout: int | None = None, cache_alias: str | None = None) -> None:
+        self._timeout = timeout
+        self._cache_alias = cache_alias
+
+    @property
+    def timeout(self) -> int:
+        return _get_setting("TIMEOUT", 0) if self._timeout is None else self._timeout
+
+    @property
+    def enabled(self) -> bool:
+        return self.timeout > 0
+
+    @property
+    def cache(self) -> Any:
+        alias = _get_setting("ALIAS", "default") if self._cache_alias is None else self._cache_alias
+        try:
+            return caches[alias]
+        except InvalidCacheBackendError:
+            logger.warning("User cache alias %r is not configured", alias)
+            return None
+
+    @property
+    def fields(self) -> list[Any]:
+        names = set(_get_setting("FIELDS", DEFAULT_FIELDS))
+        return [
+            field
+            for field in get_user_model()._meta.concrete_fields
+            if field.primary_key
+            or (field.name != "password" and (field.name in names or field.attname in names))
+        ]
+
+    def dump_user(self, user: Any) -> dict[str, Any]:
+        return {field.attname: getattr(user, field.attname) for field in self.fields}
+
+    def load_user(self, values: dict[str, Any]) -> Any:
+        User = get_user_model()
+        return User.from_db(router.db_for_read(User), list(values), list(values.values()))
+
+    @staticmethod
+    def jwt_key(user_id: Any, token_id: str) -> str:
+        return f"{CACHE_KEY_PREFIX}jwt:{user_id}:{token_id}"
+
+    @staticmethod
+    def token_key(token: str) -> str:
+        return f"{CACHE_KEY_PREFIX}token:{hashlib.sha256(token.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def version_key(user_id: Any) -> str:
+        return f"{CACHE_KEY_PREFIX}version:{user_id}"
+
+    def get_or_load(self, key: str, load: Callable[[], Any], user_id: Any = None) -> Any:
+        """
+        Return the user cached under `key`, or call `load` and cache its result.
+
+        When `user_id` is known up front the entry and the user version are fetched in a
+        single round trip, and the version is read before loading so an invalidation
+        that races with `load` always wins.
+        """
+        cache = self.cache if self.enabled else None
+        if cache is None:
+            return load()
+
+        if user_id is not None:
+            version_key = self.version_key(user_id)
+            values = cache.get_many([key, version_key])
+            entry, version = values.get(key), values.get(version_key)
+        else:
+            entry, version = cache.get(key), None
+
+        if entry is not None:
+            entry_user_id, entry_version, values = entry
+            if version is None and user_id is None:
+                version = cache.get(self.version_key(entry_user_id))
+            if version is not None and version == entry_version:
+                return self.load_user(values)
+
+        if version is None and user_id is not None:
+            version = self._get_or_create_version(cache, user_id)
+
+        user = load()
+        if user is None or user.pk is None:
+            return user
+
+        if user_id is None:
+            version = self._get_or_create_version(cache, user.pk)
+        cache.set(key, (user.pk, version, self.dump_user(user)), timeout=self.timeout)
+        return user
+
+    def invalidate_user(self, user_id: Any) -> None:
+        if self.enabled and (cache := self.cache) is not None:
+            cache.set(self.version_key(user_id), uuid.uuid4().hex, timeout=self.timeout)
+
+    def invalidate(self, key: str) -> None:
+        if self.enabled and (cache := self.cache) is not None:
+            cache.delete(key)
+
+    def _get_or_create_version(self, cache: Any, user_id: Any) -> str:
+        version_key = self.version_key(user_id)
+        cache.add(version_key, uuid.uuid4().hex, timeout=self.timeout)
+        # The key may have expired between `add` and `get`, the entry is then just missed
+        return cache.get(version_key) or ""
+
+
+user_cache = AuthenticatedUserCache()
+
+
+def invalidate_user(user_id: Any) -> None:
+    """Drop every cached resolution of `user_id`, now and once the transaction commits."""
+    if not user_cache.enabled:
+        return
+    user_cache.invalidate_user(user_id)
+    # A concurrent request may re-cache the row it read before the commit
+    transaction.on_commit(lambda: user_cache.invalidate_user(user_id))
+
+
+def _invalidate_user_on_change(sender: Any, instance: Any, **kwargs: Any) -> None:
+    if instance.pk is not None:
+        invalidate_user(instance.pk)
+
+
+def _invalidate_token_on_delete(sender: Any, instance: Any, **kwargs: Any) -> None:
+    user_cache.invalidate(user_cache.token_key(instance.key))
+
+
+def connect_signals() -> None:
+    """Invalidate cached users when they change, called from `PackageConfig.ready`."""
+    from django.apps import apps
+
+    post_save.connect(
+        _invalidate_user_on_change,
+        sender=settings.AUTH_USER_MODEL,
+        dispatch_uid="baseapp_core_user_cache_save",
+    )
+    post_delete.connect(
+        _invalidate_user_on_change,
+        sender=settings.AUTH_USER_MODEL,
+        dispatch_uid="baseapp_core_user_cache_delete",
+    )
+    if apps.is_installed("rest_framework.authtoken"):
+        post_delete.connect(
+            _invalidate_token_on_delete,
+            sender="authtoken.Token",
+            dispatch_uid="baseapp_core_user_cache_token_delete",
+        )
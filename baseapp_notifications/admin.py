@@ -3,6 +3,7 @@ from django.contrib import admin
 from notifications.admin import NotificationAdmin  # noqa
 
 NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationSetting")
+NotificationEmail = swapper.load_model("baseapp_notifications", "NotificationEmail")
 
 
 @admin.register(NotificationSetting)
@@ -10,3 +11,11 @@ class NotificationSettingAdmin(admin.ModelAdmin):
     list_display = ["user", "verb", "channel", "is_active", "created"]
     list_filter = ["channel", "is_active"]
     search_fields = ["user__username", "verb"]
+
+
+@admin.register(NotificationEmail)
+class NotificationEmailAdmin(admin.ModelAdmin):
+    list_display = ["to", "status", "attempts", "next_attempt_at", "created"]
+    list_filter = ["status"]
+    search_fields = ["to"]
+    readonly_fields = ["attempts", "last_error"]
@@ -21,6 +21,24 @@ class PackageConfig(BaseAppConfig, ServicesContributor, GraphQLContributor):
 
         notify.connect(notify_handler, dispatch_uid="notifications.models.notification")
 
+        import swapper
+        from django.db.models.signals import post_delete, post_save
+
+        from .preferences import notification_setting_changed
+
+        NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationSetting")
+        # Cached notification preferences are dropped when settings change
+        post_save.connect(
+            notification_setting_changed,
+            sender=NotificationSetting,
+            dispatch_uid="baseapp_notifications.preferences.post_save",
+        )
+        post_delete.connect(
+            notification_setting_changed,
+            sender=NotificationSetting,
+            dispatch_uid="baseapp_notifications.preferences.post_delete",
+        )
+
     def register_shared_services(self, registry) -> None:
         from .services import NotificationService
 
@@ -0,0 +1,275 @@
+"""
+Notification digests.
+
+Busy targets produce storms of near identical notifications ("X reacted to your
+comment"). With `BASEAPP_NOTIFICATIONS_DIGEST_WINDOW` seconds set,
+`NotificationService.send_notification` collapses a notification into the unread one of
+the same recipient, verb and target sent within the window instead of creating another:
+the existing notification becomes a digest, its actor being the latest one,
+`actor_count` counting the distinct actors (recorded as `NotificationDigestActor` rows)
+and `latest_actors` listing the latest `BASEAPP_NOTIFICATIONS_DIGEST_LATEST_ACTORS` of
+them. Each collapsed notification moves
+the digest's timestamp, so the window slides while the storm lasts. Collapsed
+notifications aren't pushed again.
+
+With `BASEAPP_NOTIFICATIONS_EMAIL_DIGEST = True`, notification emails aren't sent one by
+one either: notifications are flagged `email_digest_pending`, and the periodic
+`send_notification_digests` task emails each recipient a single digest of them.
+"""
+
+import logging
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import timedelta
+from itertools import groupby
+from typing import TYPE_CHECKING
+
+import swapper
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from baseapp_notifications.models import AbstractNotification
+
+logger = logging.getLogger(__name__)
+
+# Attributes set on notifications by `prime_latest_actors` and `prefetch_latest_actors`
+BATCH_ATTR = "_latest_actors_batch"
+CACHE_ATTR = "_prefetched_latest_actors"
+
+
+def get_digest_window() -> float:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_DIGEST_WINDOW", 0)
+
+
+def get_latest_actors_limit() -> int:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_DIGEST_LATEST_ACTORS", 3)
+
+
+def uses_email_digest() -> bool:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_EMAIL_DIGEST", False)
+
+
+def _actor_ref(content_type_id, object_id) -> list:
+    return [content_type_id, str(object_id)]
+
+
+def _digest_lookup(verb, target) -> dict:
+    """Filters of the notifications a notification of `verb` on `target` collapses into."""
+    lookup = dict(
+        verb=verb,
+        unread=True,
+        timestamp__gte=timezone.now() - timedelta(seconds=get_digest_window()),
+        target_content_type=None,
+        target_object_id=None,
+    )
+    if target is not None:
+        lookup.update(
+            target_content_type=ContentType.objects.get_for_model(target),
+            target_object_id=str(target.pk),
+        )
+    return lookup
+
+
+def get_collapsing_recipient_ids(recipient_ids: Iterable, verb, target=None) -> set:
+    """
+    Which of `recipient_ids` have a notification a notification of `verb` on `target`
+    would collapse into, in one query. `send_bulk_notification` collapses theirs with
+    `collapse_notification` and bulk creates the others.
+    """
+    recipient_ids = list(recipient_ids)
+    if not get_digest_window() or not recipient_ids:
+        return set()
+    Notification = swapper.load_model("notifications", "Notification")
+    return set(
+        Notification.objects.filter(recipient_id__in=recipient_ids, **_digest_lookup(verb, target))
+        .order_by()
+        .values_list("recipient_id", flat=True)
+        .distinct()
+    )
+
+
+def collapse_notification(
+    recipient, verb, actor, target=None, action_object=None, description=None
+) -> "AbstractNotification | None":
+    """
+    Collapse the notification of `actor` into the unread notification of `recipient`
+    with the same `verb` and `target` sent within the digest window, returning it, or
+    `None` if there's none to collapse into.
+    """
+    if not get_digest_window():
+        return None
+
+    Notification = swapper.load_model("notifications", "Notification")
+    NotificationDigestActor = swapper.load_model("baseapp_notifications", "NotificationDigestActor")
+    with transaction.atomic():
+        digest = (
+            Notification.objects.select_for_update()
+            .filter(recipient=recipient, **_digest_lookup(verb, target))
+            .order_by("-timestamp")
+            .first()
+        )
+        if digest is None:
+            return None
+
+        actor_content_type = ContentType.objects.get_for_model(actor)
+        ref = _actor_ref(actor_content_type.pk, actor.pk)
+        if not digest.latest_actors:
+            # Collapsed into for the first time, its own actor is the first one
+            NotificationDigestActor.objects.get_or_create(
+                notification=digest,
+                actor_content_type_id=digest.actor_content_type_id,
+                actor_object_id=str(digest.actor_object_id),
+            )
+        latest_actors = digest.latest_actors or [
+            _actor_ref(digest.actor_content_type_id, digest.actor_object_id)
+        ]
+        # The digest is locked, so concurrent collapses can't count an actor twice
+        _, created = NotificationDigestActor.objects.get_or_create(
+            notification=digest,
+            actor_content_type=actor_content_type,
+            actor_object_id=str(actor.pk),
+        )
+        if created:
+            digest.actor_count += 1
+        digest.latest_actors = [ref, *(other for other in latest_actors if other != ref)][
+            : get_latest_actors_limit()
+        ]
+        digest.actor_content_type = actor_content_type
+        digest.actor_object_id = str(actor.pk)
+        digest.timestamp = timezone.now()
+        update_fields = [
+            "actor_count",
+            "latest_actors",
+            "actor_content_type",
+            "actor_object_id",
+            "timestamp",
+        ]
+        if action_object is not None:
+            digest.action_object = action_object
+            update_fields += ["action_object_content_type", "action_object_object_id"]
+        if description is not None:
+            digest.description = description
+            update_fields.append("description")
+        digest.save(update_fields=update_fields)
+    return digest
+
+
+def _latest_actor_refs(notification: "AbstractNotification") -> list:
+    return notification.latest_actors or [
+        _actor_ref(notification.actor_content_type_id, notification.actor_object_id)
+    ]
+
+
+def prime_latest_actors(notifications: Iterable["AbstractNotification"]) -> None:
+    """Load the latest actors of all `notifications` at once when one of them is asked."""
+    notifications = list(notifications)
+    for notification in notifications:
+        setattr(notification, BATCH_ATTR, notifications)
+
+
+def prefetch_latest_actors(notifications: Iterable["AbstractNotification"]) -> None:
+    """Load the latest actors of `notifications`, with one query per actor model."""
+    notifications = [
+        notification for notification in notifications if not hasattr(notification, CACHE_ATTR)
+    ]
+    object_ids = defaultdict(set)
+    for notification in notifications:
+        for content_type_id, object_id in _latest_actor_refs(notification):
+            object_ids[content_type_id].add(object_id)
+
+    objects = {}
+    for content_type_id, ids in object_ids.items():
+        if (model := ContentType.objects.get_for_id(content_type_id).model_class()) is None:
+            continue
+        for pk, instance in model._default_manager.in_bulk(list(ids)).items():
+            objects[(content_type_id, str(pk))] = instance
+
+    for notification in notifications:
+        setattr(
+            notification,
+            CACHE_ATTR,
+            [
+                objects[tuple(ref)]
+                for ref in _latest_actor_refs(notification)
+                if tuple(ref) in objects
+            ],
+        )
+
+
+def get_latest_actors(notification: "AbstractNotification") -> list:
+    """
+    The latest actors of a digest. Those of the notifications primed along with it by
+    `prime_latest_actors` are loaded at the same time.
+    """
+    if not hasattr(notification, CACHE_ATTR):
+        prefetch_latest_actors(getattr(notification, BATCH_ATTR, [notification]))
+    return getattr(notification, CACHE_ATTR)
+
+
+def build_digest_email(
+    recipient, notifications, connection=None, templates: dict | None = None
+) -> EmailMultiAlternatives:
+    """The digest email of `notifications`, rendered with `emails/notification-digest-*`."""
+    templates = {} if templates is None else templates
+
+    def render(template_type, extension) -> str:
+        name = f"emails/notification-digest-{template_type}.{extension}.j2"
+        if name not in templates:
+            templates[name] = get_template(name)
+        return templates[name].render({"recipient": recipient, "notifications": notifications})
+
+    subject = " ".join(render("subject", "txt").strip().split())
+    message = EmailMultiAlternatives(
+        subject, render("body", "txt"), to=[recipient.email], connection=connection
+    )
+    message.attach_alternative(render("body", "html"), "text/html")
+    return message
+
+
+def send_digest_emails(batch_size: int = 100) -> int:
+    """
+    Email every recipient with `email_digest_pending` notifications a digest of them,
+    `batch_size` recipients at a time, returning how many digests were sent.
+    """
+    Notification = swapper.load_model("notifications", "Notification")
+    pending = Notification.objects.filter(email_digest_pending=True)
+    recipient_ids = list(
+        pending.order_by("recipient_id").values_list("recipient_id", flat=True).distinct()
+    )
+    # Notifications collapsed again meanwhile stay pending for the next digest
+    started = timezone.now()
+    templates = {}
+    sent = 0
+    with get_connection() as connection:
+        for start in range(0, len(recipient_ids), batch_size):
+            notifications = (
+                pending.filter(
+                    recipient_id__in=recipient_ids[start : start + batch_size],
+                    timestamp__lte=started,
+                )
+                .select_related("recipient")
+                .prefetch_related("actor", "target")
+                .order_by("recipient_id", "-timestamp")
+            )
+            emailed = []
+            for _, group in groupby(
+                notifications, key=lambda notification: notification.recipient_id
+            ):
+                group = list(group)
+                recipient = group[0].recipient
+                try:
+                    build_digest_email(recipient, group, connection, templates).send()
+                except Exception:
+                    logger.exception("Notification digest to %s failed", recipient.pk)
+                    continue
+                emailed += [notification.pk for notification in group]
+                sent += 1
+            Notification.objects.filter(pk__in=emailed, timestamp__lte=started).update(
+                email_digest_pending=False, emailed=True
+            )
+    return sent
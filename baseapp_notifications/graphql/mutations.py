@@ -5,6 +5,7 @@ from django.utils.translation import gettext_lazy as _
 from baseapp_core.graphql import RelayMutation, login_required
 from baseapp_core.graphql.utils import get_pk_from_relay_id
 
+from ..preferences import invalidate_notification_preferences
 from .object_types import NotificationChannelTypesEnum, NotificationsInterface
 
 Notification = swapper.load_model("notifications", "Notification")
@@ -120,6 +121,9 @@ class NotificationSettingToggle(RelayMutation):
                 channel=NotificationSetting.NotificationChannelTypes.ALL,
             ).update(is_active=notification_setting.is_active)
 
+        # The updates above don't send signals
+        invalidate_notification_preferences([info.context.user.pk], context=info.context)
+
         return NotificationSettingToggle(notification_setting=notification_setting)
 
 
@@ -10,7 +10,10 @@ from graphene_django.filter import DjangoFilterConnectionField
 from baseapp_core.graphql import DjangoObjectType
 from baseapp_core.graphql import Node as RelayNode
 from baseapp_core.graphql import get_object_type_for_model
+from baseapp_core.graphql.connections import CountedConnection
 
+from ..digest import get_latest_actors, prime_latest_actors
+from ..preferences import get_local_preferences
 from ..utils import can_user_receive_notification
 from .filters import NotificationFilter
 
@@ -27,6 +30,16 @@ NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationS
 NotificationChannelTypesEnum = graphene.Enum.from_enum(NotificationSetting.NotificationChannelTypes)
 
 
+class NotificationConnection(CountedConnection):
+    class Meta:
+        abstract = True
+
+    def resolve_edges(self, info, **kwargs) -> list:
+        # The `latestActors` of a page are loaded together
+        prime_latest_actors(edge.node for edge in self.edges)
+        return self.edges
+
+
 class NotificationsInterface(RelayNode):
     notifications_unread_count = graphene.Int()
     notifications = DjangoFilterConnectionField(
@@ -57,7 +70,9 @@ class NotificationsInterface(RelayNode):
 
     def resolve_is_notification_setting_active(self, info, verb, channel, **kwargs) -> bool:
         if info.context.user.is_authenticated and info.context.user == self:
-            return can_user_receive_notification(info.context.user.id, verb, channel)
+            return can_user_receive_notification(
+                info.context.user.id, verb, channel, local=get_local_preferences(info.context)
+            )
         return False
 
 
@@ -65,12 +80,17 @@ class BaseNotificationNode:
     actor = graphene.Field(RelayNode)
     target = graphene.Field(RelayNode)
     action_object = graphene.Field(RelayNode)
+    latest_actors = graphene.List(RelayNode)
     data = GenericScalar(required=False)
 
     class Meta:
         interfaces = (RelayNode,)
         model = Notification
         fields = "__all__"
+        connection_class = NotificationConnection
+
+    def resolve_latest_actors(self, info, **kwargs) -> list:
+        return get_latest_actors(self)
 
     @classmethod
     def get_node(cls, info, id) -> "AbstractNotification | None":
@@ -1,11 +1,16 @@
+from collections.abc import Iterable
+from itertools import groupby
+
 import channels_graphql_ws
 import graphene
+from django.db.models import prefetch_related_objects
 
 from .object_types import NotificationNode
 
 
 class OnNotificationChange(channels_graphql_ws.Subscription):
     created_notification = graphene.Field(NotificationNode._meta.connection.Edge)
+    created_notifications = graphene.List(NotificationNode._meta.connection.Edge)
     updated_notification = graphene.Field(NotificationNode)
     deleted_notification_id = graphene.ID()
 
@@ -19,6 +24,7 @@ class OnNotificationChange(channels_graphql_ws.Subscription):
     @staticmethod
     def publish(payload, info) -> "OnNotificationChange | None":
         created_notification = payload.get("created_notification", None)
+        created_notifications = payload.get("created_notifications", None)
         updated_notification = payload.get("updated_notification", None)
         deleted_notification_id = payload.get("deleted_notification_id", None)
 
@@ -27,11 +33,21 @@ class OnNotificationChange(channels_graphql_ws.Subscription):
         if not user.is_authenticated:
             return None
 
+        if created_notifications:
+            # Bulk created notifications arrive together, load their generic relations at once
+            prefetch_related_objects(created_notifications, "actor", "target", "action_object")
+            created_notification = created_notification or created_notifications[-1]
+            created_notifications = [
+                NotificationNode._meta.connection.Edge(node=notification)
+                for notification in created_notifications
+            ]
+
         if created_notification:
             created_notification = NotificationNode._meta.connection.Edge(node=created_notification)
 
         return OnNotificationChange(
             created_notification=created_notification,
+            created_notifications=created_notifications,
             updated_notification=updated_notification,
             deleted_notification_id=deleted_notification_id,
         )
@@ -43,6 +59,24 @@ class OnNotificationChange(channels_graphql_ws.Subscription):
             payload={"created_notification": notification},
         )
 
+    @classmethod
+    def send_created_notifications(cls, notifications: Iterable) -> None:
+        """
+        Broadcast notifications created together, one event per recipient: `createdNotifications`
+        lists them all, and `createdNotification` is the latest one for older clients.
+        """
+        for recipient_id, recipient_notifications in groupby(
+            notifications, key=lambda notification: notification.recipient_id
+        ):
+            recipient_notifications = list(recipient_notifications)
+            if len(recipient_notifications) == 1:
+                cls.send_created_notification(notification=recipient_notifications[0])
+                continue
+            cls.broadcast(
+                group=str(recipient_id),
+                payload={"created_notifications": recipient_notifications},
+            )
+
     @classmethod
     def send_updated_notification(cls, notification) -> None:
         cls.broadcast(
@@ -3,7 +3,9 @@ from typing import TYPE_CHECKING, Any
 
 import swapper
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from model_utils.models import TimeStampedModel
 from notifications.base.models import AbstractNotification as BaseAbstractNotification
@@ -20,35 +22,54 @@ class NotificationQuerySet(BaseNotificationQuerySet):
     """QuerySet for notifications that broadcasts GraphQL subscription events on bulk creation.
 
     Single-instance ``save``/``delete`` already broadcast via ``AbstractNotification``, but
-    ``bulk_create`` bypasses ``save``, so this re-queries the created rows and emits a
-    ``created`` subscription event for each one after the surrounding transaction commits.
+    ``bulk_create`` bypasses ``save``, so this re-queries the created rows in one query after
+    the surrounding transaction commits and emits one ``created`` subscription event per
+    recipient, carrying all of the recipient's new notifications.
     """
 
     def bulk_create(self, objs: Iterable[Any], *args: Any, **kwargs: Any) -> list[Any]:
-        """Bulk-create notifications and broadcast a created event per row after commit."""
+        """Bulk-create notifications and broadcast them per recipient after commit."""
         result = super().bulk_create(objs, *args, **kwargs)
 
+        pks = [n.pk for n in result if n.pk]
+        if not pks:
+            return result
+
         from baseapp_notifications.graphql.subscriptions import OnNotificationChange
 
-        pks = [n.pk for n in result if n.pk]
         Model = self.model
         db = self.db
 
         def broadcast() -> None:
-            for notification in Model._default_manager.using(db).filter(pk__in=pks):
-                OnNotificationChange.send_created_notification(notification=notification)
+            notifications = (
+                Model._default_manager.using(db).filter(pk__in=pks).order_by("recipient_id", "pk")
+            )
+            OnNotificationChange.send_created_notifications(notifications)
 
         transaction.on_commit(broadcast, using=db)
         return result
 
 
 class AbstractNotification(BaseAbstractNotification, DocumentIdMixin, RelayModel):
+    # Notifications collapsed into this one, see `baseapp_notifications.digest`
+    actor_count = models.PositiveIntegerField(default=1)
+    latest_actors = models.JSONField(default=list, blank=True)
+    email_digest_pending = models.BooleanField(default=False)
+
     objects = NotificationQuerySet.as_manager()
 
     class Meta(BaseAbstractNotification.Meta):
         abstract = True
         # This model must reference "notifications.Notification" due to the dependency on django-notifications-community
         swappable = swapper.swappable_setting("notifications", "Notification")
+        indexes = [
+            *BaseAbstractNotification.Meta.indexes,
+            models.Index(
+                fields=["recipient"],
+                condition=models.Q(email_digest_pending=True),
+                name="notification_digest_pending",
+            ),
+        ]
 
     def save(self, *args, **kwargs) -> None:
         created = self._state.adding
@@ -115,3 +136,68 @@ class AbstractNotificationSetting(TimeStampedModel, DocumentIdMixin, RelayModel)
         from .graphql.object_types import NotificationSettingNode
 
         return NotificationSettingNode
+
+
+class AbstractNotificationEmail(TimeStampedModel):
+    """
+    A notification email waiting in the outbox, see `baseapp_notifications.outbox`. Sent
+    emails are deleted, the ones failing `BASEAPP_NOTIFICATIONS_EMAIL_MAX_ATTEMPTS` times
+    are kept as failed.
+    """
+
+    class Status(models.IntegerChoices):
+        PENDING = 0, _("Pending")
+        FAILED = 1, _("Failed")
+
+    to = models.EmailField()
+    # Rendering context: JSON values, and the model instances as `instance_ref` references
+    context = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    instances = models.JSONField(default=dict)
+    status = models.IntegerField(choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(status=0),
+                name="%(app_label)s_email_pending",
+            )
+        ]
+        swappable = swapper.swappable_setting("baseapp_notifications", "NotificationEmail")
+
+    def __str__(self) -> str:
+        return f"{self.to} ({self.get_status_display()})"
+
+
+class AbstractNotificationDigestActor(models.Model):
+    """
+    An actor collapsed into a digest notification, so `actor_count` counts each actor
+    once however many times they act, see `baseapp_notifications.digest`.
+    """
+
+    notification = models.ForeignKey(
+        swapper.get_model_name("notifications", "Notification"),
+        on_delete=models.CASCADE,
+        related_name="digest_actors",
+    )
+    actor_content_type = models.ForeignKey(
+        "contenttypes.ContentType", on_delete=models.CASCADE, related_name="+"
+    )
+    actor_object_id = models.CharField(max_length=255)
+
+    class Meta:
+        abstract = True
+        constraints = [
+            models.UniqueConstraint(
+                fields=["notification", "actor_content_type", "actor_object_id"],
+                name="%(app_label)s_digest_actor_unique",
+            )
+        ]
+        swappable = swapper.swappable_setting("baseapp_notifications", "NotificationDigestActor")
+
+    def __str__(self) -> str:
+        return f"{self.actor_content_type_id}:{self.actor_object_id} in {self.notification_id}"
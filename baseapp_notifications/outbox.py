@@ -0,0 +1,168 @@
+"""
+Outbox of notification emails.
+
+With `BASEAPP_NOTIFICATIONS_EMAIL_OUTBOX = True`, `NotificationService` doesn't render
+and send notification emails in the request: `queue_email_notifications` writes them to
+the `NotificationEmail` outbox in the caller's transaction, so they are only sent if it
+commits, and enqueues the `send_outbox_emails` task once it does. The task drains the
+outbox in batches of `BASEAPP_NOTIFICATIONS_EMAIL_BATCH_SIZE`, each sent over one
+connection, rendering each template once per batch.
+
+Failed emails are retried with an exponential backoff, from
+`BASEAPP_NOTIFICATIONS_EMAIL_RETRY_DELAY` seconds, until they failed
+`BASEAPP_NOTIFICATIONS_EMAIL_MAX_ATTEMPTS` times. Retries are sent by the next run of
+`send_outbox_emails`, so schedule it periodically.
+"""
+
+import logging
+from collections.abc import Iterable
+from datetime import timedelta
+
+import swapper
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import Promise
+
+from .tasks import instance_ref, send_outbox_emails
+from .utils import build_email_notification
+
+logger = logging.getLogger(__name__)
+
+NotificationEmail = swapper.load_model("baseapp_notifications", "NotificationEmail")
+
+# Claimed emails are retried if their worker didn't report back meanwhile
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def uses_email_outbox() -> bool:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_EMAIL_OUTBOX", False)
+
+
+def get_batch_size() -> int:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_EMAIL_BATCH_SIZE", 100)
+
+
+def get_max_attempts() -> int:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_EMAIL_MAX_ATTEMPTS", 5)
+
+
+def get_retry_delay() -> float:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_EMAIL_RETRY_DELAY", 60)
+
+
+def serialize_email_context(context: dict) -> tuple[dict, dict]:
+    """
+    Split `context` into its JSON values and `{key: instance_ref}` of its model
+    instances. Lazy translations are evaluated; other values must be JSON serializable.
+    """
+    values, instances = {}, {}
+    for key, value in context.items():
+        if isinstance(value, models.Model):
+            instances[key] = instance_ref(value)
+        elif isinstance(value, Promise):
+            values[key] = str(value)
+        else:
+            values[key] = value
+    return values, instances
+
+
+def queue_email_notifications(emails: Iterable[tuple[str, dict]]) -> list[NotificationEmail]:
+    """
+    Write the `(to, context)` emails to the outbox, to be sent by `send_outbox_emails`
+    once the current transaction commits.
+    """
+    outbox = []
+    for to, context in emails:
+        values, instances = serialize_email_context(context)
+        outbox.append(NotificationEmail(to=to, context=values, instances=instances))
+    if not outbox:
+        return []
+    outbox = NotificationEmail.objects.bulk_create(outbox)
+    transaction.on_commit(send_outbox_emails.delay)
+    return outbox
+
+
+def _claim_batch(batch_size: int) -> list[NotificationEmail]:
+    """Claim pending emails, skipping the ones claimed by concurrent workers."""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            NotificationEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=NotificationEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "pk")[:batch_size]
+        )
+        NotificationEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+            next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    return emails
+
+
+def _load_instances(emails: list[NotificationEmail]) -> dict[tuple, models.Model]:
+    """`{(label, str(pk)): instance}` referenced by `emails`, with one query per model."""
+    pks_by_label = {}
+    for email in emails:
+        for label, pk in email.instances.values():
+            pks_by_label.setdefault(label, set()).add(pk)
+    instances = {}
+    for label, pks in pks_by_label.items():
+        for pk, instance in apps.get_model(label)._default_manager.in_bulk(pks).items():
+            instances[(label, str(pk))] = instance
+    return instances
+
+
+def _mark_failed(email: NotificationEmail, error: Exception) -> None:
+    attempts = email.attempts + 1
+    if attempts >= get_max_attempts():
+        update = dict(status=NotificationEmail.Status.FAILED)
+    else:
+        delay = get_retry_delay() * 2 ** (attempts - 1)
+        update = dict(next_attempt_at=timezone.now() + timedelta(seconds=delay))
+    NotificationEmail.objects.filter(pk=email.pk).update(
+        attempts=F("attempts") + 1, last_error=repr(error), **update
+    )
+
+
+def send_email_batch(emails: list[NotificationEmail]) -> int:
+    """Send claimed `emails` over one connection, returning how many were sent."""
+    instances = _load_instances(emails)
+    templates = {}
+    sent, failed = [], set()
+    try:
+        with get_connection() as connection:
+            for email in emails:
+                context = dict(email.context)
+                for key, (label, pk) in email.instances.items():
+                    context[key] = instances.get((label, str(pk)))
+                try:
+                    build_email_notification(
+                        email.to, context, connection=connection, templates=templates
+                    ).send()
+                except Exception as error:
+                    logger.warning("Notification email %s failed: %r", email.pk, error)
+                    _mark_failed(email, error)
+                    failed.add(email.pk)
+                else:
+                    sent.append(email.pk)
+    except Exception as error:
+        # Opening or closing the connection failed, the rest of the batch is retried
+        logger.warning("Notification email connection failed: %r", error)
+        for email in emails:
+            if email.pk not in sent and email.pk not in failed:
+                _mark_failed(email, error)
+    NotificationEmail.objects.filter(pk__in=sent).delete()
+    return len(sent)
+
+
+def drain_outbox(batch_size: int | None = None) -> int:
+    """Send the pending emails of the outbox, batch by batch, returning how many were sent."""
+    batch_size = batch_size or get_batch_size()
+    sent = 0
+    while emails := _claim_batch(batch_size):
+        sent += send_email_batch(emails)
+        if len(emails) < batch_size:
+            break
+    return sent
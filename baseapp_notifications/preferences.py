@@ -0,0 +1,150 @@
+"""
+Snapshots of the notification preferences of users.
+
+Whether a user receives a verb on a channel depends on their `NotificationSetting` rows
+for the verb (or its group) and `_ALL_`, on the channel and `ALL`: any inactive one
+blocks it. `get_notification_preferences_many` loads the settings of users for every
+channel and verb at once, in a single query, and keeps the snapshots in the Django cache
+(`BASEAPP_NOTIFICATIONS_PREFERENCES_CACHE`) for
+`BASEAPP_NOTIFICATIONS_PREFERENCES_CACHE_TIMEOUT` seconds (default `0`, which disables
+the cache: it must be shared by every worker, or opt-outs are served stale). Snapshots are dropped by `invalidate_notification_preferences` whenever a
+setting is saved or deleted, and by `NotificationSettingToggle`, whose bulk updates
+don't send signals.
+
+Snapshots can also be memoised in a `local` dict, such as `get_local_preferences` of a
+request, so the checks of a request only hit the Django cache once per user.
+"""
+
+from collections.abc import Iterable
+
+import swapper
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.db import transaction
+from django.http import HttpRequest
+
+KEY_PREFIX = "baseapp_notifications:preferences"
+
+# Attribute used to memoise the snapshots on requests
+LOCAL_ATTR = "_notification_preferences"
+
+
+def get_preferences_cache() -> BaseCache:
+    return caches[getattr(settings, "BASEAPP_NOTIFICATIONS_PREFERENCES_CACHE", "default")]
+
+
+def get_preferences_timeout() -> float:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_PREFERENCES_CACHE_TIMEOUT", 0)
+
+
+def _cache_key(user_id) -> str:
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+class NotificationPreferences:
+    """The notification settings of a user; only the inactive ones matter."""
+
+    def __init__(self, inactive: Iterable[tuple[str, int]] = ()) -> None:
+        self.inactive = frozenset(inactive)
+
+    def can_receive(self, verb, channel) -> bool:
+        from .utils import get_setting_from_verb
+
+        NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationSetting")
+        return not any(
+            (setting_verb, setting_channel) in self.inactive
+            for setting_verb in (get_setting_from_verb(verb), "_ALL_")
+            for setting_channel in (channel, NotificationSetting.NotificationChannelTypes.ALL)
+        )
+
+
+def get_notification_preferences_many(
+    user_ids: Iterable, local: dict | None = None
+) -> dict[int, NotificationPreferences]:
+    """`{user_id: NotificationPreferences}` of `user_ids`, querying the missing ones at once."""
+    user_ids = set(user_ids)
+    preferences = {}
+    if local is not None:
+        preferences = {user_id: local[user_id] for user_id in user_ids if user_id in local}
+    missing = user_ids - preferences.keys()
+
+    cache, timeout = get_preferences_cache(), get_preferences_timeout()
+    if missing and timeout:
+        keys = {_cache_key(user_id): user_id for user_id in missing}
+        for key, inactive in cache.get_many(keys).items():
+            preferences[keys[key]] = NotificationPreferences(inactive)
+        missing -= preferences.keys()
+
+    if missing:
+        NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationSetting")
+        inactive = {user_id: set() for user_id in missing}
+        for user_id, verb, channel in NotificationSetting.objects.filter(
+            user_id__in=missing, is_active=False
+        ).values_list("user_id", "verb", "channel"):
+            inactive[user_id].add((verb, channel))
+        if timeout:
+            cache.set_many(
+                {_cache_key(user_id): frozenset(pairs) for user_id, pairs in inactive.items()},
+                timeout=timeout,
+            )
+        for user_id, pairs in inactive.items():
+            preferences[user_id] = NotificationPreferences(pairs)
+
+    if local is not None:
+        local.update(preferences)
+    return preferences
+
+
+def get_notification_preferences(user_id, local: dict | None = None) -> NotificationPreferences:
+    return get_notification_preferences_many([user_id], local=local)[user_id]
+
+
+def can_receive_many(
+    users: Iterable, verb, channels: Iterable, local: dict | None = None
+) -> dict[int, set[int]]:
+    """
+    `{channel: user_ids}` of the users among `users` (users or their ids) that can
+    receive `verb` on each of `channels`.
+    """
+    preferences = get_notification_preferences_many(
+        {getattr(user, "pk", user) for user in users}, local=local
+    )
+    return {
+        channel: {
+            user_id
+            for user_id, user_preferences in preferences.items()
+            if user_preferences.can_receive(verb, channel)
+        }
+        for channel in channels
+    }
+
+
+def get_local_preferences(context) -> dict | None:
+    """
+    The snapshots memoised on `context` for the duration of a request, `None` for
+    contexts living longer than a request, like the ones of websocket connections.
+    """
+    if not isinstance(context, HttpRequest):
+        return None
+    if (local := getattr(context, LOCAL_ATTR, None)) is None:
+        local = {}
+        setattr(context, LOCAL_ATTR, local)
+    return local
+
+
+def invalidate_notification_preferences(user_ids: Iterable, context=None) -> None:
+    """Drop the snapshots of `user_ids`, also memoised on `context` if given."""
+    user_ids = set(user_ids)
+    if (local := getattr(context, LOCAL_ATTR, None)) is not None:
+        for user_id in user_ids:
+            local.pop(user_id, None)
+
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    cache = get_preferences_cache()
+    cache.delete_many(keys)
+    # Snapshots read before the change commits would be cached again meanwhile
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def notification_setting_changed(sender, instance, **kwargs) -> None:
+    invalidate_notification_preferences([instance.user_id])
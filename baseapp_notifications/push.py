@@ -0,0 +1,250 @@
+"""
+Push notification dispatch.
+
+`dispatch_push` sends a push notification to all the active devices of a batch of
+users: the devices of every provider (APNS, FCM, WNS and WebPush) are fetched in one
+`UNION ALL` query, grouped by provider and application, and handed to the push
+transport in multicast batches of `BASEAPP_NOTIFICATIONS_PUSH_BATCH_SIZE`. The
+registration ids the transport reports as invalid are deactivated at the end, with one
+update per provider.
+
+The transport is `BASEAPP_NOTIFICATIONS_PUSH_TRANSPORT`, a dotted path to a
+`PushTransport` subclass instantiated once per process, so the provider clients it
+holds are reused across dispatches. `DjangoPushTransport`, the default, sends through
+django-push-notifications; `FakePushTransport` records the pushes in
+`FakePushTransport.outbox` instead, for tests and local development.
+"""
+
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cache
+from types import SimpleNamespace
+from typing import Any, NamedTuple
+
+from django.conf import settings
+from django.db.models import CharField, F, Value
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+APNS = "apns"
+FCM = "fcm"
+WNS = "wns"
+WEBPUSH = "webpush"
+
+
+class PushDevice(NamedTuple):
+    provider: str
+    registration_id: str
+    application_id: str | None
+    # WebPush subscription, empty for other providers
+    p256dh: str
+    auth: str
+    browser: str
+
+
+@dataclass
+class PushMessage:
+    body: str
+    title: str | None = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+class PushTransport:
+    """Sends push notifications to the devices of one provider and application."""
+
+    def send(
+        self,
+        provider: str,
+        application_id: str | None,
+        devices: list[PushDevice],
+        message: PushMessage,
+    ) -> Iterable[str]:
+        """Send `message` to `devices`, returning the invalid registration ids."""
+        raise NotImplementedError
+
+
+class _WebPushSubscription(SimpleNamespace):
+    """A WebPush device as `webpush_send_message` expects it, deactivated in bulk instead."""
+
+    active = True
+
+    def save(self) -> None:
+        pass
+
+
+class DjangoPushTransport(PushTransport):
+    """
+    Sends through django-push-notifications' bulk senders, which reuse the Firebase app
+    of each application. FCM and APNS senders deactivate invalid tokens themselves.
+    """
+
+    def send(
+        self,
+        provider: str,
+        application_id: str | None,
+        devices: list[PushDevice],
+        message: PushMessage,
+    ) -> Iterable[str]:
+        registration_ids = [device.registration_id for device in devices]
+        if provider == APNS:
+            try:
+                from push_notifications.apns_async import apns_send_bulk_message
+            except ImportError:
+                from push_notifications.apns import apns_send_bulk_message
+
+            alert = message.body
+            if message.title:
+                alert = {"title": message.title, "body": message.body}
+            apns_send_bulk_message(
+                registration_ids=registration_ids,
+                alert=alert,
+                application_id=application_id,
+                extra=message.extra,
+            )
+        elif provider == FCM:
+            from push_notifications.gcm import dict_to_fcm_message
+            from push_notifications.gcm import send_message as fcm_send_message
+
+            kwargs = {"title": message.title} if message.title else {}
+            fcm_message = dict_to_fcm_message({**message.extra, "message": message.body}, **kwargs)
+            fcm_send_message(registration_ids, fcm_message, application_id=application_id)
+        elif provider == WNS:
+            from push_notifications.wns import wns_send_bulk_message
+
+            wns_send_bulk_message(
+                registration_ids, message=message.body, application_id=application_id
+            )
+        elif provider == WEBPUSH:
+            return self.send_webpush(application_id, devices, message)
+        return []
+
+    def send_webpush(
+        self, application_id: str | None, devices: list[PushDevice], message: PushMessage
+    ) -> list[str]:
+        from push_notifications.webpush import webpush_send_message
+
+        invalid = []
+        for device in devices:
+            subscription = _WebPushSubscription(**device._asdict())
+            try:
+                webpush_send_message(subscription, message.body)
+            except Exception:
+                # WebPush has no multicast, the rest of the batch is still sent
+                logger.exception("WebPush to %s failed", device.registration_id)
+            if not subscription.active:
+                invalid.append(device.registration_id)
+        return invalid
+
+
+class FakePushTransport(PushTransport):
+    """
+    Records the pushes in `outbox` as `(provider, application_id, registration_ids,
+    message)`; the registration ids in `invalid_registration_ids` are reported invalid.
+    """
+
+    outbox: list[tuple[str, str | None, list[str], PushMessage]] = []
+    invalid_registration_ids: set[str] = set()
+
+    def send(
+        self,
+        provider: str,
+        application_id: str | None,
+        devices: list[PushDevice],
+        message: PushMessage,
+    ) -> Iterable[str]:
+        registration_ids = [device.registration_id for device in devices]
+        type(self).outbox.append((provider, application_id, registration_ids, message))
+        return [
+            registration_id
+            for registration_id in registration_ids
+            if registration_id in self.invalid_registration_ids
+        ]
+
+
+@cache
+def _load_transport(path: str) -> PushTransport:
+    return import_string(path)()
+
+
+def get_push_transport() -> PushTransport:
+    return _load_transport(
+        getattr(
+            settings,
+            "BASEAPP_NOTIFICATIONS_PUSH_TRANSPORT",
+            "baseapp_notifications.push.DjangoPushTransport",
+        )
+    )
+
+
+def get_batch_size() -> int:
+    return getattr(settings, "BASEAPP_NOTIFICATIONS_PUSH_BATCH_SIZE", 500)
+
+
+def get_device_models() -> dict[str, type]:
+    from push_notifications.models import (
+        APNSDevice,
+        GCMDevice,
+        WebPushDevice,
+        WNSDevice,
+    )
+
+    return {APNS: APNSDevice, FCM: GCMDevice, WNS: WNSDevice, WEBPUSH: WebPushDevice}
+
+
+def get_push_devices(user_ids: Iterable) -> list[PushDevice]:
+    """The active devices of `user_ids`, of every provider, in one query."""
+    user_ids = list(user_ids)
+    querysets = []
+    for provider, model in get_device_models().items():
+        queryset = model.objects.filter(active=True, user_id__in=user_ids)
+        if provider == FCM:
+            # Legacy GCM isn't supported by django-push-notifications anymore
+            queryset = queryset.filter(cloud_message_type="FCM")
+        columns = {
+            "push_provider": Value(provider, output_field=CharField()),
+            "push_registration_id": F("registration_id"),
+            "push_application_id": F("application_id"),
+        }
+        for name in ("p256dh", "auth", "browser"):
+            columns[f"push_{name}"] = (
+                F(name) if provider == WEBPUSH else Value("", output_field=CharField())
+            )
+        querysets.append(queryset.annotate(**columns).values_list(*columns))
+    return [PushDevice(*row) for row in querysets[0].union(*querysets[1:], all=True)]
+
+
+def prune_devices(invalid: dict[str, set[str]]) -> int:
+    """Deactivate the `{provider: registration_ids}` devices, returning how many were."""
+    models = get_device_models()
+    return sum(
+        models[provider].objects.filter(registration_id__in=registration_ids).update(active=False)
+        for provider, registration_ids in invalid.items()
+        if registration_ids
+    )
+
+
+def dispatch_push(user_ids: Iterable, message: PushMessage) -> int:
+    """Send `message` to all the active devices of `user_ids`, returning how many devices."""
+    groups: dict[tuple[str, str | None], list[PushDevice]] = {}
+    for device in get_push_devices(user_ids):
+        groups.setdefault((device.provider, device.application_id), []).append(device)
+
+    transport, batch_size = get_push_transport(), get_batch_size()
+    invalid: dict[str, set[str]] = {}
+    sent = 0
+    for (provider, application_id), devices in groups.items():
+        for start in range(0, len(devices), batch_size):
+            batch = devices[start : start + batch_size]
+            try:
+                invalid_ids = transport.send(provider, application_id, batch, message)
+            except Exception:
+                # The other providers and batches are still sent
+                logger.exception("Push to %s %s devices failed", len(batch), provider)
+                continue
+            invalid.setdefault(provider, set()).update(invalid_ids)
+            sent += len(batch)
+
+    prune_devices(invalid)
+    return sent
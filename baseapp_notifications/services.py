@@ -1,13 +1,36 @@
+from dataclasses import dataclass, field
 from typing import Any
 
 import swapper
 from django.apps import apps
+from django.db import transaction
+from django.utils.encoding import force_str
 from notifications.signals import notify
 
 from baseapp_core.plugins import SharedServiceProvider
 
-from .tasks import send_push_notification
-from .utils import can_user_receive_notification, send_email_notification
+from .digest import (
+    collapse_notification,
+    get_collapsing_recipient_ids,
+    uses_email_digest,
+)
+from .outbox import queue_email_notifications, uses_email_outbox
+from .preferences import can_receive_many, get_notification_preferences
+from .tasks import instance_ref, send_bulk_notification, send_push_notification
+from .utils import send_email_notification
+
+
+@dataclass
+class SentNotification:
+    """
+    The outcome of `send_notification`: the notification added to the recipient's history,
+    or the digest it was collapsed into, if any, and the responses of the `notify` signal
+    when a notification was created.
+    """
+
+    notification: Any = None
+    collapsed: bool = False
+    responses: list = field(default_factory=list)
 
 
 class NotificationService(SharedServiceProvider):
@@ -34,37 +57,49 @@ class NotificationService(SharedServiceProvider):
         push_title=None,
         push_description=None,
         **kwargs,
-    ) -> list[tuple[Any, Any]]:
+    ) -> SentNotification:
         NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationSetting")
-        notifications = []
+        result = SentNotification()
+        # All channels are checked against one snapshot of the recipient's settings
+        preferences = get_notification_preferences(recipient.id)
 
-        if add_to_history and can_user_receive_notification(
-            recipient.id, verb, NotificationSetting.NotificationChannelTypes.IN_APP
+        if add_to_history and preferences.can_receive(
+            verb, NotificationSetting.NotificationChannelTypes.IN_APP
         ):
-            notifications = notify.send(
-                sender=sender,
-                recipient=recipient,
-                verb=verb,
+            digest = collapse_notification(
+                recipient,
+                verb,
+                sender,
+                target=target,
                 action_object=action_object,
                 description=description,
-                target=target,
-                **kwargs,
             )
+            if digest is not None:
+                result.notification, result.collapsed = digest, True
+            else:
+                result.responses = notify.send(
+                    sender=sender,
+                    recipient=recipient,
+                    verb=verb,
+                    action_object=action_object,
+                    description=description,
+                    target=target,
+                    **kwargs,
+                )
+                result.notification = _created_notification(result.responses)
 
-        if send_email and can_user_receive_notification(
-            recipient.id, verb, NotificationSetting.NotificationChannelTypes.EMAIL
+        if send_email and preferences.can_receive(
+            verb, NotificationSetting.NotificationChannelTypes.EMAIL
         ):
-            notification = (
-                notifications[0][1][0]
-                if len(notifications) > 0
-                and len(notifications[0]) > 1
-                and len(notifications[0][1]) > 0
-                else None
-            )
-
-            send_email_notification(
-                to=recipient.email,
-                context=dict(
+            notification = result.notification
+            if notification and uses_email_digest():
+                # Emailed with the recipient's next digest, an update doesn't broadcast it
+                notification.email_digest_pending = True
+                type(notification).objects.filter(pk=notification.pk).update(
+                    email_digest_pending=True
+                )
+            else:
+                email_context = dict(
                     notification=notification,
                     sender=sender,
                     recipient=recipient,
@@ -77,15 +112,21 @@ class NotificationService(SharedServiceProvider):
                     email_subject=email_subject or description,
                     email_message=email_message or description,
                     **kwargs,
-                ),
-            )
+                )
+                if uses_email_outbox():
+                    queue_email_notifications([(recipient.email, email_context)])
+                else:
+                    send_email_notification(to=recipient.email, context=email_context)
 
-            if notification:
-                notification.emailed = True
-                notification.save(update_fields=["emailed"])
+                if notification:
+                    notification.emailed = True
+                    notification.save(update_fields=["emailed"])
 
-        if send_push and can_user_receive_notification(
-            recipient.id, verb, NotificationSetting.NotificationChannelTypes.PUSH
+        # Collapsed notifications were already pushed when their digest was created
+        if (
+            send_push
+            and not result.collapsed
+            and preferences.can_receive(verb, NotificationSetting.NotificationChannelTypes.PUSH)
         ):
             send_push_notification.delay(
                 recipient.id,
@@ -96,4 +137,170 @@ class NotificationService(SharedServiceProvider):
                 **kwargs,
             )
 
+        return result
+
+    def send_bulk_notification(
+        self,
+        sender,
+        recipients,
+        verb,
+        description=None,
+        action_object=None,
+        target=None,
+        add_to_history=True,
+        send_push=True,
+        send_email=True,
+        email_subject=None,
+        email_message=None,
+        push_title=None,
+        push_description=None,
+        **kwargs,
+    ) -> list[Any]:
+        """
+        `send_notification` to many `recipients` with a constant number of queries: their
+        settings are resolved in at most one query, the history notifications are bulk
+        created and push notifications and emails are delivered by one
+        `send_bulk_notification` task once the transaction commits, or the emails are
+        written to the outbox with `BASEAPP_NOTIFICATIONS_EMAIL_OUTBOX`. Notifications
+        collapse into digests and emails wait for the email digest like with
+        `send_notification`, at the cost of a few queries per collapsed recipient. Returns
+        the notifications added to the recipients' history, created or collapsed into.
+
+        Extra `kwargs` are passed to the task, so they must be JSON serializable.
+        """
+        NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationSetting")
+        Channels = NotificationSetting.NotificationChannelTypes
+        recipients = {recipient.pk: recipient for recipient in recipients}
+        channels = [
+            channel
+            for channel, enabled in (
+                (Channels.IN_APP, add_to_history),
+                (Channels.EMAIL, send_email),
+                (Channels.PUSH, send_push),
+            )
+            if enabled
+        ]
+        if not recipients or not channels:
+            return []
+
+        receiving = can_receive_many(recipients, verb, channels)
+
+        notifications, collapsed = [], {}
+        if history_recipients := receiving.get(Channels.IN_APP):
+            for pk in sorted(get_collapsing_recipient_ids(history_recipients, verb, target)):
+                digest = collapse_notification(
+                    recipients[pk],
+                    verb,
+                    sender,
+                    target=target,
+                    action_object=action_object,
+                    description=description,
+                )
+                if digest is not None:
+                    collapsed[pk] = digest
+            if created_for := [pk for pk in history_recipients if pk not in collapsed]:
+                # `notify_handler` bulk creates the notifications of a list of recipients
+                notifications = notify.send(
+                    sender=sender,
+                    recipient=[recipients[pk] for pk in created_for],
+                    verb=verb,
+                    action_object=action_object,
+                    description=description,
+                    target=target,
+                    **kwargs,
+                )[0][1]
+            notifications = [*notifications, *collapsed.values()]
+
+        email_recipients = sorted(receiving.get(Channels.EMAIL, ()))
+        notification_ids = {
+            notification.recipient_id: notification.pk for notification in notifications
+        }
+        if uses_email_digest() and (
+            pending := {pk for pk in email_recipients if pk in notification_ids}
+        ):
+            # Emailed with the recipients' next digest, an update doesn't broadcast them
+            for notification in notifications:
+                if notification.recipient_id in pending:
+                    notification.email_digest_pending = True
+            type(notifications[0]).objects.filter(
+                pk__in=[notification_ids[pk] for pk in pending]
+            ).update(email_digest_pending=True)
+            email_recipients = [pk for pk in email_recipients if pk not in notification_ids]
+        emails = []
+        if email_recipients:
+            emails = [(pk, notification_ids.get(pk)) for pk in email_recipients]
+            if emailed_ids := [pk for _, pk in emails if pk is not None]:
+                type(notifications[0]).objects.filter(pk__in=emailed_ids).update(emailed=True)
+            if uses_email_outbox():
+                notifications_by_recipient = {
+                    notification.recipient_id: notification for notification in notifications
+                }
+                email_context = dict(
+                    sender=sender,
+                    verb=verb,
+                    action_object=action_object,
+                    description=description,
+                    target=target,
+                    add_to_history=add_to_history,
+                    send_push=send_push,
+                    email_subject=email_subject or description,
+                    email_message=email_message or description,
+                    **kwargs,
+                )
+                queue_email_notifications(
+                    (
+                        recipients[pk].email,
+                        dict(
+                            email_context,
+                            recipient=recipients[pk],
+                            notification=notifications_by_recipient.get(pk),
+                        ),
+                    )
+                    for pk in email_recipients
+                )
+                # Sent from the outbox rather than by the task
+                emails = []
+
+        # Collapsed notifications were already pushed when their digest was created
+        push_user_ids = sorted(set(receiving.get(Channels.PUSH, ())) - collapsed.keys())
+        if emails or push_user_ids:
+            # Lazy translations and model instances can't be serialized by the task
+            description = _str_or_none(description)
+            push_kwargs = dict(
+                push_title=_str_or_none(push_title),
+                push_description=_str_or_none(push_description or description),
+                extra=kwargs.get("extra"),
+            )
+            email_context = dict(
+                sender=instance_ref(sender),
+                verb=verb,
+                action_object=instance_ref(action_object),
+                description=description,
+                target=instance_ref(target),
+                add_to_history=add_to_history,
+                send_push=send_push,
+                email_subject=_str_or_none(email_subject or description),
+                email_message=_str_or_none(email_message or description),
+                **kwargs,
+            )
+            transaction.on_commit(
+                lambda: send_bulk_notification.delay(
+                    push_user_ids=push_user_ids,
+                    emails=emails,
+                    push_kwargs=push_kwargs,
+                    email_context=email_context,
+                )
+            )
+
         return notifications
+
+
+def _created_notification(responses: list) -> Any:
+    # `notify_handler`, the first receiver of `notify`, answers with the created notifications
+    if responses and len(responses[0]) > 1 and responses[0][1]:
+        return responses[0][1][0]
+    return None
+
+
+def _str_or_none(value) -> str | None:
+    return None if value is None else force_str(value)
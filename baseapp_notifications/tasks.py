@@ -1,48 +1,126 @@
+import logging
+
+import swapper
 from celery import shared_task
 from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.mail import get_connection
 from django.utils.encoding import force_str
 
+from .utils import send_email_notification
+
+logger = logging.getLogger(__name__)
+
+
+def instance_ref(instance) -> list | None:
+    """JSON-serializable reference to a model instance, loaded back by `load_instance_ref`."""
+    if instance is None:
+        return None
+    return [instance._meta.label, instance.pk]
+
+
+def load_instance_ref(ref) -> object | None:
+    if ref is None:
+        return None
+    label, pk = ref
+    return apps.get_model(label)._default_manager.filter(pk=pk).first()
+
 
 @shared_task
 def send_push_notification(
     user_id, extra=None, push_title=None, push_description=None, level=None, **kwargs
 ) -> None:
+    send_push_to_users(
+        [user_id], extra=extra, push_title=push_title, push_description=push_description
+    )
+
+
+@shared_task
+def send_bulk_notification(
+    push_user_ids=(), emails=(), push_kwargs=None, email_context=None
+) -> None:
+    """
+    Deliver the push notifications and emails of a `NotificationService.send_bulk_notification`
+    call in one job. `emails` is a list of `(recipient_id, notification_id)`, and the model
+    instances of `email_context` are `instance_ref` references. Failed emails are logged
+    and skipped, so they never hold back the rest of the batch or the push notifications.
+    """
+    if emails:
+        send_bulk_email_notification(emails, email_context or {})
+    if push_user_ids:
+        send_push_to_users(push_user_ids, **(push_kwargs or {}))
+
+
+@shared_task
+def send_outbox_emails() -> None:
+    """Drain the notification email outbox, see `baseapp_notifications.outbox`."""
+    from .outbox import drain_outbox
+
+    drain_outbox()
+
+
+@shared_task
+def send_notification_digests() -> None:
+    """Email the pending notification digests, see `baseapp_notifications.digest`."""
+    from .digest import send_digest_emails
+
+    send_digest_emails()
+
+
+def send_bulk_email_notification(emails, email_context) -> int:
+    """Send `emails` over one connection, returning how many were sent."""
+    Notification = swapper.load_model("notifications", "Notification")
+    context = {
+        key: load_instance_ref(email_context.get(key))
+        for key in ("sender", "action_object", "target")
+    }
+    context = {**email_context, **context}
+    recipients = get_user_model().objects.in_bulk([recipient_id for recipient_id, _ in emails])
+    notifications = Notification.objects.in_bulk(
+        [notification_id for _, notification_id in emails if notification_id is not None]
+    )
+
+    sent = 0
+    try:
+        with get_connection() as connection:
+            for recipient_id, notification_id in emails:
+                if (recipient := recipients.get(recipient_id)) is None:
+                    continue
+                try:
+                    send_email_notification(
+                        to=recipient.email,
+                        context=dict(
+                            context,
+                            recipient=recipient,
+                            notification=notifications.get(notification_id),
+                        ),
+                        connection=connection,
+                    )
+                except Exception as error:
+                    logger.warning("Notification email to user %s failed: %r", recipient_id, error)
+                else:
+                    sent += 1
+    except Exception as error:
+        # Opening or closing the connection failed
+        logger.warning("Notification email connection failed: %r", error)
+    return sent
+
+
+def send_push_to_users(user_ids, extra=None, push_title=None, push_description=None) -> None:
+    """Send a push notification to all the devices of `user_ids`, see `baseapp_notifications.push`."""
     if not apps.is_installed("push_notifications"):
         return
 
-    from push_notifications.models import (
-        APNSDevice,
-        GCMDevice,
-        WebPushDevice,
-        WNSDevice,
-    )
+    from .push import PushMessage, dispatch_push
 
     if not push_description:
         raise Exception("push_description is required")
 
-    # send messages to all Apple devices
-    apple_devices = APNSDevice.objects.filter(user__id=user_id)
-    if apple_devices:
-        message = force_str(push_description)
-        if push_title and push_description:
-            message = {"title": force_str(push_title), "body": force_str(push_description)}
-        apple_devices.send_message(message=message, extra=extra)
-
-    # send messages to all Android devices
-    android_devices = GCMDevice.objects.filter(user__id=user_id)
-    if android_devices:
-        message = force_str(push_description)
-        if push_title and push_description:
-            android_devices.send_message(message, title=push_title, extra=extra)
-        else:
-            android_devices.send_message(message=message, extra=extra)
-
-    # TO DO: send messages to all Windows devices
-    windows_devices = WNSDevice.objects.filter(user__id=user_id)
-    if windows_devices:
-        windows_devices.send_message(message=message, extra=extra)
-
-    # TO DO: send messages to all Web devices
-    web_devices = WebPushDevice.objects.filter(user__id=user_id)
-    if web_devices:
-        web_devices.send_message(message=message, extra=extra)
+    dispatch_push(
+        user_ids,
+        PushMessage(
+            body=force_str(push_description),
+            title=force_str(push_title) if push_title else None,
+            extra=extra or {},
+        ),
+    )
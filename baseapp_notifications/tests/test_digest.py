@@ -0,0 +1,194 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+import swapper
+from django.utils import timezone
+
+from baseapp_core.plugins import shared_services
+from baseapp_core.tests.factories import UserFactory
+from baseapp_notifications.digest import (
+    get_latest_actors,
+    prime_latest_actors,
+    send_digest_emails,
+)
+from baseapp_notifications.services import SentNotification
+
+pytestmark = pytest.mark.django_db
+
+Notification = swapper.load_model("notifications", "Notification")
+
+
+@pytest.fixture(autouse=True)
+def digest_window(settings) -> None:
+    settings.BASEAPP_NOTIFICATIONS_DIGEST_WINDOW = 60 * 60
+
+
+def _react(send_notification, actor, recipient, target, send_email=False) -> SentNotification:
+    return send_notification(
+        sender=actor,
+        recipient=recipient,
+        verb="reacted",
+        target=target,
+        description=f"{actor.pk} reacted to your post",
+        send_email=send_email,
+        send_push=False,
+    )
+
+
+def test_notifications_collapse_into_a_digest(settings, send_notification) -> None:
+    settings.BASEAPP_NOTIFICATIONS_DIGEST_LATEST_ACTORS = 2
+    recipient, target = UserFactory.create_batch(2)
+    actors = UserFactory.create_batch(3)
+
+    results = [
+        _react(send_notification, actor, recipient, target) for actor in [*actors, actors[1]]
+    ]
+
+    digest = Notification.objects.get()
+    assert not results[0].collapsed
+    assert all(result.collapsed for result in results[1:])
+    assert {result.notification for result in results} == {digest}
+    assert digest.actor == actors[1]
+    assert digest.actor_count == 3
+    assert digest.description == f"{actors[1].pk} reacted to your post"
+    assert get_latest_actors(digest) == [actors[1], actors[2]]
+
+
+def test_actors_dropping_out_of_the_latest_are_counted_once(settings, send_notification) -> None:
+    settings.BASEAPP_NOTIFICATIONS_DIGEST_LATEST_ACTORS = 1
+    recipient, target = UserFactory.create_batch(2)
+    actors = UserFactory.create_batch(2)
+
+    for actor in [*actors, *actors, actors[0]]:
+        _react(send_notification, actor, recipient, target)
+
+    digest = Notification.objects.get()
+    assert digest.actor_count == 2
+    assert get_latest_actors(digest) == [actors[0]]
+
+
+def test_latest_actors_of_primed_notifications_are_loaded_together(
+    send_notification, django_assert_num_queries
+) -> None:
+    recipient, target, other_target = UserFactory.create_batch(3)
+    actors = UserFactory.create_batch(2)
+    for actor in actors:
+        _react(send_notification, actor, recipient, target)
+        _react(send_notification, actor, recipient, other_target)
+
+    notifications = list(Notification.objects.order_by("pk"))
+    prime_latest_actors(notifications)
+
+    with django_assert_num_queries(1):
+        assert [get_latest_actors(notification) for notification in notifications] == [
+            actors[::-1],
+            actors[::-1],
+        ]
+
+
+def test_notifications_of_other_targets_dont_collapse(send_notification) -> None:
+    recipient, target, other_target, actor = UserFactory.create_batch(4)
+
+    _react(send_notification, actor, recipient, target)
+    _react(send_notification, actor, recipient, other_target)
+    _react(send_notification, actor, recipient, None)
+
+    assert Notification.objects.count() == 3
+
+
+def test_read_or_old_notifications_dont_collapse(send_notification) -> None:
+    recipient, target, actor = UserFactory.create_batch(3)
+
+    _react(send_notification, actor, recipient, target)
+    Notification.objects.update(unread=False)
+    _react(send_notification, actor, recipient, target)
+    Notification.objects.filter(unread=True).update(timestamp=timezone.now() - timedelta(days=1))
+    _react(send_notification, actor, recipient, target)
+
+    assert Notification.objects.count() == 3
+    assert set(Notification.objects.values_list("actor_count", flat=True)) == {1}
+
+
+def test_collapsed_notifications_arent_pushed_again(send_notification) -> None:
+    recipient, target, actor = UserFactory.create_batch(3)
+
+    with patch("baseapp_notifications.services.send_push_notification.delay") as push:
+        for _ in range(2):
+            send_notification(
+                sender=actor,
+                recipient=recipient,
+                verb="reacted",
+                target=target,
+                send_email=False,
+            )
+
+    assert push.call_count == 1
+
+
+def test_digest_is_disabled_by_default(settings, send_notification) -> None:
+    settings.BASEAPP_NOTIFICATIONS_DIGEST_WINDOW = 0
+    recipient, target, actor = UserFactory.create_batch(3)
+
+    for _ in range(2):
+        _react(send_notification, actor, recipient, target)
+
+    assert Notification.objects.count() == 2
+
+
+def test_emails_are_sent_as_digests(settings, outbox, send_notification) -> None:
+    settings.BASEAPP_NOTIFICATIONS_EMAIL_DIGEST = True
+    recipient, other, target = UserFactory.create_batch(3)
+    actors = UserFactory.create_batch(2)
+
+    for actor in actors:
+        _react(send_notification, actor, recipient, target, send_email=True)
+    send_notification(sender=actors[0], recipient=recipient, verb="followed", send_push=False)
+    send_notification(sender=actors[0], recipient=other, verb="followed", send_push=False)
+
+    assert len(outbox) == 0
+    assert Notification.objects.filter(email_digest_pending=True).count() == 3
+
+    assert send_digest_emails() == 2
+
+    assert sorted(message.to[0] for message in outbox) == sorted([recipient.email, other.email])
+    digest = next(message for message in outbox if message.to == [recipient.email])
+    assert digest.subject == "You have 2 new notifications"
+    assert f"{actors[1].pk} reacted to your post (2 people)" in digest.body
+    assert not Notification.objects.filter(email_digest_pending=True).exists()
+    assert not Notification.objects.filter(emailed=False).exists()
+
+    assert send_digest_emails() == 0
+
+
+def test_bulk_notifications_collapse_into_digests(
+    settings, outbox, send_notification, django_capture_on_commit_callbacks
+) -> None:
+    settings.BASEAPP_NOTIFICATIONS_EMAIL_DIGEST = True
+    recipients = UserFactory.create_batch(2)
+    target = UserFactory()
+    actors = UserFactory.create_batch(2)
+    digest = _react(send_notification, actors[0], recipients[0], target).notification
+
+    with (
+        patch("baseapp_notifications.services.send_bulk_notification.delay") as delay,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        notifications = shared_services.get("notifications").send_bulk_notification(
+            sender=actors[1],
+            recipients=recipients,
+            verb="reacted",
+            target=target,
+            description="reacted to your post",
+        )
+
+    digest.refresh_from_db()
+    assert digest in notifications
+    assert digest.actor_count == 2
+    assert Notification.objects.filter(recipient=recipients[0]).count() == 1
+    assert Notification.objects.filter(recipient=recipients[1]).count() == 1
+    assert Notification.objects.filter(email_digest_pending=True).count() == 2
+    assert len(outbox) == 0
+    # Only the recipient without a digest is pushed, and nobody is emailed right away
+    assert delay.call_args.kwargs["push_user_ids"] == [recipients[1].pk]
+    assert delay.call_args.kwargs["emails"] == []
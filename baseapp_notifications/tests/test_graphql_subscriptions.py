@@ -1,10 +1,13 @@
 import textwrap
+from unittest.mock import patch
 
 import pytest
 import swapper
 from channels.db import database_sync_to_async
+from django.db import transaction
 
 from baseapp_core.tests.factories import UserFactory
+from baseapp_notifications.graphql.subscriptions import OnNotificationChange
 
 from .factories import NotificationFactory
 
@@ -21,6 +24,12 @@ SUBSCRIPTION_QUERY = textwrap.dedent("""
           }
         }
 
+        createdNotifications {
+          node {
+            id
+          }
+        }
+
         updatedNotification {
           id
           unread
@@ -195,15 +204,14 @@ async def test_user_receives_bulk_created_notification_subscription_events(
     created = await database_sync_to_async(Notification.objects.bulk_create)([n1, n2])
 
     # Collect the relay IDs assigned after bulk_create.
-    relay_ids = await database_sync_to_async(lambda: {n.relay_id for n in created})()
-
-    # Expect one createdNotification event per bulk-created notification.
-    received_ids = set()
-    for _ in range(2):
-        resp = await client.receive(assert_id=sub_id, assert_type="next")
-        received_ids.add(resp["data"]["onNotificationChange"]["createdNotification"]["node"]["id"])
+    relay_ids = await database_sync_to_async(lambda: [n.relay_id for n in created])()
 
-    assert received_ids == relay_ids
+    # Expect a single event carrying every bulk-created notification of the recipient.
+    resp = await client.receive(assert_id=sub_id, assert_type="next")
+    event = resp["data"]["onNotificationChange"]
+    assert [edge["node"]["id"] for edge in event["createdNotifications"]] == relay_ids
+    assert event["createdNotification"]["node"]["id"] == relay_ids[-1]
+    await client.assert_no_messages()
 
     # Disconnect and wait the application to finish gracefully.
     await client.finalize()
@@ -242,3 +250,24 @@ async def test_another_user_does_not_receive_bulk_created_notification_subscript
 
     # Disconnect and wait the application to finish gracefully.
     await client.finalize()
+
+
+def test_bulk_create_broadcasts_once_per_recipient() -> None:
+    recipient, other_recipient, actor = UserFactory(), UserFactory(), UserFactory()
+    notifications = [
+        NotificationFactory.build(recipient=recipient, actor=actor),
+        NotificationFactory.build(recipient=other_recipient, actor=actor),
+        NotificationFactory.build(recipient=recipient, actor=actor),
+    ]
+
+    with patch.object(OnNotificationChange, "broadcast") as broadcast:
+        with transaction.atomic():
+            created = Notification.objects.bulk_create(notifications)
+            # Nothing is broadcast before the transaction commits
+            broadcast.assert_not_called()
+
+    payloads = {call.kwargs["group"]: call.kwargs["payload"] for call in broadcast.mock_calls}
+    assert payloads == {
+        str(recipient.pk): {"created_notifications": [created[0], created[2]]},
+        str(other_recipient.pk): {"created_notification": created[1]},
+    }
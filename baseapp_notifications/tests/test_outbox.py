@@ -0,0 +1,122 @@
+from unittest.mock import patch
+
+import pytest
+import swapper
+from django.core.mail.backends.locmem import EmailBackend
+from django.template.loader import get_template
+
+from baseapp_core.plugins import shared_services
+from baseapp_core.tests.factories import UserFactory
+from baseapp_notifications.outbox import drain_outbox, queue_email_notifications
+
+pytestmark = pytest.mark.django_db
+
+Notification = swapper.load_model("notifications", "Notification")
+NotificationEmail = swapper.load_model("baseapp_notifications", "NotificationEmail")
+
+
+@pytest.fixture(autouse=True)
+def email_outbox(settings) -> None:
+    settings.BASEAPP_NOTIFICATIONS_EMAIL_OUTBOX = True
+
+
+def _fail_for(to) -> object:
+    """`EmailBackend.send_messages` failing for the messages sent to `to`."""
+    send_messages = EmailBackend.send_messages
+
+    def fail_for(self, messages) -> int:
+        if any(to in message.to for message in messages):
+            raise ConnectionError("Refused")
+        return send_messages(self, messages)
+
+    return fail_for
+
+
+def test_emails_are_sent_once_the_transaction_commits(
+    outbox, send_notification, django_capture_on_commit_callbacks
+) -> None:
+    user = UserFactory()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        send_notification(
+            sender=user,
+            recipient=user,
+            verb="sent to email",
+            description="this is my description",
+            notification_url="https://example.com",
+            send_push=False,
+        )
+        assert len(outbox) == 0
+        assert NotificationEmail.objects.count() == 1
+
+    assert len(outbox) == 1
+    assert outbox[0].to == [user.email]
+    assert outbox[0].subject == "this is my description"
+    assert "this is my description" in outbox[0].alternatives[0][0]
+    assert Notification.objects.get().emailed is True
+    assert not NotificationEmail.objects.exists()
+
+
+def test_bulk_emails_are_sent_from_the_outbox(outbox, django_capture_on_commit_callbacks) -> None:
+    sender = UserFactory()
+    users = UserFactory.create_batch(3)
+    service = shared_services.get("notifications")
+
+    with patch("baseapp_notifications.tasks.send_bulk_email_notification") as send_bulk_email:
+        with django_capture_on_commit_callbacks(execute=True):
+            service.send_bulk_notification(
+                sender=sender,
+                recipients=users,
+                verb="sent in bulk",
+                description="this is my description",
+                send_push=False,
+            )
+
+    send_bulk_email.assert_not_called()
+    assert sorted(message.to[0] for message in outbox) == sorted(user.email for user in users)
+
+
+def test_batches_share_connections_and_templates(outbox) -> None:
+    users = UserFactory.create_batch(4)
+    queue_email_notifications(
+        (user.email, {"verb": "batched", "recipient": user, "email_subject": "Batched"})
+        for user in users
+    )
+
+    with (
+        patch("baseapp_notifications.outbox.get_connection", wraps=EmailBackend) as connection,
+        patch("baseapp_notifications.utils.get_template", wraps=get_template) as loader,
+    ):
+        assert drain_outbox(batch_size=2) == 4
+
+    assert len(outbox) == 4
+    # One connection per batch, and the subject, text and html templates once per batch:
+    # the missing verb template, then the default one
+    assert connection.call_count == 2
+    assert loader.call_count == 2 * 3 * 2
+
+
+def test_failed_emails_are_retried_with_backoff(settings, outbox) -> None:
+    settings.BASEAPP_NOTIFICATIONS_EMAIL_MAX_ATTEMPTS = 2
+    settings.BASEAPP_NOTIFICATIONS_EMAIL_RETRY_DELAY = 0
+    failing, other = UserFactory.create_batch(2)
+    queue_email_notifications(
+        (user.email, {"verb": "retried", "recipient": user}) for user in (failing, other)
+    )
+
+    with patch.object(EmailBackend, "send_messages", _fail_for(failing.email)):
+        assert drain_outbox() == 1
+        email = NotificationEmail.objects.get()
+        assert email.to == failing.email
+        assert email.status == NotificationEmail.Status.PENDING
+        assert email.attempts == 1
+        assert "Refused" in email.last_error
+
+        # Retried right away without delay, and given up after the last attempt
+        assert drain_outbox() == 0
+
+    email.refresh_from_db()
+    assert email.status == NotificationEmail.Status.FAILED
+    assert email.attempts == 2
+    assert drain_outbox() == 0
+    assert [message.to for message in outbox] == [[other.email]]
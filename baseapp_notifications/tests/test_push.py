@@ -0,0 +1,100 @@
+import pytest
+from push_notifications.models import APNSDevice, GCMDevice, WebPushDevice
+
+from baseapp_core.tests.factories import UserFactory
+from baseapp_notifications.push import (
+    APNS,
+    FCM,
+    WEBPUSH,
+    FakePushTransport,
+    PushMessage,
+    dispatch_push,
+    get_push_devices,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def fake_push_transport(settings) -> type[FakePushTransport]:
+    settings.BASEAPP_NOTIFICATIONS_PUSH_TRANSPORT = "baseapp_notifications.push.FakePushTransport"
+    FakePushTransport.outbox = []
+    FakePushTransport.invalid_registration_ids = set()
+    return FakePushTransport
+
+
+def test_devices_of_all_providers_are_fetched_at_once(django_assert_num_queries) -> None:
+    user, other = UserFactory.create_batch(2)
+    APNSDevice.objects.create(user=user, registration_id="apns")
+    APNSDevice.objects.create(user=user, registration_id="inactive", active=False)
+    GCMDevice.objects.create(user=user, registration_id="fcm", application_id="app")
+    GCMDevice.objects.create(user=user, registration_id="gcm", cloud_message_type="GCM")
+    WebPushDevice.objects.create(user=user, registration_id="web", p256dh="key", auth="secret")
+    APNSDevice.objects.create(user=other, registration_id="other")
+
+    with django_assert_num_queries(1):
+        devices = get_push_devices([user.pk])
+
+    assert sorted((device.provider, device.registration_id) for device in devices) == [
+        (APNS, "apns"),
+        (FCM, "fcm"),
+        (WEBPUSH, "web"),
+    ]
+    web = next(device for device in devices if device.provider == WEBPUSH)
+    assert (web.p256dh, web.auth) == ("key", "secret")
+
+
+def test_dispatch_batches_devices_by_provider(settings, fake_push_transport) -> None:
+    settings.BASEAPP_NOTIFICATIONS_PUSH_BATCH_SIZE = 2
+    users = UserFactory.create_batch(3)
+    for user in users:
+        APNSDevice.objects.create(user=user, registration_id=f"apns-{user.pk}")
+    GCMDevice.objects.create(user=users[0], registration_id="fcm", application_id="app")
+
+    message = PushMessage(body="Hello", title="Title")
+    assert dispatch_push([user.pk for user in users], message) == 4
+
+    batches = sorted(
+        (provider, len(registration_ids))
+        for provider, _, registration_ids, _ in fake_push_transport.outbox
+    )
+    assert batches == [(APNS, 1), (APNS, 2), (FCM, 1)]
+    assert all(sent == message for *_, sent in fake_push_transport.outbox)
+
+
+def test_invalid_devices_are_pruned(fake_push_transport, django_assert_num_queries) -> None:
+    user = UserFactory()
+    APNSDevice.objects.create(user=user, registration_id="valid")
+    APNSDevice.objects.create(user=user, registration_id="expired")
+    GCMDevice.objects.create(user=user, registration_id="uninstalled")
+    fake_push_transport.invalid_registration_ids = {"expired", "uninstalled"}
+
+    # The devices, and one update per provider with invalid devices
+    with django_assert_num_queries(3):
+        dispatch_push([user.pk], PushMessage(body="Hello"))
+
+    assert set(
+        APNSDevice.objects.filter(active=True).values_list("registration_id", flat=True)
+    ) == {"valid"}
+    assert not GCMDevice.objects.filter(active=True).exists()
+
+
+def test_send_notification_pushes_through_the_transport(
+    send_notification, fake_push_transport
+) -> None:
+    user = UserFactory()
+    GCMDevice.objects.create(user=user, registration_id="fcm")
+
+    send_notification(
+        sender=user,
+        recipient=user,
+        verb="sent as push",
+        add_to_history=False,
+        send_email=False,
+        push_description="Hello",
+        extra={"url": "/notifications"},
+    )
+
+    [(provider, _, registration_ids, message)] = fake_push_transport.outbox
+    assert (provider, registration_ids) == (FCM, ["fcm"])
+    assert message == PushMessage(body="Hello", extra={"url": "/notifications"})
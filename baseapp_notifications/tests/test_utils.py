@@ -3,11 +3,27 @@ from unittest.mock import patch
 import pytest
 import swapper
 
+from baseapp_core.plugins import shared_services
 from baseapp_core.tests.factories import UserFactory
+from baseapp_notifications.preferences import (
+    can_receive_many,
+    get_notification_preferences,
+    invalidate_notification_preferences,
+)
+from baseapp_notifications.tasks import send_bulk_notification
+from baseapp_notifications.utils import (
+    can_user_receive_notification,
+    get_users_receiving_notification,
+    send_email_notification,
+)
+
+from .factories import NotificationSettingFactory
 
 pytestmark = pytest.mark.django_db
 
 Notification = swapper.load_model("notifications", "Notification")
+NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationSetting")
+Channels = NotificationSetting.NotificationChannelTypes
 
 
 def test_send_notification_add_to_history(send_notification) -> None:
@@ -136,3 +152,156 @@ def test_can_override_email_message(outbox, send_notification) -> None:
     )
 
     assert "custom message" in outbox[0].body
+
+
+def test_get_users_receiving_notification(django_assert_num_queries) -> None:
+    users = UserFactory.create_batch(3)
+    NotificationSettingFactory(user=users[0], channel=Channels.PUSH, verb="CHATS", is_active=False)
+    NotificationSettingFactory(user=users[1], channel=Channels.ALL, verb="_ALL_", is_active=False)
+    NotificationSettingFactory(user=users[2], channel=Channels.PUSH, verb="OTHER", is_active=False)
+
+    with django_assert_num_queries(1):
+        receiving = get_users_receiving_notification(
+            [user.pk for user in users], "CHATS.NEW_MESSAGE", [Channels.PUSH, Channels.EMAIL]
+        )
+
+    assert receiving == {
+        Channels.PUSH: {users[2].pk},
+        Channels.EMAIL: {users[0].pk, users[2].pk},
+    }
+
+
+@pytest.fixture
+def preferences_cache(settings) -> None:
+    settings.BASEAPP_NOTIFICATIONS_PREFERENCES_CACHE_TIMEOUT = 300
+
+
+@pytest.mark.usefixtures("preferences_cache")
+def test_can_user_receive_notification_caches_preferences(django_assert_num_queries) -> None:
+    user = UserFactory()
+    NotificationSettingFactory(user=user, channel=Channels.EMAIL, verb="CHATS", is_active=False)
+
+    with django_assert_num_queries(1):
+        assert not can_user_receive_notification(user.pk, "CHATS.NEW_MESSAGE", Channels.EMAIL)
+        assert can_user_receive_notification(user.pk, "CHATS.NEW_MESSAGE", Channels.PUSH)
+        assert can_user_receive_notification(user.pk, "OTHER", Channels.EMAIL)
+
+    # Saving a setting drops the cached preferences
+    NotificationSettingFactory(user=user, channel=Channels.ALL, verb="_ALL_", is_active=False)
+    assert not can_user_receive_notification(user.pk, "OTHER", Channels.PUSH)
+
+
+@pytest.mark.usefixtures("preferences_cache")
+def test_preferences_changed_by_update_must_be_invalidated() -> None:
+    user = UserFactory()
+    setting = NotificationSettingFactory(
+        user=user, channel=Channels.PUSH, verb="CHATS", is_active=False
+    )
+    assert not get_notification_preferences(user.pk).can_receive("CHATS", Channels.PUSH)
+
+    NotificationSetting.objects.filter(pk=setting.pk).update(is_active=True)
+    assert not get_notification_preferences(user.pk).can_receive("CHATS", Channels.PUSH)
+
+    invalidate_notification_preferences([user.pk])
+    assert get_notification_preferences(user.pk).can_receive("CHATS", Channels.PUSH)
+
+
+@pytest.mark.usefixtures("preferences_cache")
+def test_can_receive_many_only_queries_missing_users(django_assert_num_queries) -> None:
+    users = UserFactory.create_batch(3)
+    NotificationSettingFactory(user=users[0], channel=Channels.ALL, verb="CHATS", is_active=False)
+    local = {}
+    can_receive_many(users[:2], "CHATS", [Channels.PUSH])
+
+    with django_assert_num_queries(1):
+        receiving = can_receive_many(users, "CHATS", [Channels.PUSH, Channels.IN_APP], local=local)
+    with django_assert_num_queries(0):
+        assert can_receive_many(users, "CHATS", [Channels.PUSH], local=local) == {
+            Channels.PUSH: {users[1].pk, users[2].pk}
+        }
+
+    assert receiving == {
+        Channels.PUSH: {users[1].pk, users[2].pk},
+        Channels.IN_APP: {users[1].pk, users[2].pk},
+    }
+
+
+def test_preferences_cache_is_disabled_by_default(django_assert_num_queries) -> None:
+    user = UserFactory()
+
+    with django_assert_num_queries(2):
+        get_notification_preferences(user.pk)
+        get_notification_preferences(user.pk)
+
+
+def test_send_bulk_notification(outbox, django_capture_on_commit_callbacks) -> None:
+    sender = UserFactory()
+    users = UserFactory.create_batch(3)
+    NotificationSettingFactory(
+        user=users[0], channel=Channels.IN_APP, verb="_ALL_", is_active=False
+    )
+    service = shared_services.get("notifications")
+
+    with patch("baseapp_notifications.tasks.send_push_to_users") as send_push:
+        with django_capture_on_commit_callbacks(execute=True):
+            notifications = service.send_bulk_notification(
+                sender=sender,
+                recipients=users,
+                verb="sent in bulk",
+                description="this is my description",
+                notification_url="https://example.com",
+                push_description="push description",
+            )
+
+    assert {notification.recipient for notification in notifications} == set(users[1:])
+    assert Notification.objects.filter(emailed=True).count() == 2
+    assert sorted(message.to[0] for message in outbox) == sorted(user.email for user in users)
+    send_push.assert_called_once()
+    assert send_push.call_args.args[0] == sorted(user.pk for user in users)
+    assert send_push.call_args.kwargs["push_description"] == "push description"
+
+
+def test_failed_bulk_emails_dont_drop_the_rest(outbox) -> None:
+    users = UserFactory.create_batch(3)
+
+    def send_email(to, **kwargs) -> None:
+        if to == users[0].email:
+            raise ConnectionError("SMTP error")
+        send_email_notification(to=to, **kwargs)
+
+    with (
+        patch("baseapp_notifications.tasks.send_email_notification", side_effect=send_email),
+        patch("baseapp_notifications.tasks.send_push_to_users") as send_push,
+    ):
+        send_bulk_notification(
+            push_user_ids=[users[0].pk],
+            emails=[(user.pk, None) for user in users],
+            push_kwargs={"push_description": "push description"},
+            email_context={"verb": "sent in bulk", "email_message": "message"},
+        )
+
+    assert sorted(message.to[0] for message in outbox) == sorted(user.email for user in users[1:])
+    send_push.assert_called_once()
+
+
+def test_send_bulk_notification_queries_do_not_grow_with_recipients(
+    django_assert_num_queries,
+) -> None:
+    sender = UserFactory()
+    service = shared_services.get("notifications")
+
+    def send(users) -> None:
+        service.send_bulk_notification(
+            sender=sender, recipients=users, verb="sent in bulk", send_email=False, send_push=False
+        )
+
+    # Warms up the content types cache
+    send([UserFactory()])
+    with patch("baseapp_notifications.tasks.send_bulk_notification.delay") as delay:
+        for count in (2, 10):
+            users = UserFactory.create_batch(count)
+            # The settings and the notifications insert
+            with django_assert_num_queries(2):
+                send(users)
+
+    assert not delay.called
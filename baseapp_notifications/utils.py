@@ -1,58 +1,70 @@
 import logging
+from typing import Any
 
-import swapper
-from django.core.mail import send_mail
-from django.db.models import Q
+from django.core.mail import EmailMultiAlternatives
 from django.template.exceptions import TemplateDoesNotExist
-from django.template.loader import render_to_string
+from django.template.loader import get_template
 from django.utils.text import slugify
 
+from .preferences import can_receive_many, get_notification_preferences
 
-def render_verb_template_or_default(verb, context, template_type, extension) -> str:
+
+def get_verb_template(verb, template_type, extension) -> Any:
     try:
-        return render_to_string(
-            f"emails/notifications/{verb}-{template_type}.{extension}.j2",
-            context=context,
-        )
+        return get_template(f"emails/notifications/{verb}-{template_type}.{extension}.j2")
     except TemplateDoesNotExist:
         logging.warning(
             f"Template emails/notifications/{verb}-{template_type}.{extension}.j2 does not exist, falling back to default template"
         )
-        return render_to_string(
-            f"emails/notification-{template_type}.{extension}.j2",
-            context=context,
-        )
+        return get_template(f"emails/notification-{template_type}.{extension}.j2")
+
+
+def render_verb_template_or_default(
+    verb, context, template_type, extension, templates: dict | None = None
+) -> str:
+    """
+    Render the `verb` template, or the default one. `templates` memoises the compiled
+    templates, for callers rendering many emails.
+    """
+    if templates is None:
+        return get_verb_template(verb, template_type, extension).render(context)
+    key = (verb, template_type, extension)
+    if key not in templates:
+        templates[key] = get_verb_template(verb, template_type, extension)
+    return templates[key].render(context)
 
 
-def send_email_notification(to, context) -> None:
+def build_email_notification(
+    to, context, connection=None, templates: dict | None = None
+) -> EmailMultiAlternatives:
     verb = slugify(context["verb"])
 
-    subject = render_verb_template_or_default(verb, context, "subject", "txt")
+    subject = render_verb_template_or_default(verb, context, "subject", "txt", templates)
     subject = " ".join(subject.strip().split())
 
-    text_message = render_verb_template_or_default(verb, context, "body", "txt")
-    html_message = render_verb_template_or_default(verb, context, "body", "html")
+    text_message = render_verb_template_or_default(verb, context, "body", "txt", templates)
+    html_message = render_verb_template_or_default(verb, context, "body", "html", templates)
 
-    send_mail(
-        subject, text_message, html_message=html_message, from_email=None, recipient_list=[to]
-    )
+    message = EmailMultiAlternatives(subject, text_message, to=[to], connection=connection)
+    message.attach_alternative(html_message, "text/html")
+    return message
 
 
-def can_user_receive_notification(user_id, verb, channel) -> bool:
-    NotificationSetting = swapper.load_model("baseapp_notifications", "NotificationSetting")
-    user_setting = (
-        NotificationSetting.objects.filter(
-            Q(channel=channel) | Q(channel=NotificationSetting.NotificationChannelTypes.ALL),
-            Q(verb=get_setting_from_verb(verb)) | Q(verb="_ALL_"),
-            user_id=user_id,
-        )
-        .order_by("is_active")
-        .first()
-    )
+def send_email_notification(to, context, connection=None) -> None:
+    build_email_notification(to, context, connection=connection).send()
+
+
+def can_user_receive_notification(user_id, verb, channel, local: dict | None = None) -> bool:
+    """Whether `user_id` receives `verb` on `channel`, see `baseapp_notifications.preferences`."""
+    return get_notification_preferences(user_id, local=local).can_receive(verb, channel)
 
-    if user_setting:
-        return user_setting.is_active
-    return True
+
+def get_users_receiving_notification(user_ids, verb, channels) -> dict[int, set[int]]:
+    """
+    Vectorised `can_user_receive_notification`: `{channel: user_ids}` of the users among
+    `user_ids` that can receive `verb` on each of `channels`, in at most one query.
+    """
+    return can_receive_many(user_ids, verb, channels)
 
 
 def get_setting_from_verb(verb) -> str:
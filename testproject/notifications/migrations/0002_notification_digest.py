@@ -0,0 +1,36 @@
+# Generated by Django 5.2.14 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="actor_count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="latest_actors",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="email_digest_pending",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("email_digest_pending", True)),
+                fields=["recipient"],
+                name="notification_digest_pending",
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.14 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("notifications", "0002_notification_digest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationDigestActor",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("actor_object_id", models.CharField(max_length=255)),
+                (
+                    "actor_content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+                (
+                    "notification",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="digest_actors",
+                        to=settings.NOTIFICATIONS_NOTIFICATION_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+                "swappable": "BASEAPP_NOTIFICATIONS_NOTIFICATIONDIGESTACTOR_MODEL",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("notification", "actor_content_type", "actor_object_id"),
+                        name="notifications_digest_actor_unique",
+                    )
+                ],
+            },
+        ),
+    ]
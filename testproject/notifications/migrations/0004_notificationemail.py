@@ -0,0 +1,65 @@
+# Generated by Django 5.2.14 on 2026-10-18 12:00
+
+import django.core.serializers.json
+import django.utils.timezone
+import model_utils.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0003_notificationdigestactor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificationEmail",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now, editable=False, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now, editable=False, verbose_name="modified"
+                    ),
+                ),
+                ("to", models.EmailField(max_length=254)),
+                (
+                    "context",
+                    models.JSONField(
+                        default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ("instances", models.JSONField(default=dict)),
+                (
+                    "status",
+                    models.IntegerField(choices=[(0, "Pending"), (1, "Failed")], default=0),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+            options={
+                "abstract": False,
+                "swappable": "BASEAPP_NOTIFICATIONS_NOTIFICATIONEMAIL_MODEL",
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", 0)),
+                        fields=["next_attempt_at"],
+                        name="notifications_email_pending",
+                    )
+                ],
+            },
+        ),
+    ]
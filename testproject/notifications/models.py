@@ -1,5 +1,7 @@
 from baseapp_notifications.models import (
     AbstractNotification,
+    AbstractNotificationDigestActor,
+    AbstractNotificationEmail,
     AbstractNotificationSetting,
 )
 
@@ -12,3 +14,13 @@ class Notification(AbstractNotification):
 class NotificationSetting(AbstractNotificationSetting):
     class Meta(AbstractNotificationSetting.Meta):
         pass
+
+
+class NotificationDigestActor(AbstractNotificationDigestActor):
+    class Meta(AbstractNotificationDigestActor.Meta):
+        pass
+
+
+class NotificationEmail(AbstractNotificationEmail):
+    class Meta(AbstractNotificationEmail.Meta):
+        pass
@@ -237,10 +237,13 @@ BASEAPP_CHATS_CHATROOMPARTICIPANT_MODEL = "social_chats.ChatRoomParticipant"
 BASEAPP_CHATS_UNREADMESSAGECOUNT_MODEL = "social_chats.UnreadMessageCount"
 BASEAPP_CHATS_MESSAGE_MODEL = "social_chats.Message"
 BASEAPP_CHATS_MESSAGESTATUS_MODEL = "social_chats.MessageStatus"
+BASEAPP_CHATS_UNREADMESSAGECOUNTDELTA_MODEL = "social_chats.UnreadMessageCountDelta"
 
 # Notifications
 NOTIFICATIONS_NOTIFICATION_MODEL = "notifications.Notification"
 BASEAPP_NOTIFICATIONS_NOTIFICATIONSETTING_MODEL = "notifications.NotificationSetting"
+BASEAPP_NOTIFICATIONS_NOTIFICATIONDIGESTACTOR_MODEL = "notifications.NotificationDigestActor"
+BASEAPP_NOTIFICATIONS_NOTIFICATIONEMAIL_MODEL = "notifications.NotificationEmail"
 
 # Payments
 BASEAPP_PAYMENTS_CUSTOMER_MODEL = "payments.Customer"
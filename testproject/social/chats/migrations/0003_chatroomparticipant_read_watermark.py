@@ -0,0 +1,27 @@
+# Generated by Django 5.2.14 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_chats", "0002_alter_message_action_object_content_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatroomparticipant",
+            name="last_read_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="chatroomparticipant",
+            name="last_read_message_id",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(fields=["room", "id"], name="social_chats_msg_room_idx"),
+        ),
+    ]
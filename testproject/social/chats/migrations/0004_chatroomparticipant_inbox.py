@@ -0,0 +1,98 @@
+# Generated by Django 5.2.14 on 2026-10-17 12:00
+
+import django.utils.timezone
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_chats", "0003_chatroomparticipant_read_watermark"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatroomparticipant",
+            name="is_pinned",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="chatroomparticipant",
+            name="last_message_time",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="chatroomparticipant",
+            name="unread_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE social_chats_chatroomparticipant AS participant
+                SET last_message_time = COALESCE(room.last_message_time, room.created)
+                FROM social_chats_chatroom AS room
+                WHERE room.id = participant.room_id;
+
+                UPDATE social_chats_chatroomparticipant AS participant
+                SET unread_count = unread.count
+                FROM social_chats_unreadmessagecount AS unread
+                WHERE
+                    unread.room_id = participant.room_id AND
+                    unread.profile_id = participant.profile_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="chatroomparticipant",
+            index=models.Index(
+                fields=["profile", "has_archived_room", "-is_pinned", "-last_message_time", "-id"],
+                include=("room", "unread_count"),
+                name="social_chats_inbox_idx",
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="chatroom",
+            trigger=pgtrigger.compiler.Trigger(
+                name="sync_inbox_last_message_time",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    condition='WHEN (OLD."last_message_time" IS DISTINCT FROM (NEW."last_message_time"))',
+                    func="\n            UPDATE social_chats_chatroomparticipant\n            SET last_message_time = COALESCE(NEW.last_message_time, NEW.created)\n            WHERE room_id = NEW.id;\n            RETURN NULL;\n        ",
+                    hash="60883d79ec9f7559aff5c60268b407c64fbe5579",
+                    operation="UPDATE",
+                    pgid="pgtrigger_sync_inbox_last_message_time_8aa10",
+                    table="social_chats_chatroom",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="chatroomparticipant",
+            trigger=pgtrigger.compiler.Trigger(
+                name="set_inbox_last_message_time",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n            SELECT COALESCE(last_message_time, created, NEW.last_message_time)\n            INTO NEW.last_message_time\n            FROM social_chats_chatroom\n            WHERE id = NEW.room_id;\n            RETURN NEW;\n        ",
+                    hash="d3385358557174bd4181decdd5ec7abff2b68e4d",
+                    operation="INSERT",
+                    pgid="pgtrigger_set_inbox_last_message_time_9be56",
+                    table="social_chats_chatroomparticipant",
+                    when="BEFORE",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="unreadmessagecount",
+            trigger=pgtrigger.compiler.Trigger(
+                name="sync_inbox_unread_count",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n            UPDATE social_chats_chatroomparticipant\n            SET unread_count = NEW.count\n            WHERE\n                room_id = NEW.room_id AND\n                profile_id = NEW.profile_id AND\n                unread_count <> NEW.count;\n            RETURN NULL;\n        ",
+                    hash="24ea4162f79a5f0967886493d39351774fa8c912",
+                    operation='INSERT OR UPDATE OF "count"',
+                    pgid="pgtrigger_sync_inbox_unread_count_90bb8",
+                    table="social_chats_unreadmessagecount",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
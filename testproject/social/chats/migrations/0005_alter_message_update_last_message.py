@@ -0,0 +1,33 @@
+# Generated by Django 5.2.14 on 2026-10-17 12:00
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_chats", "0004_chatroomparticipant_inbox"),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="message",
+            name="update_last_message",
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="message",
+            trigger=pgtrigger.compiler.Trigger(
+                name="update_last_message",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n            UPDATE social_chats_chatroom\n            SET (last_message_id, last_message_time) = (\n                SELECT id, created\n                FROM social_chats_message\n                WHERE room_id = OLD.room_id\n                ORDER BY created DESC\n                LIMIT 1\n            )\n            WHERE\n                id = OLD.room_id AND\n                (last_message_id IS NULL OR last_message_id = OLD.id);\n            RETURN NULL;\n        ",
+                    hash="4534d7c8b05b7952019d3464e08c35297353de63",
+                    operation="DELETE",
+                    pgid="pgtrigger_update_last_message_80435",
+                    table="social_chats_message",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
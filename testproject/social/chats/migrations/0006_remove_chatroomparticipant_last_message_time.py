@@ -0,0 +1,38 @@
+# Generated by Django 5.2.14 on 2026-10-18 12:00
+
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_chats", "0005_alter_message_update_last_message"),
+    ]
+
+    operations = [
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="chatroom",
+            name="sync_inbox_last_message_time",
+        ),
+        pgtrigger.migrations.RemoveTrigger(
+            model_name="chatroomparticipant",
+            name="set_inbox_last_message_time",
+        ),
+        migrations.RemoveIndex(
+            model_name="chatroomparticipant",
+            name="social_chats_inbox_idx",
+        ),
+        migrations.RemoveField(
+            model_name="chatroomparticipant",
+            name="last_message_time",
+        ),
+        migrations.AddIndex(
+            model_name="chatroomparticipant",
+            index=models.Index(
+                fields=["profile", "has_archived_room", "-is_pinned"],
+                include=("room", "unread_count"),
+                name="social_chats_inbox_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("social_chats", "0006_remove_chatroomparticipant_last_message_time"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UnreadMessageCountDelta",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("room_id", models.BigIntegerField()),
+                ("profile_id", models.BigIntegerField()),
+                ("delta", models.IntegerField()),
+            ],
+            options={
+                "abstract": False,
+                "swappable": "BASEAPP_CHATS_UNREADMESSAGECOUNTDELTA_MODEL",
+                "indexes": [
+                    models.Index(
+                        fields=["profile_id", "room_id"], name="social_chats_unread_delta_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -4,6 +4,7 @@ from baseapp_chats.models import (
     AbstractChatRoomParticipant,
     AbstractMessageStatus,
     AbstractUnreadMessageCount,
+    AbstractUnreadMessageCountDelta,
 )
 
 
@@ -30,3 +31,8 @@ class Message(AbstractBaseMessage):
 class MessageStatus(AbstractMessageStatus):
     class Meta(AbstractMessageStatus.Meta):
         pass
+
+
+class UnreadMessageCountDelta(AbstractUnreadMessageCountDelta):
+    class Meta(AbstractUnreadMessageCountDelta.Meta):
+        pass
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.13 on 2026-10-17 22:13
+
+import pgtrigger.compiler
+import pgtrigger.migrations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testapp", "0003_plugin_arch_squashed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DummyBulkPublicIdModel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="dummybulkpublicidmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="insert_document_id",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n                INSERT INTO baseapp_core_documentid (public_id, content_type_id, object_id, created, modified)\n                SELECT gen_random_uuid(), ct.id, new_values.id, NOW(), NOW()\n                FROM new_values\n                CROSS JOIN (\n                    SELECT id FROM django_content_type WHERE app_label = 'testapp' AND model = 'dummybulkpublicidmodel'\n                ) AS ct\n                ON CONFLICT (content_type_id, object_id) DO NOTHING;\n                RETURN NULL;\n                ",
+                    hash="3db88a7fe240ae048acbf0c17dc549af3a46e78d",
+                    level="STATEMENT",
+                    operation="INSERT",
+                    pgid="pgtrigger_insert_document_id_ca854",
+                    referencing="REFERENCING NEW TABLE AS new_values ",
+                    table="testapp_dummybulkpublicidmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+        pgtrigger.migrations.AddTrigger(
+            model_name="dummybulkpublicidmodel",
+            trigger=pgtrigger.compiler.Trigger(
+                name="delete_document_id",
+                sql=pgtrigger.compiler.UpsertTriggerSql(
+                    func="\n                DELETE FROM baseapp_core_documentid AS document_id\n                USING old_values\n                WHERE\n                    document_id.content_type_id = (SELECT id FROM django_content_type WHERE app_label = 'testapp' AND model = 'dummybulkpublicidmodel')\n                    AND document_id.object_id = old_values.id;\n                RETURN NULL;\n                ",
+                    hash="4725066fb3ea5e4a8fa39a18c5a7c4e856e55a4a",
+                    level="STATEMENT",
+                    operation="DELETE",
+                    pgid="pgtrigger_delete_document_id_fb0fb",
+                    referencing="REFERENCING OLD TABLE AS old_values ",
+                    table="testapp_dummybulkpublicidmodel",
+                    when="AFTER",
+                ),
+            ),
+        ),
+    ]
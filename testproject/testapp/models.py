@@ -1,3 +1,4 @@
+import pgtrigger
 from django.db import models
 
 from baseapp_cloudflare_stream_field import CloudflareStreamField
@@ -23,6 +24,13 @@ class DummyPublicIdModel(DocumentIdMixin, models.Model):
     name = models.CharField(max_length=100)
 
 
+# Used for testing the statement-level DocumentId triggers.
+class DummyBulkPublicIdModel(DocumentIdMixin, models.Model):
+    document_id_trigger_level = pgtrigger.Statement
+
+    name = models.CharField(max_length=100)
+
+
 class DummyLegacyWithPkModel(LegacyWithPkMixin, models.Model):
     name = models.CharField(max_length=100)
 
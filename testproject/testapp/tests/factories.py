@@ -1,6 +1,7 @@
 import factory
 
 from testproject.testapp.models import (
+    DummyBulkPublicIdModel,
     DummyLegacyModel,
     DummyLegacyWithPkModel,
     DummyPublicIdModel,
@@ -14,6 +15,13 @@ class DummyPublicIdModelFactory(factory.django.DjangoModelFactory):
         model = DummyPublicIdModel
 
 
+class DummyBulkPublicIdModelFactory(factory.django.DjangoModelFactory):
+    name = factory.Faker("name")
+
+    class Meta:
+        model = DummyBulkPublicIdModel
+
+
 class DummyLegacyWithPkModelFactory(factory.django.DjangoModelFactory):
     name = factory.Faker("name")
 